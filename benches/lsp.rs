@@ -0,0 +1,304 @@
+//! Benchmarks for LSP work against the scripted `tethys-fake-lsp` server
+//! (build with `--features fake-lsp`), so no real language server is
+//! needed.
+//!
+//! These benchmarks measure:
+//! - One session's `textDocument/definition` traffic for many references
+//!   spread over a few documents (`goto_definitions`), one round-trip at a
+//!   time vs pipelined with the default window
+//! - Pass 3 throughput: a full `index_with_options` whose method calls only
+//!   the server can resolve, in references per second, with every document
+//!   opened up front (`DefinitionQueries::PerReference`) vs one open
+//!   document at a time (`DefinitionQueries::PerDocument`), next to the
+//!   same index without LSP
+//! - `callers --lsp` latency (`CallerMode::LspRefined`): server start,
+//!   readiness wait, one `textDocument/references`, and the merge
+//!
+//! The fake server spends a fixed time on every message it reads, so the
+//! numbers track client-side cost plus a modelled per-message server cost.
+
+// Benchmark code - performance of the benchmark setup is not critical
+#![allow(missing_docs)]
+#![allow(clippy::format_push_string)]
+#![allow(clippy::cast_possible_truncation)]
+
+mod common;
+
+use std::fs;
+use std::path::{Path, PathBuf};
+
+use criterion::{BenchmarkId, Criterion, Throughput, black_box, criterion_group, criterion_main};
+use serde_json::{Value, json};
+use tethys::lsp::{DefinitionQueries, LspClient, LspProvider, ReadinessWait};
+use tethys::{CallerMode, IndexOptions, Language, Tethys};
+
+use common::{as_file_refs, create_indexed_workspace, create_workspace};
+
+const NUM_DOCUMENTS: usize = 20;
+const REFS_PER_DOCUMENT: usize = 100;
+/// Server time per incoming message.
+const LATENCY_US: u64 = 20;
+
+/// Modules in the Pass 3 workspace, each with a caller file.
+const PASS3_MODULES: usize = 10;
+/// `c.area()` / `s.area()` call pairs per caller file.
+const CALL_PAIRS_PER_MODULE: usize = 25;
+
+/// Runs `tethys-fake-lsp` with a fixture.
+struct FakeProvider {
+    fixture: String,
+    queries: DefinitionQueries,
+}
+
+impl FakeProvider {
+    /// Write `fixture` to `path` and serve it.
+    fn write(path: &Path, fixture: &Value) -> Self {
+        fs::write(path, fixture.to_string()).expect("write fixture");
+        Self {
+            fixture: path.to_string_lossy().into_owned(),
+            queries: DefinitionQueries::PerReference,
+        }
+    }
+}
+
+impl LspProvider for FakeProvider {
+    fn command(&self) -> &'static str {
+        env!("CARGO_BIN_EXE_tethys-fake-lsp")
+    }
+
+    fn args(&self) -> Vec<&str> {
+        vec![self.fixture.as_str()]
+    }
+
+    fn readiness_wait(&self) -> ReadinessWait {
+        ReadinessWait::Quiescence
+    }
+
+    fn definition_queries(&self) -> DefinitionQueries {
+        self.queries
+    }
+}
+
+/// Write `NUM_DOCUMENTS` sources whose every position has a definition in
+/// the first one. Returns the sources' paths.
+fn write_documents(root: &Path) -> Vec<PathBuf> {
+    (0..NUM_DOCUMENTS)
+        .map(|d| {
+            let path = root.join(format!("doc_{d}.rs"));
+            let body: String = (0..REFS_PER_DOCUMENT)
+                .map(|i| format!("    helper_{i}();\n"))
+                .collect();
+            fs::write(&path, format!("fn caller_{d}() {{\n{body}}}\n")).expect("write source");
+            path.canonicalize().expect("canonical path")
+        })
+        .collect()
+}
+
+fn bench_definition_queries(c: &mut Criterion) {
+    let dir = tempfile::tempdir().expect("tempdir");
+    let documents = write_documents(dir.path());
+    let fixture = json!({
+        "latency_us": LATENCY_US,
+        "default_target": {"path": documents[0], "line": 0},
+    });
+    let positions: Vec<(&Path, u32, u32)> = documents
+        .iter()
+        .flat_map(|doc| (1..=REFS_PER_DOCUMENT).map(move |line| (doc.as_path(), line as u32, 4)))
+        .collect();
+
+    let mut group = c.benchmark_group("lsp_definitions");
+    group.sample_size(20);
+    group.throughput(Throughput::Elements(positions.len() as u64));
+
+    let provider = FakeProvider::write(&dir.path().join("fixture.json"), &fixture);
+    let mut client = LspClient::start(&provider, dir.path()).expect("start fake server");
+    let pipelined = client.max_in_flight();
+    for (name, window) in [("sequential", 1), ("pipelined", pipelined)] {
+        client.set_max_in_flight(window);
+        group.bench_function(BenchmarkId::new(name, positions.len()), |b| {
+            b.iter(|| {
+                let mut found = 0usize;
+                client
+                    .goto_definitions(positions.iter().copied(), |_, definition| {
+                        found += usize::from(matches!(definition, Ok(Some(_))));
+                    })
+                    .expect("pipeline");
+                assert_eq!(found, positions.len());
+                black_box(found)
+            });
+        });
+    }
+    client.shutdown().expect("shutdown");
+    group.finish();
+}
+
+/// Generate a workspace where every `area` call is left to Pass 3 (the
+/// receivers are untyped `let`s and every module has two `area` methods),
+/// and a fixture answering each call with its `impl` method. Returns the
+/// files, the fixture, and the number of calls.
+///
+/// Each `src/shape_{i}.rs` has `Circle::area` on 0-based line 12 and
+/// `Square::area` on line 18; each `src/use_{i}.rs` calls them from
+/// 0-based line 6 on, alternating, with the method name at character 11.
+fn generate_pass3_workspace() -> (Vec<(String, String)>, Value, usize) {
+    let mut files = vec![(
+        "Cargo.toml".to_string(),
+        "[package]\nname = \"bench_workspace\"\nversion = \"0.0.0\"\nedition = \"2021\"\n"
+            .to_string(),
+    )];
+    let mut lib = String::new();
+    let mut definitions = Vec::new();
+
+    for i in 0..PASS3_MODULES {
+        lib.push_str(&format!("pub mod shape_{i};\npub mod use_{i};\n"));
+        files.push((
+            format!("src/shape_{i}.rs"),
+            format!(
+                "pub struct Circle;\n\
+                 pub struct Square;\n\
+                 \n\
+                 pub fn circle_{i}() -> Circle {{\n\
+                 \x20   Circle\n\
+                 }}\n\
+                 \n\
+                 pub fn square_{i}() -> Square {{\n\
+                 \x20   Square\n\
+                 }}\n\
+                 \n\
+                 impl Circle {{\n\
+                 \x20   pub fn area(&self) -> u32 {{\n\
+                 \x20       3\n\
+                 \x20   }}\n\
+                 }}\n\
+                 \n\
+                 impl Square {{\n\
+                 \x20   pub fn area(&self) -> u32 {{\n\
+                 \x20       4\n\
+                 \x20   }}\n\
+                 }}\n"
+            ),
+        ));
+
+        let mut caller = format!(
+            "use crate::shape_{i};\n\
+             \n\
+             pub fn total() -> u32 {{\n\
+             \x20   let c = shape_{i}::circle_{i}();\n\
+             \x20   let s = shape_{i}::square_{i}();\n\
+             \x20   let mut n = 0;\n"
+        );
+        for pair in 0..CALL_PAIRS_PER_MODULE {
+            caller.push_str("    n += c.area();\n    n += s.area();\n");
+            for (offset, target_line) in [(0, 12), (1, 18)] {
+                definitions.push(json!({
+                    "path": format!("src/use_{i}.rs"),
+                    "line": 6 + 2 * pair + offset,
+                    "character": 11,
+                    "target": {"path": format!("src/shape_{i}.rs"), "line": target_line},
+                }));
+            }
+        }
+        caller.push_str("    n\n}\n");
+        files.push((format!("src/use_{i}.rs"), caller));
+    }
+    files.push(("src/lib.rs".to_string(), lib));
+
+    let calls = definitions.len();
+    let fixture = json!({"latency_us": LATENCY_US, "definitions": definitions});
+    (files, fixture, calls)
+}
+
+/// Benchmark a full index with Pass 3 against the fake server.
+fn bench_pass3(c: &mut Criterion) {
+    let (files, fixture, calls) = generate_pass3_workspace();
+    let file_refs = as_file_refs(&files);
+    let fixture_dir = tempfile::tempdir().expect("tempdir");
+    let fixture_path = fixture_dir.path().join("fixture.json");
+    fs::write(&fixture_path, fixture.to_string()).expect("write fixture");
+
+    let mut group = c.benchmark_group("pass3");
+    group.sample_size(10);
+    group.throughput(Throughput::Elements(calls as u64));
+
+    group.bench_function(BenchmarkId::new("without_lsp", calls), |b| {
+        b.iter_with_setup(
+            || {
+                let (dir, path) = create_workspace(&file_refs);
+                let tethys = Tethys::new(&path).expect("failed to create Tethys");
+                (dir, tethys)
+            },
+            |(_dir, mut tethys)| black_box(tethys.index().expect("index failed")),
+        );
+    });
+
+    for (name, queries) in [
+        ("per_reference", DefinitionQueries::PerReference),
+        ("per_document", DefinitionQueries::PerDocument),
+    ] {
+        group.bench_function(BenchmarkId::new(name, calls), |b| {
+            b.iter_with_setup(
+                || {
+                    let (dir, path) = create_workspace(&file_refs);
+                    let mut tethys = Tethys::new(&path).expect("failed to create Tethys");
+                    tethys.set_lsp_provider(
+                        Language::Rust,
+                        FakeProvider {
+                            fixture: fixture_path.to_string_lossy().into_owned(),
+                            queries,
+                        },
+                    );
+                    (dir, tethys)
+                },
+                |(_dir, mut tethys)| {
+                    let stats = tethys
+                        .index_with_options(IndexOptions::with_lsp())
+                        .expect("index failed");
+                    assert_eq!(stats.total_lsp_resolved(), calls);
+                    black_box(stats)
+                },
+            );
+        });
+    }
+    group.finish();
+}
+
+/// Benchmark one `CallerMode::LspRefined` query: a server per query, as
+/// `tethys callers --lsp` runs without a broker.
+fn bench_callers_lsp(c: &mut Criterion) {
+    let (files, _, _) = generate_pass3_workspace();
+    let mut workspace = create_indexed_workspace(&as_file_refs(&files));
+    // `circle_0` is defined on 0-based line 3, character 7, and called
+    // from `use_0::total`.
+    let fixture = json!({
+        "latency_us": LATENCY_US,
+        "references": [{
+            "path": "src/shape_0.rs", "line": 3, "character": 7,
+            "locations": [{"path": "src/use_0.rs", "line": 3, "character": 21}],
+        }],
+    });
+    let fixture_path = workspace.dir.path().join("fixture.json");
+    let provider = FakeProvider::write(&fixture_path, &fixture);
+    workspace.tethys.set_lsp_provider(Language::Rust, provider);
+
+    let mut group = c.benchmark_group("callers_lsp");
+    group.sample_size(20);
+    group.bench_function("cold_server", |b| {
+        b.iter(|| {
+            let callers = workspace
+                .tethys
+                .get_callers("circle_0", CallerMode::LspRefined)
+                .expect("callers");
+            assert_eq!(callers.len(), 1);
+            black_box(callers)
+        });
+    });
+    group.finish();
+}
+
+criterion_group!(
+    benches,
+    bench_definition_queries,
+    bench_pass3,
+    bench_callers_lsp
+);
+criterion_main!(benches);
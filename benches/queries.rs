@@ -3,6 +3,10 @@
 //! These benchmarks measure the performance of:
 //! - `get_callers` with varying numbers of callers
 //! - `get_symbol_impact` for transitive caller analysis
+//! - `search_symbols` ranked name search at 10k/100k/1M symbols
+//! - every hot query shape side by side (`query_shapes`)
+//! - `get_type_hierarchy` over deep class chains and wide trait hierarchies,
+//!   from the precomputed closure and by walking `inherit` refs
 //! - Database index effectiveness
 
 // Benchmark code - performance of the benchmark setup is not critical
@@ -333,6 +337,95 @@ fn bench_get_references(c: &mut Criterion) {
     group.finish();
 }
 
+/// Latency of every hot query shape against one mixed workspace, so a
+/// single `--save-baseline` / `--baseline` comparison covers them all.
+/// Their plans are pinned by `tests/query_plans.rs`.
+fn bench_hot_query_shapes(c: &mut Criterion) {
+    let mut group = c.benchmark_group("query_shapes");
+
+    let files = generate_mixed_call_graph(20);
+    let file_refs = as_file_refs(&files);
+    let workspace = create_indexed_workspace(&file_refs);
+    let tethys = &workspace.tethys;
+    let core_file = workspace.dir.path().join("src/core.rs");
+    let consumer_file = workspace.dir.path().join("src/consumer0.rs");
+
+    for (name, call_edges) in [
+        ("callers", tethys::CallEdgeSelection::All),
+        (
+            "callers_exclude_speculative",
+            tethys::CallEdgeSelection::ExcludeSpeculative,
+        ),
+    ] {
+        group.bench_function(name, |b| {
+            b.iter(|| {
+                black_box(
+                    tethys
+                        .get_callers("core_compute", tethys::CallerMode::Indexed { call_edges })
+                        .expect("get_callers failed"),
+                )
+            });
+        });
+    }
+    group.bench_function("callees", |b| {
+        b.iter(|| {
+            black_box(
+                tethys
+                    .get_symbol_dependencies("consumer0_main")
+                    .expect("get_symbol_dependencies failed"),
+            )
+        });
+    });
+    group.bench_function("transitive_callers", |b| {
+        b.iter(|| {
+            black_box(
+                tethys
+                    .get_symbol_impact("core_compute", None, tethys::CallEdgeSelection::All)
+                    .expect("get_symbol_impact failed"),
+            )
+        });
+    });
+    group.bench_function("references_to_symbol", |b| {
+        b.iter(|| {
+            black_box(
+                tethys
+                    .get_references("core_compute")
+                    .expect("get_references failed"),
+            )
+        });
+    });
+    group.bench_function("references_in_file", |b| {
+        b.iter(|| {
+            black_box(
+                tethys
+                    .list_references_in_file(&consumer_file)
+                    .expect("list_references_in_file failed"),
+            )
+        });
+    });
+    group.bench_function("transitive_dependents", |b| {
+        b.iter(|| {
+            black_box(
+                tethys
+                    .get_impact(&core_file, None)
+                    .expect("get_impact failed"),
+            )
+        });
+    });
+    group.bench_function("imports_in_file", |b| {
+        b.iter(|| {
+            black_box(
+                tethys
+                    .list_imports_in_file(&consumer_file)
+                    .expect("list_imports_in_file failed"),
+            )
+        });
+    });
+
+    group.finish();
+    drop(workspace.dir);
+}
+
 /// Benchmark dependency chain finding.
 fn bench_dependency_chain(c: &mut Criterion) {
     let mut group = c.benchmark_group("dependency_chain");
@@ -363,6 +456,174 @@ fn bench_dependency_chain(c: &mut Criterion) {
     group.finish();
 }
 
+/// Generate a workspace with `num_symbols` functions, 1000 per file, named
+/// from a small vocabulary (`parse_config_17`, `load_buffer_902`, ...) so
+/// substring, prefix, and fuzzy queries all have realistic hit rates.
+fn generate_symbol_search_workspace(num_symbols: usize) -> Vec<(String, String)> {
+    const VERBS: &[&str] = &["parse", "load", "render", "update", "flush", "resolve"];
+    const NOUNS: &[&str] = &["config", "buffer", "request", "session", "token", "graph"];
+    const PER_FILE: usize = 1000;
+
+    let num_files = num_symbols.div_ceil(PER_FILE);
+    let mut lib_content = String::new();
+    for f in 0..num_files {
+        lib_content.push_str(&format!("mod m{f};\n"));
+    }
+    let mut files = vec![("src/lib.rs".to_string(), lib_content)];
+
+    for f in 0..num_files {
+        let mut content = String::new();
+        for i in 0..PER_FILE.min(num_symbols - f * PER_FILE) {
+            let verb = VERBS[i % VERBS.len()];
+            let noun = NOUNS[(i / VERBS.len()) % NOUNS.len()];
+            content.push_str(&format!("pub fn {verb}_{noun}_{f}_{i}() {{}}\n"));
+        }
+        files.push((format!("src/m{f}.rs"), content));
+    }
+
+    files
+}
+
+/// Benchmark `search_symbols` across index sizes: a trigram-indexed
+/// substring query, a short query on the `LIKE` fallback, and a fuzzy
+/// query that is no substring of any name, answered by the subsequence
+/// tier from the names sharing its trigrams (`update_session_*`).
+fn bench_search_symbols(c: &mut Criterion) {
+    let mut group = c.benchmark_group("search_symbols");
+    group.sample_size(20);
+
+    for num_symbols in &[10_000, 100_000, 1_000_000] {
+        let files = generate_symbol_search_workspace(*num_symbols);
+        let file_refs = as_file_refs(&files);
+        let workspace = create_indexed_workspace(&file_refs);
+
+        group.throughput(Throughput::Elements(*num_symbols as u64));
+
+        for (label, query) in [
+            ("substring", "config_4"),
+            ("short", "pa"),
+            ("fuzzy", "updsess"),
+        ] {
+            group.bench_with_input(BenchmarkId::new(label, num_symbols), query, |b, query| {
+                b.iter(|| {
+                    let symbols = workspace
+                        .tethys
+                        .search_symbols(query)
+                        .expect("search_symbols failed");
+                    black_box(symbols)
+                });
+            });
+        }
+
+        drop(workspace.dir);
+    }
+
+    group.finish();
+}
+
+/// Generate a C# class chain `depth` levels deep: `C0` is the base and
+/// each `C{i}` extends `C{i-1}`, one namespace, one file.
+fn generate_deep_class_tree(depth: usize) -> Vec<(String, String)> {
+    let mut content = String::from("namespace Bench\n{\n    public class C0 { }\n");
+    for i in 1..=depth {
+        content.push_str(&format!("    public class C{i} : C{} {{ }}\n", i - 1));
+    }
+    content.push_str("}\n");
+    vec![("cs/Classes.cs".to_string(), content)]
+}
+
+/// Generate `width` structs implementing `Leaf`, a trait three supertraits
+/// deep (`Leaf: Mid + Debug`, `Mid: Root`), 100 structs per file, plus
+/// blanket impls over the traits.
+fn generate_wide_trait_hierarchy(width: usize) -> Vec<(String, String)> {
+    const PER_FILE: usize = 100;
+
+    let num_files = width.div_ceil(PER_FILE);
+    let mut lib_content = String::from(
+        "pub trait Root {}\n\
+         pub trait Mid: Root {}\n\
+         pub trait Leaf: Mid + std::fmt::Debug {}\n\
+         impl<T: Leaf> Mid for T {}\n\
+         impl<T: Mid> Root for T {}\n",
+    );
+    for f in 0..num_files {
+        lib_content.push_str(&format!("mod m{f};\n"));
+    }
+    let mut files = vec![("src/lib.rs".to_string(), lib_content)];
+
+    for f in 0..num_files {
+        let mut content = String::from("use crate::Leaf;\n\n");
+        for i in 0..PER_FILE.min(width - f * PER_FILE) {
+            content.push_str(&format!(
+                "#[derive(Debug)]\npub struct S{f}_{i};\nimpl Leaf for S{f}_{i} {{}}\n\n"
+            ));
+        }
+        files.push((format!("src/m{f}.rs"), content));
+    }
+
+    files
+}
+
+/// Benchmark `get_type_hierarchy` over deep and wide hierarchies, served
+/// from the closure the index maintains and (`walk`) by walking `inherit`
+/// refs once the closure is marked stale.
+fn bench_type_hierarchy(c: &mut Criterion) {
+    let mut group = c.benchmark_group("type_hierarchy");
+    group.sample_size(20);
+
+    let deep = [10, 100, 500].map(|depth| {
+        (
+            format!("deep_{depth}"),
+            generate_deep_class_tree(depth),
+            format!("C{depth}"),
+            "C0".to_string(),
+        )
+    });
+    let wide = [100, 1_000, 5_000].map(|width| {
+        (
+            format!("wide_{width}"),
+            generate_wide_trait_hierarchy(width),
+            "S0_0".to_string(),
+            "Root".to_string(),
+        )
+    });
+
+    for (label, files, bottom, top) in deep.into_iter().chain(wide) {
+        let file_refs = as_file_refs(&files);
+        let workspace = create_indexed_workspace(&file_refs);
+
+        for mode in ["closure", "walk"] {
+            if mode == "walk" {
+                rusqlite::Connection::open(workspace.tethys.db_path())
+                    .expect("open index")
+                    .execute("DELETE FROM derived_state WHERE name = 'type_closure'", [])
+                    .expect("mark the closure stale");
+            }
+            for (direction, name, dir) in [
+                ("up", &bottom, tethys::HierarchyDirection::Up),
+                ("down", &top, tethys::HierarchyDirection::Down),
+            ] {
+                group.bench_function(
+                    BenchmarkId::new(format!("{mode}_{direction}"), &label),
+                    |b| {
+                        b.iter(|| {
+                            let hierarchy = workspace
+                                .tethys
+                                .get_type_hierarchy(name, dir)
+                                .expect("get_type_hierarchy failed");
+                            black_box(hierarchy)
+                        });
+                    },
+                );
+            }
+        }
+
+        drop(workspace.dir);
+    }
+
+    group.finish();
+}
+
 /// Print database index usage analysis (not a benchmark, but useful for optimization).
 fn analyze_query_plans(c: &mut Criterion) {
     let mut group = c.benchmark_group("query_analysis");
@@ -396,6 +657,9 @@ fn analyze_query_plans(c: &mut Criterion) {
     println!("  Symbols: {}", stats.symbol_count);
     println!("  References: {}", stats.reference_count);
     println!("  File dependencies: {}", stats.file_dependency_count);
+    // Main file only: rows still in the WAL are not counted.
+    let db_bytes = std::fs::metadata(workspace.tethys.db_path()).map_or(0, |m| m.len());
+    println!("  Database file: {db_bytes} bytes");
 
     drop(workspace.dir);
 }
@@ -407,7 +671,10 @@ criterion_group!(
     bench_get_symbol_impact_mixed,
     bench_get_file_impact,
     bench_get_references,
+    bench_hot_query_shapes,
     bench_dependency_chain,
+    bench_search_symbols,
+    bench_type_hierarchy,
     analyze_query_plans,
 );
 
@@ -0,0 +1,110 @@
+//! Benchmarks for the shared multi-pattern word-boundary scanner.
+//!
+//! These benchmarks measure:
+//! - Compiling 10k candidate names into one automaton
+//! - One parallel pass of those names over ~100 MB of generated source
+//! - The per-name `find` loop the scanner replaced, on a 1 MB slice, for
+//!   scale
+
+// Benchmark code - performance of the benchmark setup is not critical
+#![allow(missing_docs)]
+#![allow(clippy::format_push_string)]
+#![allow(clippy::cast_possible_truncation)]
+
+use criterion::{BenchmarkId, Criterion, Throughput, black_box, criterion_group, criterion_main};
+use tethys::word_scan::WordScanner;
+
+const NUM_NAMES: usize = 10_000;
+const FILE_BYTES: usize = 100 * 1024;
+const NUM_FILES: usize = 1_000;
+
+/// Candidate names shaped like dead-code candidates (`helper_1234`).
+fn candidate_names() -> Vec<String> {
+    (0..NUM_NAMES).map(|i| format!("helper_{i}")).collect()
+}
+
+/// Generate `NUM_FILES` Rust-ish sources of ~`FILE_BYTES` each, mentioning
+/// a sparse, deterministic subset of the candidate names among plenty of
+/// near-miss identifiers (`helper_12x`, `my_helper_12`).
+fn generate_corpus() -> Vec<String> {
+    (0..NUM_FILES)
+        .map(|f| {
+            let mut content = String::with_capacity(FILE_BYTES + 128);
+            let mut i = 0usize;
+            while content.len() < FILE_BYTES {
+                let n = (f * 7919 + i * 104_729) % (NUM_NAMES * 4);
+                content.push_str(&format!(
+                    "fn generated_{f}_{i}(x: i64) -> i64 {{ helper_{n}(x) + my_helper_{n}(x) + helper_{n}x }}\n"
+                ));
+                i += 1;
+            }
+            content
+        })
+        .collect()
+}
+
+/// The pre-scanner shape: one `find` loop per name over the content.
+fn count_per_name(content: &str, names: &[String]) -> usize {
+    let bytes = content.as_bytes();
+    let is_ident = |b: u8| b.is_ascii_alphanumeric() || b == b'_';
+    let mut total = 0;
+    for name in names {
+        let mut start = 0;
+        while let Some(pos) = content[start..].find(name.as_str()) {
+            let abs = start + pos;
+            let end = abs + name.len();
+            if (abs == 0 || !is_ident(bytes[abs - 1]))
+                && (end >= bytes.len() || !is_ident(bytes[end]))
+            {
+                total += 1;
+            }
+            start = end;
+        }
+    }
+    total
+}
+
+fn bench_word_scan(c: &mut Criterion) {
+    let names = candidate_names();
+    let corpus = generate_corpus();
+    let corpus_bytes: usize = corpus.iter().map(String::len).sum();
+
+    let mut group = c.benchmark_group("word_scan");
+    group.sample_size(10);
+
+    group.bench_function(BenchmarkId::new("build", NUM_NAMES), |b| {
+        b.iter(|| black_box(WordScanner::new(names.iter().cloned()).expect("build scanner")));
+    });
+
+    let scanner = WordScanner::new(names.iter().cloned()).expect("build scanner");
+    group.throughput(Throughput::Bytes(corpus_bytes as u64));
+    group.bench_function(BenchmarkId::new("scan_all_100mb", NUM_NAMES), |b| {
+        b.iter(|| {
+            let hits: usize = scanner.scan_all(&corpus).iter().map(Vec::len).sum();
+            black_box(hits)
+        });
+    });
+
+    // Baseline on ~1 MB: the per-name loop is O(names x bytes), so the
+    // full 100 MB would take minutes per iteration.
+    let slice = &corpus[..10];
+    let slice_bytes: usize = slice.iter().map(String::len).sum();
+    group.throughput(Throughput::Bytes(slice_bytes as u64));
+    group.bench_function(BenchmarkId::new("scanner_1mb", NUM_NAMES), |b| {
+        b.iter(|| {
+            let hits: usize = slice.iter().map(|c| scanner.occurrences(c).len()).sum();
+            black_box(hits)
+        });
+    });
+    group.bench_function(BenchmarkId::new("per_name_find_1mb", NUM_NAMES), |b| {
+        b.iter(|| {
+            let hits: usize = slice.iter().map(|c| count_per_name(c, &names)).sum();
+            black_box(hits)
+        });
+    });
+
+    group.finish();
+}
+
+criterion_group!(benches, bench_word_scan);
+criterion_main!(benches);
@@ -29,7 +29,7 @@
 //! let batch_writer = BatchWriter::new(db_path, 100);
 //!
 //! source_files.par_iter().for_each(|(path, lang)| {
-//!     if let Ok(data) = Tethys::parse_file_static(&workspace_root, path, *lang) {
+//!     if let Ok(data) = Tethys::parse_file_static(&workspace_root, path, *lang, None) {
 //!         let _ = batch_writer.send(data);
 //!     }
 //! });
@@ -254,10 +254,11 @@ impl BatchWriter {
             data.language,
             data.mtime_ns,
             data.size_bytes,
-            None,
+            Some(data.content_hash),
             &symbol_data,
             &data.references,
             &data.imports,
+            Some(&data.identifiers),
         )?;
 
         Ok((data.symbols.len(), refs_stored))
@@ -288,6 +289,7 @@ mod tests {
             language: Language::Rust,
             mtime_ns: 1_234_567_890,
             size_bytes: 100,
+            content_hash: 0,
             symbols: vec![OwnedSymbolData {
                 name: "main".to_string(),
                 module_path: "crate".to_string(),
@@ -305,6 +307,7 @@ mod tests {
             }],
             references: vec![],
             imports: vec![],
+            identifiers: vec![],
         };
 
         writer.send(data);
@@ -330,9 +333,11 @@ mod tests {
                 language: Language::Rust,
                 mtime_ns: 1_234_567_890 + i64::from(i),
                 size_bytes: 100,
+                content_hash: 0,
                 symbols: vec![],
                 references: vec![],
                 imports: vec![],
+                identifiers: vec![],
             };
             writer.send(data);
         }
@@ -385,6 +390,7 @@ mod tests {
             language: Language::Rust,
             mtime_ns: 1,
             size_bytes: 1,
+            content_hash: 0,
             symbols: vec![OwnedSymbolData {
                 name: name.to_string(),
                 module_path: String::new(),
@@ -402,6 +408,7 @@ mod tests {
             }],
             references: vec![],
             imports: vec![],
+            identifiers: vec![],
         };
 
         let mut bad = good("poisoned");
@@ -0,0 +1,364 @@
+//! Scripted stand-in for a language server, for the LSP benches and tests.
+//!
+//! Speaks JSON-RPC over stdio like a real server, but replays
+//! `textDocument/definition` and `textDocument/references` answers from a
+//! fixture instead of analysing code, so Pass 3 and `callers --lsp` can be
+//! measured and tested without rust-analyzer or csharp-ls installed.
+//! Built only with the `fake-lsp` feature; plug it in with
+//! `Tethys::set_lsp_provider`.
+//!
+//! ```text
+//! tethys-fake-lsp FIXTURE.json
+//! ```
+//!
+//! The fixture is a JSON object; every field is optional:
+//!
+//! - `latency_us`: time spent on every incoming message before answering
+//!   it, modelling per-message server cost.
+//! - `position_encoding`: `"utf-8"` (default) or `"utf-16"`, chosen in
+//!   `initialize` when the client offers it (else `utf-16`, the protocol
+//!   default). Fixture characters are in this encoding's units.
+//! - `readiness`: the signal sent after `initialized`: `"quiescence"`
+//!   (default; rust-analyzer's `experimental/serverStatus`),
+//!   `"solution_load"` (csharp-ls's "Loading workspace" `$/progress`), or
+//!   `"none"`, which leaves the client's readiness wait to time out.
+//! - `ready_after_ms`: delay before the readiness signal, modelling
+//!   workspace load time.
+//! - `definitions`: `[{"path", "line", "character", "target": {"path",
+//!   "line", "character"?}}]`, the answer for a 0-based position.
+//! - `default_target`: `{"path", "line"}` for positions not listed;
+//!   without it they have no definition (`null`).
+//! - `require_open`: answer definitions only in documents currently open
+//!   (`didOpen` without a later `didClose`), like a server that analyses
+//!   open documents only; others have no definition.
+//! - `references`: `[{"path", "line", "character", "locations": [{"path",
+//!   "line", "character"?}]}]`; unlisted positions have no references.
+//!
+//! Relative paths are resolved against the workspace root the client sends
+//! in `initialize`, so one fixture fits any checkout of the workspace.
+
+use std::collections::{HashMap, HashSet};
+use std::io::{self, BufRead, BufReader, Write};
+use std::path::{Path, PathBuf};
+use std::time::Duration;
+
+use percent_encoding::percent_decode_str;
+use serde::Deserialize;
+use serde_json::{Value, json};
+
+/// A location in the fixture.
+#[derive(Debug, Clone, Deserialize)]
+struct Target {
+    path: PathBuf,
+    line: u32,
+    #[serde(default)]
+    character: u32,
+}
+
+/// One scripted `textDocument/definition` answer.
+#[derive(Debug, Deserialize)]
+struct Definition {
+    path: PathBuf,
+    line: u32,
+    character: u32,
+    target: Target,
+}
+
+/// One scripted `textDocument/references` answer.
+#[derive(Debug, Deserialize)]
+struct References {
+    path: PathBuf,
+    line: u32,
+    character: u32,
+    locations: Vec<Target>,
+}
+
+/// The readiness signal sent after `initialized`.
+#[derive(Debug, Clone, Copy, Default, Deserialize)]
+#[serde(rename_all = "snake_case")]
+enum Readiness {
+    #[default]
+    Quiescence,
+    SolutionLoad,
+    None,
+}
+
+/// The fixture file's contents.
+#[derive(Debug, Deserialize)]
+#[serde(default)]
+struct Fixture {
+    latency_us: u64,
+    position_encoding: String,
+    readiness: Readiness,
+    ready_after_ms: u64,
+    definitions: Vec<Definition>,
+    default_target: Option<Target>,
+    require_open: bool,
+    references: Vec<References>,
+}
+
+impl Default for Fixture {
+    fn default() -> Self {
+        Self {
+            latency_us: 0,
+            position_encoding: "utf-8".to_string(),
+            readiness: Readiness::default(),
+            ready_after_ms: 0,
+            definitions: Vec::new(),
+            default_target: None,
+            require_open: false,
+            references: Vec::new(),
+        }
+    }
+}
+
+/// A 0-based position in an absolute path, the key answers are looked up by.
+type Position = (PathBuf, u32, u32);
+
+/// The scripted server's state.
+struct FakeServer {
+    fixture: Fixture,
+    /// Workspace root from `initialize`; relative fixture paths hang off it.
+    root: PathBuf,
+    definitions: HashMap<Position, Target>,
+    references: HashMap<Position, Vec<Target>>,
+    /// Documents opened and not since closed.
+    open: HashSet<PathBuf>,
+}
+
+impl FakeServer {
+    fn new(fixture: Fixture) -> Self {
+        Self {
+            fixture,
+            root: PathBuf::new(),
+            definitions: HashMap::new(),
+            references: HashMap::new(),
+            open: HashSet::new(),
+        }
+    }
+
+    /// Index the fixture's answers by absolute position once the
+    /// workspace root is known.
+    fn load(&mut self, root: PathBuf) {
+        self.root = root;
+        let root = &self.root;
+        self.definitions = self
+            .fixture
+            .definitions
+            .iter()
+            .map(|d| ((root.join(&d.path), d.line, d.character), d.target.clone()))
+            .collect();
+        self.references = self
+            .fixture
+            .references
+            .iter()
+            .map(|r| {
+                (
+                    (root.join(&r.path), r.line, r.character),
+                    r.locations.clone(),
+                )
+            })
+            .collect();
+    }
+
+    /// Answer one message: `Some(response)` for a request, `None` for a
+    /// notification.
+    fn handle(&mut self, message: &Value, out: &mut impl Write) -> io::Result<Option<Value>> {
+        let method = message.get("method").and_then(Value::as_str).unwrap_or("");
+        let Some(id) = message.get("id") else {
+            match method {
+                "initialized" => self.signal_ready(out)?,
+                "textDocument/didOpen" => {
+                    self.open.extend(document_path(&message["params"]));
+                }
+                "textDocument/didClose" => {
+                    if let Some(path) = document_path(&message["params"]) {
+                        self.open.remove(&path);
+                    }
+                }
+                "exit" => std::process::exit(0),
+                _ => {}
+            }
+            return Ok(None);
+        };
+        let result = match method {
+            "initialize" => self.initialize(&message["params"]),
+            "textDocument/definition" => self.definition(&message["params"]),
+            "textDocument/references" => self.references(&message["params"]),
+            _ => Value::Null,
+        };
+        Ok(Some(json!({"jsonrpc": "2.0", "id": id, "result": result})))
+    }
+
+    fn initialize(&mut self, params: &Value) -> Value {
+        let root = params["rootUri"]
+            .as_str()
+            .or_else(|| params["workspaceFolders"][0]["uri"].as_str())
+            .and_then(uri_to_path)
+            .unwrap_or_default();
+        self.load(root);
+
+        let offered = params["capabilities"]["general"]["positionEncodings"]
+            .as_array()
+            .is_some_and(|kinds| {
+                kinds
+                    .iter()
+                    .any(|kind| kind.as_str() == Some(&self.fixture.position_encoding))
+            });
+        let encoding = if offered {
+            self.fixture.position_encoding.as_str()
+        } else {
+            "utf-16"
+        };
+        json!({
+            "capabilities": {
+                "positionEncoding": encoding,
+                "definitionProvider": true,
+                "referencesProvider": true,
+            },
+            "serverInfo": {"name": "tethys-fake-lsp"},
+        })
+    }
+
+    fn signal_ready(&self, out: &mut impl Write) -> io::Result<()> {
+        if self.fixture.ready_after_ms > 0 {
+            std::thread::sleep(Duration::from_millis(self.fixture.ready_after_ms));
+        }
+        let mut notify = |method: &str, params: Value| {
+            write_message(
+                out,
+                &json!({"jsonrpc": "2.0", "method": method, "params": params}),
+            )
+        };
+        match self.fixture.readiness {
+            Readiness::Quiescence => notify(
+                "experimental/serverStatus",
+                json!({"health": "ok", "quiescent": true}),
+            ),
+            Readiness::SolutionLoad => {
+                let token = "tethys-fake-lsp/load";
+                notify(
+                    "$/progress",
+                    json!({"token": token, "value": {"kind": "begin", "title": "Loading workspace"}}),
+                )?;
+                notify(
+                    "$/progress",
+                    json!({"token": token, "value": {"kind": "end"}}),
+                )
+            }
+            Readiness::None => Ok(()),
+        }
+    }
+
+    fn definition(&self, params: &Value) -> Value {
+        let Some(key) = position_key(params) else {
+            return Value::Null;
+        };
+        if self.fixture.require_open && !self.open.contains(&key.0) {
+            return Value::Null;
+        }
+        self.definitions
+            .get(&key)
+            .or(self.fixture.default_target.as_ref())
+            .map_or(Value::Null, |target| self.location(target))
+    }
+
+    fn references(&self, params: &Value) -> Value {
+        let locations = position_key(params)
+            .and_then(|key| self.references.get(&key))
+            .map_or_else(Vec::new, |targets| {
+                targets.iter().map(|t| self.location(t)).collect()
+            });
+        Value::Array(locations)
+    }
+
+    fn location(&self, target: &Target) -> Value {
+        let position = json!({"line": target.line, "character": target.character});
+        json!({
+            "uri": path_to_uri(&self.root.join(&target.path)),
+            "range": {"start": position, "end": position},
+        })
+    }
+}
+
+/// The path of the document `params` name (`textDocument.uri`).
+fn document_path(params: &Value) -> Option<PathBuf> {
+    params["textDocument"]["uri"].as_str().and_then(uri_to_path)
+}
+
+/// The lookup key for a `TextDocumentPositionParams`.
+fn position_key(params: &Value) -> Option<Position> {
+    let path = document_path(params)?;
+    let position = &params["position"];
+    let coordinate = |key: &str| {
+        position[key]
+            .as_u64()
+            .and_then(|v| u32::try_from(v).ok())
+            .unwrap_or(0)
+    };
+    Some((path, coordinate("line"), coordinate("character")))
+}
+
+fn uri_to_path(uri: &str) -> Option<PathBuf> {
+    let path = uri.strip_prefix("file://")?;
+    Some(PathBuf::from(
+        percent_decode_str(path).decode_utf8().ok()?.as_ref(),
+    ))
+}
+
+fn path_to_uri(path: &Path) -> String {
+    format!("file://{}", path.display())
+}
+
+fn write_message(out: &mut impl Write, message: &Value) -> io::Result<()> {
+    let body = message.to_string();
+    write!(out, "Content-Length: {}\r\n\r\n{body}", body.len())?;
+    out.flush()
+}
+
+/// Read one frame's body, or `None` at end of input.
+fn read_message(input: &mut impl BufRead) -> io::Result<Option<Value>> {
+    let mut content_length = None;
+    loop {
+        let mut line = String::new();
+        if input.read_line(&mut line)? == 0 {
+            return Ok(None);
+        }
+        let line = line.trim_end();
+        if line.is_empty() {
+            break;
+        }
+        if let Some(value) = line.strip_prefix("Content-Length: ") {
+            content_length = value.parse::<usize>().ok();
+        }
+    }
+    let length = content_length
+        .ok_or_else(|| io::Error::new(io::ErrorKind::InvalidData, "missing Content-Length"))?;
+    let mut body = vec![0; length];
+    input.read_exact(&mut body)?;
+    serde_json::from_slice(&body)
+        .map(Some)
+        .map_err(|e| io::Error::new(io::ErrorKind::InvalidData, e))
+}
+
+fn main() -> io::Result<()> {
+    let fixture = match std::env::args_os().nth(1) {
+        Some(path) => serde_json::from_slice(&std::fs::read(path)?)
+            .map_err(|e| io::Error::new(io::ErrorKind::InvalidData, e))?,
+        None => Fixture::default(),
+    };
+    let latency = Duration::from_micros(fixture.latency_us);
+    let mut server = FakeServer::new(fixture);
+
+    let mut input = BufReader::new(io::stdin().lock());
+    let mut out = io::stdout().lock();
+    while let Some(message) = read_message(&mut input)? {
+        if !latency.is_zero() {
+            std::thread::sleep(latency);
+        }
+        if let Some(response) = server.handle(&message, &mut out)? {
+            write_message(&mut out, &response)?;
+        }
+    }
+    Ok(())
+}
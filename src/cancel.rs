@@ -0,0 +1,224 @@
+//! Cooperative cancellation for long queries and indexing runs.
+//!
+//! A [`CancellationToken`] is cancelled explicitly ([`CancellationToken::cancel`],
+//! from any thread) or implicitly once its deadline passes. Work under a
+//! token observes it at three kinds of points:
+//!
+//! - **In `SQLite`**: the index connection's progress handler polls the
+//!   calling thread's current token every [`PROGRESS_HANDLER_OPS`] virtual
+//!   machine steps and interrupts the running statement, which surfaces as
+//!   [`Error::Cancelled`] (see the `From<rusqlite::Error>` impl). An
+//!   interrupted write rolls back its transaction, so no statement or
+//!   transaction is left half-applied; a table cleared and repopulated in
+//!   one phase (call edges) is replaced in a single transaction.
+//! - **Between phases**: indexing checks before each pass and between
+//!   per-file writes. A run stopped there has committed only some of its
+//!   phases, so the index stays marked incomplete until a later run
+//!   completes (see [`crate::Tethys::is_index_complete`]).
+//! - **In long in-memory loops**: e.g. cycle enumeration.
+//!
+//! The current token is thread-local: [`enter`] installs one for the
+//! duration of a query or index run on the calling thread. Work fanned out
+//! to other threads (rayon parsing, LSP sessions) carries the token itself.
+
+use std::cell::RefCell;
+use std::sync::Arc;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::time::{Duration, Instant};
+
+use crate::error::{Error, Result};
+
+/// `SQLite` virtual machine steps between progress-handler polls.
+///
+/// Small enough that an interrupt lands within microseconds, large enough
+/// that the poll (an atomic load and, with a deadline, a clock read) does
+/// not show up in query profiles.
+pub(crate) const PROGRESS_HANDLER_OPS: i32 = 1000;
+
+/// A handle for aborting a query or index run from another thread, or after
+/// a deadline.
+///
+/// Clones share state: cancelling one cancels all. Pass a token to
+/// [`crate::Tethys::with_cancellation`] for queries or to
+/// [`crate::IndexOptions::cancellation`] for indexing.
+///
+/// # Example
+///
+/// ```no_run
+/// use std::time::Duration;
+/// use tethys::{CallEdgeSelection, CancellationToken, Tethys};
+///
+/// let tethys = Tethys::new(std::path::Path::new("."))?;
+/// let token = CancellationToken::with_timeout(Duration::from_millis(200));
+/// match tethys.with_cancellation(&token, |t| {
+///     t.get_symbol_impact("Index::open", Some(50), CallEdgeSelection::All)
+/// }) {
+///     Err(tethys::Error::Cancelled) => println!("gave up after 200ms"),
+///     other => println!("{:?}", other?.direct_callers().len()),
+/// }
+/// # Ok::<(), tethys::Error>(())
+/// ```
+#[derive(Debug, Clone, Default)]
+pub struct CancellationToken {
+    inner: Arc<TokenState>,
+}
+
+#[derive(Debug, Default)]
+struct TokenState {
+    cancelled: AtomicBool,
+    deadline: Option<Instant>,
+}
+
+impl CancellationToken {
+    /// A token that is cancelled only by [`Self::cancel`].
+    #[must_use]
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// A token that is also cancelled once `deadline` passes.
+    #[must_use]
+    pub fn with_deadline(deadline: Instant) -> Self {
+        Self {
+            inner: Arc::new(TokenState {
+                cancelled: AtomicBool::new(false),
+                deadline: Some(deadline),
+            }),
+        }
+    }
+
+    /// A token that is also cancelled `timeout` from now.
+    #[must_use]
+    pub fn with_timeout(timeout: Duration) -> Self {
+        Self::with_deadline(Instant::now() + timeout)
+    }
+
+    /// Cancel the work running under this token (and its clones).
+    pub fn cancel(&self) {
+        self.inner.cancelled.store(true, Ordering::Relaxed);
+    }
+
+    /// Whether [`Self::cancel`] was called or the deadline has passed.
+    #[must_use]
+    pub fn is_cancelled(&self) -> bool {
+        self.inner.cancelled.load(Ordering::Relaxed)
+            || self
+                .inner
+                .deadline
+                .is_some_and(|deadline| Instant::now() >= deadline)
+    }
+
+    /// The deadline, if the token has one.
+    #[must_use]
+    pub fn deadline(&self) -> Option<Instant> {
+        self.inner.deadline
+    }
+
+    /// `Err(Error::Cancelled)` once the token is cancelled.
+    pub(crate) fn check(&self) -> Result<()> {
+        if self.is_cancelled() {
+            Err(Error::Cancelled)
+        } else {
+            Ok(())
+        }
+    }
+}
+
+thread_local! {
+    static CURRENT: RefCell<Option<CancellationToken>> = const { RefCell::new(None) };
+}
+
+/// Restores the previously current token when dropped.
+pub(crate) struct CancellationScope {
+    previous: Option<CancellationToken>,
+}
+
+impl Drop for CancellationScope {
+    fn drop(&mut self) {
+        let previous = self.previous.take();
+        CURRENT.with(|current| *current.borrow_mut() = previous);
+    }
+}
+
+/// Make `token` the calling thread's current token until the returned
+/// scope drops. `None` keeps the current one (nested calls without a token
+/// stay cancellable by the outer one).
+pub(crate) fn enter(token: Option<&CancellationToken>) -> CancellationScope {
+    let previous = CURRENT.with(|current| {
+        let previous = current.borrow().clone();
+        if let Some(token) = token {
+            *current.borrow_mut() = Some(token.clone());
+        }
+        previous
+    });
+    CancellationScope { previous }
+}
+
+/// The calling thread's current token, if any.
+pub(crate) fn current() -> Option<CancellationToken> {
+    CURRENT.with(|current| current.borrow().clone())
+}
+
+/// Whether the calling thread's current token is cancelled. The index
+/// connection's progress handler.
+pub(crate) fn is_cancelled() -> bool {
+    CURRENT.with(|current| {
+        current
+            .borrow()
+            .as_ref()
+            .is_some_and(CancellationToken::is_cancelled)
+    })
+}
+
+/// `Err(Error::Cancelled)` once the calling thread's current token is
+/// cancelled.
+pub(crate) fn check() -> Result<()> {
+    if is_cancelled() {
+        Err(Error::Cancelled)
+    } else {
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn cancel_is_shared_by_clones() {
+        let token = CancellationToken::new();
+        let clone = token.clone();
+        assert!(!token.is_cancelled());
+
+        clone.cancel();
+
+        assert!(token.is_cancelled());
+        assert!(matches!(token.check(), Err(Error::Cancelled)));
+    }
+
+    #[test]
+    fn deadline_cancels_without_a_call() {
+        let past = CancellationToken::with_deadline(Instant::now());
+        let future = CancellationToken::with_timeout(Duration::from_secs(3600));
+
+        assert!(past.is_cancelled());
+        assert!(!future.is_cancelled());
+    }
+
+    #[test]
+    fn scopes_nest_and_restore() {
+        let outer = CancellationToken::new();
+        assert!(current().is_none());
+        {
+            let _outer = enter(Some(&outer));
+            {
+                let _inner = enter(None);
+                outer.cancel();
+                assert!(is_cancelled(), "a token-less scope keeps the outer token");
+            }
+            assert!(check().is_err());
+        }
+        assert!(current().is_none());
+        assert!(check().is_ok());
+    }
+}
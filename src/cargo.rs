@@ -24,7 +24,36 @@ use crate::CrateInfo;
 ///
 /// Individual workspace members that fail to parse are skipped with a warning log.
 pub fn discover_crates(workspace_root: &Path) -> Vec<CrateInfo> {
+    discover_crates_with_inputs(workspace_root).0
+}
+
+/// A path [`discover_crates`] depended on.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub(crate) enum DiscoveryInput {
+    /// A manifest parsed or probed for, or a directory listed: its content
+    /// (or entry names) matter.
+    Read(PathBuf),
+    /// A default target (`src/lib.rs`, `src/main.rs`) checked for: only
+    /// whether it exists matters, so editing it leaves discovery valid.
+    Probed(PathBuf),
+}
+
+/// [`discover_crates`], also returning every path the result depends on:
+/// each manifest parsed or probed for, each directory a member glob
+/// listed, and each default target checked for. The result stays valid
+/// while none of them changes, which is what lets [`crate::Tethys::new`]
+/// reuse it from the index.
+pub(crate) fn discover_crates_with_inputs(
+    workspace_root: &Path,
+) -> (Vec<CrateInfo>, Vec<DiscoveryInput>) {
+    let mut inputs = Vec::new();
+    let crates = discover(workspace_root, &mut inputs);
+    (crates, inputs)
+}
+
+fn discover(workspace_root: &Path, inputs: &mut Vec<DiscoveryInput>) -> Vec<CrateInfo> {
     let manifest_path = workspace_root.join("Cargo.toml");
+    inputs.push(DiscoveryInput::Read(manifest_path.clone()));
 
     let manifest = match Manifest::from_path(&manifest_path) {
         Ok(m) => m,
@@ -45,10 +74,10 @@ pub fn discover_crates(workspace_root: &Path) -> Vec<CrateInfo> {
             let member_path = workspace_root.join(member);
 
             if member.contains('*') {
-                match glob_member(workspace_root, member) {
+                match glob_member(workspace_root, member, inputs) {
                     Ok(entries) => {
                         for entry in entries {
-                            if let Some(info) = parse_crate(&entry) {
+                            if let Some(info) = parse_crate(&entry, inputs) {
                                 crates.push(info);
                             }
                         }
@@ -62,14 +91,14 @@ pub fn discover_crates(workspace_root: &Path) -> Vec<CrateInfo> {
                         );
                     }
                 }
-            } else if let Some(info) = parse_crate(&member_path) {
+            } else if let Some(info) = parse_crate(&member_path, inputs) {
                 crates.push(info);
             }
         }
     }
 
     if manifest.package.is_some()
-        && let Some(info) = parse_crate_from_manifest(workspace_root, &manifest)
+        && let Some(info) = parse_crate_from_manifest(workspace_root, &manifest, inputs)
     {
         crates.push(info);
     }
@@ -90,9 +119,11 @@ pub fn discover_crates(workspace_root: &Path) -> Vec<CrateInfo> {
 /// - Cargo.toml cannot be parsed
 /// - Manifest has no `[package]` section
 ///
-/// Errors are logged before returning `None`.
-fn parse_crate(crate_path: &Path) -> Option<CrateInfo> {
+/// Errors are logged before returning `None`. Paths read are appended to
+/// `inputs` (see [`discover_crates_with_inputs`]).
+fn parse_crate(crate_path: &Path, inputs: &mut Vec<DiscoveryInput>) -> Option<CrateInfo> {
     let manifest_path = crate_path.join("Cargo.toml");
+    inputs.push(DiscoveryInput::Read(manifest_path.clone()));
     let manifest = match Manifest::from_path(&manifest_path) {
         Ok(m) => m,
         Err(e) => {
@@ -104,7 +135,7 @@ fn parse_crate(crate_path: &Path) -> Option<CrateInfo> {
             return None;
         }
     };
-    parse_crate_from_manifest(crate_path, &manifest)
+    parse_crate_from_manifest(crate_path, &manifest, inputs)
 }
 
 /// Validate that a target path (from `[lib].path` or `[[bin]].path` in a
@@ -148,8 +179,13 @@ fn sanitize_target_path(crate_path: &Path, rel: PathBuf, target_name: &str) -> O
     Some(rel)
 }
 
-/// Extract `CrateInfo` from a parsed manifest.
-fn parse_crate_from_manifest(crate_path: &Path, manifest: &Manifest) -> Option<CrateInfo> {
+/// Extract `CrateInfo` from a parsed manifest, appending the default
+/// targets probed for to `inputs`.
+fn parse_crate_from_manifest(
+    crate_path: &Path,
+    manifest: &Manifest,
+    inputs: &mut Vec<DiscoveryInput>,
+) -> Option<CrateInfo> {
     let Some(package) = manifest.package.as_ref() else {
         debug!(
             path = %crate_path.display(),
@@ -175,6 +211,7 @@ fn parse_crate_from_manifest(crate_path: &Path, manifest: &Manifest) -> Option<C
             .and_then(|p| sanitize_target_path(&crate_path, p, "lib"))
     } else {
         let default_lib = crate_path.join("src/lib.rs");
+        inputs.push(DiscoveryInput::Probed(default_lib.clone()));
         if default_lib.exists() {
             Some(PathBuf::from("src/lib.rs"))
         } else {
@@ -183,6 +220,8 @@ fn parse_crate_from_manifest(crate_path: &Path, manifest: &Manifest) -> Option<C
     };
 
     let mut bin_paths = Vec::new();
+    // `Manifest::from_path` adds a target for each file under src/bin.
+    inputs.push(DiscoveryInput::Read(crate_path.join("src/bin")));
 
     // Explicit [[bin]] entries. When path is unset, uses Cargo's convention: src/bin/{name}.rs.
     // When name is also unset, defaults to the package name.
@@ -211,6 +250,7 @@ fn parse_crate_from_manifest(crate_path: &Path, manifest: &Manifest) -> Option<C
 
     if bin_paths.is_empty() {
         let default_main = crate_path.join("src/main.rs");
+        inputs.push(DiscoveryInput::Probed(default_main.clone()));
         if default_main.exists() {
             bin_paths.push((package.name.clone(), PathBuf::from("src/main.rs")));
         }
@@ -379,7 +419,8 @@ pub fn get_crate_for_file<'a>(file_path: &Path, crates: &'a [CrateInfo]) -> Opti
         .max_by_key(|c| c.path.components().count())
 }
 
-/// Expand a simple glob pattern to matching directories.
+/// Expand a simple glob pattern to matching directories, appending the
+/// searched directory and each candidate's manifest path to `inputs`.
 ///
 /// Only supports `prefix/*` patterns (e.g., `"crates/*"`). Full glob support
 /// (via the `glob` crate) could be added if needed, but workspace member
@@ -390,7 +431,11 @@ pub fn get_crate_for_file<'a>(file_path: &Path, crates: &'a [CrateInfo]) -> Opti
 /// Returns an error if:
 /// - The pattern is not in `prefix/*` format (unsupported pattern)
 /// - Directory enumeration fails (I/O error)
-fn glob_member(workspace_root: &Path, pattern: &str) -> std::io::Result<Vec<PathBuf>> {
+fn glob_member(
+    workspace_root: &Path,
+    pattern: &str,
+    inputs: &mut Vec<DiscoveryInput>,
+) -> std::io::Result<Vec<PathBuf>> {
     let mut results = Vec::new();
 
     let prefix = pattern.strip_suffix("/*").ok_or_else(|| {
@@ -405,11 +450,17 @@ fn glob_member(workspace_root: &Path, pattern: &str) -> std::io::Result<Vec<Path
     })?;
 
     let search_dir = workspace_root.join(prefix);
+    inputs.push(DiscoveryInput::Read(search_dir.clone()));
     if search_dir.is_dir() {
         for entry in std::fs::read_dir(&search_dir)? {
             let entry = entry?;
             let path = entry.path();
-            if path.is_dir() && path.join("Cargo.toml").exists() {
+            if !path.is_dir() {
+                continue;
+            }
+            let manifest = path.join("Cargo.toml");
+            inputs.push(DiscoveryInput::Read(manifest.clone()));
+            if manifest.exists() {
                 results.push(path);
             }
         }
@@ -438,7 +489,8 @@ mod tests {
             .parent()
             .expect("tethys crate should be nested under workspace");
 
-        let results = glob_member(workspace, "crates/*").expect("glob should work");
+        let results =
+            glob_member(workspace, "crates/*", &mut Vec::new()).expect("glob should work");
 
         // Skip when not running inside the rivets monorepo (e.g., the standalone
         // tethys repo): there is no crates/ directory to expand.
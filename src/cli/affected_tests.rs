@@ -11,11 +11,16 @@
 //! - **1** — hard error (unchanged).
 //!
 //! Standing itself is computed by the facade
-//! (`get_affected_tests_with_standing`); this layer only maps it onto the
-//! process contract.
+//! (`get_affected_tests_with_standing` / `get_affected_tests_for_diff`);
+//! this layer only maps it onto the process contract.
+//!
+//! `--diff` reads a unified diff from a patch file, from stdin (`-`), or
+//! from a local `git diff` of a revision range, and selects tests at symbol
+//! granularity. The exit-code contract is identical for both input forms.
 
+use std::io::Read as _;
 use std::path::{Path, PathBuf};
-use std::process::ExitCode;
+use std::process::{Command, ExitCode};
 
 use colored::Colorize;
 use tethys::{QueryStanding, StandingReason, Tethys};
@@ -29,32 +34,49 @@ const EXIT_INDETERMINATE: u8 = 2;
 pub fn run(
     workspace: &Path,
     files: &[String],
+    diff: Option<&str>,
     names_only: bool,
 ) -> Result<ExitCode, tethys::Error> {
     debug!(workspace = %workspace.display(), "Opening tethys database");
-    let tethys = Tethys::new(workspace)?;
-
-    // Convert file strings to PathBuf
-    let changed_files: Vec<PathBuf> = files.iter().map(PathBuf::from).collect();
+    let tethys = Tethys::open_read_only(workspace)?;
+
+    let (report, input) = if let Some(spec) = diff {
+        let patch = read_diff(workspace, spec)?;
+        debug!(diff = %spec, bytes = patch.len(), "Querying affected tests for diff");
+        (
+            tethys.get_affected_tests_for_diff(&patch)?,
+            "the diff".to_string(),
+        )
+    } else {
+        // Convert file strings to PathBuf
+        let changed_files: Vec<PathBuf> = files.iter().map(PathBuf::from).collect();
 
-    if changed_files.is_empty() {
-        warn!("No files specified for affected-tests query");
-        eprintln!("{}: no files specified", "warning".yellow());
-        return Ok(ExitCode::SUCCESS);
-    }
+        if changed_files.is_empty() {
+            warn!("No files specified for affected-tests query");
+            eprintln!("{}: no files specified", "warning".yellow());
+            return Ok(ExitCode::SUCCESS);
+        }
 
-    debug!(
-        file_count = changed_files.len(),
-        files = ?changed_files,
-        "Querying affected tests"
-    );
-    let report = tethys.get_affected_tests_with_standing(&changed_files)?;
+        debug!(
+            file_count = changed_files.len(),
+            files = ?changed_files,
+            "Querying affected tests"
+        );
+        (
+            tethys.get_affected_tests_with_standing(&changed_files)?,
+            format!("{} file(s)", changed_files.len().to_string().cyan()),
+        )
+    };
     let affected = report.tests;
     debug!(affected_count = affected.len(), "Found affected tests");
 
     if affected.is_empty() {
         if !names_only {
-            println!("No tests affected by changes to the specified files.");
+            if diff.is_some() {
+                println!("No tests affected by the diff.");
+            } else {
+                println!("No tests affected by changes to the specified files.");
+            }
         }
         return Ok(exit_for_standing(&report.standing));
     }
@@ -66,10 +88,7 @@ pub fn run(
         }
     } else {
         // Human-readable output
-        println!(
-            "Tests affected by changes to {} file(s):",
-            changed_files.len().to_string().cyan()
-        );
+        println!("Tests affected by changes to {input}:");
         println!();
 
         // Group tests by file for nicer display
@@ -112,6 +131,50 @@ pub fn run(
     Ok(exit_for_standing(&report.standing))
 }
 
+/// Read the `--diff` input: `-` is stdin, an existing path is a patch
+/// file, and anything else is a git revision range diffed locally
+/// (`git diff --relative`, so paths come out workspace-relative even when
+/// the workspace is a subdirectory of the repository). Nothing is fetched.
+fn read_diff(workspace: &Path, spec: &str) -> Result<String, tethys::Error> {
+    if spec == "-" {
+        let mut patch = String::new();
+        std::io::stdin().read_to_string(&mut patch)?;
+        return Ok(patch);
+    }
+
+    let path = Path::new(spec);
+    if path.is_file() {
+        return Ok(std::fs::read_to_string(path)?);
+    }
+
+    let output = Command::new("git")
+        .arg("-C")
+        .arg(workspace)
+        .args([
+            "diff",
+            "--no-color",
+            "--no-ext-diff",
+            "--relative",
+            "--unified=0",
+            spec,
+            "--",
+        ])
+        .output()
+        .map_err(|e| {
+            tethys::Error::Config(format!(
+                "--diff '{spec}' is not a patch file, and git could not be run: {e}"
+            ))
+        })?;
+    if !output.status.success() {
+        return Err(tethys::Error::Config(format!(
+            "--diff '{spec}' is not a patch file, and `git diff {spec}` failed: {}",
+            String::from_utf8_lossy(&output.stderr).trim()
+        )));
+    }
+    String::from_utf8(output.stdout)
+        .map_err(|e| tethys::Error::Config(format!("`git diff {spec}` output is not UTF-8: {e}")))
+}
+
 /// Map query standing onto the process contract: emit one machine-readable
 /// reason line per trigger on stderr, then pick the exit code.
 ///
@@ -20,7 +20,7 @@ pub fn run(
 ) -> Result<(), tethys::Error> {
     ensure_lsp_if_requested(lsp)?;
 
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
 
     let call_edges = if exclude_speculative {
         CallEdgeSelection::ExcludeSpeculative
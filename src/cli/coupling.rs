@@ -38,15 +38,19 @@ impl From<SortFlag> for CouplingSort {
 /// Run the coupling command.
 ///
 /// # Errors
-/// Propagates any `tethys::Error` from `Tethys::new` (workspace initialization)
-/// or the underlying DB queries (`get_coupling_metrics`, `get_package_coupling`).
+/// Propagates any `tethys::Error` from `Tethys::open_read_only` (workspace
+/// initialization) or the underlying DB queries (`get_coupling_metrics`,
+/// `get_package_coupling`). `no_cache` recomputes the metrics instead of
+/// serving them from the report cache.
 pub fn run(
     workspace: &Path,
     sort: SortFlag,
     package: Option<String>,
     json: bool,
+    no_cache: bool,
 ) -> Result<(), tethys::Error> {
-    let tethys = Tethys::new(workspace)?;
+    let mut tethys = Tethys::open_read_only(workspace)?;
+    tethys.set_report_cache(!no_cache);
 
     if let Some(name) = package {
         run_detail(&tethys, &name, json)
@@ -7,7 +7,7 @@ use tethys::Tethys;
 
 /// Run the cycles command.
 pub fn run(workspace: &Path) -> Result<(), tethys::Error> {
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
 
     let cycles = tethys.detect_cycles()?;
 
@@ -15,9 +15,17 @@ use tracing::debug;
 /// reference extraction cannot see (verify before deleting). Known
 /// false-positive sources are documented on the facade. `limit`
 /// truncates the listing; the summary always counts the full population.
-pub fn run(workspace: &Path, limit: Option<usize>, json: bool) -> Result<(), tethys::Error> {
+/// `no_cache` recomputes the report instead of serving it from the report
+/// cache.
+pub fn run(
+    workspace: &Path,
+    limit: Option<usize>,
+    json: bool,
+    no_cache: bool,
+) -> Result<(), tethys::Error> {
     debug!(workspace = %workspace.display(), "Opening tethys index");
-    let tethys = Tethys::new(workspace)?;
+    let mut tethys = Tethys::open_read_only(workspace)?;
+    tethys.set_report_cache(!no_cache);
 
     let report = tethys.find_dead_code(limit)?;
     debug!(
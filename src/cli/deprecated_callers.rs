@@ -12,9 +12,12 @@ use tracing::debug;
 /// Reports every `#[deprecated]` symbol in the index with its reference
 /// sites, tiered by resolution trustworthiness (Definite/Maybe), plus a
 /// clean list for deprecated symbols with no known remaining callers.
-pub fn run(workspace: &Path, json: bool) -> Result<(), tethys::Error> {
+/// `no_cache` recomputes the report instead of serving it from the report
+/// cache.
+pub fn run(workspace: &Path, json: bool, no_cache: bool) -> Result<(), tethys::Error> {
     debug!(workspace = %workspace.display(), "Opening tethys index");
-    let tethys = Tethys::new(workspace)?;
+    let mut tethys = Tethys::open_read_only(workspace)?;
+    tethys.set_report_cache(!no_cache);
 
     let findings = tethys.get_deprecated_callers()?;
     debug!(
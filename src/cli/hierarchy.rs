@@ -22,7 +22,7 @@ pub fn run(
         _ => HierarchyDirection::Both,
     };
     debug!(workspace = %workspace.display(), symbol, "Opening tethys index");
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
     let hierarchy = tethys.get_type_hierarchy(symbol, dir)?;
 
     let rendered = if json {
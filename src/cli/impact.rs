@@ -18,7 +18,7 @@ pub fn run(
 ) -> Result<(), tethys::Error> {
     ensure_lsp_if_requested(lsp)?;
 
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
 
     if is_symbol {
         let impact = tethys.get_symbol_impact(target, depth, CallEdgeSelection::All)?;
@@ -2,6 +2,7 @@
 
 use std::io::{self, Write};
 use std::path::Path;
+use std::time::Duration;
 
 use colored::Colorize;
 use tethys::{ArchPhaseResult, IndexOptions, Tethys};
@@ -9,11 +10,22 @@ use tethys::{ArchPhaseResult, IndexOptions, Tethys};
 use super::ensure_lsp_if_requested;
 
 /// Run the index command.
+#[expect(
+    clippy::too_many_arguments,
+    reason = "one parameter per `tethys index` flag, as clap parsed them"
+)]
 pub fn run(
     workspace: &Path,
     rebuild: bool,
     lsp: bool,
     lsp_timeout: Option<u64>,
+    lsp_window: Option<usize>,
+    lsp_shards: Option<usize>,
+    lsp_budget: Option<u64>,
+    scip: Option<&Path>,
+    import: Option<&Path>,
+    export: Option<&Path>,
+    extraction_cache: Option<u64>,
 ) -> Result<(), tethys::Error> {
     ensure_lsp_if_requested(lsp)?;
 
@@ -29,6 +41,18 @@ pub fn run(
         Tethys::remove_index_files(workspace)?;
     }
 
+    // Restore before opening, for the same reason: the snapshot replaces
+    // the db files, which no connection may hold.
+    if let Some(snapshot) = import {
+        let restored = Tethys::import_snapshot(workspace, snapshot)?;
+        println!(
+            "{} {} ({} files)",
+            "Restored".cyan().bold(),
+            snapshot.display(),
+            restored.files
+        );
+    }
+
     let mut tethys = Tethys::new(workspace)?;
 
     // Build options - with_lsp() reads TETHYS_LSP_TIMEOUT env var by default,
@@ -38,19 +62,74 @@ pub fn run(
         if let Some(timeout) = lsp_timeout {
             opts = opts.lsp_timeout(timeout);
         }
+        if let Some(window) = lsp_window {
+            opts = opts.lsp_window(window);
+        }
+        if let Some(shards) = lsp_shards {
+            opts = opts.lsp_shards(shards);
+        }
+        if let Some(budget) = lsp_budget {
+            opts = opts.lsp_budget(Duration::from_secs(budget));
+        }
         opts
     } else {
         IndexOptions::default()
     };
+    let options = match scip {
+        Some(path) => options.scip_index(path),
+        None => options,
+    };
+    let options = match extraction_cache {
+        Some(mib) => options.extraction_cache(mib.saturating_mul(1024 * 1024)),
+        None => options,
+    };
 
-    let stats = if rebuild {
-        println!("{}", "Rebuilding index from scratch".yellow());
-        tethys.rebuild_with_options(options)?
+    if import.is_some() {
+        print_update(&tethys.update_with_options(options)?);
     } else {
-        tethys.index_with_options(options)?
-    };
+        let stats = if rebuild {
+            println!("{}", "Rebuilding index from scratch".yellow());
+            tethys.rebuild_with_options(options)?
+        } else {
+            tethys.index_with_options(options)?
+        };
+        print_index_stats(&stats)?;
+    }
+
+    if let Some(snapshot) = export {
+        let exported = tethys.export_snapshot(snapshot)?;
+        println!(
+            "{}: {} files to {} ({} bytes, {} uncompressed)",
+            "Exported".green().bold(),
+            exported.files,
+            snapshot.display(),
+            exported.snapshot_bytes,
+            exported.database_bytes
+        );
+    }
+
+    Ok(())
+}
+
+/// Print what an incremental update after `--import` re-indexed.
+fn print_update(update: &tethys::IndexUpdate) {
+    println!();
+    println!(
+        "{} {} changed files ({} unchanged, {} removed)",
+        "Updated".green().bold(),
+        update.files_changed,
+        update.files_unchanged,
+        update.files_removed
+    );
+    println!("{}: {:.2?}", "Duration".dimmed(), update.duration);
+    if update.cancelled {
+        println!("{}", "Update cancelled; the index is incomplete".yellow());
+    }
+    print_index_errors(&update.errors);
+}
 
-    // Display results
+/// Print the results of a full index or rebuild.
+fn print_index_stats(stats: &tethys::IndexStats) -> Result<(), tethys::Error> {
     println!();
     println!(
         "{} {} files, found {} symbols, {} references",
@@ -77,16 +156,7 @@ pub fn run(
         );
     }
 
-    if !stats.errors.is_empty() {
-        println!();
-        println!("{} ({}):", "Errors".red().bold(), stats.errors.len());
-        for err in stats.errors.iter().take(5) {
-            println!("  {} {}: {}", "•".red(), err.path.display(), err.message);
-        }
-        if stats.errors.len() > 5 {
-            println!("  ... and {} more", stats.errors.len() - 5);
-        }
-    }
+    print_index_errors(&stats.errors);
 
     if !stats.unresolved_dependencies.is_empty() {
         println!();
@@ -97,6 +167,27 @@ pub fn run(
         );
     }
 
+    if let Some(scip) = &stats.scip_import {
+        println!(
+            "{}: {} references from {} documents ({:.2?})",
+            "SCIP resolved".cyan(),
+            scip.resolved,
+            scip.documents,
+            scip.duration
+        );
+    }
+
+    if let Some(cache) = &stats.extraction_cache {
+        println!(
+            "{}: {} files reused, {} parsed ({} bytes cached, {} evicted)",
+            "Extraction cache".cyan(),
+            cache.hits,
+            cache.misses,
+            cache.bytes,
+            cache.evicted
+        );
+    }
+
     let total_lsp_resolved = stats.total_lsp_resolved();
     if total_lsp_resolved > 0 {
         println!(
@@ -104,6 +195,34 @@ pub fn run(
             "LSP resolved".cyan(),
         );
     }
+    let lsp_cached: usize = stats
+        .lsp_sessions
+        .iter()
+        .filter_map(|s| match &s.outcome {
+            tethys::LspOutcome::Completed(c) => Some(c.cached),
+            _ => None,
+        })
+        .sum();
+    if lsp_cached > 0 {
+        println!(
+            "{}: {lsp_cached} references answered without the server",
+            "LSP cached".cyan(),
+        );
+    }
+    let lsp_skipped: usize = stats
+        .lsp_sessions
+        .iter()
+        .filter_map(|s| match &s.outcome {
+            tethys::LspOutcome::Completed(c) => Some(c.skipped),
+            _ => None,
+        })
+        .sum();
+    if lsp_skipped > 0 {
+        println!(
+            "{}: {lsp_skipped} references not queried (budget spent; left unresolved)",
+            "LSP budget".yellow(),
+        );
+    }
 
     // Indexing already succeeded by this point. The arch-phase warning is a
     // diagnostic, not data — send it to stderr so callers piping `tethys index`
@@ -118,6 +237,21 @@ pub fn run(
     Ok(())
 }
 
+/// Print the first few file-level indexing errors, if any.
+fn print_index_errors(errors: &[tethys::IndexError]) {
+    if errors.is_empty() {
+        return;
+    }
+    println!();
+    println!("{} ({}):", "Errors".red().bold(), errors.len());
+    for err in errors.iter().take(5) {
+        println!("  {} {}: {}", "•".red(), err.path.display(), err.message);
+    }
+    if errors.len() > 5 {
+        println!("  ... and {} more", errors.len() - 5);
+    }
+}
+
 /// Print architecture-phase outcome to `out`, if any. Success path is silent.
 ///
 /// Takes a `Write` sink so callers can unit-test all three output paths
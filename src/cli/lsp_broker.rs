@@ -0,0 +1,58 @@
+//! `tethys lsp-broker` command implementation.
+
+use std::path::Path;
+#[cfg(unix)]
+use std::time::Duration;
+
+#[cfg(unix)]
+use colored::Colorize;
+#[cfg(unix)]
+use tethys::lsp::{BrokerClient, DEFAULT_BROKER_IDLE_TIMEOUT, LspBroker};
+
+/// Run the lsp-broker command: serve in the foreground until idle or
+/// stopped, or (`stop`) ask a running broker to exit.
+#[cfg(unix)]
+pub fn run(workspace: &Path, idle_timeout: Option<u64>, stop: bool) -> Result<(), tethys::Error> {
+    let workspace = workspace.canonicalize().map_err(|e| {
+        tethys::Error::Io(std::io::Error::new(
+            e.kind(),
+            format!("workspace root not found: {}", workspace.display()),
+        ))
+    })?;
+    let lsp_error = |e: tethys::lsp::LspError| tethys::Error::Config(e.to_string());
+
+    if stop {
+        let Some(mut broker) = BrokerClient::connect(&workspace) else {
+            return Err(tethys::Error::Config(format!(
+                "no LSP broker is running for {}",
+                workspace.display()
+            )));
+        };
+        broker.stop().map_err(lsp_error)?;
+        println!("{}", "LSP broker stopped.".green());
+        return Ok(());
+    }
+
+    let idle_timeout = idle_timeout.map_or(DEFAULT_BROKER_IDLE_TIMEOUT, Duration::from_secs);
+    let broker = LspBroker::bind(&workspace, idle_timeout).map_err(lsp_error)?;
+    println!(
+        "LSP broker listening on {} (exits after {}s idle; stop with `tethys lsp-broker --stop`)",
+        broker.socket_path().display().to_string().cyan(),
+        idle_timeout.as_secs()
+    );
+    broker.run();
+    Ok(())
+}
+
+/// Run the lsp-broker command: unavailable without Unix domain sockets.
+#[cfg(not(unix))]
+pub fn run(
+    _workspace: &Path,
+    _idle_timeout: Option<u64>,
+    _stop: bool,
+) -> Result<(), tethys::Error> {
+    Err(tethys::Error::Config(
+        "the LSP broker requires Unix domain sockets; `--lsp` queries start their own server"
+            .to_string(),
+    ))
+}
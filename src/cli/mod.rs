@@ -11,6 +11,7 @@ pub mod deprecated_callers;
 pub mod hierarchy;
 pub mod impact;
 pub mod index;
+pub mod lsp_broker;
 pub mod panic_points;
 pub mod reachable;
 pub mod search;
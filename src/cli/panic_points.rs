@@ -4,21 +4,37 @@ use std::collections::BTreeMap;
 use std::path::Path;
 
 use colored::Colorize;
-use tethys::{PanicKind, PanicPoint, Tethys};
+use tethys::{PanicDensity, PanicKind, PanicPoint, Tethys};
 use tracing::debug;
 
 /// Run the panic-points command.
 ///
-/// Queries the index for panic points (`.unwrap()` and `.expect()` calls) and displays
-/// them in either human-readable or JSON format.
+/// Queries the index for panic points (`.unwrap()`/`.expect()` calls and
+/// `panic!()`-family macros) and displays them in either human-readable or
+/// JSON format. With `by_file`, displays the per-file rollup instead.
 pub fn run(
     workspace: &Path,
     include_tests: bool,
     json: bool,
     file_filter: Option<&str>,
+    by_file: bool,
 ) -> Result<(), tethys::Error> {
     debug!(workspace = %workspace.display(), "Opening tethys database");
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
+
+    if by_file {
+        let density = tethys.get_panic_density()?;
+        debug!(
+            file_count = density.len(),
+            "Rolled up panic points per file"
+        );
+        if json {
+            output_density_json(&density)?;
+        } else {
+            output_density_human(&density, include_tests);
+        }
+        return Ok(());
+    }
 
     let (prod_count, test_count) = tethys.count_panic_points()?;
     debug!(
@@ -75,6 +91,60 @@ fn output_json(
     Ok(())
 }
 
+/// Output the per-file rollup in JSON format.
+fn output_density_json(density: &[PanicDensity]) -> Result<(), tethys::Error> {
+    #[derive(serde::Serialize)]
+    struct JsonFile<'a> {
+        #[serde(flatten)]
+        file: &'a PanicDensity,
+        per_kib: f64,
+    }
+
+    let files: Vec<JsonFile<'_>> = density
+        .iter()
+        .map(|file| JsonFile {
+            file,
+            per_kib: file.per_kib(),
+        })
+        .collect();
+
+    let json = serde_json::to_string_pretty(&files).map_err(|e| {
+        tethys::Error::Internal(format!("Failed to serialize panic density to JSON: {e}"))
+    })?;
+    println!("{json}");
+
+    Ok(())
+}
+
+/// Output the per-file rollup in human-readable format.
+fn output_density_human(density: &[PanicDensity], include_tests: bool) {
+    println!("{}", "Panic Points by File".cyan().bold());
+    println!("{}", "=".repeat(63).dimmed());
+    println!();
+
+    if density.is_empty() {
+        println!("{}", "No panic points found.".dimmed());
+        return;
+    }
+
+    for file in density {
+        let test_column = if include_tests {
+            format!("  {:>5} in tests", file.test_count)
+                .yellow()
+                .to_string()
+        } else {
+            String::new()
+        };
+        println!(
+            "  {:>5}  {:>7.2}/KiB  {}{}",
+            file.production_count.to_string().green(),
+            file.per_kib(),
+            file.path.display().to_string().white(),
+            test_column
+        );
+    }
+}
+
 /// Output panic points in human-readable format.
 fn output_human(
     panic_points: &[PanicPoint],
@@ -168,6 +238,19 @@ mod tests {
         output_human(&[], 0, 0, false);
     }
 
+    #[test]
+    fn output_density_handles_empty_and_zero_sized_files() {
+        output_density_human(&[], true);
+        let density = [PanicDensity {
+            path: PathBuf::from("src/empty.rs"),
+            production_count: 0,
+            test_count: 2,
+            size_bytes: 0,
+        }];
+        output_density_human(&density, true);
+        assert!(output_density_json(&density).is_ok());
+    }
+
     #[test]
     fn output_json_produces_valid_json() {
         let points = vec![
@@ -16,7 +16,7 @@ pub fn run(
     direction: &str,
     max_depth: Option<usize>,
 ) -> Result<(), tethys::Error> {
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
 
     let direction = match direction.to_lowercase().as_str() {
         "forward" | "f" => ReachabilityDirection::Forward,
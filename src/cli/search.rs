@@ -12,7 +12,7 @@ pub fn run(
     kind_filter: Option<&str>,
     limit: usize,
 ) -> Result<(), tethys::Error> {
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
 
     let mut symbols = tethys.search_symbols(query)?;
 
@@ -7,7 +7,7 @@ use tethys::{DatabaseStats, SymbolKind, Tethys};
 
 /// Run the stats command.
 pub fn run(workspace: &Path) -> Result<(), tethys::Error> {
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
 
     // Get database size
     let db_path = tethys.db_path();
@@ -128,8 +128,20 @@ fn print_reference_stats(stats: &DatabaseStats) {
     );
 }
 
-/// Print warnings about skipped entries from possible version mismatch.
+/// Print warnings about an incomplete index and about skipped entries
+/// from possible version mismatch.
 fn print_warnings(stats: &DatabaseStats) {
+    if stats.incomplete {
+        println!();
+        println!(
+            "  {}: The last indexing run did not complete",
+            "Warning".yellow().bold()
+        );
+        println!(
+            "    {}",
+            "Counts may be partial. Run `tethys index` to complete the index.".dimmed()
+        );
+    }
     if stats.skipped_unknown_languages > 0 || stats.skipped_unknown_kinds > 0 {
         println!();
         println!(
@@ -13,10 +13,12 @@ use tracing::debug;
 /// from `is_test` roots over the reference graph. Reachability, not
 /// verification; known false-positive sources are documented on the facade.
 /// With zero test roots the result is indeterminate: no findings are
-/// listed and a diagnostic goes to stderr.
-pub fn run(workspace: &Path, json: bool) -> Result<(), tethys::Error> {
+/// listed and a diagnostic goes to stderr. `no_cache` recomputes the
+/// report instead of serving it from the report cache.
+pub fn run(workspace: &Path, json: bool, no_cache: bool) -> Result<(), tethys::Error> {
     debug!(workspace = %workspace.display(), "Opening tethys index");
-    let tethys = Tethys::new(workspace)?;
+    let mut tethys = Tethys::open_read_only(workspace)?;
+    tethys.set_report_cache(!no_cache);
 
     let report = tethys.get_untested_code()?;
     debug!(
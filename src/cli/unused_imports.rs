@@ -19,7 +19,7 @@ use tracing::debug;
 /// reference to its own name).
 pub fn run(workspace: &Path, json: bool, all: bool) -> Result<(), tethys::Error> {
     debug!(workspace = %workspace.display(), "Opening tethys database");
-    let tethys = Tethys::new(workspace)?;
+    let tethys = Tethys::open_read_only(workspace)?;
 
     let findings = tethys.find_unused_imports()?;
     debug!(
@@ -13,9 +13,17 @@ use tracing::debug;
 /// `pub(crate)`, tiered Definite/Maybe with per-finding demotion reasons.
 /// `workspace_closed` asserts nothing outside the indexed workspace can
 /// consume the code, lifting the root-reachability Maybe ceiling.
-pub fn run(workspace: &Path, json: bool, workspace_closed: bool) -> Result<(), tethys::Error> {
+/// `no_cache` recomputes the report instead of serving it from the report
+/// cache.
+pub fn run(
+    workspace: &Path,
+    json: bool,
+    workspace_closed: bool,
+    no_cache: bool,
+) -> Result<(), tethys::Error> {
     debug!(workspace = %workspace.display(), "Opening tethys index");
-    let tethys = Tethys::new(workspace)?;
+    let mut tethys = Tethys::open_read_only(workspace)?;
+    tethys.set_report_cache(!no_cache);
 
     let findings = tethys.get_visibility_candidates(workspace_closed)?;
     debug!(
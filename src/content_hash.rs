@@ -0,0 +1,77 @@
+//! Stable content hashing for change detection.
+//!
+//! `files.content_hash` and the caches keyed by it must agree across runs
+//! and toolchain upgrades, which rules out `std`'s `DefaultHasher` (its
+//! algorithm is unspecified). FNV-1a 64 is fixed, dependency-free, and
+//! fast enough to run over every file while its bytes are already in
+//! memory for parsing. It is not collision-resistant against adversarial
+//! input; an accidental collision only costs a stale cache entry.
+
+const FNV_OFFSET_BASIS: u64 = 0xcbf2_9ce4_8422_2325;
+const FNV_PRIME: u64 = 0x0000_0100_0000_01b3;
+
+/// Incremental FNV-1a 64 hasher, for fingerprints built from several
+/// inputs.
+#[derive(Debug, Clone, Copy)]
+pub(crate) struct ContentHasher(u64);
+
+impl Default for ContentHasher {
+    fn default() -> Self {
+        Self(FNV_OFFSET_BASIS)
+    }
+}
+
+impl ContentHasher {
+    /// Feed `bytes` into the hash.
+    pub(crate) fn update(&mut self, bytes: &[u8]) {
+        for &b in bytes {
+            self.0 ^= u64::from(b);
+            self.0 = self.0.wrapping_mul(FNV_PRIME);
+        }
+    }
+
+    /// Feed `bytes` followed by a separator, so consecutive fields cannot
+    /// run together (`"ab" + "c"` hashes apart from `"a" + "bc"`).
+    pub(crate) fn field(&mut self, bytes: &[u8]) {
+        self.update(&u64::try_from(bytes.len()).unwrap_or(u64::MAX).to_le_bytes());
+        self.update(bytes);
+    }
+
+    /// The hash of everything fed so far.
+    pub(crate) fn finish(self) -> u64 {
+        self.0
+    }
+}
+
+/// Hash of a file's raw bytes, as stored in `files.content_hash`.
+pub(crate) fn content_hash(bytes: &[u8]) -> u64 {
+    let mut hasher = ContentHasher::default();
+    hasher.update(bytes);
+    hasher.finish()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn matches_reference_vectors() {
+        // Published FNV-1a 64 test vectors.
+        assert_eq!(content_hash(b""), 0xcbf2_9ce4_8422_2325);
+        assert_eq!(content_hash(b"a"), 0xaf63_dc4c_8601_ec8c);
+        assert_eq!(content_hash(b"foobar"), 0x8594_4171_f739_67e8);
+    }
+
+    #[test]
+    fn fields_do_not_run_together() {
+        let hash = |parts: &[&str]| {
+            let mut hasher = ContentHasher::default();
+            for part in parts {
+                hasher.field(part.as_bytes());
+            }
+            hasher.finish()
+        };
+        assert_ne!(hash(&["ab", "c"]), hash(&["a", "bc"]));
+        assert_eq!(hash(&["ab", "c"]), hash(&["ab", "c"]));
+    }
+}
@@ -0,0 +1,147 @@
+//! Symbol-granular affected-tests traversal (`affected-tests --diff`).
+//!
+//! Reverse closure over the reference graph: starting from the symbols a
+//! patch touched, follow `refs.symbol_id → refs.in_symbol_id` backwards
+//! (every symbol that references a reached symbol is reached too) and keep
+//! the `is_test` symbols. Like `untested`, this reads `refs` rather than
+//! `call_edges`, so tests that exercise code only through macro arguments
+//! (`assert_eq!(helper(), 1)`) or type mentions are still selected.
+//!
+//! Top-level references (`in_symbol_id` NULL) have no source symbol and
+//! cannot extend the closure; the file-level fallback in the facade covers
+//! the changes that only such references could observe.
+
+use rusqlite::params_from_iter;
+use tracing::trace;
+
+use super::Index;
+use super::helpers::{SYMBOLS_COLUMNS, row_to_symbol};
+use crate::error::Result;
+use crate::types::{Symbol, SymbolId};
+
+impl Index {
+    /// Test symbols that reach any of `seeds` through the reference graph,
+    /// ordered by `(file_id, line)` like [`Index::get_test_symbols`].
+    ///
+    /// Seeds are part of the closure, so a changed test selects itself.
+    /// `UNION` (not `UNION ALL`) deduplicates the recursive working set,
+    /// which is what makes cycles terminate. An empty `seeds` slice issues
+    /// zero statements.
+    pub fn get_tests_reaching_symbols(&self, seeds: &[SymbolId]) -> Result<Vec<Symbol>> {
+        if seeds.is_empty() {
+            return Ok(Vec::new());
+        }
+
+        let conn = self.connection()?;
+        let placeholders = vec!["?"; seeds.len()].join(",");
+        let mut stmt = conn.prepare(&format!(
+            "WITH RECURSIVE reached(id) AS (
+                 SELECT id FROM symbols WHERE id IN ({placeholders})
+                 UNION
+                 SELECT r.in_symbol_id
+                 FROM refs r
+                 JOIN reached ON r.symbol_id = reached.id
+                 WHERE r.in_symbol_id IS NOT NULL
+             )
+             SELECT {SYMBOLS_COLUMNS} FROM symbols
+             WHERE is_test = 1 AND id IN (SELECT id FROM reached)
+             ORDER BY file_id, line"
+        ))?;
+
+        let tests = stmt
+            .query_map(
+                params_from_iter(seeds.iter().map(|id| id.as_i64())),
+                row_to_symbol,
+            )?
+            .collect::<std::result::Result<Vec<_>, _>>()?;
+
+        trace!(
+            seeds = seeds.len(),
+            tests = tests.len(),
+            "Reverse reference closure complete"
+        );
+        Ok(tests)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::path::Path;
+
+    use crate::db::{Index, InsertReferenceParams, InsertSymbolParams};
+    use crate::types::{FileId, Language, SymbolId, SymbolKind, Visibility};
+
+    fn symbol(index: &Index, file_id: FileId, name: &str, line: u32, is_test: bool) -> SymbolId {
+        index
+            .insert_symbol(&InsertSymbolParams {
+                file_id,
+                name,
+                module_path: "crate",
+                qualified_name: name,
+                kind: SymbolKind::Function,
+                line,
+                column: 1,
+                span: None,
+                signature: None,
+                visibility: Visibility::Private,
+                parent_symbol_id: None,
+                is_test,
+            })
+            .expect("insert symbol")
+    }
+
+    fn reference(index: &Index, file_id: FileId, from: SymbolId, to: SymbolId, line: u32) {
+        index
+            .insert_reference(&InsertReferenceParams {
+                symbol_id: Some(to),
+                file_id,
+                kind: "call",
+                line,
+                column: 1,
+                in_symbol_id: Some(from),
+                reference_name: None,
+                strategy: None,
+            })
+            .expect("insert reference");
+    }
+
+    /// helper ← mid ← test_a; other ← test_b; mid ↔ cycle. Changing
+    /// `helper` selects only `test_a`, and the cycle terminates.
+    #[test]
+    fn reverse_closure_selects_only_tests_that_reach_the_seed() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let mut index = Index::open(&dir.path().join("a.db")).expect("open");
+        let file = index
+            .upsert_file(Path::new("src/lib.rs"), Language::Rust, 0, 0, None)
+            .expect("file");
+
+        let helper = symbol(&index, file, "helper", 1, false);
+        let mid = symbol(&index, file, "mid", 2, false);
+        let cycle = symbol(&index, file, "cycle", 3, false);
+        let other = symbol(&index, file, "other", 4, false);
+        let test_a = symbol(&index, file, "test_a", 5, true);
+        let test_b = symbol(&index, file, "test_b", 6, true);
+        reference(&index, file, mid, helper, 2);
+        reference(&index, file, cycle, mid, 3);
+        reference(&index, file, mid, cycle, 2);
+        reference(&index, file, test_a, mid, 5);
+        reference(&index, file, test_b, other, 6);
+
+        let tests = index
+            .get_tests_reaching_symbols(&[helper])
+            .expect("closure");
+        let names: Vec<&str> = tests.iter().map(|t| t.name.as_str()).collect();
+        assert_eq!(names, ["test_a"]);
+
+        let tests = index
+            .get_tests_reaching_symbols(&[test_b])
+            .expect("closure");
+        assert_eq!(tests.len(), 1, "a changed test selects itself");
+        assert!(
+            index
+                .get_tests_reaching_symbols(&[])
+                .expect("empty")
+                .is_empty()
+        );
+    }
+}
@@ -20,6 +20,35 @@ use crate::types::FileId;
 /// unit tests agree on the format without duplicating the literal.
 pub(crate) const ORPHAN_PSEUDO_CRATE_PREFIX: &str = "orphan:";
 
+/// Insert aggregated edges from the refs table. ON CONFLICT handles
+/// duplicates by adding to `call_count`.
+///
+/// Three ref kinds are EXCLUDED as uses-not-calls that must not
+/// inflate the call graph (`callers`/`impact`):
+/// - `value` (fn-as-value, tethys-ygjx): the analyses meant to consume
+///   them in `refs` — dead-code (tethys-dvsw) and hotspots
+///   (tethys-7p54) — are not built yet.
+/// - `field_access` (C# member reads, tethys-xebx D3): a property or
+///   field read is not a call edge; `deprecated-callers` still lists
+///   reader sites because it reads `refs` directly, not this table.
+/// - `macro_call` (macro-token calls, tethys-8ym0): token-soup
+///   provenance — on DSL-heavy code a token like `div(...)` can bind
+///   a same-named in-crate fn. Suppression consumers (dead-code,
+///   untested-code) read them from `refs`; the precision graph
+///   excludes them by default.
+/// - `inherit` (type-hierarchy edges, tethys-j2r1): implementing a
+///   trait is not a call; a resolved edge (subtype -> trait) in this
+///   table would fabricate caller/impact blast radius.
+const POPULATE_CALL_EDGES_SQL: &str =
+    "INSERT INTO call_edges (caller_symbol_id, callee_symbol_id, call_count)
+     SELECT in_symbol_id, symbol_id, COUNT(*) as call_count
+     FROM refs
+     WHERE in_symbol_id IS NOT NULL AND symbol_id IS NOT NULL
+       AND kind NOT IN ('value', 'field_access', 'macro_call', 'inherit')
+     GROUP BY in_symbol_id, symbol_id
+     ON CONFLICT(caller_symbol_id, callee_symbol_id) DO UPDATE SET
+         call_count = call_edges.call_count + excluded.call_count";
+
 impl Index {
     /// Clear all call edges before a full rebuild.
     ///
@@ -47,41 +76,26 @@ impl Index {
         trace!("Populating call edges from refs table");
         let conn = self.connection()?;
 
-        // Insert aggregated edges from refs table
-        // ON CONFLICT handles duplicates by adding to call_count.
-        // Three ref kinds are EXCLUDED as uses-not-calls that must not
-        // inflate the call graph (`callers`/`impact`):
-        // - `value` (fn-as-value, tethys-ygjx): the analyses meant to consume
-        //   them in `refs` — dead-code (tethys-dvsw) and hotspots
-        //   (tethys-7p54) — are not built yet.
-        // - `field_access` (C# member reads, tethys-xebx D3): a property or
-        //   field read is not a call edge; `deprecated-callers` still lists
-        //   reader sites because it reads `refs` directly, not this table.
-        // - `macro_call` (macro-token calls, tethys-8ym0): token-soup
-        //   provenance — on DSL-heavy code a token like `div(...)` can bind
-        //   a same-named in-crate fn. Suppression consumers (dead-code,
-        //   untested-code) read them from `refs`; the precision graph
-        //   excludes them by default.
-        // - `inherit` (type-hierarchy edges, tethys-j2r1): implementing a
-        //   trait is not a call; a resolved edge (subtype -> trait) in this
-        //   table would fabricate caller/impact blast radius.
-        let inserted = conn.execute(
-            "INSERT INTO call_edges (caller_symbol_id, callee_symbol_id, call_count)
-             SELECT in_symbol_id, symbol_id, COUNT(*) as call_count
-             FROM refs
-             WHERE in_symbol_id IS NOT NULL AND symbol_id IS NOT NULL
-               AND kind NOT IN ('value', 'field_access', 'macro_call', 'inherit')
-             GROUP BY in_symbol_id, symbol_id
-             ON CONFLICT(caller_symbol_id, callee_symbol_id) DO UPDATE SET
-                 call_count = call_edges.call_count + excluded.call_count",
-            [],
-        )?;
+        let inserted = conn.execute(POPULATE_CALL_EDGES_SQL, [])?;
 
         trace!(edges_inserted = inserted, "Populated call edges");
 
         Ok(inserted)
     }
 
+    /// [`Index::clear_all_call_edges`] and [`Index::populate_call_edges`]
+    /// in one transaction, so a run cancelled between or during them keeps
+    /// the previous edges rather than none.
+    pub fn rebuild_call_edges(&self) -> Result<usize> {
+        let mut conn = self.connection()?;
+        let tx = conn.transaction()?;
+        tx.execute("DELETE FROM call_edges", [])?;
+        let inserted = tx.execute(POPULATE_CALL_EDGES_SQL, [])?;
+        tx.commit()?;
+        trace!(edges_inserted = inserted, "Rebuilt call edges");
+        Ok(inserted)
+    }
+
     /// Populate file-level dependencies from call edges, filtered by import
     /// corroboration for cross-crate edges (rivets-3d0s K-hybrid).
     ///
@@ -0,0 +1,540 @@
+//! Index generations and the change feed.
+//!
+//! Every indexing run that writes bumps the index generation and records,
+//! in `index_changes`, which files, symbols, call edges and file
+//! dependencies it added, removed or modified. A consumer that cached
+//! answers at generation `g` asks [`Index::changes_since`] for everything
+//! after `g` and invalidates only what those entries touch.
+//!
+//! Changes are found by diffing rather than tracked per write: Pass 1
+//! rewrites a re-indexed file's symbols under new row ids, and the call
+//! graph and file dependencies are rebuilt wholesale, so row-level writes
+//! say little about what actually differs. The diff covers only the run's
+//! scope: the files it re-parses or deletes, the files it adds, and the
+//! files whose refs it resolves differently. Nothing else can change (a
+//! call edge or file dependency changes only with a file at one of its
+//! ends), so an update's diff costs what the update touched, not the whole
+//! index. [`Index::begin_generation`] fingerprints the scope under stable
+//! keys (paths and qualified names, never row ids), later scope as it joins
+//! (see [`Index::extend_generation`]), and [`Index::commit_generation`]
+//! fingerprints it again and logs the keys whose fingerprint differs.
+
+use std::collections::HashSet;
+use std::path::PathBuf;
+
+use rusqlite::{Connection, OptionalExtension, params};
+use tracing::debug;
+
+use super::Index;
+use crate::error::{Error, Result};
+use crate::types::{ChangeKind, ChangedEntity, IndexChange, IndexChanges};
+
+/// Generations whose changes are kept; older entries are pruned, and
+/// [`Index::changes_since`] reports a generation before them as
+/// incomplete.
+const RETAINED_GENERATIONS: i64 = 64;
+
+/// Connection-local state of a run, from [`Index::begin_generation`] to
+/// [`Index::commit_generation`]: the fingerprints taken before (side 0) and
+/// after (side 1) the run, the files in its scope (`captured` once their
+/// side 0 is taken), and the file dependencies as they were before it. The
+/// triggers add a file to the scope when the run inserts it (nothing to
+/// capture) or changes what one of its refs resolves to.
+const BEGIN_SQL: &str = "
+DROP TRIGGER IF EXISTS temp.generation_file_added;
+DROP TRIGGER IF EXISTS temp.generation_resolved;
+CREATE TEMP TABLE IF NOT EXISTS generation_snapshot (
+    side INTEGER NOT NULL,
+    entity_code INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    target TEXT NOT NULL,
+    fingerprint
+);
+CREATE INDEX IF NOT EXISTS temp.idx_generation_snapshot
+    ON generation_snapshot(entity_code, path, name, target, side);
+CREATE TEMP TABLE IF NOT EXISTS generation_scope (
+    path TEXT PRIMARY KEY,
+    captured INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TEMP TABLE IF NOT EXISTS generation_file_deps (
+    from_path TEXT NOT NULL,
+    to_path TEXT NOT NULL,
+    ref_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS temp.idx_generation_file_deps_from
+    ON generation_file_deps(from_path);
+CREATE INDEX IF NOT EXISTS temp.idx_generation_file_deps_to
+    ON generation_file_deps(to_path);
+DELETE FROM temp.generation_snapshot;
+DELETE FROM temp.generation_scope;
+DELETE FROM temp.generation_file_deps;
+CREATE TEMP TRIGGER generation_file_added
+AFTER INSERT ON main.files
+BEGIN
+    INSERT OR IGNORE INTO generation_scope (path, captured) VALUES (NEW.path, 1);
+END;
+CREATE TEMP TRIGGER generation_resolved
+AFTER UPDATE OF symbol_id ON main.refs
+WHEN OLD.symbol_id IS NOT NEW.symbol_id
+BEGIN
+    INSERT OR IGNORE INTO generation_scope (path, captured)
+    SELECT path, 0 FROM files WHERE id = NEW.file_id;
+END;
+";
+
+const END_SQL: &str = "
+DROP TRIGGER IF EXISTS temp.generation_file_added;
+DROP TRIGGER IF EXISTS temp.generation_resolved;
+DELETE FROM temp.generation_snapshot;
+DELETE FROM temp.generation_scope;
+DELETE FROM temp.generation_file_deps;
+";
+
+/// The file dependencies before the run, by path: Pass 1 clears them all
+/// and the run rebuilds them, so they cannot be read back per file later.
+const STASH_FILE_DEPS_SQL: &str = "
+INSERT INTO temp.generation_file_deps (from_path, to_path, ref_count)
+SELECT ff.path, tf.path, fd.ref_count
+FROM file_deps fd
+JOIN files ff ON ff.id = fd.from_file_id
+JOIN files tf ON tf.id = fd.to_file_id
+";
+
+/// Fingerprint into side `?1` the files in the scope with `captured` at
+/// most `?2`, their symbols, and the call edges into or out of them, keyed
+/// as documented on the `index_changes` table. A fingerprint covers what a
+/// cached answer about the entity would show, except positions, which an
+/// edit above an entity shifts without changing it: a file's content, a
+/// symbol's kind, visibility and signature, an edge's weight. Here and
+/// below, `CROSS JOIN` keeps the scope driving the join.
+const SNAPSHOT_SQL: &str = "
+INSERT INTO temp.generation_snapshot (side, entity_code, path, name, target, fingerprint)
+SELECT ?1, 1, f.path, '', '', COALESCE(f.content_hash, f.size_bytes || ':' || f.mtime_ns)
+FROM temp.generation_scope g
+CROSS JOIN files f ON f.path = g.path
+WHERE g.captured <= ?2
+UNION ALL
+SELECT ?1, 2, f.path, s.qualified_name, '',
+       s.kind_code || ':' || s.visibility_code || ':' || s.is_test || ':'
+       || COALESCE(s.signature, '')
+FROM temp.generation_scope g
+CROSS JOIN files f ON f.path = g.path
+CROSS JOIN symbols s ON s.file_id = f.id
+WHERE g.captured <= ?2
+UNION ALL
+SELECT ?1, 3, cf.path, caller.qualified_name, callee.qualified_name, e.call_count
+FROM (
+    SELECT ce.caller_symbol_id, ce.callee_symbol_id, ce.call_count
+    FROM temp.generation_scope g
+    CROSS JOIN files f ON f.path = g.path
+    CROSS JOIN symbols s ON s.file_id = f.id
+    CROSS JOIN call_edges ce ON ce.caller_symbol_id = s.id
+    WHERE g.captured <= ?2
+    UNION
+    SELECT ce.caller_symbol_id, ce.callee_symbol_id, ce.call_count
+    FROM temp.generation_scope g
+    CROSS JOIN files f ON f.path = g.path
+    CROSS JOIN symbols s ON s.file_id = f.id
+    CROSS JOIN call_edges ce ON ce.callee_symbol_id = s.id
+    WHERE g.captured <= ?2
+) e
+JOIN symbols caller ON caller.id = e.caller_symbol_id
+JOIN files cf ON cf.id = caller.file_id
+JOIN symbols callee ON callee.id = e.callee_symbol_id
+";
+
+/// Side 0 of the file dependencies from or to a file in the scope, from
+/// the stash, and side 1 from `file_deps`.
+const FILE_DEPS_SNAPSHOT_SQL: &str = "
+INSERT INTO temp.generation_snapshot (side, entity_code, path, name, target, fingerprint)
+SELECT 0, 4, d.from_path, '', d.to_path, d.ref_count
+FROM temp.generation_scope g
+CROSS JOIN temp.generation_file_deps d ON d.from_path = g.path
+UNION
+SELECT 0, 4, d.from_path, '', d.to_path, d.ref_count
+FROM temp.generation_scope g
+CROSS JOIN temp.generation_file_deps d ON d.to_path = g.path
+UNION
+SELECT 1, 4, ff.path, '', tf.path, fd.ref_count
+FROM temp.generation_scope g
+CROSS JOIN files ff ON ff.path = g.path
+CROSS JOIN file_deps fd ON fd.from_file_id = ff.id
+JOIN files tf ON tf.id = fd.to_file_id
+UNION
+SELECT 1, 4, ff.path, '', tf.path, fd.ref_count
+FROM temp.generation_scope g
+CROSS JOIN files tf ON tf.path = g.path
+CROSS JOIN file_deps fd ON fd.to_file_id = tf.id
+JOIN files ff ON ff.id = fd.from_file_id
+";
+
+/// Log generation `?1`: every key whose fingerprints differ between the
+/// sides, as added (only after), removed (only before) or modified.
+const DIFF_SQL: &str = "
+INSERT INTO index_changes (generation, entity_code, change_code, path, name, target)
+SELECT ?1, d.entity_code,
+       CASE
+           WHEN NOT EXISTS (
+               SELECT 1 FROM temp.generation_snapshot b
+               WHERE b.entity_code = d.entity_code AND b.path = d.path
+                 AND b.name = d.name AND b.target = d.target AND b.side = 0
+           ) THEN 1
+           WHEN NOT EXISTS (
+               SELECT 1 FROM temp.generation_snapshot a
+               WHERE a.entity_code = d.entity_code AND a.path = d.path
+                 AND a.name = d.name AND a.target = d.target AND a.side = 1
+           ) THEN 2
+           ELSE 3
+       END,
+       d.path, d.name, d.target
+FROM (
+    SELECT entity_code, path, name, target FROM (
+        SELECT entity_code, path, name, target, fingerprint
+        FROM temp.generation_snapshot WHERE side = 0
+        EXCEPT
+        SELECT entity_code, path, name, target, fingerprint
+        FROM temp.generation_snapshot WHERE side = 1
+    )
+    UNION
+    SELECT entity_code, path, name, target FROM (
+        SELECT entity_code, path, name, target, fingerprint
+        FROM temp.generation_snapshot WHERE side = 1
+        EXCEPT
+        SELECT entity_code, path, name, target, fingerprint
+        FROM temp.generation_snapshot WHERE side = 0
+    )
+) d
+";
+
+fn entity_from_code(code: i64) -> Result<ChangedEntity> {
+    match code {
+        1 => Ok(ChangedEntity::File),
+        2 => Ok(ChangedEntity::Symbol),
+        3 => Ok(ChangedEntity::CallEdge),
+        4 => Ok(ChangedEntity::FileDependency),
+        _ => Err(Error::Internal(format!(
+            "unknown change entity code {code}"
+        ))),
+    }
+}
+
+fn change_from_code(code: i64) -> Result<ChangeKind> {
+    match code {
+        1 => Ok(ChangeKind::Added),
+        2 => Ok(ChangeKind::Removed),
+        3 => Ok(ChangeKind::Modified),
+        _ => Err(Error::Internal(format!("unknown change kind code {code}"))),
+    }
+}
+
+/// A generation as stored (`i64`) as the API reports it.
+fn to_generation(stored: i64) -> u64 {
+    u64::try_from(stored).unwrap_or_default()
+}
+
+/// Start `conn`'s database on a new lineage of generations: at least the
+/// current time in milliseconds, with no changes on record. For a database
+/// that replaced another at the same path (see the `index_generation`
+/// table).
+pub(super) fn restart_generations(conn: &Connection) -> Result<()> {
+    conn.execute_batch(
+        "UPDATE index_generation
+         SET generation = MAX(generation,
+                              CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)),
+             base = MAX(generation,
+                        CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER));
+         DELETE FROM index_changes;",
+    )?;
+    Ok(())
+}
+
+/// Whether the derived table `name` (see the `derived_state` table) is
+/// current at the index's generation.
+pub(super) fn is_derived_current(conn: &Connection, name: &str) -> Result<bool> {
+    let current: Option<bool> = conn
+        .query_row(
+            "SELECT d.generation = g.generation
+             FROM derived_state d, index_generation g
+             WHERE d.name = ?1 AND g.id = 1",
+            [name],
+            |row| row.get(0),
+        )
+        .optional()?;
+    Ok(current.unwrap_or(false))
+}
+
+/// Record the derived table `name` as current at `generation`.
+pub(super) fn mark_derived_current(conn: &Connection, name: &str, generation: u64) -> Result<()> {
+    conn.execute(
+        "INSERT INTO derived_state (name, generation) VALUES (?1, ?2)
+         ON CONFLICT (name) DO UPDATE SET generation = excluded.generation",
+        params![name, i64::try_from(generation).unwrap_or(i64::MAX)],
+    )?;
+    Ok(())
+}
+
+/// Add `paths` to the run's scope, to be fingerprinted by [`capture_scope`].
+fn add_to_scope(conn: &Connection, paths: &HashSet<String>) -> Result<()> {
+    let mut insert = conn.prepare_cached(
+        "INSERT OR IGNORE INTO temp.generation_scope (path, captured) VALUES (?1, 0)",
+    )?;
+    for path in paths {
+        insert.execute([path])?;
+    }
+    Ok(())
+}
+
+/// Take side 0 of the files in the scope not yet fingerprinted.
+fn capture_scope(conn: &Connection) -> Result<()> {
+    conn.execute(SNAPSHOT_SQL, [0, 0])?;
+    conn.execute(
+        "UPDATE temp.generation_scope SET captured = 1 WHERE captured = 0",
+        [],
+    )?;
+    Ok(())
+}
+
+impl Index {
+    /// The current index generation.
+    pub(crate) fn generation(&self) -> Result<u64> {
+        let stored: i64 = self.connection()?.query_row(
+            "SELECT generation FROM index_generation WHERE id = 1",
+            [],
+            |row| row.get(0),
+        )?;
+        Ok(to_generation(stored))
+    }
+
+    /// Whether the last indexing run completed: `false` after one that was
+    /// cancelled or failed part way, until a later run completes.
+    pub fn is_complete(&self) -> Result<bool> {
+        let incomplete: bool = self.connection()?.query_row(
+            "SELECT incomplete FROM index_generation WHERE id = 1",
+            [],
+            |row| row.get(0),
+        )?;
+        Ok(!incomplete)
+    }
+
+    /// Open an indexing run that re-parses or deletes the files in `scope`
+    /// (normalized workspace-relative paths), or every file when `None`:
+    /// fingerprint them as they are, and mark the index incomplete until
+    /// [`Self::commit_generation`] records the run as complete.
+    pub(crate) fn begin_generation(&self, scope: Option<&HashSet<String>>) -> Result<()> {
+        let conn = self.connection()?;
+        conn.execute(
+            "UPDATE index_generation SET incomplete = 1 WHERE id = 1",
+            [],
+        )?;
+        conn.execute_batch(BEGIN_SQL)?;
+        match scope {
+            Some(paths) => add_to_scope(&conn, paths)?,
+            None => {
+                conn.execute(
+                    "INSERT INTO temp.generation_scope (path, captured) SELECT path, 0 FROM files",
+                    [],
+                )?;
+            }
+        }
+        conn.execute(STASH_FILE_DEPS_SQL, [])?;
+        capture_scope(&conn)
+    }
+
+    /// Add `paths` to the scope of the run opened by
+    /// [`Self::begin_generation`], before the run rewrites or deletes them.
+    pub(crate) fn extend_generation(&self, paths: &HashSet<String>) -> Result<()> {
+        let conn = self.connection()?;
+        add_to_scope(&conn, paths)?;
+        capture_scope(&conn)
+    }
+
+    /// Fingerprint the files the run's trigger added to its scope, before
+    /// the call edges are rebuilt.
+    pub(crate) fn capture_generation(&self) -> Result<()> {
+        let conn = self.connection()?;
+        capture_scope(&conn)
+    }
+
+    /// Close the run opened by [`Self::begin_generation`]: bump the
+    /// generation, log what the run changed under it, and prune the log to
+    /// the last [`RETAINED_GENERATIONS`]. The index stays marked incomplete
+    /// unless the run was `complete`. Returns the new generation.
+    pub(crate) fn commit_generation(&self, complete: bool) -> Result<u64> {
+        let mut conn = self.connection()?;
+        conn.execute_batch(
+            "DROP TRIGGER IF EXISTS temp.generation_file_added;
+             DROP TRIGGER IF EXISTS temp.generation_resolved;",
+        )?;
+        let tx = conn.transaction()?;
+        tx.execute(SNAPSHOT_SQL, [1, 1])?;
+        tx.execute(FILE_DEPS_SNAPSHOT_SQL, [])?;
+        let generation: i64 = tx.query_row(
+            "UPDATE index_generation
+             SET generation = generation + 1, incomplete = NOT ?1
+             WHERE id = 1
+             RETURNING generation",
+            [complete],
+            |row| row.get(0),
+        )?;
+        let changes = tx.execute(DIFF_SQL, [generation])?;
+        let oldest_kept = generation - RETAINED_GENERATIONS;
+        tx.execute(
+            "DELETE FROM index_changes WHERE generation <= ?1",
+            [oldest_kept],
+        )?;
+        tx.execute(
+            "UPDATE index_generation SET base = MAX(base, ?1) WHERE id = 1",
+            [oldest_kept],
+        )?;
+        tx.execute_batch(END_SQL)?;
+        tx.commit()?;
+        debug!(generation, changes, "Committed index generation");
+        Ok(to_generation(generation))
+    }
+
+    /// What changed after generation `since`, oldest first.
+    ///
+    /// [`IndexChanges::complete`] is `false`, with no changes listed, when
+    /// the log cannot answer for `since`: its entries were pruned, or
+    /// `since` came from a database this one replaced.
+    pub fn changes_since(&self, since: u64) -> Result<IndexChanges> {
+        let conn = self.connection()?;
+        let (generation, base): (i64, i64) = conn.query_row(
+            "SELECT generation, base FROM index_generation WHERE id = 1",
+            [],
+            |row| Ok((row.get(0)?, row.get(1)?)),
+        )?;
+        let generation = to_generation(generation);
+        if since < to_generation(base) || since > generation {
+            return Ok(IndexChanges {
+                since,
+                generation,
+                complete: false,
+                changes: Vec::new(),
+            });
+        }
+
+        let mut stmt = conn.prepare(
+            "SELECT generation, entity_code, change_code, path, name, target
+             FROM index_changes
+             WHERE generation > ?1
+             ORDER BY generation, entity_code, path, name, target",
+        )?;
+        let rows = stmt.query_map(params![i64::try_from(since).unwrap_or(i64::MAX)], |row| {
+            Ok((
+                row.get::<_, i64>(0)?,
+                row.get::<_, i64>(1)?,
+                row.get::<_, i64>(2)?,
+                row.get::<_, String>(3)?,
+                row.get::<_, String>(4)?,
+                row.get::<_, String>(5)?,
+            ))
+        })?;
+        let mut changes = Vec::new();
+        for row in rows {
+            let (changed_in, entity, change, path, name, target) = row?;
+            changes.push(IndexChange {
+                generation: to_generation(changed_in),
+                entity: entity_from_code(entity)?,
+                kind: change_from_code(change)?,
+                path: PathBuf::from(path),
+                name: (!name.is_empty()).then_some(name),
+                target: (!target.is_empty()).then_some(target),
+            });
+        }
+        Ok(IndexChanges {
+            since,
+            generation,
+            complete: true,
+            changes,
+        })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::path::Path;
+
+    use super::*;
+    use crate::types::Language;
+
+    fn open() -> (tempfile::TempDir, Index) {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let index = Index::open(&dir.path().join("tethys.db")).expect("open");
+        (dir, index)
+    }
+
+    #[test]
+    fn a_new_database_starts_past_earlier_generations() {
+        let (_dir, index) = open();
+        let start = index.generation().expect("generation");
+
+        // Creation time in milliseconds, well past any small counter.
+        assert!(start > 1_600_000_000_000, "got {start}");
+    }
+
+    #[test]
+    fn logs_file_changes_per_generation() {
+        let (_dir, index) = open();
+        let start = index.generation().expect("generation");
+
+        index.begin_generation(None).expect("begin");
+        index
+            .upsert_file(Path::new("src/a.rs"), Language::Rust, 1, 10, Some(1))
+            .expect("upsert a");
+        let first = index.commit_generation(true).expect("commit");
+        assert_eq!(first, start + 1);
+
+        index.begin_generation(None).expect("begin");
+        index
+            .upsert_file(Path::new("src/a.rs"), Language::Rust, 2, 11, Some(2))
+            .expect("rewrite a");
+        index
+            .upsert_file(Path::new("src/b.rs"), Language::Rust, 1, 10, Some(3))
+            .expect("upsert b");
+        let second = index.commit_generation(true).expect("commit");
+
+        let since_first = index.changes_since(first).expect("changes");
+        assert!(since_first.complete);
+        assert_eq!(since_first.generation, second);
+        let summary: Vec<_> = since_first
+            .changes
+            .iter()
+            .map(|c| (c.entity, c.kind, c.path.clone()))
+            .collect();
+        assert_eq!(
+            summary,
+            [
+                (
+                    ChangedEntity::File,
+                    ChangeKind::Modified,
+                    PathBuf::from("src/a.rs")
+                ),
+                (
+                    ChangedEntity::File,
+                    ChangeKind::Added,
+                    PathBuf::from("src/b.rs")
+                ),
+            ]
+        );
+        assert_eq!(index.changes_since(start).expect("all").changes.len(), 3);
+        assert!(
+            index
+                .changes_since(second)
+                .expect("none")
+                .changes
+                .is_empty()
+        );
+    }
+
+    #[test]
+    fn unknown_generations_are_incomplete() {
+        let (_dir, index) = open();
+        let start = index.generation().expect("generation");
+
+        assert!(!index.changes_since(start - 1).expect("before").complete);
+        assert!(!index.changes_since(start + 1).expect("after").complete);
+        assert!(index.changes_since(start).expect("current").complete);
+    }
+}
@@ -0,0 +1,244 @@
+//! Persistent crate discovery.
+//!
+//! [`crate::cargo::discover_crates`] parses every workspace member's
+//! `Cargo.toml` (expanding member globs) on each [`crate::Tethys::new`].
+//! Its result is stored with a stamp of every path it read and reused
+//! while all the stamps still match, so commands against an unchanged
+//! workspace skip manifest parsing entirely. Default targets are stamped
+//! by existence only: editing `src/lib.rs` keeps the discovery.
+
+use std::path::{Path, PathBuf};
+
+use rusqlite::{OptionalExtension, params};
+use tracing::debug;
+
+use super::Index;
+use crate::cargo::DiscoveryInput;
+use crate::content_hash::{ContentHasher, content_hash};
+use crate::error::{Error, Result};
+use crate::types::CrateInfo;
+
+/// How one discovery input looked: a hash of a file's content or of a
+/// directory's sorted entry names, `None` for a path that did not exist.
+/// A `probed` path is stamped `0` when it exists, since discovery only
+/// checked that.
+///
+/// Hashes rather than mtimes, which miss a same-size rewrite (or an entry
+/// added) within the filesystem's timestamp granularity. The inputs are a
+/// handful of small manifests, so hashing them costs far less than parsing.
+fn input_stamp(path: &Path, probed: bool) -> Option<i64> {
+    let metadata = std::fs::metadata(path).ok()?;
+    if probed {
+        return Some(0);
+    }
+    let hash = if metadata.is_dir() {
+        let mut names: Vec<_> = std::fs::read_dir(path)
+            .ok()?
+            .filter_map(|entry| entry.ok().map(|e| e.file_name()))
+            .collect();
+        names.sort();
+        let mut hasher = ContentHasher::default();
+        for name in &names {
+            hasher.field(name.as_encoded_bytes());
+        }
+        hasher.finish()
+    } else {
+        content_hash(&std::fs::read(path).ok()?)
+    };
+    #[expect(
+        clippy::cast_possible_wrap,
+        reason = "u64 bit-pattern stored as i64 for SQLite; only compared for equality"
+    )]
+    let stamp = hash as i64;
+    Some(stamp)
+}
+
+impl Index {
+    /// The crates stored by [`Self::store_crate_discovery`] for
+    /// `workspace_root`, or `None` when there are none or any input they
+    /// were discovered from has changed since.
+    pub(crate) fn cached_crate_discovery(
+        &self,
+        workspace_root: &Path,
+    ) -> Result<Option<Vec<CrateInfo>>> {
+        let conn = self.connection()?;
+        let crates: Option<String> = conn
+            .query_row(
+                "SELECT crates FROM crate_discovery WHERE workspace_root = ?1",
+                [workspace_root.to_string_lossy()],
+                |row| row.get(0),
+            )
+            .optional()?;
+        let Some(crates) = crates else {
+            return Ok(None);
+        };
+
+        let mut stmt = conn.prepare("SELECT path, probed, stamp FROM crate_discovery_inputs")?;
+        let inputs = stmt
+            .query_map([], |row| {
+                Ok((
+                    PathBuf::from(row.get::<_, String>(0)?),
+                    row.get(1)?,
+                    row.get(2)?,
+                ))
+            })?
+            .collect::<rusqlite::Result<Vec<(PathBuf, bool, Option<i64>)>>>()?;
+        if let Some((path, _, _)) = inputs
+            .iter()
+            .find(|(path, probed, stamp)| input_stamp(path, *probed) != *stamp)
+        {
+            debug!(changed = %path.display(), "Cached crate discovery is stale");
+            return Ok(None);
+        }
+
+        serde_json::from_str(&crates)
+            .map(Some)
+            .map_err(|e| Error::Internal(format!("corrupt cached crate discovery: {e}")))
+    }
+
+    /// Store `crates`, discovered for `workspace_root` from `inputs`,
+    /// replacing any earlier discovery.
+    pub(crate) fn store_crate_discovery(
+        &self,
+        workspace_root: &Path,
+        crates: &[CrateInfo],
+        inputs: &[DiscoveryInput],
+    ) -> Result<()> {
+        let crates = serde_json::to_string(crates)
+            .map_err(|e| Error::Internal(format!("failed to serialize crates: {e}")))?;
+        let mut conn = self.connection()?;
+        let tx = conn.transaction()?;
+        tx.execute("DELETE FROM crate_discovery", [])?;
+        tx.execute("DELETE FROM crate_discovery_inputs", [])?;
+        tx.execute(
+            "INSERT INTO crate_discovery (workspace_root, crates) VALUES (?1, ?2)",
+            params![workspace_root.to_string_lossy(), crates],
+        )?;
+        {
+            let mut stmt = tx.prepare(
+                "INSERT OR REPLACE INTO crate_discovery_inputs (path, probed, stamp) \
+                 VALUES (?1, ?2, ?3)",
+            )?;
+            for input in inputs {
+                let (path, probed) = match input {
+                    DiscoveryInput::Read(path) => (path, false),
+                    DiscoveryInput::Probed(path) => (path, true),
+                };
+                stmt.execute(params![
+                    path.to_string_lossy(),
+                    probed,
+                    input_stamp(path, probed)
+                ])?;
+            }
+        }
+        tx.commit()?;
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::cargo::discover_crates_with_inputs;
+
+    fn workspace() -> (tempfile::TempDir, PathBuf) {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let root = dir.path().canonicalize().expect("canonical root");
+        std::fs::write(
+            root.join("Cargo.toml"),
+            "[workspace]\nmembers = [\"crates/*\"]\n",
+        )
+        .expect("write root manifest");
+        add_member(&root, "alpha");
+        (dir, root)
+    }
+
+    fn add_member(root: &Path, name: &str) {
+        let src = root.join("crates").join(name).join("src");
+        std::fs::create_dir_all(&src).expect("create member");
+        std::fs::write(
+            src.parent().expect("member dir").join("Cargo.toml"),
+            format!("[package]\nname = \"{name}\"\nversion = \"0.1.0\"\n"),
+        )
+        .expect("write member manifest");
+        std::fs::write(src.join("lib.rs"), "").expect("write lib.rs");
+    }
+
+    fn cached_after_store(root: &Path) -> (Index, tempfile::TempDir) {
+        let db_dir = tempfile::tempdir().expect("tempdir");
+        let index = Index::open(&db_dir.path().join("test.db")).expect("open");
+        let (crates, inputs) = discover_crates_with_inputs(root);
+        index
+            .store_crate_discovery(root, &crates, &inputs)
+            .expect("store");
+        (index, db_dir)
+    }
+
+    #[test]
+    fn unchanged_workspace_reuses_discovery() {
+        let (_dir, root) = workspace();
+        let (index, _db_dir) = cached_after_store(&root);
+
+        let cached = index
+            .cached_crate_discovery(&root)
+            .expect("read")
+            .expect("cache hit");
+
+        assert_eq!(cached, crate::cargo::discover_crates(&root));
+        assert_eq!(cached[0].name, "alpha");
+    }
+
+    #[test]
+    fn edited_manifest_invalidates_discovery() {
+        let (_dir, root) = workspace();
+        let (index, _db_dir) = cached_after_store(&root);
+
+        // Same length as "alpha": only the content differs.
+        std::fs::write(
+            root.join("crates/alpha/Cargo.toml"),
+            "[package]\nname = \"omega\"\nversion = \"0.1.0\"\n",
+        )
+        .expect("rewrite manifest");
+
+        assert!(index.cached_crate_discovery(&root).expect("read").is_none());
+    }
+
+    #[test]
+    fn edited_default_target_keeps_discovery() {
+        let (_dir, root) = workspace();
+        let (index, _db_dir) = cached_after_store(&root);
+
+        std::fs::write(root.join("crates/alpha/src/lib.rs"), "pub fn f() {}\n")
+            .expect("edit lib.rs");
+        assert!(
+            index.cached_crate_discovery(&root).expect("read").is_some(),
+            "only the existence of a default target matters"
+        );
+
+        std::fs::remove_file(root.join("crates/alpha/src/lib.rs")).expect("remove lib.rs");
+        assert!(index.cached_crate_discovery(&root).expect("read").is_none());
+    }
+
+    #[test]
+    fn new_glob_member_invalidates_discovery() {
+        let (_dir, root) = workspace();
+        let (index, _db_dir) = cached_after_store(&root);
+
+        add_member(&root, "beta");
+
+        assert!(index.cached_crate_discovery(&root).expect("read").is_none());
+    }
+
+    #[test]
+    fn other_workspace_root_misses() {
+        let (_dir, root) = workspace();
+        let (index, _db_dir) = cached_after_store(&root);
+
+        assert!(
+            index
+                .cached_crate_discovery(&root.join("elsewhere"))
+                .expect("read")
+                .is_none()
+        );
+    }
+}
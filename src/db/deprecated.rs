@@ -9,7 +9,7 @@
 //! already flagged by unused-imports. Design and falsification tables:
 //! `.tethys-jdly/design.md`, `.tethys-haw5/design.md`.
 
-use serde::Serialize;
+use serde::{Deserialize, Serialize};
 use tracing::trace;
 
 use super::Index;
@@ -21,9 +21,10 @@ use crate::error::Result;
 /// always null for C#, `error` always null for Rust — both serialize as
 /// explicit nulls rather than vanishing, so downstream consumers see one
 /// stable shape.
-#[derive(Debug, Clone, PartialEq, Eq, Serialize)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct DeprecatedSymbol {
-    /// Internal symbol id, used to join reference sites; not part of output.
+    /// Internal symbol id, used to join reference sites; not part of output
+    /// (0 in a report served from the report cache).
     #[serde(skip)]
     pub(crate) symbol_id: i64,
     /// Symbol name as declared.
@@ -44,7 +45,8 @@ pub struct DeprecatedSymbol {
     /// bool argument.
     pub error: Option<bool>,
     /// Declaring file's `files.language` value; drives the same-language
-    /// guards on Path B and ambiguity tiering (design C9). Not output.
+    /// guards on Path B and ambiguity tiering (design C9). Not output
+    /// (empty in a report served from the report cache).
     #[serde(skip)]
     pub(crate) language: String,
 }
@@ -56,7 +58,7 @@ pub struct DeprecatedSymbol {
 /// unique-name resolution matched rustc while every ambiguous one was a
 /// phantom. Errors are suppressions, not accusations — Maybe means "verify
 /// by hand", never "definitely calls deprecated code".
-#[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord, Serialize)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord, Serialize, Deserialize)]
 pub enum Tier {
     /// Every same-named symbol in the index is deprecated (uniqueness is the
     /// n=1 case): whichever candidate the ref really binds to, the site uses
@@ -68,7 +70,7 @@ pub enum Tier {
 }
 
 /// How a site was associated with the deprecated symbol.
-#[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord, Serialize)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord, Serialize, Deserialize)]
 #[serde(rename_all = "kebab-case")]
 pub enum Via {
     /// Pass-2-resolved reference (`refs.symbol_id` points at the symbol).
@@ -82,7 +84,7 @@ pub enum Via {
 }
 
 /// One reference site of a deprecated symbol.
-#[derive(Debug, Clone, PartialEq, Eq, Serialize)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct ReferenceSite {
     /// Workspace-relative path of the referencing file.
     pub file: String,
@@ -103,7 +105,7 @@ pub struct ReferenceSite {
 ///
 /// An empty `sites` vec is meaningful output, not absence: it is the
 /// "clean — migration done" verdict (design C6).
-#[derive(Debug, Clone, PartialEq, Eq, Serialize)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct DeprecatedFinding {
     /// The symbol carrying `#[deprecated]`.
     pub symbol: DeprecatedSymbol,
@@ -602,6 +604,7 @@ mod tests {
                 &symbols,
                 &[],
                 &[],
+                None,
             )
             .expect("write C# file");
 
@@ -631,6 +634,7 @@ mod tests {
                 &[rust_sym],
                 &[],
                 &[],
+                None,
             )
             .expect("write Rust file");
 
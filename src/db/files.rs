@@ -7,9 +7,17 @@ use rusqlite::OptionalExtension;
 use rusqlite::params;
 use tracing::trace;
 
-use super::{FILES_COLUMNS, Index, SymbolData, row_to_indexed_file};
+use super::identifiers::{COVERAGE_SENTINEL, encode_lines};
+use super::panic_points::classify_panic;
+use super::{
+    FILES_COLUMNS, Index, SymbolData, panic_code, reference_kind_code, row_to_indexed_file,
+    strategy_code, symbol_kind_code, visibility_code,
+};
 use crate::error::Result;
-use crate::languages::common::{ExtractedReference, ExtractedReferenceKind, ImportStatement};
+use crate::identifiers::IdentifierLines;
+use crate::languages::common::{
+    ExtractedReference, ExtractedReferenceKind, ImportStatement, referenced_names,
+};
 use crate::languages::module_resolver::get_module_resolver;
 use crate::types::ResolutionStrategy;
 use crate::types::{FileId, IndexedFile, Language, Span, SymbolId, SymbolKind};
@@ -54,7 +62,7 @@ impl Index {
     /// Insert or update a file record, returning the file ID.
     ///
     /// Delegates to [`Self::index_parsed_file_atomic`] with empty symbols,
-    /// references, and imports.
+    /// references, and imports, and no identifier occurrences.
     #[cfg(test)]
     pub fn upsert_file(
         &mut self,
@@ -73,6 +81,7 @@ impl Index {
             &[],
             &[],
             &[],
+            None,
         )?;
         Ok(file_id)
     }
@@ -148,8 +157,8 @@ impl Index {
     }
 
     /// Atomically write a file's COMPLETE parse output — file row, symbols,
-    /// attributes, references, and imports — in ONE transaction with cached
-    /// statements (idxperf design claims C4/C5).
+    /// attributes, references, imports, and file-local analysis facts — in ONE
+    /// transaction with cached statements (idxperf design claims C4/C5).
     ///
     /// All-or-nothing: a failure anywhere rolls back the entire file, so a
     /// crash can never leave symbols without their refs (partial data
@@ -190,6 +199,7 @@ impl Index {
         symbols: &[SymbolData],
         references: &[ExtractedReference],
         imports: &[ImportStatement],
+        identifiers: Option<&[IdentifierLines]>,
     ) -> Result<(FileId, Vec<SymbolId>, usize)> {
         let mut conn = self.connection()?;
         let tx = conn.transaction()?;
@@ -237,6 +247,9 @@ impl Index {
             tx.execute("DELETE FROM refs WHERE file_id = ?1", [id])?;
             tx.execute("DELETE FROM symbols WHERE file_id = ?1", [id])?;
             tx.execute("DELETE FROM imports WHERE file_id = ?1", [id])?;
+            tx.execute("DELETE FROM identifier_lines WHERE file_id = ?1", [id])?;
+            tx.execute("DELETE FROM import_statements WHERE file_id = ?1", [id])?;
+            tx.execute("DELETE FROM referenced_names WHERE file_id = ?1", [id])?;
             id
         } else {
             // Insert new
@@ -261,8 +274,8 @@ impl Index {
         let mut symbol_ids = Vec::with_capacity(symbols.len());
         {
             let mut insert_symbol_stmt = tx.prepare_cached(
-                "INSERT INTO symbols (file_id, name, module_path, qualified_name, kind, line, column,
-                 end_line, end_column, signature, visibility, parent_symbol_id, is_test)
+                "INSERT INTO symbols (file_id, name, module_path, qualified_name, kind_code, line,
+                 column, end_line, end_column, signature, visibility_code, parent_symbol_id, is_test)
                  VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?12, ?13)",
             )?;
             let mut insert_attribute_stmt = tx.prepare_cached(
@@ -276,13 +289,13 @@ impl Index {
                     sym.name,
                     sym.module_path,
                     sym.qualified_name,
-                    sym.kind.as_str(),
+                    symbol_kind_code(sym.kind),
                     sym.line,
                     sym.column,
                     sym.span.map(|s| s.end_line()),
                     sym.span.map(|s| s.end_column()),
                     sym.signature,
-                    sym.visibility.as_str(),
+                    visibility_code(sym.visibility),
                     sym.parent_symbol_id.map(SymbolId::as_i64),
                     sym.is_test
                 ])?;
@@ -404,8 +417,9 @@ impl Index {
         let mut refs_stored = 0usize;
         {
             let mut insert_ref_stmt = tx.prepare_cached(
-                "INSERT INTO refs (symbol_id, file_id, kind, line, column, in_symbol_id, reference_name, strategy)
-                 VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8)",
+                "INSERT INTO refs (symbol_id, file_id, kind_code, line, column, in_symbol_id,
+                 reference_name, strategy_code, panic_code)
+                 VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9)",
             )?;
             for r in references {
                 // Type-hierarchy edges (tethys-j2r1) bypass the generic
@@ -431,12 +445,13 @@ impl Index {
                     insert_ref_stmt.execute(params![
                         symbol_id.map(SymbolId::as_i64),
                         file_id,
-                        r.kind.to_db_kind().as_str(),
+                        reference_kind_code(&r.kind.to_db_kind()),
                         r.line,
                         r.column,
                         in_symbol_id.map(SymbolId::as_i64),
                         symbol_id.is_none().then_some(r.name.as_str()),
-                        symbol_id.map(|_| ResolutionStrategy::SameFile.as_str())
+                        symbol_id.map(|_| strategy_code(ResolutionStrategy::SameFile)),
+                        None::<i64>
                     ])?;
                     refs_stored += 1;
                     continue;
@@ -475,7 +490,14 @@ impl Index {
                 // Provenance (ADR-0003): any insert-time bind — general or
                 // macro map — is by definition a same-file bind;
                 // unresolved rows stay NULL until a later pass stamps them.
-                let strategy = symbol_id.map(|_| ResolutionStrategy::SameFile.as_str());
+                let strategy = symbol_id.map(|_| strategy_code(ResolutionStrategy::SameFile));
+                // Panic-prone refs are classified here, once, so the
+                // panic-points queries are index lookups (db/panic_points.rs).
+                let db_kind = r.kind.to_db_kind();
+                let panic = reference_name
+                    .as_deref()
+                    .and_then(|name| classify_panic(&db_kind, name))
+                    .map(panic_code);
                 let in_symbol_id = r
                     .containing_symbol_span
                     .and_then(|span| span_to_id.get(&span).copied());
@@ -483,12 +505,13 @@ impl Index {
                 insert_ref_stmt.execute(params![
                     symbol_id.map(SymbolId::as_i64),
                     file_id,
-                    r.kind.to_db_kind().as_str(),
+                    reference_kind_code(&db_kind),
                     r.line,
                     r.column,
                     in_symbol_id.map(SymbolId::as_i64),
                     reference_name.as_deref(),
-                    strategy
+                    strategy,
+                    panic
                 ])?;
                 refs_stored += 1;
             }
@@ -524,6 +547,56 @@ impl Index {
             }
         }
 
+        // File-local analysis facts — identifier occurrences (textual
+        // mentions), import statements with lines, and pre-resolution
+        // reference names — plus the coverage sentinels that mark this file
+        // as answerable from the index. `None` writes none of them, leaving
+        // the file to the disk-scan and re-parse fallbacks.
+        if let Some(identifiers) = identifiers {
+            let mut insert_identifier_stmt = tx.prepare_cached(
+                "INSERT INTO identifier_lines (name, file_id, lines) VALUES (?1, ?2, ?3)",
+            )?;
+            insert_identifier_stmt.execute(params![
+                COVERAGE_SENTINEL,
+                file_id,
+                Vec::<u8>::new()
+            ])?;
+            for ident in identifiers {
+                insert_identifier_stmt.execute(params![
+                    ident.name,
+                    file_id,
+                    encode_lines(&ident.lines)
+                ])?;
+            }
+
+            let mut insert_statement_stmt = tx.prepare_cached(
+                "INSERT INTO import_statements (file_id, ordinal, line, path, imported_names,
+                 alias, is_glob, is_reexport)
+                 VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8)",
+            )?;
+            for (ordinal, import) in imports.iter().enumerate() {
+                insert_statement_stmt.execute(params![
+                    file_id,
+                    ordinal,
+                    import.line,
+                    import.path.join(" "),
+                    import.imported_names.join(" "),
+                    import.alias.as_deref(),
+                    import.is_glob,
+                    import.is_reexport
+                ])?;
+            }
+
+            let mut insert_name_stmt =
+                tx.prepare_cached("INSERT INTO referenced_names (name, file_id) VALUES (?1, ?2)")?;
+            insert_name_stmt.execute(params![COVERAGE_SENTINEL, file_id])?;
+            for name in referenced_names(references) {
+                if name != COVERAGE_SENTINEL {
+                    insert_name_stmt.execute(params![name, file_id])?;
+                }
+            }
+        }
+
         tx.commit()?;
         Ok((FileId::from(file_id), symbol_ids, refs_stored))
     }
@@ -590,6 +663,17 @@ impl Index {
 
         Ok(files)
     }
+
+    /// Record `mtime_ns` for a file whose content is unchanged since it was
+    /// indexed, so staleness checks see it as current without a re-index.
+    pub(crate) fn set_file_mtime(&self, id: FileId, mtime_ns: i64) -> Result<()> {
+        let conn = self.connection()?;
+        conn.execute(
+            "UPDATE files SET mtime_ns = ?2 WHERE id = ?1",
+            params![id.as_i64(), mtime_ns],
+        )?;
+        Ok(())
+    }
 }
 
 #[cfg(test)]
@@ -709,6 +793,7 @@ mod index_parsed_file_atomic_tests {
                 &symbols,
                 &references,
                 &imports,
+                None,
             )
             .expect("atomic write");
 
@@ -805,6 +890,7 @@ mod index_parsed_file_atomic_tests {
                 &symbols,
                 &references,
                 &imports,
+                None,
             )
             .expect("atomic write");
 
@@ -849,6 +935,7 @@ mod index_parsed_file_atomic_tests {
             &symbols,
             &references,
             &[],
+            None,
         );
         assert!(result.is_err(), "dangling parent_symbol_id must fail");
 
@@ -914,6 +1001,7 @@ mod index_parsed_file_atomic_tests {
                 &symbols,
                 &references,
                 &imports,
+                None,
             )
             .expect("initial write");
 
@@ -949,6 +1037,7 @@ mod index_parsed_file_atomic_tests {
             &[bad],
             &[],
             &[],
+            None,
         );
         assert!(result.is_err(), "poisoned re-index must fail");
 
@@ -1106,16 +1195,16 @@ mod delete_files_tests {
                  (1, 'gone.rs', 'rust', 0, 0, 0),
                  (2, 'kept.rs', 'rust', 0, 0, 0);
              INSERT INTO symbols (id, file_id, name, module_path, qualified_name,
-                                  kind, line, column, visibility) VALUES
-                 (10, 1, 'gone_fn', '', 'gone_fn', 'function', 1, 1, 'pub'),
-                 (20, 2, 'kept_fn', '', 'kept_fn', 'function', 1, 1, 'pub');
+                                  kind_code, line, column, visibility_code) VALUES
+                 (10, 1, 'gone_fn', '', 'gone_fn', 1, 1, 1, 1),
+                 (20, 2, 'kept_fn', '', 'kept_fn', 1, 1, 1, 1);
              INSERT INTO attributes (symbol_id, name, args, line)
                  VALUES (10, 'derive', 'Clone', 1);
              -- gone.rs ref resolved to kept.rs's symbol; kept.rs ref resolved
              -- to gone.rs's symbol (must cascade via refs.symbol_id).
-             INSERT INTO refs (id, symbol_id, file_id, kind, line, column, in_symbol_id) VALUES
-                 (100, 20, 1, 'call', 2, 1, 10),
-                 (200, 10, 2, 'call', 2, 1, 20);
+             INSERT INTO refs (id, symbol_id, file_id, kind_code, line, column, in_symbol_id) VALUES
+                 (100, 20, 1, 2, 2, 1, 10),
+                 (200, 10, 2, 2, 2, 1, 20);
              INSERT INTO imports (file_id, symbol_name, source_module) VALUES
                  (1, 'kept_fn', 'crate::kept'),
                  (2, 'gone_fn', 'crate::gone');
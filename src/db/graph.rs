@@ -123,17 +123,22 @@ impl Index {
                 FROM call_edges ce
                 JOIN caller_tree ct ON ce.callee_symbol_id = ct.symbol_id
                 WHERE ct.depth < ?2{exclusion}
+            ),
+            -- Collapse to one row per caller BEFORE joining: joined
+            -- directly, the planner scans all of symbols against the
+            -- materialized tree.
+            nearest(symbol_id, min_depth) AS (
+                SELECT symbol_id, MIN(depth) FROM caller_tree GROUP BY symbol_id
             )
             SELECT
                 s.id, s.file_id, s.name, s.module_path, s.qualified_name,
                 s.kind, s.line, s.column, s.end_line, s.end_column,
                 s.signature, s.visibility, s.parent_symbol_id, s.is_test,
-                f.path, MIN(ct.depth) as min_depth
-            FROM caller_tree ct
-            JOIN symbols s ON s.id = ct.symbol_id
+                f.path, n.min_depth
+            FROM nearest n
+            JOIN symbols s ON s.id = n.symbol_id
             JOIN files f ON f.id = s.file_id
-            GROUP BY s.id
-            ORDER BY min_depth, s.qualified_name"
+            ORDER BY n.min_depth, s.qualified_name"
                 .replace("{exclusion}", &edge_support_filter(call_edges, "ce")),
         )?;
 
@@ -291,7 +296,9 @@ impl Index {
 /// The base case's `?2 >= 1` guard makes a zero bound yield no rows (depth
 /// zero validates the target and traverses nothing), mirroring the symbol
 /// `caller_tree` CTE; consumers passing `DEFAULT_MAX_DEPTH` never engage it.
-/// Callers append their own projection over `dependent_tree(file_id, depth)`.
+/// Callers append their own projection over `nearest(file_id, min_depth)`,
+/// one row per dependent, collapsed before any join with `files` so the
+/// planner looks files up by id instead of scanning them.
 const DEPENDENT_TREE_CTE: &str = "WITH RECURSIVE dependent_tree(file_id, depth) AS (
                 -- Base case: direct dependents
                 SELECT DISTINCT fd.from_file_id, 1
@@ -305,6 +312,9 @@ const DEPENDENT_TREE_CTE: &str = "WITH RECURSIVE dependent_tree(file_id, depth)
                 FROM file_deps fd
                 JOIN dependent_tree dt ON fd.to_file_id = dt.file_id
                 WHERE dt.depth < ?2
+            ),
+            nearest(file_id, min_depth) AS (
+                SELECT file_id, MIN(depth) FROM dependent_tree GROUP BY file_id
             )";
 
 impl Index {
@@ -318,12 +328,10 @@ impl Index {
 
         let mut stmt = conn.prepare(&format!(
             "{DEPENDENT_TREE_CTE}
-            SELECT
-                f.path, MIN(dt.depth) as min_depth
-            FROM dependent_tree dt
-            JOIN files f ON f.id = dt.file_id
-            GROUP BY f.id
-            ORDER BY min_depth, f.path"
+            SELECT f.path, n.min_depth
+            FROM nearest n
+            JOIN files f ON f.id = n.file_id
+            ORDER BY n.min_depth, f.path"
         ))?;
 
         let dependents = stmt
@@ -350,10 +358,9 @@ impl Index {
         let mut stmt = conn.prepare(&format!(
             "{DEPENDENT_TREE_CTE}
             SELECT f.id
-            FROM dependent_tree dt
-            JOIN files f ON f.id = dt.file_id
-            GROUP BY f.id
-            ORDER BY MIN(dt.depth), f.path"
+            FROM nearest n
+            JOIN files f ON f.id = n.file_id
+            ORDER BY n.min_depth, f.path"
         ))?;
 
         let file_ids = stmt
@@ -424,6 +431,8 @@ impl Index {
         let edge_count: usize = adj.values().map(Vec::len).sum();
 
         let cycle_ids = enumerate_cycles(adj, &paths_by_id);
+        // A cancelled search stops early; its cycle list is incomplete.
+        crate::cancel::check()?;
         let mut cycles = Vec::with_capacity(cycle_ids.len());
         for ids in cycle_ids {
             let mut files = Vec::with_capacity(ids.len());
@@ -670,6 +679,7 @@ fn run_cycle_search(
         component: HashSet::new(),
         cycles: Vec::new(),
         visits: 0,
+        cancelled: false,
     };
 
     // Johnson's outer loop. Rather than searching from every node, advance a
@@ -681,7 +691,10 @@ fn run_cycle_search(
     let mut cursor = 0;
     let mut scc_passes = 0;
     let mut component_work = 0;
-    while cursor < nodes.len() {
+    while cursor < nodes.len() && !search.cancelled {
+        if crate::cancel::is_cancelled() {
+            break;
+        }
         let scan = strongly_connected_components(&adj, &nodes[cursor..]);
         scc_passes += 1;
         component_work += scan.work;
@@ -849,6 +862,9 @@ fn hosts_cycle(component: &[FileId], adj: &HashMap<FileId, Vec<FileId>>) -> bool
     }
 }
 
+/// Node visits between cancellation polls in [`CycleSearch::visit`].
+const CANCEL_POLL_VISITS: usize = 1024;
+
 /// Mutable state of one [`enumerate_cycles`] search.
 ///
 /// Bundled so the recursion keeps a single allocation of each collection
@@ -876,6 +892,9 @@ struct CycleSearch<'a> {
     cycles: Vec<Vec<FileId>>,
     /// Node visits made, reported as [`CycleSearchOutcome::visits`].
     visits: usize,
+    /// Set once the current `CancellationToken` is seen cancelled; every
+    /// frame then unwinds without exploring further.
+    cancelled: bool,
 }
 
 impl<'a> CycleSearch<'a> {
@@ -908,10 +927,17 @@ impl<'a> CycleSearch<'a> {
     /// it, a graph with no cycles at all still costs one visit per simple
     /// path (tethys-u5o5 review: 72 files, 0 cycles, 228s).
     fn visit(&mut self, node: FileId, start: FileId) -> bool {
+        if self.cancelled {
+            return false;
+        }
         let neighbors: &'a [FileId] = self.adj.get(&node).map_or(&[], Vec::as_slice);
         let mut found = false;
 
         self.visits += 1;
+        if self.visits.is_multiple_of(CANCEL_POLL_VISITS) && crate::cancel::is_cancelled() {
+            self.cancelled = true;
+            return false;
+        }
         self.path.push(node);
         self.blocked.insert(node);
 
@@ -6,8 +6,8 @@
 use std::path::PathBuf;
 
 use crate::types::{
-    FileId, Import, IndexedFile, Language, Reference, ReferenceKind, Span, Symbol, SymbolId,
-    SymbolKind, Visibility,
+    FileId, Import, IndexedFile, Language, PanicKind, Reference, ReferenceKind, ResolutionStrategy,
+    Span, Symbol, SymbolId, SymbolKind, Visibility,
 };
 
 /// SQL column list for files table.
@@ -105,6 +105,97 @@ pub(crate) fn parse_reference_kind(s: &str) -> rusqlite::Result<ReferenceKind> {
     })
 }
 
+/// Storage code for `symbols.kind_code`.
+///
+/// The schema's generated `kind` column decodes it back to
+/// [`SymbolKind::as_str`]; the two mappings must change together.
+pub(crate) const fn symbol_kind_code(kind: SymbolKind) -> i64 {
+    match kind {
+        SymbolKind::Function => 1,
+        SymbolKind::Method => 2,
+        SymbolKind::Struct => 3,
+        SymbolKind::Class => 4,
+        SymbolKind::Enum => 5,
+        SymbolKind::Trait => 6,
+        SymbolKind::Interface => 7,
+        SymbolKind::Const => 8,
+        SymbolKind::Static => 9,
+        SymbolKind::Module => 10,
+        SymbolKind::TypeAlias => 11,
+        SymbolKind::Macro => 12,
+        SymbolKind::EnumVariant => 13,
+        SymbolKind::StructField => 14,
+        SymbolKind::Property => 15,
+        SymbolKind::Event => 16,
+        SymbolKind::Delegate => 17,
+    }
+}
+
+/// Storage code for `symbols.visibility_code`, decoded by the generated
+/// `visibility` column.
+pub(crate) const fn visibility_code(visibility: Visibility) -> i64 {
+    match visibility {
+        Visibility::Public => 1,
+        Visibility::Crate => 2,
+        Visibility::Module => 3,
+        Visibility::Private => 4,
+    }
+}
+
+/// Storage code for `refs.kind_code`, decoded by the generated `kind`
+/// column. [`ReferenceKind::Unknown`] stores 0 and reads back as
+/// `"unknown"`, as its [`ReferenceKind::as_str`] always has.
+pub(crate) const fn reference_kind_code(kind: &ReferenceKind) -> i64 {
+    match kind {
+        ReferenceKind::Unknown(_) => 0,
+        ReferenceKind::Import => 1,
+        ReferenceKind::Call => 2,
+        ReferenceKind::Type => 3,
+        ReferenceKind::Inherit => 4,
+        ReferenceKind::Construct => 5,
+        ReferenceKind::FieldAccess => 6,
+        ReferenceKind::Macro => 7,
+        ReferenceKind::Reexport => 8,
+        ReferenceKind::Value => 9,
+        ReferenceKind::MacroCall => 10,
+    }
+}
+
+/// Storage code for `refs.strategy_code`, decoded by the generated
+/// `strategy` column.
+pub(crate) const fn strategy_code(strategy: ResolutionStrategy) -> i64 {
+    match strategy {
+        ResolutionStrategy::SameFile => 1,
+        ResolutionStrategy::ExplicitImport => 2,
+        ResolutionStrategy::GlobImport => 3,
+        ResolutionStrategy::ImportUnion => 4,
+        ResolutionStrategy::QualifiedExact => 5,
+        ResolutionStrategy::SameCrate => 6,
+        ResolutionStrategy::UniqueWorkspace => 7,
+        ResolutionStrategy::QualifiedModuleFallback => 8,
+        ResolutionStrategy::Lsp => 9,
+    }
+}
+
+/// Storage code for `refs.panic_code`, decoded by the generated `panic`
+/// column.
+pub(crate) const fn panic_code(kind: PanicKind) -> i64 {
+    match kind {
+        PanicKind::Unwrap => 1,
+        PanicKind::Expect => 2,
+        PanicKind::Panic => 3,
+        PanicKind::Unreachable => 4,
+        PanicKind::Todo => 5,
+        PanicKind::Unimplemented => 6,
+    }
+}
+
+/// The first column of every row `sql` returns, as ids.
+pub(crate) fn query_ids(conn: &rusqlite::Connection, sql: &str) -> rusqlite::Result<Vec<i64>> {
+    let mut stmt = conn.prepare(sql)?;
+    stmt.query_map([], |row| row.get(0))?.collect()
+}
+
 /// Build a span from start and optional end positions.
 ///
 /// Returns `None` if either `end_line` or `end_column` is missing, or if the
@@ -10,12 +10,18 @@
 //! anchored (`in_symbol` NULL — cross-file impl) is invisible to the down
 //! walk; documented degrade, measured 3/37 on the self-index.
 //!
+//! Both walks are served from the precomputed closure (`type_closure`,
+//! maintained by every indexing run in `db/type_closure.rs`) when it is
+//! current: the resolved nodes are its rows, and the external leaves are
+//! the unresolved edges of the root and of those rows. Otherwise they fall
+//! back to walking the edges.
+//!
 //! Deliberate deviation from the recursive-CTE graph-query convention:
 //! unresolved supertypes are name-only leaves with no symbol id, so the
 //! frontier mixes ids and names — a Rust-side BFS expresses that
 //! directly; a CTE cannot carry the name-leaf branch.
 
-use std::collections::HashSet;
+use std::collections::{HashMap, HashSet};
 
 use rusqlite::params;
 use serde::Serialize;
@@ -51,7 +57,8 @@ pub struct HierarchyNode {
     pub depth: u32,
 }
 
-/// Output of [`Index::get_type_hierarchy`].
+/// Output of [`Index::get_type_hierarchy`]. Both lists are sorted by
+/// depth, then name.
 #[derive(Debug, Clone, Serialize)]
 pub struct TypeHierarchy {
     /// The queried type as found in the index.
@@ -89,19 +96,23 @@ impl Index {
             return Err(Error::NotFound(format!("type: {name}")));
         }
 
-        let up = if matches!(direction, HierarchyDirection::Up | HierarchyDirection::Both) {
-            walk_up(&conn, &roots)?
-        } else {
-            Vec::new()
+        let closure = super::type_closure::is_current(&conn)?;
+        let mut up = match direction {
+            HierarchyDirection::Up | HierarchyDirection::Both if closure => {
+                closure_up(&conn, &roots)?
+            }
+            HierarchyDirection::Up | HierarchyDirection::Both => walk_up(&conn, &roots)?,
+            HierarchyDirection::Down => Vec::new(),
         };
-        let down = if matches!(
-            direction,
-            HierarchyDirection::Down | HierarchyDirection::Both
-        ) {
-            walk_down(&conn, &roots)?
-        } else {
-            Vec::new()
+        let mut down = match direction {
+            HierarchyDirection::Down | HierarchyDirection::Both if closure => {
+                closure_down(&conn, &roots)?
+            }
+            HierarchyDirection::Down | HierarchyDirection::Both => walk_down(&conn, &roots)?,
+            HierarchyDirection::Up => Vec::new(),
         };
+        sort_nodes(&mut up);
+        sort_nodes(&mut down);
 
         Ok(TypeHierarchy {
             name: name.to_string(),
@@ -111,6 +122,109 @@ impl Index {
     }
 }
 
+/// Order nodes by depth, then name, with location breaking ties between
+/// same-named types.
+fn sort_nodes(nodes: &mut [HierarchyNode]) {
+    nodes.sort_by(|a, b| {
+        (a.depth, &a.name, &a.file, a.line).cmp(&(b.depth, &b.name, &b.file, b.line))
+    });
+}
+
+/// Keep `node` for symbol `id` unless a shallower one is already there
+/// (several roots may reach the same type).
+fn keep_shallowest(nodes: &mut HashMap<i64, HierarchyNode>, id: i64, node: HierarchyNode) {
+    match nodes.get(&id) {
+        Some(kept) if kept.depth <= node.depth => {}
+        _ => {
+            nodes.insert(id, node);
+        }
+    }
+}
+
+/// Closure rows joined to their symbol, for [`closure_up`] (`ancestor`)
+/// and [`closure_down`] (`descendant`).
+fn closure_sql(node: &str, anchor: &str) -> String {
+    format!(
+        "SELECT c.{node}_id, c.depth, s.name, s.kind, f.path, s.line
+         FROM type_closure c
+         JOIN symbols s ON s.id = c.{node}_id
+         JOIN files f ON f.id = s.file_id
+         WHERE c.{anchor}_id = ?1"
+    )
+}
+
+/// Resolved nodes of a closure query over every root, at the shallowest
+/// depth any root reaches them; the roots themselves are left out, as in
+/// the walks.
+fn closure_nodes(
+    conn: &rusqlite::Connection,
+    sql: &str,
+    roots: &[i64],
+) -> Result<HashMap<i64, HierarchyNode>> {
+    let mut stmt = conn.prepare(sql)?;
+    let mut nodes = HashMap::new();
+    for &root in roots {
+        for row in stmt.query_map(params![root], |r| {
+            Ok((
+                r.get::<_, i64>(0)?,
+                HierarchyNode {
+                    depth: r.get(1)?,
+                    name: r.get(2)?,
+                    kind: Some(r.get(3)?),
+                    file: Some(r.get(4)?),
+                    line: Some(r.get(5)?),
+                },
+            ))
+        })? {
+            let (id, node) = row?;
+            if !roots.contains(&id) {
+                keep_shallowest(&mut nodes, id, node);
+            }
+        }
+    }
+    Ok(nodes)
+}
+
+/// Supertypes from the closure: its ancestor rows, plus the external
+/// names inherited by a root or an ancestor, one level below it and
+/// deduped by name like the walk's leaves.
+fn closure_up(conn: &rusqlite::Connection, roots: &[i64]) -> Result<Vec<HierarchyNode>> {
+    let resolved = closure_nodes(conn, &closure_sql("ancestor", "descendant"), roots)?;
+
+    let mut external: HashMap<String, u32> = HashMap::new();
+    let mut stmt = conn.prepare(
+        "SELECT reference_name FROM refs
+         WHERE in_symbol_id = ?1 AND kind = 'inherit'
+           AND symbol_id IS NULL AND reference_name IS NOT NULL",
+    )?;
+    let levels = roots
+        .iter()
+        .map(|&root| (root, 0))
+        .chain(resolved.iter().map(|(&id, node)| (id, node.depth)));
+    for (id, depth) in levels {
+        for name in stmt.query_map(params![id], |r| r.get::<_, String>(0))? {
+            let shallowest = external.entry(name?).or_insert(depth + 1);
+            *shallowest = (*shallowest).min(depth + 1);
+        }
+    }
+
+    let mut up: Vec<HierarchyNode> = resolved.into_values().collect();
+    up.extend(external.into_iter().map(|(name, depth)| HierarchyNode {
+        name,
+        kind: None,
+        file: None,
+        line: None,
+        depth,
+    }));
+    Ok(up)
+}
+
+/// Subtypes from the closure: its descendant rows.
+fn closure_down(conn: &rusqlite::Connection, roots: &[i64]) -> Result<Vec<HierarchyNode>> {
+    let down = closure_nodes(conn, &closure_sql("descendant", "ancestor"), roots)?;
+    Ok(down.into_values().collect())
+}
+
 /// Transitive supertype walk: resolved targets recurse, unresolved
 /// (external) names are leaves, deduped by name. Frontier of resolved
 /// symbol ids; the visited set is the cycle guard.
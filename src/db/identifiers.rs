@@ -0,0 +1,202 @@
+//! Identifier-occurrence storage for the Tethys index.
+//!
+//! `identifier_lines` is an inverted index: one row per (identifier, file)
+//! holding the line of each occurrence, written by Pass 1 alongside the
+//! file's symbols (see [`crate::identifiers`]). Lines are stored as a
+//! delta-encoded LEB128 varint blob — ascending line numbers make most
+//! deltas one byte (a same-line repeat is a zero delta), so a row costs
+//! roughly one byte per occurrence plus the key.
+//!
+//! Every file written with extracted identifiers also gets one sentinel
+//! row with an empty name. Its presence separates "this file has no
+//! occurrences of the name" from "this file predates the table or was
+//! written without extraction"; callers fall back to scanning the latter
+//! from disk rather than treating silence as absence.
+
+use std::collections::HashSet;
+
+use rusqlite::params_from_iter;
+use tracing::trace;
+
+use super::Index;
+use crate::error::Result;
+use crate::types::FileId;
+
+/// Name of the per-file sentinel row (see the module docs).
+pub(crate) const COVERAGE_SENTINEL: &str = "";
+
+/// Stored identifier occurrences for a set of names, as returned by
+/// [`Index::identifier_occurrences`].
+#[derive(Debug, Default)]
+pub(crate) struct StoredOccurrences {
+    /// Files whose occurrences are in the index. Files absent here were
+    /// never tokenized into `identifier_lines` and must be scanned from
+    /// disk for a complete answer.
+    pub covered: HashSet<FileId>,
+    /// `(file, name, lines)` for each requested name with at least one
+    /// occurrence in a covered file; one 1-based line per occurrence, in
+    /// ascending order.
+    pub occurrences: Vec<(FileId, String, Vec<u32>)>,
+}
+
+/// Encode non-decreasing line numbers as LEB128 varints of successive deltas.
+pub(crate) fn encode_lines(lines: &[u32]) -> Vec<u8> {
+    let mut out = Vec::with_capacity(lines.len());
+    let mut prev = 0u32;
+    for &line in lines {
+        let mut delta = line.wrapping_sub(prev);
+        prev = line;
+        loop {
+            let byte = delta.to_le_bytes()[0] & 0x7f;
+            delta >>= 7;
+            if delta == 0 {
+                out.push(byte);
+                break;
+            }
+            out.push(byte | 0x80);
+        }
+    }
+    out
+}
+
+/// Inverse of [`encode_lines`]. A truncated trailing varint is dropped.
+pub(crate) fn decode_lines(bytes: &[u8]) -> Vec<u32> {
+    let mut out = Vec::new();
+    let mut prev = 0u32;
+    let mut delta = 0u32;
+    let mut shift = 0u32;
+    for &byte in bytes {
+        delta |= u32::from(byte & 0x7f).checked_shl(shift).unwrap_or(0);
+        if byte & 0x80 == 0 {
+            prev = prev.wrapping_add(delta);
+            out.push(prev);
+            delta = 0;
+            shift = 0;
+        } else {
+            shift += 7;
+        }
+    }
+    out
+}
+
+impl Index {
+    /// Stored occurrences of `names` across the indexed corpus, plus the
+    /// set of files the answer is complete for. Point lookups on the
+    /// `(name, file_id)` primary key; no file I/O.
+    pub(crate) fn identifier_occurrences(&self, names: &[&str]) -> Result<StoredOccurrences> {
+        let conn = self.connection()?;
+
+        let mut stmt =
+            conn.prepare_cached("SELECT file_id FROM identifier_lines WHERE name = ?1")?;
+        let covered = stmt
+            .query_map([COVERAGE_SENTINEL], |row| {
+                row.get::<_, i64>(0).map(FileId::from)
+            })?
+            .collect::<std::result::Result<HashSet<_>, _>>()?;
+
+        let mut names: Vec<&str> = names
+            .iter()
+            .copied()
+            .filter(|n| *n != COVERAGE_SENTINEL)
+            .collect();
+        names.sort_unstable();
+        names.dedup();
+
+        let mut occurrences = Vec::new();
+        for chunk in names.chunks(500) {
+            let placeholders = vec!["?"; chunk.len()].join(",");
+            let mut stmt = conn.prepare(&format!(
+                "SELECT file_id, name, lines FROM identifier_lines WHERE name IN ({placeholders})"
+            ))?;
+            let rows = stmt.query_map(params_from_iter(chunk), |row| {
+                Ok((
+                    FileId::from(row.get::<_, i64>(0)?),
+                    row.get::<_, String>(1)?,
+                    decode_lines(&row.get::<_, Vec<u8>>(2)?),
+                ))
+            })?;
+            for row in rows {
+                occurrences.push(row?);
+            }
+        }
+
+        trace!(
+            names = names.len(),
+            covered_files = covered.len(),
+            occurrences = occurrences.len(),
+            "Loaded stored identifier occurrences"
+        );
+        Ok(StoredOccurrences {
+            covered,
+            occurrences,
+        })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn line_codec_round_trips() {
+        for lines in [
+            vec![],
+            vec![1],
+            vec![1, 2, 3, 127, 128, 129, 16_384, 2_000_000],
+            vec![4, 4, 4, 9],
+            vec![u32::MAX],
+        ] {
+            assert_eq!(decode_lines(&encode_lines(&lines)), lines);
+        }
+        assert_eq!(
+            encode_lines(&[1, 2, 3]).len(),
+            3,
+            "adjacent lines cost one byte"
+        );
+    }
+
+    #[test]
+    fn occurrences_are_stored_replaced_and_coverage_marked() {
+        use std::path::Path;
+
+        use crate::identifiers::extract_identifier_lines;
+        use crate::types::Language;
+
+        let dir = tempfile::tempdir().expect("tempdir");
+        let mut index = Index::open(&dir.path().join("i.db")).expect("open");
+        let write = |index: &mut Index, path: &str, content: Option<&str>| {
+            let identifiers = content.map(extract_identifier_lines);
+            index
+                .index_parsed_file_atomic(
+                    Path::new(path),
+                    Language::Rust,
+                    0,
+                    0,
+                    None,
+                    &[],
+                    &[],
+                    &[],
+                    identifiers.as_deref(),
+                )
+                .expect("write")
+        };
+
+        let (a, _, _) = write(&mut index, "src/a.rs", Some("fn helper() {}\nhelper();\n"));
+        let (b, _, _) = write(&mut index, "src/b.rs", None);
+
+        let stored = index.identifier_occurrences(&["helper"]).expect("query");
+        assert_eq!(stored.covered, HashSet::from([a]));
+        assert_eq!(stored.occurrences, [(a, "helper".to_string(), vec![1, 2])]);
+        assert!(
+            !stored.covered.contains(&b),
+            "None leaves the file uncovered"
+        );
+
+        // Re-indexing replaces the file's rows rather than appending.
+        write(&mut index, "src/a.rs", Some("fn other() {}\n"));
+        let stored = index
+            .identifier_occurrences(&["helper", "other"])
+            .expect("query");
+        assert_eq!(stored.occurrences, [(a, "other".to_string(), vec![1])]);
+    }
+}
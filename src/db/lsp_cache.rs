@@ -0,0 +1,354 @@
+//! Persistent Pass 3 (LSP) resolution cache.
+//!
+//! Every `tethys index --lsp` re-inserts refs with fresh row ids, so Pass 3
+//! answers are cached by what they depend on instead: the referencing
+//! file's content hash and the reference position, under a per-language
+//! fingerprint of the build manifests and server (see
+//! [`crate::Tethys::resolve_via_lsp`]). An answer pointing into the
+//! workspace also records the target file's hash and is reused only while
+//! that file is unchanged — the symbol on the target line is looked up
+//! afresh, since symbol ids do not survive re-indexing either. An answer
+//! finding no definition in the workspace depends on every file of the
+//! language (one may gain the definition, or one broken when the server
+//! answered may be fixed), so it records their fingerprint (see
+//! [`Index::lsp_sources_fingerprint`]) and is reused only while no file of
+//! the language was added, removed or edited.
+//!
+//! Rows are pruned when their fingerprint is superseded or no indexed file
+//! has their content hash any more, so the table tracks the workspace
+//! rather than growing with its history.
+
+use std::collections::HashMap;
+use std::path::PathBuf;
+
+use rusqlite::params;
+use tracing::trace;
+
+use super::Index;
+use super::files::normalize_path;
+use crate::content_hash::ContentHasher;
+use crate::error::Result;
+use crate::types::{FileId, Language};
+
+/// One reference position, identified independently of row ids.
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash)]
+pub(crate) struct LspCacheKey {
+    /// Content hash of the referencing file.
+    pub file_hash: u64,
+    /// 1-based line of the reference.
+    pub line: u32,
+    /// 1-based column of the reference.
+    pub column: u32,
+}
+
+/// A cached `goto_definition` answer.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub(crate) enum CachedLspAnswer {
+    /// No definition inside the workspace (none at all, or external).
+    Outside,
+    /// A definition on 1-based `line` of workspace file `path`, which had
+    /// content hash `hash` when the server answered.
+    At {
+        /// Workspace-relative path of the definition's file.
+        path: PathBuf,
+        /// 1-based line of the definition.
+        line: u32,
+        /// Content hash of `path` at answer time.
+        hash: u64,
+    },
+}
+
+/// Reinterpret a `u64` hash as the `i64` `SQLite` stores.
+#[expect(
+    clippy::cast_possible_wrap,
+    reason = "u64 bit-pattern stored as i64 for SQLite; round-trips via hash_from_sql"
+)]
+fn hash_to_sql(hash: u64) -> i64 {
+    hash as i64
+}
+
+/// Inverse of [`hash_to_sql`].
+#[expect(
+    clippy::cast_sign_loss,
+    reason = "i64 from SQLite is a bit-pattern round-trip of u64"
+)]
+fn hash_from_sql(stored: i64) -> u64 {
+    stored as u64
+}
+
+impl Index {
+    /// Id and content hash of every indexed file that has a hash, by
+    /// workspace-relative path.
+    pub(crate) fn file_content_hashes(&self) -> Result<HashMap<PathBuf, (FileId, u64)>> {
+        let conn = self.connection()?;
+        let mut stmt = conn
+            .prepare("SELECT path, id, content_hash FROM files WHERE content_hash IS NOT NULL")?;
+        let rows = stmt.query_map([], |row| {
+            Ok((
+                PathBuf::from(row.get::<_, String>(0)?),
+                (
+                    FileId::from(row.get::<_, i64>(1)?),
+                    hash_from_sql(row.get(2)?),
+                ),
+            ))
+        })?;
+        Ok(rows.collect::<std::result::Result<HashMap<_, _>, _>>()?)
+    }
+
+    /// Fingerprint of the path and content hash of every indexed file of
+    /// `language`, which a [`CachedLspAnswer::Outside`] answer depends on.
+    pub(crate) fn lsp_sources_fingerprint(&self, language: Language) -> Result<u64> {
+        let conn = self.connection()?;
+        let mut stmt =
+            conn.prepare("SELECT path, content_hash FROM files WHERE language = ?1 ORDER BY path")?;
+        let mut rows = stmt.query([language.as_str()])?;
+        let mut hasher = ContentHasher::default();
+        while let Some(row) = rows.next()? {
+            let path: String = row.get(0)?;
+            let hash: Option<i64> = row.get(1)?;
+            hasher.field(path.as_bytes());
+            hasher.field(&hash.unwrap_or_default().to_le_bytes());
+        }
+        Ok(hasher.finish())
+    }
+
+    /// Every cached answer for `language` recorded under `fingerprint`,
+    /// with [`CachedLspAnswer::Outside`] answers only where they were
+    /// recorded under `sources` (see [`Self::lsp_sources_fingerprint`]).
+    pub(crate) fn lsp_cache_entries(
+        &self,
+        language: Language,
+        fingerprint: u64,
+        sources: u64,
+    ) -> Result<HashMap<LspCacheKey, CachedLspAnswer>> {
+        let conn = self.connection()?;
+        let mut stmt = conn.prepare(
+            "SELECT file_hash, line, column, target_path, target_line, target_hash
+             FROM lsp_resolution_cache
+             WHERE language = ?1 AND deps_fingerprint = ?2
+               AND (target_path IS NOT NULL OR target_hash = ?3)",
+        )?;
+        let rows = stmt.query_map(
+            params![
+                language.as_str(),
+                hash_to_sql(fingerprint),
+                hash_to_sql(sources)
+            ],
+            |row| {
+                let key = LspCacheKey {
+                    file_hash: hash_from_sql(row.get(0)?),
+                    line: row.get(1)?,
+                    column: row.get(2)?,
+                };
+                let target: (Option<String>, Option<u32>, Option<i64>) =
+                    (row.get(3)?, row.get(4)?, row.get(5)?);
+                let answer = match target {
+                    (Some(path), Some(line), Some(hash)) => CachedLspAnswer::At {
+                        path: PathBuf::from(path),
+                        line,
+                        hash: hash_from_sql(hash),
+                    },
+                    _ => CachedLspAnswer::Outside,
+                };
+                Ok((key, answer))
+            },
+        )?;
+        let entries = rows.collect::<std::result::Result<HashMap<_, _>, _>>()?;
+        trace!(
+            language = language.as_str(),
+            entries = entries.len(),
+            "Loaded LSP resolution cache"
+        );
+        Ok(entries)
+    }
+
+    /// Record `answers` for `language` under `fingerprint`, and its
+    /// [`CachedLspAnswer::Outside`] answers under `sources`, in one
+    /// transaction, then prune rows that can no longer be reused: the
+    /// language's rows under any other fingerprint, and rows whose
+    /// referencing file hash no indexed file has. Returns the number of
+    /// rows pruned.
+    pub(crate) fn store_lsp_cache(
+        &self,
+        language: Language,
+        fingerprint: u64,
+        sources: u64,
+        answers: &[(LspCacheKey, CachedLspAnswer)],
+    ) -> Result<usize> {
+        let mut conn = self.connection()?;
+        let tx = conn.transaction()?;
+        {
+            let mut stmt = tx.prepare_cached(
+                "INSERT OR REPLACE INTO lsp_resolution_cache
+                 (language, file_hash, line, column, deps_fingerprint,
+                  target_path, target_line, target_hash)
+                 VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8)",
+            )?;
+            for (key, answer) in answers {
+                let (path, line, hash) = match answer {
+                    CachedLspAnswer::Outside => (None, None, Some(hash_to_sql(sources))),
+                    CachedLspAnswer::At { path, line, hash } => (
+                        Some(normalize_path(path)),
+                        Some(*line),
+                        Some(hash_to_sql(*hash)),
+                    ),
+                };
+                stmt.execute(params![
+                    language.as_str(),
+                    hash_to_sql(key.file_hash),
+                    key.line,
+                    key.column,
+                    hash_to_sql(fingerprint),
+                    path,
+                    line,
+                    hash,
+                ])?;
+            }
+        }
+        let mut pruned = tx.execute(
+            "DELETE FROM lsp_resolution_cache WHERE language = ?1 AND deps_fingerprint != ?2",
+            params![language.as_str(), hash_to_sql(fingerprint)],
+        )?;
+        pruned += tx.execute(
+            "DELETE FROM lsp_resolution_cache
+             WHERE language = ?1
+               AND file_hash NOT IN
+                   (SELECT content_hash FROM files WHERE content_hash IS NOT NULL)",
+            [language.as_str()],
+        )?;
+        tx.commit()?;
+
+        trace!(
+            language = language.as_str(),
+            stored = answers.len(),
+            pruned,
+            "Stored LSP resolution cache"
+        );
+        Ok(pruned)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::path::Path;
+
+    use super::*;
+
+    fn write_file(index: &mut Index, path: &str, hash: u64) -> FileId {
+        let (file_id, _, _) = index
+            .index_parsed_file_atomic(
+                Path::new(path),
+                Language::Rust,
+                0,
+                0,
+                Some(hash),
+                &[],
+                &[],
+                &[],
+                None,
+            )
+            .expect("write file");
+        file_id
+    }
+
+    #[test]
+    fn answers_round_trip_under_their_fingerprint_and_stale_rows_are_pruned() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let mut index = Index::open(&dir.path().join("c.db")).expect("open");
+        let a = write_file(&mut index, "src/a.rs", u64::MAX);
+        write_file(&mut index, "src/b.rs", 7);
+
+        let hashes = index.file_content_hashes().expect("hashes");
+        assert_eq!(hashes[Path::new("src/a.rs")], (a, u64::MAX));
+
+        let key = |file_hash, line| LspCacheKey {
+            file_hash,
+            line,
+            column: 5,
+        };
+        let target = CachedLspAnswer::At {
+            path: PathBuf::from("src/b.rs"),
+            line: 3,
+            hash: 7,
+        };
+        let answers = [
+            (key(u64::MAX, 1), target.clone()),
+            (key(u64::MAX, 2), CachedLspAnswer::Outside),
+            (key(99, 1), CachedLspAnswer::Outside),
+        ];
+        let pruned = index
+            .store_lsp_cache(Language::Rust, 42, 1, &answers)
+            .expect("store");
+        assert_eq!(pruned, 1, "hash 99 belongs to no indexed file");
+
+        let entries = index
+            .lsp_cache_entries(Language::Rust, 42, 1)
+            .expect("load");
+        assert_eq!(entries.len(), 2);
+        assert_eq!(entries[&key(u64::MAX, 1)], target);
+        assert_eq!(entries[&key(u64::MAX, 2)], CachedLspAnswer::Outside);
+        assert!(
+            index
+                .lsp_cache_entries(Language::CSharp, 42, 1)
+                .expect("other language")
+                .is_empty()
+        );
+
+        // A new fingerprint supersedes the language's old rows.
+        let pruned = index
+            .store_lsp_cache(Language::Rust, 43, 1, &[])
+            .expect("store");
+        assert_eq!(pruned, 2);
+        assert!(
+            index
+                .lsp_cache_entries(Language::Rust, 42, 1)
+                .expect("old fingerprint")
+                .is_empty()
+        );
+    }
+
+    #[test]
+    fn no_definition_answers_expire_when_another_file_changes() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let mut index = Index::open(&dir.path().join("c.db")).expect("open");
+        write_file(&mut index, "src/caller.rs", 11);
+        let key = LspCacheKey {
+            file_hash: 11,
+            line: 2,
+            column: 5,
+        };
+        let before = index
+            .lsp_sources_fingerprint(Language::Rust)
+            .expect("sources");
+        index
+            .store_lsp_cache(
+                Language::Rust,
+                42,
+                before,
+                &[(key, CachedLspAnswer::Outside)],
+            )
+            .expect("store");
+        assert_eq!(
+            index
+                .lsp_cache_entries(Language::Rust, 42, before)
+                .expect("load")
+                .get(&key),
+            Some(&CachedLspAnswer::Outside)
+        );
+
+        // The definition appears in another file; caller.rs is unchanged.
+        write_file(&mut index, "src/defs.rs", 12);
+        let after = index
+            .lsp_sources_fingerprint(Language::Rust)
+            .expect("sources");
+
+        assert_ne!(after, before);
+        assert!(
+            index
+                .lsp_cache_entries(Language::Rust, 42, after)
+                .expect("load")
+                .is_empty(),
+            "the caller's ref must be asked again"
+        );
+    }
+}
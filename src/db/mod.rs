@@ -10,18 +10,30 @@
 //! - `helpers` - Row conversion and parsing utilities
 //! - `files` - File CRUD operations
 //! - `symbols` - Symbol CRUD operations
+//! - `identifiers` - Identifier-occurrence storage (textual mentions)
 //! - `references` - Reference CRUD operations
 //! - `imports` - Import CRUD operations
 //! - `call_edges` - Call edge bulk operations
+//! - `changes` - Index generations and the change feed
 //! - `file_deps` - File dependency CRUD operations
 //! - `panic_points` - Panic point CRUD operations
 //! - `deprecated` - Deprecated-callers analysis queries
 //! - `visibility` - Visibility-tightening analysis queries
+//! - `test_reach` - Persisted, incrementally maintained test reachability
+//! - `type_closure` - Persisted, incrementally maintained type-hierarchy closure
 //! - `graph` - Concrete `Index` graph traversal queries
+//! - `affected` - Reverse reference closure for symbol-granular affected tests
+//! - `unused_imports` - Stored file-local facts for unused-import analysis
+//! - `lsp_cache` - Persistent Pass 3 (LSP) resolution cache
+//! - `crate_cache` - Persistent crate discovery
+//! - `snapshot` - Portable, compressed index snapshots for export/import
 //! - `architecture` - Architecture analysis (packages, coupling metrics)
 
+mod affected;
 mod architecture;
 mod call_edges;
+mod changes;
+mod crate_cache;
 pub(crate) mod dead_code;
 mod deprecated;
 mod file_deps;
@@ -29,12 +41,18 @@ mod files;
 mod graph;
 mod helpers;
 mod hierarchy;
+mod identifiers;
 mod imports;
+mod lsp_cache;
 mod panic_points;
 mod references;
 mod schema;
+mod snapshot;
 mod symbols;
+mod test_reach;
+mod type_closure;
 mod untested;
+mod unused_imports;
 mod visibility;
 
 pub use deprecated::{DeprecatedFinding, DeprecatedSymbol, ReferenceSite, Tier, Via};
@@ -48,10 +66,14 @@ pub(crate) use call_edges::ORPHAN_PSEUDO_CRATE_PREFIX;
 pub(crate) use files::normalize_path;
 pub(crate) use graph::DEFAULT_MAX_DEPTH;
 pub(crate) use helpers::{
-    FILES_COLUMNS, REFS_COLUMNS, SYMBOLS_COLUMNS, parse_language, parse_symbol_kind, row_to_import,
-    row_to_indexed_file, row_to_reference, row_to_symbol,
+    FILES_COLUMNS, REFS_COLUMNS, SYMBOLS_COLUMNS, panic_code, parse_language, parse_symbol_kind,
+    reference_kind_code, row_to_import, row_to_indexed_file, row_to_reference, row_to_symbol,
+    strategy_code, symbol_kind_code, visibility_code,
 };
-pub(crate) use schema::SCHEMA;
+pub(crate) use identifiers::StoredOccurrences;
+pub(crate) use lsp_cache::{CachedLspAnswer, LspCacheKey};
+pub(crate) use references::LspRefFacts;
+pub(crate) use schema::{SCHEMA, SCHEMA_VERSION};
 
 // Test-only re-exports: fixture helper for authoring ref rows directly,
 // and the canonical qualified-name builder (production callers reach it
@@ -71,7 +93,7 @@ use std::path::{Path, PathBuf};
 use std::sync::{Mutex, MutexGuard};
 use std::time::{SystemTime, UNIX_EPOCH};
 
-use rusqlite::Connection;
+use rusqlite::{Connection, OpenFlags};
 
 use crate::error::{Error, Result};
 use crate::types::{Span, SymbolKind, Visibility};
@@ -111,6 +133,8 @@ pub struct SymbolData<'a> {
 pub struct Index {
     conn: Mutex<Connection>,
     path: PathBuf,
+    /// Opened with [`Index::open_read_only`]: every write fails.
+    read_only: bool,
 }
 
 impl Index {
@@ -134,35 +158,122 @@ impl Index {
         conn.pragma_update(None, "journal_mode", "WAL")?;
         conn.pragma_update(None, "foreign_keys", "ON")?;
 
+        // 0 is a fresh database or one from before schema versioning, left
+        // to the guards below; any other version but ours is rebuilt.
+        let version = Self::schema_version(&conn)?;
+        if version != 0 && version != SCHEMA_VERSION {
+            return Err(Error::Config(format!(
+                "index schema is version {version}, this tethys uses {SCHEMA_VERSION}; the \
+                 index is a rebuildable cache — run `tethys index --rebuild` (db: {})",
+                path.display()
+            )));
+        }
+
+        // An index written before the trigram search table existed gets the
+        // table from SCHEMA below, but empty; backfill it once from symbols.
+        let had_symbols_fts: bool = conn.query_row(
+            "SELECT EXISTS(SELECT 1 FROM sqlite_master WHERE name = 'symbols_fts')",
+            [],
+            |r| r.get(0),
+        )?;
+
         // Apply schema
         conn.execute_batch(SCHEMA)?;
 
+        if !had_symbols_fts {
+            conn.execute(
+                "INSERT INTO symbols_fts(symbols_fts) VALUES ('rebuild')",
+                [],
+            )?;
+        }
+
         // Schema-currency guard (tethys-9z7i / closes tethys-xvlw AC3):
         // CREATE TABLE IF NOT EXISTS cannot retrofit columns onto an
         // existing table, so a refs table from before the provenance
-        // column would silently break every strategy read. Fires ONLY
-        // when refs survived from an older schema WITHOUT the column —
+        // column (or from before it was stored as a code) would silently
+        // break every strategy read and write. Fires ONLY when refs
+        // survived from an older, unversioned schema WITHOUT the column —
         // a fresh or reset db just received the full schema above. The
         // index is a disposable derived cache, so the remedy is a
         // rebuild, not a migration (approved design decision;
         // .tethys-9z7i/design-slice2.md).
         let has_strategy: i64 = conn.query_row(
-            "SELECT COUNT(*) FROM pragma_table_info('refs') WHERE name = 'strategy'",
+            "SELECT COUNT(*) FROM pragma_table_info('refs') WHERE name = 'strategy_code'",
             [],
             |r| r.get(0),
         )?;
         if has_strategy == 0 {
             return Err(Error::Config(format!(
-                "index schema is outdated (refs.strategy missing); the index is a \
+                "index schema is outdated (refs.strategy_code missing); the index is a \
                  rebuildable cache — run `tethys index --rebuild` (db: {})",
                 path.display()
             )));
         }
 
-        Ok(Self {
+        // Stamp the version only now that the schema is known to be
+        // complete: it is what lets `open_read_only` skip all of the above.
+        if version != SCHEMA_VERSION {
+            conn.pragma_update(None, "user_version", SCHEMA_VERSION)?;
+        }
+
+        Ok(Self::from_connection(conn, path, false))
+    }
+
+    /// Open an existing index read-only, for queries.
+    ///
+    /// Skips everything [`Self::open`] does to create or upgrade the
+    /// database (the directory, pragma writes, schema DDL, backfills and
+    /// guards) after one `user_version` read. Returns `Ok(None)` when
+    /// there is no database at `path` or it is not at [`SCHEMA_VERSION`],
+    /// i.e. when only [`Self::open`] can make it usable.
+    pub fn open_read_only(path: &Path) -> Result<Option<Self>> {
+        if !path.is_file() {
+            return Ok(None);
+        }
+        let conn = Connection::open_with_flags(
+            path,
+            OpenFlags::SQLITE_OPEN_READ_ONLY
+                | OpenFlags::SQLITE_OPEN_URI
+                | OpenFlags::SQLITE_OPEN_NO_MUTEX,
+        )?;
+        conn.busy_timeout(std::time::Duration::from_secs(30))?;
+
+        let version = Self::schema_version(&conn)?;
+        if version != SCHEMA_VERSION {
+            tracing::debug!(
+                path = %path.display(),
+                version,
+                expected = SCHEMA_VERSION,
+                "Index schema not current; read-only open declined"
+            );
+            return Ok(None);
+        }
+        Ok(Some(Self::from_connection(conn, path, true)))
+    }
+
+    fn from_connection(conn: Connection, path: &Path, read_only: bool) -> Self {
+        // Statements run under a cancelled `CancellationToken` are
+        // interrupted (surfacing as `Error::Cancelled`); see `crate::cancel`.
+        conn.progress_handler(
+            crate::cancel::PROGRESS_HANDLER_OPS,
+            Some(crate::cancel::is_cancelled),
+        );
+        Self {
             conn: Mutex::new(conn),
             path: path.to_path_buf(),
-        })
+            read_only,
+        }
+    }
+
+    /// The database's `user_version`: the [`SCHEMA_VERSION`] it was
+    /// stamped with, or 0.
+    fn schema_version(conn: &Connection) -> Result<i32> {
+        Ok(conn.pragma_query_value(None, "user_version", |row| row.get(0))?)
+    }
+
+    /// Whether this index was opened with [`Self::open_read_only`].
+    pub(crate) fn is_read_only(&self) -> bool {
+        self.read_only
     }
 
     /// Acquire the connection lock.
@@ -342,6 +453,12 @@ impl Index {
             conn.query_row("SELECT COUNT(*) FROM file_deps", [], |row| row.get(0))?;
         stats.file_dependency_count = dep_count;
 
+        stats.incomplete = conn.query_row(
+            "SELECT incomplete FROM index_generation WHERE id = 1",
+            [],
+            |row| row.get(0),
+        )?;
+
         Ok(stats)
     }
 
@@ -550,6 +667,36 @@ mod tests {
         assert!(results.is_empty());
     }
 
+    #[test]
+    fn read_only_open_needs_a_stamped_schema() {
+        let (_dir, path) = temp_db();
+        assert!(
+            Index::open_read_only(&path).expect("missing db").is_none(),
+            "no database yet"
+        );
+
+        drop(Index::open(&path).expect("should open database"));
+        let index = Index::open_read_only(&path)
+            .expect("read-only open")
+            .expect("stamped schema is current");
+        assert!(index.is_read_only());
+
+        let conn = index.connection().expect("connection");
+        let write = conn.execute("DELETE FROM files", []);
+        assert!(write.is_err(), "read-only connection accepted a write");
+        drop(conn);
+
+        Connection::open(&path)
+            .expect("raw open")
+            .pragma_update(None, "user_version", 0)
+            .expect("clear user_version");
+        assert!(
+            Index::open_read_only(&path)
+                .expect("unstamped db")
+                .is_none()
+        );
+    }
+
     #[test]
     fn reset_deletes_database_and_recreates_schema() {
         let (_dir, path) = temp_db();
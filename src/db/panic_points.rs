@@ -1,7 +1,10 @@
 //! Panic point query operations for the Tethys index.
 //!
-//! These operations identify potential panic points (`.unwrap()` and `.expect()` calls)
-//! in the codebase by querying the `refs` table for method calls with those names.
+//! These operations identify potential panic points (`.unwrap()` and `.expect()`
+//! calls, and `panic!()`-family macro invocations) in the codebase. Pass 1
+//! classifies each reference as it is stored ([`classify_panic`]) into
+//! `refs.panic_code`, so the queries here read the partial `idx_refs_panic`
+//! index instead of matching names across every reference.
 
 use std::path::PathBuf;
 
@@ -10,29 +13,36 @@ use tracing::{trace, warn};
 
 use super::Index;
 use crate::error::Result;
-use crate::types::{PanicKind, PanicPoint};
-
-/// SQL predicate matching panic-prone reference names. Method-call refs
-/// with a derived receiver stay unresolved as `Type::unwrap` (tethys-53iv),
-/// so the filter matches the bare names AND the `::`-qualified last segment
-/// — a raw `= 'unwrap'` filter re-hides exactly the sites the receiver
-/// gating preserved. `GLOB` (not `LIKE`) keeps the suffix match
-/// case-sensitive, and `r.kind = 'call'` keeps non-call refs (e.g. a C#
-/// `field_access` read of a property named `Unwrap`) out of a panic
-/// analysis about calls. Kept as one fragment so both queries below stay
-/// in lockstep (the `deprecated.rs` `DEPRECATION_ATTR_NAMES_SQL`
-/// precedent).
-const PANIC_NAME_PREDICATE: &str = "(r.reference_name IN ('unwrap', 'expect')
-       OR r.reference_name GLOB '*::unwrap'
-       OR r.reference_name GLOB '*::expect')
-      AND r.kind = 'call'";
+use crate::types::{PanicDensity, PanicKind, PanicPoint, ReferenceKind};
+
+/// The panic kind of an unresolved reference, if it is panic-prone.
+///
+/// Method-call refs with a derived receiver stay unresolved as
+/// `Type::unwrap` (tethys-53iv), and macros may be invoked by path
+/// (`std::panic!`), so names are classified by their last `::` segment; a
+/// raw `== "unwrap"` check would re-hide exactly the sites the receiver
+/// gating preserved. The match is case-sensitive, and only calls qualify
+/// for `unwrap`/`expect` (a C# `field_access` read of a property named
+/// `Unwrap` is not a panic point) and only macro invocations for the
+/// macro kinds. Resolved refs are never classified: they bind a workspace
+/// symbol that merely shares the name, and resolution clears the column
+/// along with `reference_name`.
+pub(super) fn classify_panic(kind: &ReferenceKind, reference_name: &str) -> Option<PanicKind> {
+    let last_segment = reference_name.rsplit("::").next().unwrap_or(reference_name);
+    let panic_kind = PanicKind::parse(last_segment)?;
+    let expected = if panic_kind.is_macro() {
+        ReferenceKind::Macro
+    } else {
+        ReferenceKind::Call
+    };
+    (*kind == expected).then_some(panic_kind)
+}
 
 impl Index {
     /// Get all panic points in the codebase.
     ///
-    /// Panic points are `.unwrap()` and `.expect()` calls that could panic at runtime.
-    /// We identify these by querying the `refs` table for method calls with
-    /// `reference_name` in ('unwrap', 'expect') that have a containing symbol
+    /// Panic points are references classified at Pass 1 (see
+    /// [`classify_panic`]) that have a containing symbol
     /// (`in_symbol_id IS NOT NULL`) which is a function or method.
     ///
     /// References without a containing symbol, or contained within non-callable symbols
@@ -58,19 +68,17 @@ impl Index {
         );
         let conn = self.connection()?;
 
-        let base_query = format!(
+        let mut query = String::from(
             r"
-            SELECT f.path, r.line, r.reference_name, s.name, s.is_test
+            SELECT f.path, r.line, r.panic, s.name, s.is_test
             FROM refs r
             JOIN files f ON r.file_id = f.id
             JOIN symbols s ON r.in_symbol_id = s.id
-            WHERE {PANIC_NAME_PREDICATE}
+            WHERE r.panic_code IS NOT NULL
               AND s.kind IN ('function', 'method')
-        "
+        ",
         );
 
-        let mut query = base_query;
-
         if !include_tests {
             query.push_str(" AND s.is_test = 0");
         }
@@ -95,7 +103,7 @@ impl Index {
         if skipped_count > 0 {
             warn!(
                 skipped_count = skipped_count,
-                "Skipped panic point references with unrecognized names"
+                "Skipped panic point references with unrecognized kinds"
             );
         }
 
@@ -112,16 +120,16 @@ impl Index {
     pub fn count_panic_points(&self) -> Result<(usize, usize)> {
         let conn = self.connection()?;
 
-        let mut stmt = conn.prepare(&format!(
+        let mut stmt = conn.prepare(
             r"
             SELECT s.is_test, COUNT(*)
             FROM refs r
             JOIN symbols s ON r.in_symbol_id = s.id
-            WHERE {PANIC_NAME_PREDICATE}
+            WHERE r.panic_code IS NOT NULL
               AND s.kind IN ('function', 'method')
             GROUP BY s.is_test
-            "
-        ))?;
+            ",
+        )?;
 
         let mut production_count = 0usize;
         let mut test_count = 0usize;
@@ -150,29 +158,68 @@ impl Index {
         Ok((production_count, test_count))
     }
 
+    /// Roll panic points up per file, counted like [`Self::count_panic_points`].
+    ///
+    /// Only files with at least one panic point are listed, ordered by
+    /// production count (descending), then test count (descending), then
+    /// path.
+    pub fn get_panic_density(&self) -> Result<Vec<PanicDensity>> {
+        let conn = self.connection()?;
+
+        let mut stmt = conn.prepare(
+            r"
+            SELECT f.path, f.size_bytes,
+                   SUM(s.is_test = 0) AS production_count,
+                   SUM(s.is_test = 1) AS test_count
+            FROM refs r
+            JOIN symbols s ON r.in_symbol_id = s.id
+            JOIN files f ON r.file_id = f.id
+            WHERE r.panic_code IS NOT NULL
+              AND s.kind IN ('function', 'method')
+            GROUP BY r.file_id
+            ORDER BY production_count DESC, test_count DESC, f.path
+            ",
+        )?;
+
+        let density = stmt
+            .query_map([], |row| {
+                Ok(PanicDensity {
+                    path: PathBuf::from(row.get::<_, String>(0)?),
+                    // Safety: size_bytes stored as i64 in SQLite; bit-pattern round-trips correctly
+                    #[expect(
+                        clippy::cast_sign_loss,
+                        reason = "i64 from SQLite is a bit-pattern round-trip of u64"
+                    )]
+                    size_bytes: row.get::<_, i64>(1)? as u64,
+                    production_count: row.get(2)?,
+                    test_count: row.get(3)?,
+                })
+            })?
+            .collect::<std::result::Result<Vec<_>, _>>()?;
+
+        trace!(files = density.len(), "Rolled up panic points per file");
+
+        Ok(density)
+    }
+
     /// Convert a database row to a `PanicPoint`.
     ///
-    /// Expected columns: `f.path`, `r.line`, `r.reference_name`, `s.name`, `s.is_test`
+    /// Expected columns: `f.path`, `r.line`, `r.panic`, `s.name`, `s.is_test`
     ///
-    /// Returns `Ok(None)` if the `reference_name` is not a recognized panic kind,
-    /// which is logged at warn level by the caller.
+    /// Returns `Ok(None)` if the decoded `panic` column is not a recognized
+    /// panic kind, which is logged at warn level by the caller.
     fn row_to_panic_point(row: &rusqlite::Row) -> rusqlite::Result<Option<PanicPoint>> {
         let path: String = row.get(0)?;
         let line: u32 = row.get(1)?;
-        let reference_name: String = row.get(2)?;
+        let panic: Option<String> = row.get(2)?;
         let containing_symbol: String = row.get(3)?;
         let is_test: bool = row.get(4)?;
 
-        // Qualified names (`Option::unwrap`, tethys-53iv derived receivers)
-        // parse by their last segment; bare names pass through unchanged.
-        let last_segment = reference_name
-            .rsplit("::")
-            .next()
-            .unwrap_or(&reference_name);
-        let Some(kind) = PanicKind::parse(last_segment) else {
-            // This shouldn't happen since SQL filters the same shapes,
-            // but if it does (e.g., database corruption or schema change),
-            // we skip this row. The caller logs aggregated skip counts.
+        let Some(kind) = panic.as_deref().and_then(PanicKind::parse) else {
+            // This shouldn't happen since the generated column decodes every
+            // code Pass 1 writes, but if it does (e.g., database corruption
+            // or a code from a newer schema), we skip this row. The caller
+            // logs aggregated skip counts.
             return Ok(None);
         };
 
@@ -190,7 +237,7 @@ impl Index {
 mod tests {
     use super::*;
     use crate::db::Index;
-    use crate::db::{InsertReferenceParams, InsertSymbolParams};
+    use crate::db::{InsertReferenceParams, InsertSymbolParams, panic_code};
     use crate::types::{Language, SymbolKind, Visibility};
     use tempfile::TempDir;
 
@@ -414,34 +461,86 @@ mod tests {
         }
     }
 
-    /// Verify the SQL query's IN clause stays in sync with `PanicKind::parse()`.
+    /// Verify the generated `panic` column stays in sync with `panic_code()`
+    /// and `PanicKind::parse()`.
     ///
     /// This test catches bugs where someone adds a new `PanicKind` variant but
-    /// forgets to update the SQL query (or vice versa).
+    /// forgets to update the schema's CASE (or vice versa).
     #[test]
-    fn panic_kinds_match_sql_query_filter() {
-        // The SQL query filters for these exact values (from get_panic_points)
-        let sql_values = ["unwrap", "expect"];
-
-        // Verify all SQL values are parseable by PanicKind
-        for value in sql_values {
-            assert!(
-                PanicKind::parse(value).is_some(),
-                "SQL query includes '{value}' but PanicKind::parse doesn't recognize it"
+    fn panic_kinds_match_generated_column() {
+        let (_dir, index) = setup_test_db();
+        let conn = index.connection().expect("connection");
+
+        let all_kinds = [
+            PanicKind::Unwrap,
+            PanicKind::Expect,
+            PanicKind::Panic,
+            PanicKind::Unreachable,
+            PanicKind::Todo,
+            PanicKind::Unimplemented,
+        ];
+        for kind in all_kinds {
+            conn.execute("UPDATE refs SET panic_code = ?1", [panic_code(kind)])
+                .expect("set panic_code");
+            let decoded: Option<String> = conn
+                .query_row("SELECT panic FROM refs LIMIT 1", [], |row| row.get(0))
+                .expect("read panic");
+            assert_eq!(
+                decoded.as_deref().and_then(PanicKind::parse),
+                Some(kind),
+                "PanicKind::{kind:?} does not round-trip through refs.panic"
             );
         }
+    }
 
-        // Verify all PanicKind variants are in SQL
-        let all_kinds = [PanicKind::Unwrap, PanicKind::Expect];
-        for kind in all_kinds {
-            assert!(
-                sql_values.contains(&kind.as_str()),
-                "PanicKind::{kind:?} (as_str='{}') not in SQL WHERE IN clause",
-                kind.as_str()
-            );
+    /// Macro invocations classify by their macro name, calls by the method
+    /// name, and neither shape borrows the other's kinds.
+    #[test]
+    fn classify_panic_separates_calls_and_macros() {
+        let cases = [
+            (ReferenceKind::Call, "unwrap", Some(PanicKind::Unwrap)),
+            (
+                ReferenceKind::Call,
+                "Option::expect",
+                Some(PanicKind::Expect),
+            ),
+            (ReferenceKind::Macro, "panic", Some(PanicKind::Panic)),
+            (
+                ReferenceKind::Macro,
+                "std::unreachable",
+                Some(PanicKind::Unreachable),
+            ),
+            (ReferenceKind::Macro, "todo", Some(PanicKind::Todo)),
+            (
+                ReferenceKind::Macro,
+                "core::unimplemented",
+                Some(PanicKind::Unimplemented),
+            ),
+            // a fn named like a macro, a macro named like a method
+            (ReferenceKind::Call, "panic", None),
+            (ReferenceKind::Macro, "unwrap", None),
+            (ReferenceKind::Macro, "assert", None),
+            (ReferenceKind::FieldAccess, "unwrap", None),
+            (ReferenceKind::Call, "X::Unwrap", None),
+        ];
+        for (kind, name, expected) in cases {
+            assert_eq!(classify_panic(&kind, name), expected, "{kind:?} {name}");
         }
     }
 
+    #[test]
+    fn get_panic_density_rolls_up_per_file() {
+        let (_dir, index) = setup_test_db();
+
+        let density = index.get_panic_density().expect("should get density");
+
+        assert_eq!(density.len(), 1, "one file holds panic points");
+        assert_eq!(density[0].path, PathBuf::from("src/lib.rs"));
+        assert_eq!(density[0].production_count, 2);
+        assert_eq!(density[0].test_count, 1);
+        assert_eq!(density[0].size_bytes, 1000);
+    }
+
     /// tethys-53iv D4 fence: qualified `reference_name`s (`Option::unwrap`,
     /// `a::b::expect` — the shapes derived-receiver declines produce) must
     /// report as panic points; decoys that merely CONTAIN the words
@@ -3,21 +3,36 @@
 //! These operations support symbol-level "who calls X?" queries.
 //! See graph module for higher-level graph traversal using these primitives.
 
+use std::collections::HashMap;
 use std::path::PathBuf;
 
-use rusqlite::params;
+use rusqlite::{params, params_from_iter};
 use tracing::trace;
 
-use super::{Index, REFS_COLUMNS, row_to_reference};
+use super::identifiers::COVERAGE_SENTINEL;
+use super::{Index, REFS_COLUMNS, row_to_reference, strategy_code};
 use crate::error::Result;
 use crate::types::{FileId, RefId, Reference, ResolutionStrategy, SymbolId};
 
-/// Single source of truth for the "resolve a reference" UPDATE, shared by the
-/// batched Pass 2 path ([`Index::apply_resolutions`]) and the single-row
-/// Pass 3/LSP path ([`Index::resolve_reference`]) so a future change to how a
-/// resolution is recorded cannot silently diverge between the two.
-const RESOLVE_REFERENCE_SQL: &str =
-    "UPDATE refs SET symbol_id = ?2, reference_name = NULL, strategy = ?3 WHERE id = ?1";
+/// The "resolve a reference" UPDATE behind [`Index::apply_resolutions`],
+/// which both Pass 2 and Pass 3 (LSP) record their resolutions through, so
+/// a change to how a resolution is recorded cannot diverge between them.
+/// A resolved ref binds a workspace symbol, so it stops being a panic
+/// point along with losing its name.
+const RESOLVE_REFERENCE_SQL: &str = "UPDATE refs SET symbol_id = ?2, reference_name = NULL, \
+     panic_code = NULL, strategy_code = ?3 WHERE id = ?1";
+
+/// What Pass 3 ranks an unresolved reference by under a time budget
+/// (see [`Index::lsp_priority_facts`]).
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub(crate) struct LspRefFacts {
+    /// The reference is a call.
+    pub is_call: bool,
+    /// The reference sits inside a test symbol.
+    pub in_test: bool,
+    /// Workspace symbols named like the reference's last `::` segment.
+    pub candidates: usize,
+}
 
 /// Parameters for inserting a reference into the index.
 ///
@@ -65,19 +80,27 @@ impl Index {
             "unresolved reference (symbol_id is None) must have a reference_name for Pass 2"
         );
         let conn = self.connection()?;
+        let kind = crate::types::ReferenceKind::parse_or_unknown(params.kind);
+        // Classified like Pass 1 does, so fixtures surface as panic points.
+        let panic = params
+            .reference_name
+            .filter(|_| params.symbol_id.is_none())
+            .and_then(|name| super::panic_points::classify_panic(&kind, name));
 
         conn.execute(
-            "INSERT INTO refs (symbol_id, file_id, kind, line, column, in_symbol_id, reference_name, strategy)
-             VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8)",
+            "INSERT INTO refs (symbol_id, file_id, kind_code, line, column, in_symbol_id,
+             reference_name, strategy_code, panic_code)
+             VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9)",
             params![
                 params.symbol_id.map(SymbolId::as_i64),
                 params.file_id.as_i64(),
-                params.kind,
+                super::reference_kind_code(&kind),
                 params.line,
                 params.column,
                 params.in_symbol_id.map(SymbolId::as_i64),
                 params.reference_name,
-                params.strategy.map(ResolutionStrategy::as_str)
+                params.strategy.map(strategy_code),
+                panic.map(super::panic_code)
             ],
         )?;
         Ok(conn.last_insert_rowid())
@@ -171,7 +194,63 @@ impl Index {
         Ok(refs)
     }
 
-    /// Apply a batch of Pass 2 resolutions in ONE transaction.
+    /// Ranking facts for every reference
+    /// [`Self::get_unresolved_references_for_lsp`] returns, by ref id.
+    pub(crate) fn lsp_priority_facts(&self) -> Result<HashMap<RefId, LspRefFacts>> {
+        let conn = self.connection()?;
+        let mut stmt = conn.prepare(
+            "SELECT r.id, r.kind_code = 2, COALESCE(s.is_test, 0), r.reference_name
+             FROM refs r
+             LEFT JOIN symbols s ON s.id = r.in_symbol_id
+             WHERE r.symbol_id IS NULL AND r.reference_name IS NOT NULL",
+        )?;
+        let rows = stmt
+            .query_map([], |row| {
+                Ok((
+                    RefId::from(row.get::<_, i64>(0)?),
+                    row.get::<_, bool>(1)?,
+                    row.get::<_, bool>(2)?,
+                    row.get::<_, String>(3)?,
+                ))
+            })?
+            .collect::<std::result::Result<Vec<_>, _>>()?;
+
+        let mut names: Vec<&str> = rows
+            .iter()
+            .map(|(_, _, _, name)| name.rsplit("::").next().unwrap_or(name))
+            .collect();
+        names.sort_unstable();
+        names.dedup();
+        let mut candidates: HashMap<String, usize> = HashMap::new();
+        for chunk in names.chunks(500) {
+            let placeholders = vec!["?"; chunk.len()].join(",");
+            let mut stmt = conn.prepare(&format!(
+                "SELECT name, COUNT(*) FROM symbols WHERE name IN ({placeholders}) GROUP BY name"
+            ))?;
+            let counts = stmt.query_map(params_from_iter(chunk), |row| {
+                Ok((row.get::<_, String>(0)?, row.get::<_, usize>(1)?))
+            })?;
+            for count in counts {
+                let (name, count) = count?;
+                candidates.insert(name, count);
+            }
+        }
+
+        Ok(rows
+            .into_iter()
+            .map(|(ref_id, is_call, in_test, name)| {
+                let last = name.rsplit("::").next().unwrap_or(&name);
+                let facts = LspRefFacts {
+                    is_call,
+                    in_test,
+                    candidates: candidates.get(last).copied().unwrap_or(0),
+                };
+                (ref_id, facts)
+            })
+            .collect())
+    }
+
+    /// Apply a batch of Pass 2 or Pass 3 resolutions in ONE transaction.
     ///
     /// Each pair is `(ref row id, resolved symbol id)`. Replaces the
     /// per-resolution autocommit UPDATE pattern (idxperf claim C7): on a
@@ -191,44 +270,77 @@ impl Index {
         }
         trace!(
             resolution_count = resolutions.len(),
-            "Applying Pass 2 resolutions in one transaction"
+            "Applying resolutions in one transaction"
         );
         let mut conn = self.connection()?;
         let tx = conn.transaction()?;
         {
             let mut stmt = tx.prepare_cached(RESOLVE_REFERENCE_SQL)?;
             for (ref_id, symbol_id, strategy) in resolutions {
-                stmt.execute(params![ref_id, symbol_id.as_i64(), strategy.as_str()])?;
+                stmt.execute(params![ref_id, symbol_id.as_i64(), strategy_code(strategy)])?;
             }
         }
         tx.commit()?;
         Ok(())
     }
 
-    /// Resolve a reference by setting its `symbol_id`.
-    ///
-    /// This is used in Pass 3 (LSP) to link unresolved references to their
-    /// target symbols one at a time as the language server answers; Pass 2
-    /// uses the batched [`Self::apply_resolutions`] instead.
-    pub fn resolve_reference(
-        &self,
-        ref_id: i64,
-        symbol_id: SymbolId,
-        strategy: ResolutionStrategy,
-    ) -> Result<()> {
-        trace!(
-            ref_id = ref_id,
-            symbol_id = %symbol_id,
-            strategy = strategy.as_str(),
-            "Resolving reference"
-        );
+    /// Paths of the files, other than those in `paths`, holding references
+    /// resolved to a symbol defined in one of `paths`: the references a
+    /// re-index or deletion of those files removes along with their
+    /// symbols.
+    pub(crate) fn files_referencing(&self, paths: &[PathBuf]) -> Result<Vec<PathBuf>> {
+        if paths.is_empty() {
+            return Ok(Vec::new());
+        }
         let conn = self.connection()?;
+        let placeholders = vec!["?"; paths.len()].join(",");
+        let mut stmt = conn.prepare(&format!(
+            "WITH targets(id) AS (SELECT id FROM files WHERE path IN ({placeholders}))
+             SELECT DISTINCT f.path
+             FROM symbols s
+             JOIN refs r ON r.symbol_id = s.id
+             JOIN files f ON f.id = r.file_id
+             WHERE s.file_id IN (SELECT id FROM targets)
+               AND r.file_id NOT IN (SELECT id FROM targets)
+             ORDER BY f.path"
+        ))?;
+        let files = stmt
+            .query_map(
+                params_from_iter(paths.iter().map(|p| super::normalize_path(p))),
+                |row| row.get::<_, String>(0).map(PathBuf::from),
+            )?
+            .collect::<rusqlite::Result<Vec<_>>>()?;
+        Ok(files)
+    }
 
-        conn.execute(
-            RESOLVE_REFERENCE_SQL,
-            params![ref_id, symbol_id.as_i64(), strategy.as_str()],
+    /// Paths of the files whose references, as extracted, use one of
+    /// `names` (see the `referenced_names` table), and of every file whose
+    /// reference names were not stored, which may use any of them.
+    pub(crate) fn files_naming(&self, names: &[String]) -> Result<Vec<PathBuf>> {
+        if names.is_empty() {
+            return Ok(Vec::new());
+        }
+        let conn = self.connection()?;
+        let mut paths: Vec<String> = conn
+            .prepare(
+                "SELECT f.path FROM files f
+                 WHERE NOT EXISTS (SELECT 1 FROM referenced_names n
+                                   WHERE n.name = ?1 AND n.file_id = f.id)",
+            )?
+            .query_map([COVERAGE_SENTINEL], |row| row.get(0))?
+            .collect::<rusqlite::Result<_>>()?;
+        let mut stmt = conn.prepare_cached(
+            "SELECT f.path FROM referenced_names n JOIN files f ON f.id = n.file_id
+             WHERE n.name = ?1",
         )?;
-        Ok(())
+        for name in names {
+            for path in stmt.query_map([name], |row| row.get(0))? {
+                paths.push(path?);
+            }
+        }
+        paths.sort_unstable();
+        paths.dedup();
+        Ok(paths.into_iter().map(PathBuf::from).collect())
     }
 
     /// Get all references to a symbol.
@@ -316,10 +428,10 @@ mod apply_resolutions_tests {
         (ref_ids, sym_id)
     }
 
-    /// tethys-9z7i B6 (design C6): the single-row LSP path stamps `lsp`
-    /// through the SAME widened SQL as the batch — the readback checks
-    /// strategy AND the seam's existing `reference_name` null-out, so a
-    /// forked single-row statement missing either fails.
+    /// tethys-9z7i B6 (design C6): an LSP resolution stamps `lsp` through
+    /// the SAME widened SQL as Pass 2 — the readback checks strategy AND the
+    /// seam's existing `reference_name` null-out, so a forked statement
+    /// missing either fails.
     #[test]
     fn lsp_path_stamps_strategy() {
         let dir = tempfile::tempdir().expect("tempdir");
@@ -327,7 +439,7 @@ mod apply_resolutions_tests {
         let (ref_ids, sym_id) = fixture(&mut index);
 
         index
-            .resolve_reference(ref_ids[0], sym_id, ResolutionStrategy::Lsp)
+            .apply_resolutions(&[(ref_ids[0], sym_id, ResolutionStrategy::Lsp)])
             .expect("resolve via lsp");
 
         let conn = index.connection().expect("conn");
@@ -343,6 +455,66 @@ mod apply_resolutions_tests {
         assert!(name_nulled, "the seam still nulls reference_name");
     }
 
+    #[test]
+    fn lsp_priority_facts_rank_inputs() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let mut index = Index::open(&dir.path().join("idx.db")).expect("open");
+        let (ref_ids, sym_id) = fixture(&mut index);
+        let file_id = index
+            .get_symbol_by_id(sym_id)
+            .expect("lookup")
+            .expect("symbol")
+            .file_id;
+        let test_fn = index
+            .insert_symbol(&InsertSymbolParams {
+                file_id,
+                name: "it_works",
+                module_path: "",
+                qualified_name: "it_works",
+                kind: SymbolKind::Function,
+                line: 20,
+                column: 1,
+                span: None,
+                signature: None,
+                visibility: Visibility::Private,
+                parent_symbol_id: None,
+                is_test: true,
+            })
+            .expect("test symbol");
+        let in_test = index
+            .insert_reference(&InsertReferenceParams {
+                symbol_id: None,
+                file_id,
+                kind: "type",
+                line: 21,
+                column: 5,
+                in_symbol_id: Some(test_fn),
+                reference_name: Some("Wrapper::target"),
+                strategy: None,
+            })
+            .expect("ref");
+
+        let facts = index.lsp_priority_facts().expect("facts");
+        assert_eq!(facts.len(), 3);
+        assert_eq!(
+            facts[&RefId::from(ref_ids[0])],
+            LspRefFacts {
+                is_call: true,
+                in_test: false,
+                candidates: 1,
+            }
+        );
+        assert_eq!(
+            facts[&RefId::from(in_test)],
+            LspRefFacts {
+                is_call: false,
+                in_test: true,
+                candidates: 1,
+            },
+            "candidates count the last path segment"
+        );
+    }
+
     /// C7 fence: the whole batch applies in EXACTLY one transaction, every
     /// pair lands, and `reference_name` is cleared. A buggy implementation
     /// that falls back to per-resolution autocommit fails the commit count;
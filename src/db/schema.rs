@@ -1,5 +1,11 @@
 //! Database schema definition for Tethys.
 
+/// Version of [`SCHEMA`], stored in the database's `user_version` once it is
+/// applied. Bump it with every change to `SCHEMA`: a database at another
+/// version is rebuilt rather than migrated, and only a database at this
+/// version can be opened read-only (see `Index::open_read_only`).
+pub(crate) const SCHEMA_VERSION: i32 = 9;
+
 /// Database schema definition.
 pub(crate) const SCHEMA: &str = r"
 -- Indexed source files
@@ -13,59 +19,157 @@ CREATE TABLE IF NOT EXISTS files (
     indexed_at INTEGER NOT NULL
 );
 
-CREATE INDEX IF NOT EXISTS idx_files_path ON files(path);
 CREATE INDEX IF NOT EXISTS idx_files_language ON files(language);
 
 -- Symbol definitions
+-- Closed enums are stored as small integer codes (db/helpers.rs writes
+-- them); kind and visibility are VIRTUAL generated columns decoding them
+-- back to the wire strings, so readers and ad-hoc SQL keep using text
+-- while rows carry one or two bytes instead of the string. Writers must
+-- target the *_code columns: generated columns reject INSERT and UPDATE.
 CREATE TABLE IF NOT EXISTS symbols (
     id INTEGER PRIMARY KEY,
     file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
     name TEXT NOT NULL,
     module_path TEXT NOT NULL,
     qualified_name TEXT NOT NULL,
-    kind TEXT NOT NULL,
+    kind_code INTEGER NOT NULL,
+    kind TEXT GENERATED ALWAYS AS (CASE kind_code
+        WHEN 1 THEN 'function' WHEN 2 THEN 'method' WHEN 3 THEN 'struct'
+        WHEN 4 THEN 'class' WHEN 5 THEN 'enum' WHEN 6 THEN 'trait'
+        WHEN 7 THEN 'interface' WHEN 8 THEN 'const' WHEN 9 THEN 'static'
+        WHEN 10 THEN 'module' WHEN 11 THEN 'type_alias' WHEN 12 THEN 'macro'
+        WHEN 13 THEN 'enum_variant' WHEN 14 THEN 'struct_field'
+        WHEN 15 THEN 'property' WHEN 16 THEN 'event' WHEN 17 THEN 'delegate'
+    END) VIRTUAL,
     line INTEGER NOT NULL,
     column INTEGER NOT NULL,
     end_line INTEGER,
     end_column INTEGER,
     signature TEXT,
-    visibility TEXT NOT NULL,
+    visibility_code INTEGER NOT NULL,
+    visibility TEXT GENERATED ALWAYS AS (CASE visibility_code
+        WHEN 1 THEN 'public' WHEN 2 THEN 'crate' WHEN 3 THEN 'module'
+        WHEN 4 THEN 'private'
+    END) VIRTUAL,
     parent_symbol_id INTEGER REFERENCES symbols(id) ON DELETE CASCADE,
     is_test INTEGER NOT NULL DEFAULT 0
 );
 
+-- No index on module_path (no query filters on it) or files(path) (UNIQUE
+-- already has one): each was a full copy of the strings it indexed.
 CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name);
-CREATE INDEX IF NOT EXISTS idx_symbols_module_path ON symbols(module_path);
 CREATE INDEX IF NOT EXISTS idx_symbols_qualified ON symbols(qualified_name);
 CREATE INDEX IF NOT EXISTS idx_symbols_file ON symbols(file_id);
-CREATE INDEX IF NOT EXISTS idx_symbols_kind ON symbols(kind);
+CREATE INDEX IF NOT EXISTS idx_symbols_kind ON symbols(kind_code);
 CREATE INDEX IF NOT EXISTS idx_symbols_is_test ON symbols(is_test) WHERE is_test = 1;
 
+-- Trigram full-text index over symbol names for substring search.
+-- External-content table: the text lives only in symbols; the triggers keep
+-- the trigram postings in step with every write path (Pass 1's atomic
+-- per-file rewrite, FK cascades from file deletion, parent-link updates).
+-- Queries shorter than three characters cannot use a trigram index and fall
+-- back to a LIKE scan (see Index::search_symbols).
+CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+    name, qualified_name,
+    content='symbols', content_rowid='id', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS symbols_fts_insert AFTER INSERT ON symbols BEGIN
+    INSERT INTO symbols_fts(rowid, name, qualified_name)
+    VALUES (new.id, new.name, new.qualified_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS symbols_fts_delete AFTER DELETE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, name, qualified_name)
+    VALUES ('delete', old.id, old.name, old.qualified_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS symbols_fts_update
+AFTER UPDATE OF name, qualified_name ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, name, qualified_name)
+    VALUES ('delete', old.id, old.name, old.qualified_name);
+    INSERT INTO symbols_fts(rowid, name, qualified_name)
+    VALUES (new.id, new.name, new.qualified_name);
+END;
+
+-- Identifier occurrences: inverted index of word-boundary tokens to the
+-- lines they occur on, per file. lines is a blob of delta-encoded LEB128
+-- varints (see db/identifiers.rs). A row with name = '' marks a file whose
+-- occurrences were extracted; files without it are scanned from disk.
+CREATE TABLE IF NOT EXISTS identifier_lines (
+    name TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    lines BLOB NOT NULL,
+    PRIMARY KEY (name, file_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_identifier_lines_file ON identifier_lines(file_id);
+
 -- References (usages of symbols)
 -- symbol_id is NULL for unresolved references (to be resolved in Pass 2)
 -- reference_name stores the name for resolution (e.g., Index_open)
+-- kind and strategy are decoded from integer codes like symbols.kind;
+-- strategy_code is NULL exactly when the reference is unresolved.
 CREATE TABLE IF NOT EXISTS refs (
     id INTEGER PRIMARY KEY,
     symbol_id INTEGER REFERENCES symbols(id) ON DELETE CASCADE,
     file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
-    kind TEXT NOT NULL,
+    kind_code INTEGER NOT NULL,
+    kind TEXT GENERATED ALWAYS AS (CASE kind_code
+        WHEN 1 THEN 'import' WHEN 2 THEN 'call' WHEN 3 THEN 'type'
+        WHEN 4 THEN 'inherit' WHEN 5 THEN 'construct' WHEN 6 THEN 'field_access'
+        WHEN 7 THEN 'macro' WHEN 8 THEN 'reexport' WHEN 9 THEN 'value'
+        WHEN 10 THEN 'macro_call' ELSE 'unknown'
+    END) VIRTUAL,
     line INTEGER NOT NULL,
     column INTEGER NOT NULL,
     end_line INTEGER,
     end_column INTEGER,
     in_symbol_id INTEGER REFERENCES symbols(id) ON DELETE CASCADE,
     reference_name TEXT,
-    strategy TEXT
+    strategy_code INTEGER,
+    strategy TEXT GENERATED ALWAYS AS (CASE strategy_code
+        WHEN 1 THEN 'same_file' WHEN 2 THEN 'explicit_import'
+        WHEN 3 THEN 'glob_import' WHEN 4 THEN 'import_union'
+        WHEN 5 THEN 'qualified_exact' WHEN 6 THEN 'same_crate'
+        WHEN 7 THEN 'unique_workspace' WHEN 8 THEN 'qualified_module_fallback'
+        WHEN 9 THEN 'lsp'
+    END) VIRTUAL,
+    -- Set at Pass 1 on unresolved panic-prone refs (db/panic_points.rs)
+    -- and cleared with reference_name when a pass resolves the ref.
+    panic_code INTEGER,
+    panic TEXT GENERATED ALWAYS AS (CASE panic_code
+        WHEN 1 THEN 'unwrap' WHEN 2 THEN 'expect' WHEN 3 THEN 'panic'
+        WHEN 4 THEN 'unreachable' WHEN 5 THEN 'todo' WHEN 6 THEN 'unimplemented'
+    END) VIRTUAL
 );
 
-CREATE INDEX IF NOT EXISTS idx_refs_symbol ON refs(symbol_id);
-CREATE INDEX IF NOT EXISTS idx_refs_file ON refs(file_id);
-CREATE INDEX IF NOT EXISTS idx_refs_in_symbol ON refs(in_symbol_id);
-CREATE INDEX IF NOT EXISTS idx_refs_unresolved ON refs(symbol_id) WHERE symbol_id IS NULL;
+-- The trailing columns serve the hot reads: each index delivers its
+-- query's ORDER BY (references to a symbol by file_id, line; a file's
+-- references by line, column; unresolved references by file_id, line)
+-- without a sort, and idx_refs_in_symbol answers the refs_banded EXISTS
+-- probe behind --exclude-speculative from the index alone. The partial
+-- WHERE clauses split refs between idx_refs_symbol and
+-- idx_refs_unresolved, so `symbol_id IS NULL` sweeps cannot be planned
+-- onto the resolved-reference index.
+CREATE INDEX IF NOT EXISTS idx_refs_symbol
+    ON refs(symbol_id, file_id, line) WHERE symbol_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_refs_file ON refs(file_id, line, column);
+CREATE INDEX IF NOT EXISTS idx_refs_in_symbol ON refs(in_symbol_id, symbol_id, strategy_code);
+CREATE INDEX IF NOT EXISTS idx_refs_unresolved ON refs(file_id, line) WHERE symbol_id IS NULL;
+-- Resolved inherit refs (kind_code 4) by supertype: the few edges the type
+-- closure is built from, without a sweep of refs.
+CREATE INDEX IF NOT EXISTS idx_refs_inherit
+    ON refs(symbol_id, in_symbol_id) WHERE kind_code = 4 AND symbol_id IS NOT NULL;
+-- Panic points by file and line: the panic-points queries and their
+-- per-file counts read this index instead of matching names across refs.
+CREATE INDEX IF NOT EXISTS idx_refs_panic
+    ON refs(file_id, line, panic_code, in_symbol_id) WHERE panic_code IS NOT NULL;
 
 -- Name-queryable view over refs (tethys-6rlu).
 -- reference_name is populated ONLY for unresolved refs; resolution nulls it
--- (see resolve_reference). This view restores name-queryability by falling back
+-- (see Index::apply_resolutions). This view restores name-queryability by falling back
 -- to the resolved symbol's name, so `WHERE name = 'foo'` finds refs to in-crate
 -- symbols too. LEFT JOIN so unresolved refs (symbol_id NULL) still appear.
 -- External/ad-hoc consumers should query refs_named, not refs.reference_name.
@@ -80,29 +184,36 @@ CREATE VIEW IF NOT EXISTS refs_named AS
 -- sibling adding the resolution strategy and its DERIVED confidence band.
 -- The band lives ONLY here — one CASE, revisable without re-indexing.
 -- band is NULL exactly when strategy is NULL (unresolved refs have no
--- band; NULL <=> unbound symmetry).
+-- band; NULL <=> unbound symmetry). The CASE tests strategy_code rather
+-- than the decoded text so a band scan does not decode every row twice.
+-- name is a scalar subquery rather than refs_named's LEFT JOIN so that
+-- band-only probes (--exclude-speculative's EXISTS) never touch symbols.
 CREATE VIEW IF NOT EXISTS refs_banded AS
     SELECT r.id, r.symbol_id, r.file_id, r.kind, r.line, r.column,
            r.in_symbol_id, r.reference_name,
-           COALESCE(r.reference_name, s.name) AS name,
+           COALESCE(r.reference_name,
+                    (SELECT s.name FROM symbols s WHERE s.id = r.symbol_id)) AS name,
            r.strategy,
            CASE
-               WHEN r.strategy IS NULL THEN NULL
-               WHEN r.strategy IN ('explicit_import', 'lsp') THEN 'high'
-               WHEN r.strategy IN ('same_file', 'glob_import', 'import_union',
-                                   'qualified_exact', 'same_crate') THEN 'medium'
+               WHEN r.strategy_code IS NULL THEN NULL
+               -- explicit_import, lsp
+               WHEN r.strategy_code IN (2, 9) THEN 'high'
+               -- same_file, glob_import, import_union, qualified_exact, same_crate
+               WHEN r.strategy_code IN (1, 3, 4, 5, 6) THEN 'medium'
                ELSE 'speculative'
            END AS band
-    FROM refs r
-    LEFT JOIN symbols s ON r.symbol_id = s.id;
+    FROM refs r;
 
 -- File-level dependencies (denormalized for fast queries)
+-- WITHOUT ROWID: rows live in the primary-key b-tree, and
+-- idx_file_deps_to carries the key, so the dependents walk never touches
+-- the table. Same layout for call_edges and imports below.
 CREATE TABLE IF NOT EXISTS file_deps (
     from_file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
     to_file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
     ref_count INTEGER NOT NULL DEFAULT 1,
     PRIMARY KEY (from_file_id, to_file_id)
-);
+) WITHOUT ROWID;
 
 CREATE INDEX IF NOT EXISTS idx_file_deps_to ON file_deps(to_file_id);
 
@@ -113,11 +224,80 @@ CREATE TABLE IF NOT EXISTS imports (
     source_module TEXT NOT NULL,    -- e.g. crate::db or MyApp.Services
     alias TEXT,                      -- for use foo as bar
     PRIMARY KEY (file_id, symbol_name, source_module)
-);
+) WITHOUT ROWID;
 
-CREATE INDEX IF NOT EXISTS idx_imports_file ON imports(file_id);
+-- Per-file reads use the primary key's leading file_id.
 CREATE INDEX IF NOT EXISTS idx_imports_symbol ON imports(symbol_name);
 
+-- Import statements as parsed, one row per statement in source order, for
+-- file-local analyses (unused-imports). The imports table above is keyed
+-- per bound name and drops lines and statement grouping; this keeps both.
+-- path and imported_names are space-joined (segments are identifiers).
+CREATE TABLE IF NOT EXISTS import_statements (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    imported_names TEXT NOT NULL,
+    alias TEXT,
+    is_glob INTEGER NOT NULL,
+    is_reexport INTEGER NOT NULL,
+    PRIMARY KEY (file_id, ordinal)
+) WITHOUT ROWID;
+
+-- Names a file's references use BEFORE same-file resolution nulls
+-- refs.reference_name: each reference's name plus the first segment of its
+-- qualified path. A row with name = '' marks a file whose import facts
+-- (this table and import_statements) were extracted; files without it are
+-- re-parsed by unused-imports.
+CREATE TABLE IF NOT EXISTS referenced_names (
+    name TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    PRIMARY KEY (name, file_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_referenced_names_file ON referenced_names(file_id);
+
+-- Pass 3 (LSP) answers, keyed by the referencing file's content hash and the
+-- reference position rather than by row ids, so they survive re-indexing.
+-- deps_fingerprint covers the language's build manifests and server; a row
+-- is only reused under the same fingerprint. target_path and target_line
+-- are NULL when the server found no definition inside the workspace, and
+-- target_hash then fingerprints the language's indexed files, so the row
+-- is only reused while none of them changed; otherwise the row is only
+-- reused while the target file still has content hash target_hash.
+-- No foreign keys: rows outlive the files rows they were computed from and
+-- are pruned by hash instead.
+CREATE TABLE IF NOT EXISTS lsp_resolution_cache (
+    language TEXT NOT NULL,
+    file_hash INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    column INTEGER NOT NULL,
+    deps_fingerprint INTEGER NOT NULL,
+    target_path TEXT,
+    target_line INTEGER,
+    target_hash INTEGER,
+    PRIMARY KEY (language, file_hash, line, column)
+) WITHOUT ROWID;
+
+-- Crate discovery (`cargo::discover_crates`) for workspace_root, reused by
+-- Tethys::new instead of re-parsing every manifest. crates is the JSON
+-- CrateInfo list. It is stale once the stamp of any path discovery read
+-- changed: the hash of a file's content or of a directory's entry names (a
+-- glob member appearing), NULL when the path did not exist. A probed path
+-- (a default target such as src/lib.rs) is stamped 0 when it exists, since
+-- only its existence decides discovery.
+CREATE TABLE IF NOT EXISTS crate_discovery (
+    workspace_root TEXT PRIMARY KEY,
+    crates TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS crate_discovery_inputs (
+    path TEXT PRIMARY KEY,
+    probed INTEGER NOT NULL DEFAULT 0,
+    stamp INTEGER
+) WITHOUT ROWID;
+
 -- Pre-computed call graph edges (caller -> callee relationships)
 -- Populated from refs where both in_symbol_id (caller) and symbol_id (callee) are resolved.
 -- Enables efficient indexed lookups for get_callers/get_callees.
@@ -128,10 +308,11 @@ CREATE TABLE IF NOT EXISTS call_edges (
     PRIMARY KEY (caller_symbol_id, callee_symbol_id),
     FOREIGN KEY (caller_symbol_id) REFERENCES symbols(id) ON DELETE CASCADE,
     FOREIGN KEY (callee_symbol_id) REFERENCES symbols(id) ON DELETE CASCADE
-);
+) WITHOUT ROWID;
 
+-- Callers walk by callee: this index holds (callee, caller), covering
+-- get_callers and the caller_tree CTE. Callees walk the primary key.
 CREATE INDEX IF NOT EXISTS idx_call_edges_callee ON call_edges(callee_symbol_id);
-CREATE INDEX IF NOT EXISTS idx_call_edges_caller ON call_edges(caller_symbol_id);
 
 -- Attributes attached to symbols (e.g. #[derive(Clone)], #[source], #[cfg_attr(...)]).
 -- args holds the raw text inside the outermost parens with parens stripped, or NULL
@@ -148,6 +329,84 @@ CREATE TABLE IF NOT EXISTS attributes (
 CREATE INDEX IF NOT EXISTS idx_attributes_symbol ON attributes(symbol_id);
 CREATE INDEX IF NOT EXISTS idx_attributes_name ON attributes(name);
 
+-- Index generation (db/changes.rs): bumped by every indexing run, so a
+-- consumer that cached answers at generation g can ask what changed since.
+-- One row. A new database starts counting at its creation time in
+-- milliseconds, so one recreated at the same path (a rebuild, a snapshot
+-- import) continues above the generations of the database it replaced
+-- rather than reusing them (unless that one indexed more often than once a
+-- millisecond). Changes after base are in index_changes; the
+-- log cannot answer for generations before it. incomplete is set from the
+-- start of an indexing run until it completes, so it stays set after a
+-- cancelled or failed run, whose writes are committed but partial.
+CREATE TABLE IF NOT EXISTS index_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL,
+    base INTEGER NOT NULL,
+    incomplete INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO index_generation (id, generation, base)
+VALUES (1, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER),
+        CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER));
+
+-- Change feed: what each generation added, removed or modified, keyed by
+-- paths and qualified names (row ids do not survive re-indexing). entity
+-- and change are decoded from codes like symbols.kind. path is the file the
+-- entry belongs to: the file itself, the symbol's, the caller's, or the
+-- dependent's. name is the symbol's or caller's qualified name, target the
+-- callee's qualified name or the dependency's path; '' where they do not
+-- apply. Per-generation reads use the primary key's leading generation.
+CREATE TABLE IF NOT EXISTS index_changes (
+    generation INTEGER NOT NULL,
+    entity_code INTEGER NOT NULL,
+    entity TEXT GENERATED ALWAYS AS (CASE entity_code
+        WHEN 1 THEN 'file' WHEN 2 THEN 'symbol' WHEN 3 THEN 'call_edge'
+        WHEN 4 THEN 'file_dep'
+    END) VIRTUAL,
+    change_code INTEGER NOT NULL,
+    change TEXT GENERATED ALWAYS AS (CASE change_code
+        WHEN 1 THEN 'added' WHEN 2 THEN 'removed' WHEN 3 THEN 'modified'
+    END) VIRTUAL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (generation, entity_code, path, name, target)
+) WITHOUT ROWID;
+
+-- Tables derived from refs that every indexing run brings up to date
+-- (test_reach, type_closure): the generation each is current at. A derived
+-- table is current only while its row holds the current generation, and
+-- readers fall back to computing from refs otherwise.
+CREATE TABLE IF NOT EXISTS derived_state (
+    name TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Test reachability (db/test_reach.rs): every symbol some test reaches over
+-- resolved refs, with its distance in refs from the nearest test (0 for a
+-- test) and its witnesses, the reached symbols referencing it from one
+-- step closer. Updates maintain it from what they rewrote.
+CREATE TABLE IF NOT EXISTS test_reach (
+    symbol_id INTEGER PRIMARY KEY REFERENCES symbols(id) ON DELETE CASCADE,
+    distance INTEGER NOT NULL,
+    witnesses INTEGER NOT NULL
+);
+
+-- Type-hierarchy closure (db/type_closure.rs): every type paired with each
+-- of its transitive supertypes over resolved inherit refs anchored to a
+-- container symbol, at the length of the shortest chain between them (1
+-- for a direct supertype). A type on a cycle is not its own ancestor.
+-- Updates maintain it from what they rewrote.
+CREATE TABLE IF NOT EXISTS type_closure (
+    descendant_id INTEGER NOT NULL REFERENCES symbols(id) ON DELETE CASCADE,
+    ancestor_id INTEGER NOT NULL REFERENCES symbols(id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (descendant_id, ancestor_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_type_closure_ancestor ON type_closure(ancestor_id, depth);
+
 -- === Architecture analysis ===
 
 -- One row per discovered package. v1: only source = 'manifest'.
@@ -228,23 +487,117 @@ mod schema_tests {
 
     /// tethys-9z7i design C8 fence half: a FRESH db carries the provenance
     /// column, nullable (NULL means unresolved, ADR-0003), and the column
-    /// count is pinned so a stray duplicate addition fails loudly.
+    /// count (generated columns included) is pinned so a stray duplicate
+    /// addition fails loudly.
     #[test]
     fn refs_has_strategy_column() {
         let conn = open_test_conn();
         let (count, strategy_rows, strategy_notnull): (i64, i64, i64) = conn
             .query_row(
                 "SELECT COUNT(*),
-                        SUM(name = 'strategy'),
-                        SUM(CASE WHEN name = 'strategy' THEN \"notnull\" ELSE 0 END)
-                 FROM pragma_table_info('refs')",
+                        SUM(name = 'strategy_code'),
+                        SUM(CASE WHEN name = 'strategy_code' THEN \"notnull\" ELSE 0 END)
+                 FROM pragma_table_xinfo('refs')",
                 [],
                 |r| Ok((r.get(0)?, r.get(1)?, r.get(2)?)),
             )
-            .expect("pragma table_info");
+            .expect("pragma table_xinfo");
         assert_eq!(strategy_rows, 1, "strategy column present exactly once");
         assert_eq!(strategy_notnull, 0, "strategy is nullable");
-        assert_eq!(count, 11, "refs column count pinned");
+        assert_eq!(count, 13, "refs column count pinned");
+    }
+
+    /// The generated text columns must decode every code the writers in
+    /// db/helpers.rs store back to the enum's `as_str`, or every reader
+    /// parsing `kind`/`visibility`/`strategy` breaks. Exhaustive lists, so
+    /// a new variant without a CASE arm fails here rather than reading
+    /// back NULL.
+    #[test]
+    fn generated_columns_decode_every_code() {
+        use crate::db::{reference_kind_code, strategy_code, symbol_kind_code, visibility_code};
+        use crate::types::{ReferenceKind, ResolutionStrategy as RS, SymbolKind as SK, Visibility};
+
+        // One fixture row per table; each probe rewrites its code column
+        // and reads the generated column back.
+        let conn = open_test_conn();
+        conn.execute_batch(
+            "INSERT INTO files (id, path, language, mtime_ns, size_bytes, indexed_at)
+                 VALUES (1, 'f.rs', 'rust', 0, 0, 0);
+             INSERT INTO symbols (id, file_id, name, module_path, qualified_name,
+                                  kind_code, line, column, visibility_code)
+                 VALUES (10, 1, 'x', '', 'x', 1, 1, 1, 1);
+             INSERT INTO refs (id, file_id, kind_code, line, column)
+                 VALUES (100, 1, 2, 1, 1);",
+        )
+        .expect("seed fixture");
+        let decode = |table: &str, column: &str, code: i64| -> Option<String> {
+            conn.execute(&format!("UPDATE {table} SET {column}_code = ?1"), [code])
+                .expect("set code");
+            conn.query_row(&format!("SELECT {column} FROM {table}"), [], |r| r.get(0))
+                .expect("decode")
+        };
+
+        for kind in [
+            SK::Function,
+            SK::Method,
+            SK::Struct,
+            SK::Class,
+            SK::Enum,
+            SK::Trait,
+            SK::Interface,
+            SK::Const,
+            SK::Static,
+            SK::Module,
+            SK::TypeAlias,
+            SK::Macro,
+            SK::EnumVariant,
+            SK::StructField,
+            SK::Property,
+            SK::Event,
+            SK::Delegate,
+        ] {
+            let got = decode("symbols", "kind", symbol_kind_code(kind));
+            assert_eq!(got.as_deref(), Some(kind.as_str()), "{kind:?}");
+        }
+        for visibility in [
+            Visibility::Public,
+            Visibility::Crate,
+            Visibility::Module,
+            Visibility::Private,
+        ] {
+            let got = decode("symbols", "visibility", visibility_code(visibility));
+            assert_eq!(got.as_deref(), Some(visibility.as_str()), "{visibility:?}");
+        }
+        for strategy in [
+            RS::SameFile,
+            RS::ExplicitImport,
+            RS::GlobImport,
+            RS::ImportUnion,
+            RS::QualifiedExact,
+            RS::SameCrate,
+            RS::UniqueWorkspace,
+            RS::QualifiedModuleFallback,
+            RS::Lsp,
+        ] {
+            let got = decode("refs", "strategy", strategy_code(strategy));
+            assert_eq!(got.as_deref(), Some(strategy.as_str()), "{strategy:?}");
+        }
+        for kind in [
+            ReferenceKind::Import,
+            ReferenceKind::Call,
+            ReferenceKind::Type,
+            ReferenceKind::Inherit,
+            ReferenceKind::Construct,
+            ReferenceKind::FieldAccess,
+            ReferenceKind::Macro,
+            ReferenceKind::Reexport,
+            ReferenceKind::Value,
+            ReferenceKind::MacroCall,
+            ReferenceKind::Unknown("custom".to_string()),
+        ] {
+            let got = decode("refs", "kind", reference_kind_code(&kind));
+            assert_eq!(got.as_deref(), Some(kind.as_str()), "{kind:?}");
+        }
     }
 
     /// Slice-3 C1/C2: refs_banded exists, its band CASE matches ADR-0003
@@ -282,8 +635,8 @@ mod schema_tests {
             .expect("file row");
             conn.execute(
                 "INSERT INTO symbols (id, file_id, name, module_path, qualified_name,
-                                      kind, line, column, visibility)
-                 VALUES (9, 1, 'tgt', '', 'tgt', 'function', 1, 1, 'public')",
+                                      kind_code, line, column, visibility_code)
+                 VALUES (9, 1, 'tgt', '', 'tgt', 1, 1, 1, 1)",
                 [],
             )
             .expect("symbol row");
@@ -386,7 +739,7 @@ mod schema_tests {
         let conn = Connection::open(dir.path().join("fresh.db")).expect("reopen raw");
         let n: i64 = conn
             .query_row(
-                "SELECT COUNT(*) FROM pragma_table_info('refs') WHERE name = 'strategy'",
+                "SELECT COUNT(*) FROM pragma_table_xinfo('refs') WHERE name = 'strategy'",
                 [],
                 |r| r.get(0),
             )
@@ -445,8 +798,8 @@ mod schema_tests {
             "INSERT INTO files (id, path, language, mtime_ns, size_bytes, indexed_at)
                  VALUES (1, 'a.rs', 'rust', 0, 0, 0);
              INSERT INTO symbols (id, file_id, name, module_path, qualified_name,
-                                  kind, line, column, visibility)
-                 VALUES (10, 1, 'alpha', '', 'alpha', 'function', 1, 1, 'pub');",
+                                  kind_code, line, column, visibility_code)
+                 VALUES (10, 1, 'alpha', '', 'alpha', 1, 1, 1, 1);",
         )
         .expect("seed file+symbol");
     }
@@ -473,8 +826,8 @@ mod schema_tests {
         seed_refs_fixture(&conn);
         // Resolved call ref: symbol_id -> 'alpha', reference_name omitted (NULL).
         conn.execute(
-            "INSERT INTO refs (id, symbol_id, file_id, kind, line, column)
-                 VALUES (100, 10, 1, 'call', 5, 1)",
+            "INSERT INTO refs (id, symbol_id, file_id, kind_code, line, column)
+                 VALUES (100, 10, 1, 2, 5, 1)",
             [],
         )
         .expect("insert resolved ref");
@@ -501,8 +854,8 @@ mod schema_tests {
         seed_refs_fixture(&conn);
         // Unresolved call ref: symbol_id omitted (NULL), reference_name set.
         conn.execute(
-            "INSERT INTO refs (id, file_id, kind, line, column, reference_name)
-                 VALUES (200, 1, 'call', 9, 1, 'extern_fn')",
+            "INSERT INTO refs (id, file_id, kind_code, line, column, reference_name)
+                 VALUES (200, 1, 2, 9, 1, 'extern_fn')",
             [],
         )
         .expect("insert unresolved ref");
@@ -531,12 +884,12 @@ mod schema_tests {
             "INSERT INTO files (id, path, language, mtime_ns, size_bytes, indexed_at)
                  VALUES (1, 'a.rs', 'rust', 0, 0, 0), (2, 'b.rs', 'rust', 0, 0, 0);
              INSERT INTO symbols (id, file_id, name, module_path, qualified_name,
-                                  kind, line, column, visibility) VALUES
-                 (10, 1, 'dup', '', 'dup', 'function', 1, 1, 'pub'),
-                 (20, 2, 'dup', 'B', 'B::dup', 'method', 1, 1, 'pub');
-             INSERT INTO refs (id, symbol_id, file_id, kind, line, column) VALUES
-                 (300, 10, 1, 'call', 5, 1),
-                 (301, 20, 2, 'call', 6, 1);",
+                                  kind_code, line, column, visibility_code) VALUES
+                 (10, 1, 'dup', '', 'dup', 1, 1, 1, 1),
+                 (20, 2, 'dup', 'B', 'B::dup', 2, 1, 1, 1);
+             INSERT INTO refs (id, symbol_id, file_id, kind_code, line, column) VALUES
+                 (300, 10, 1, 2, 5, 1),
+                 (301, 20, 2, 2, 6, 1);",
         )
         .expect("seed collision fixture");
 
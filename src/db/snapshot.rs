@@ -0,0 +1,302 @@
+//! Portable index snapshots (`tethys index --export` / `--import`).
+//!
+//! A snapshot is the index database compacted with `VACUUM INTO`, behind a
+//! 16-byte header, gzip-compressed as one stream:
+//!
+//! | Bytes | Content |
+//! |-------|---------|
+//! | 8     | magic `TETHYSNP` |
+//! | 4     | snapshot format version, little-endian |
+//! | 4     | the database's [`SCHEMA_VERSION`], little-endian |
+//! | rest  | the `SQLite` database file |
+//!
+//! The gzip trailer's CRC-32 and length cover the header and the database,
+//! and are checked on import before anything replaces the index, so a
+//! truncated or corrupted snapshot is refused rather than restored.
+//!
+//! Every path the index stores is workspace-relative, so a snapshot
+//! restores under any checkout path. The one exception is the crate
+//! discovery cache (keyed by the absolute workspace root, stamped per
+//! absolute input path), which is left out: the importing workspace
+//! rediscovers its crates when opened.
+
+use std::fs::File;
+use std::io::{self, BufReader, BufWriter, Read, Write};
+use std::path::{Path, PathBuf};
+
+use flate2::Compression;
+use flate2::read::GzDecoder;
+use flate2::write::GzEncoder;
+use rusqlite::Connection;
+use tracing::{debug, warn};
+
+use super::{Index, SCHEMA_VERSION};
+use crate::error::{Error, Result};
+use crate::types::SnapshotStats;
+
+const MAGIC: &[u8; 8] = b"TETHYSNP";
+
+/// Version of the snapshot layout above (not of the schema inside it).
+const FORMAT_VERSION: u32 = 1;
+
+/// `path` with `suffix` appended to its file name: the temporary files a
+/// snapshot is staged in before being renamed over their destination.
+fn staging_path(path: &Path, suffix: &str) -> PathBuf {
+    let mut staged = path.as_os_str().to_owned();
+    staged.push(suffix);
+    PathBuf::from(staged)
+}
+
+/// An I/O error reading `snapshot`, with the path and the likely cause.
+fn unreadable(snapshot: &Path, e: &io::Error) -> Error {
+    Error::Io(io::Error::new(
+        e.kind(),
+        format!(
+            "snapshot {} is truncated or corrupt: {e}",
+            snapshot.display()
+        ),
+    ))
+}
+
+impl Index {
+    /// Write a snapshot of this index to `snapshot`, replacing any file
+    /// there. The file only appears once complete, so a cache never picks
+    /// up a partial snapshot.
+    pub(crate) fn export_snapshot(&self, snapshot: &Path) -> Result<SnapshotStats> {
+        let copy = staging_path(snapshot, ".db.tmp");
+        let partial = staging_path(snapshot, ".tmp");
+        Self::remove_db_files(&copy)?;
+
+        let result = self.write_snapshot(&copy, &partial, snapshot);
+        if let Err(e) = Self::remove_db_files(&copy) {
+            warn!(path = %copy.display(), error = %e, "Failed to remove snapshot staging copy");
+        }
+        if result.is_err() {
+            let _ = std::fs::remove_file(&partial);
+        }
+        result
+    }
+
+    fn write_snapshot(
+        &self,
+        copy: &Path,
+        partial: &Path,
+        snapshot: &Path,
+    ) -> Result<SnapshotStats> {
+        // VACUUM INTO writes a defragmented, rollback-journal copy from one
+        // read transaction: consistent even while this index is in WAL mode.
+        self.connection()?
+            .execute("VACUUM INTO ?1", [copy.to_string_lossy()])?;
+
+        let files: usize = {
+            let conn = Connection::open(copy)?;
+            conn.execute_batch(
+                "DELETE FROM crate_discovery;
+                 DELETE FROM crate_discovery_inputs;",
+            )?;
+            conn.query_row("SELECT COUNT(*) FROM files", [], |row| row.get(0))?
+        };
+
+        let mut database = File::open(copy)?;
+        let database_bytes = database.metadata()?.len();
+
+        let mut encoder = GzEncoder::new(
+            BufWriter::new(File::create(partial)?),
+            Compression::default(),
+        );
+        encoder.write_all(MAGIC)?;
+        encoder.write_all(&FORMAT_VERSION.to_le_bytes())?;
+        encoder.write_all(&SCHEMA_VERSION.to_le_bytes())?;
+        io::copy(&mut database, &mut encoder)?;
+        encoder
+            .finish()?
+            .into_inner()
+            .map_err(io::IntoInnerError::into_error)?
+            .sync_all()?;
+        std::fs::rename(partial, snapshot)?;
+
+        let stats = SnapshotStats {
+            files,
+            database_bytes,
+            snapshot_bytes: std::fs::metadata(snapshot)?.len(),
+        };
+        debug!(path = %snapshot.display(), ?stats, "Exported index snapshot");
+        Ok(stats)
+    }
+
+    /// Restore the snapshot at `snapshot` as the index database at
+    /// `db_path`, replacing any index there.
+    ///
+    /// The snapshot is decompressed and verified next to `db_path` first;
+    /// the existing index is only removed once it passed. No connection to
+    /// `db_path` may be open.
+    pub(crate) fn import_snapshot(snapshot: &Path, db_path: &Path) -> Result<SnapshotStats> {
+        let file = File::open(snapshot).map_err(|e| {
+            Error::Io(io::Error::new(
+                e.kind(),
+                format!("cannot open snapshot {}: {e}", snapshot.display()),
+            ))
+        })?;
+        let snapshot_bytes = file.metadata()?.len();
+        let mut decoder = GzDecoder::new(BufReader::new(file));
+
+        let mut header = [0u8; 16];
+        decoder
+            .read_exact(&mut header)
+            .map_err(|e| unreadable(snapshot, &e))?;
+        if header[..8] != MAGIC[..] {
+            return Err(Error::Config(format!(
+                "{} is not a tethys index snapshot",
+                snapshot.display()
+            )));
+        }
+        let format = u32::from_le_bytes([header[8], header[9], header[10], header[11]]);
+        if format != FORMAT_VERSION {
+            return Err(Error::Config(format!(
+                "snapshot {} has format version {format}, this tethys reads {FORMAT_VERSION}",
+                snapshot.display()
+            )));
+        }
+        let schema = i32::from_le_bytes([header[12], header[13], header[14], header[15]]);
+        if schema != SCHEMA_VERSION {
+            return Err(Error::Config(format!(
+                "snapshot {} holds index schema version {schema}, this tethys uses \
+                 {SCHEMA_VERSION}; export it again with this tethys, or index from scratch",
+                snapshot.display()
+            )));
+        }
+
+        if let Some(parent) = db_path.parent() {
+            std::fs::create_dir_all(parent)?;
+        }
+        let restored = staging_path(db_path, ".import");
+        let result = Self::restore_database(&mut decoder, snapshot, &restored);
+        let (files, database_bytes) = match result {
+            Ok(restored_stats) => restored_stats,
+            Err(e) => {
+                let _ = std::fs::remove_file(&restored);
+                return Err(e);
+            }
+        };
+
+        Self::remove_db_files(db_path)?;
+        std::fs::rename(&restored, db_path)?;
+
+        let stats = SnapshotStats {
+            files,
+            database_bytes,
+            snapshot_bytes,
+        };
+        debug!(path = %snapshot.display(), ?stats, "Imported index snapshot");
+        Ok(stats)
+    }
+
+    /// Decompress the database that follows the header into `restored`
+    /// (reading to the end is what checks the gzip trailer) and return its
+    /// file count and size.
+    fn restore_database(
+        decoder: &mut impl Read,
+        snapshot: &Path,
+        restored: &Path,
+    ) -> Result<(usize, u64)> {
+        let mut out = BufWriter::new(File::create(restored)?);
+        let database_bytes = io::copy(decoder, &mut out).map_err(|e| unreadable(snapshot, &e))?;
+        out.into_inner()
+            .map_err(io::IntoInnerError::into_error)?
+            .sync_all()?;
+
+        let conn = Connection::open(restored)?;
+        let version: i32 = conn.pragma_query_value(None, "user_version", |row| row.get(0))?;
+        if version != SCHEMA_VERSION {
+            return Err(Error::Config(format!(
+                "snapshot {} header says schema version {SCHEMA_VERSION} but its database \
+                 is version {version}",
+                snapshot.display()
+            )));
+        }
+        // The restored index replaces whatever was at the path: a consumer
+        // holding a generation from either must not read the other's log.
+        super::changes::restart_generations(&conn)?;
+        let files = conn.query_row("SELECT COUNT(*) FROM files", [], |row| row.get(0))?;
+        Ok((files, database_bytes))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::types::Language;
+
+    fn index_with_one_file(dir: &Path) -> Index {
+        let mut index = Index::open(&dir.join("source.db")).expect("open");
+        index
+            .upsert_file(Path::new("src/lib.rs"), Language::Rust, 1, 2, Some(3))
+            .expect("upsert");
+        index
+    }
+
+    #[test]
+    fn round_trips_the_index() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let index = index_with_one_file(dir.path());
+        let snapshot = dir.path().join("index.snapshot");
+
+        let exported = index.export_snapshot(&snapshot).expect("export");
+        assert_eq!(exported.files, 1);
+        assert!(exported.snapshot_bytes < exported.database_bytes);
+        assert!(!staging_path(&snapshot, ".db.tmp").exists());
+        assert!(!staging_path(&snapshot, ".tmp").exists());
+
+        let restored_path = dir.path().join("restored").join("tethys.db");
+        let imported = Index::import_snapshot(&snapshot, &restored_path).expect("import");
+        assert_eq!(imported.files, 1);
+        assert_eq!(imported.database_bytes, exported.database_bytes);
+
+        let restored = Index::open(&restored_path).expect("open restored");
+        let file = restored
+            .get_file(Path::new("src/lib.rs"))
+            .expect("query")
+            .expect("file restored");
+        assert_eq!(file.content_hash, Some(3));
+    }
+
+    #[test]
+    fn refuses_a_corrupted_snapshot_and_keeps_the_index() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let snapshot = dir.path().join("index.snapshot");
+        index_with_one_file(dir.path())
+            .export_snapshot(&snapshot)
+            .expect("export");
+
+        let mut bytes = std::fs::read(&snapshot).expect("read");
+        let len = bytes.len();
+        // The trailer's CRC-32 (last 8 bytes are CRC-32 then length).
+        bytes[len - 8] ^= 0xff;
+        std::fs::write(&snapshot, &bytes).expect("write");
+
+        let target = dir.path().join("target.db");
+        drop(Index::open(&target).expect("create target"));
+        let err = Index::import_snapshot(&snapshot, &target).expect_err("corrupt snapshot");
+
+        assert!(matches!(err, Error::Io(_)), "got {err:?}");
+        assert!(target.exists(), "existing index must survive");
+        assert!(!staging_path(&target, ".import").exists());
+    }
+
+    #[test]
+    fn refuses_a_file_that_is_not_a_snapshot() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let not_snapshot = dir.path().join("plain.gz");
+        let mut encoder = GzEncoder::new(
+            File::create(&not_snapshot).expect("create"),
+            Compression::default(),
+        );
+        encoder.write_all(&[0u8; 64]).expect("write");
+        encoder.finish().expect("finish");
+
+        let err = Index::import_snapshot(&not_snapshot, &dir.path().join("t.db"))
+            .expect_err("not a snapshot");
+
+        assert!(matches!(err, Error::Config(_)), "got {err:?}");
+    }
+}
@@ -1,13 +1,21 @@
 //! Symbol CRUD operations for the Tethys index.
 
+use std::collections::{HashMap, HashSet};
+
 use rusqlite::OptionalExtension;
 use rusqlite::params;
 use tracing::{debug, trace};
 
-use super::{Index, SYMBOLS_COLUMNS, row_to_symbol};
+use super::{Index, SYMBOLS_COLUMNS, row_to_symbol, symbol_kind_code};
 use crate::error::Result;
 use crate::types::{FileId, Symbol, SymbolId, SymbolKind};
 
+/// How many trigram candidates the fuzzy search tier reads per wanted
+/// result, best `bm25` rank first. Bounds the work of a query holding a
+/// common trigram (`get`, `new`) at the cost of occasionally missing a
+/// subsequence match that shares few of the query's trigrams.
+const FUZZY_CANDIDATE_FACTOR: usize = 16;
+
 /// Parameters for inserting a symbol into the index (test-only).
 #[cfg(test)]
 pub(crate) struct InsertSymbolParams<'a> {
@@ -32,21 +40,21 @@ impl Index {
         let conn = self.connection()?;
 
         conn.execute(
-            "INSERT INTO symbols (file_id, name, module_path, qualified_name, kind, line, column,
-             end_line, end_column, signature, visibility, parent_symbol_id, is_test)
+            "INSERT INTO symbols (file_id, name, module_path, qualified_name, kind_code, line, column,
+             end_line, end_column, signature, visibility_code, parent_symbol_id, is_test)
              VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?12, ?13)",
             params![
                 params.file_id.as_i64(),
                 params.name,
                 params.module_path,
                 params.qualified_name,
-                params.kind.as_str(),
+                symbol_kind_code(params.kind),
                 params.line,
                 params.column,
                 params.span.map(|s| s.end_line()),
                 params.span.map(|s| s.end_column()),
                 params.signature,
-                params.visibility.as_str(),
+                super::visibility_code(params.visibility),
                 params.parent_symbol_id.map(SymbolId::as_i64),
                 params.is_test
             ],
@@ -69,30 +77,167 @@ impl Index {
         Ok(symbols)
     }
 
-    /// Search symbols by name pattern.
+    /// Search symbols by name, ranked best-first, returning at most `limit`.
+    ///
+    /// Candidates are symbols whose `name` or `qualified_name` contains
+    /// `query` (case-insensitive), found through the `symbols_fts` trigram
+    /// index; queries shorter than three characters have no trigrams and
+    /// fall back to a `LIKE` scan. Ranking tiers, ties broken by shorter
+    /// `qualified_name`:
+    ///
+    /// 0. exact name (case-sensitive), 1. name prefix, 2. match starting at
+    ///    a word boundary in the name (camel hump or after `_`), 3. substring
+    ///    of the name, 4. substring of the qualified name only.
+    ///
+    /// The ordering runs in SQL with `LIMIT`, so `SQLite` keeps a bounded
+    /// top-k sorter rather than materializing every candidate. Only when
+    /// the substring tiers leave room does a fuzzy pass add
+    /// subsequence-only matches (`hmap` → `HashMap`), camel-case initials
+    /// first. That pass draws its candidates from the trigram index too, so
+    /// it needs a query of three or more characters and only finds names
+    /// sharing at least one trigram with it (`usertok` →
+    /// `user_token`, but not initials alone such as `gubi`).
     pub fn search_symbols(&self, query: &str, limit: usize) -> Result<Vec<Symbol>> {
-        if query.is_empty() {
+        if query.is_empty() || limit == 0 {
             return Ok(vec![]);
         }
 
-        let pattern = format!("%{query}%");
         let limit_i64 = i64::try_from(limit).unwrap_or(i64::MAX);
+        let escaped = escape_like(query);
+        let cap = capitalize(query);
         let conn = self.connection()?;
 
+        let (candidates, needle) = if query.chars().count() >= 3 {
+            (
+                "id IN (SELECT rowid FROM symbols_fts WHERE symbols_fts MATCH ?6)",
+                format!("\"{}\"", query.replace('"', "\"\"")),
+            )
+        } else {
+            (
+                "(name LIKE ?6 ESCAPE '\\' OR qualified_name LIKE ?6 ESCAPE '\\')",
+                format!("%{escaped}%"),
+            )
+        };
         let mut stmt = conn.prepare(&format!(
             "SELECT {SYMBOLS_COLUMNS} FROM symbols \
-             WHERE name LIKE ?1 OR qualified_name LIKE ?1 \
-             ORDER BY CASE WHEN name = ?2 THEN 0 ELSE 1 END, length(qualified_name) \
-             LIMIT ?3"
+             WHERE {candidates} \
+             ORDER BY CASE \
+                 WHEN name = ?1 THEN 0 \
+                 WHEN name LIKE ?2 ESCAPE '\\' THEN 1 \
+                 WHEN instr(name, ?3) > 1 OR name LIKE ?4 ESCAPE '\\' THEN 2 \
+                 WHEN name LIKE ?5 ESCAPE '\\' THEN 3 \
+                 ELSE 4 END, length(qualified_name), id \
+             LIMIT ?7"
         ))?;
 
-        let symbols = stmt
-            .query_map(params![pattern, query, limit_i64], row_to_symbol)?
+        let mut symbols = stmt
+            .query_map(
+                params![
+                    query,
+                    format!("{escaped}%"),
+                    cap,
+                    format!("%\\_{escaped}%"),
+                    format!("%{escaped}%"),
+                    needle,
+                    limit_i64
+                ],
+                row_to_symbol,
+            )?
             .collect::<std::result::Result<Vec<_>, _>>()?;
+        drop(stmt);
+
+        if symbols.len() < limit && query.chars().count() >= 3 {
+            let found: HashSet<SymbolId> = symbols.iter().map(|s| s.id).collect();
+            let extra = Self::fuzzy_symbol_matches(&conn, query, &found, limit - symbols.len())?;
+            symbols.extend(extra);
+        }
 
+        trace!(query, results = symbols.len(), "Symbol search complete");
         Ok(symbols)
     }
 
+    /// The fuzzy tier of [`Self::search_symbols`]: up to `want` symbols
+    /// whose name holds `query` as a case-insensitive subsequence, skipping
+    /// `found`. Candidates are the names sharing a trigram with `query`,
+    /// read from `symbols_fts` best-ranked first (names holding more of the
+    /// query's trigrams) up to `want * FUZZY_CANDIDATE_FACTOR` beyond
+    /// `found`, then ranked by [`fuzzy_rank`].
+    fn fuzzy_symbol_matches(
+        conn: &rusqlite::Connection,
+        query: &str,
+        found: &HashSet<SymbolId>,
+        want: usize,
+    ) -> Result<Vec<Symbol>> {
+        let chars: Vec<char> = query.chars().collect();
+        let mut trigrams: Vec<String> = chars
+            .windows(3)
+            .map(|w| format!("\"{}\"", w.iter().collect::<String>().replace('"', "\"\"")))
+            .collect();
+        trigrams.sort_unstable();
+        trigrams.dedup();
+        let needle = format!("name : ({})", trigrams.join(" OR "));
+        let scan = want
+            .saturating_mul(FUZZY_CANDIDATE_FACTOR)
+            .saturating_add(found.len());
+        let scan = i64::try_from(scan).unwrap_or(i64::MAX);
+
+        let mut stmt = conn.prepare_cached(
+            "SELECT s.id, s.name \
+             FROM (SELECT rowid FROM symbols_fts WHERE symbols_fts MATCH ?1 \
+                   ORDER BY rank LIMIT ?2) AS c \
+             CROSS JOIN symbols AS s ON s.id = c.rowid",
+        )?;
+        let mut ranked: Vec<(u32, usize, SymbolId)> = Vec::new();
+        for row in stmt.query_map(params![needle, scan], |r| {
+            Ok((SymbolId::from(r.get::<_, i64>(0)?), r.get::<_, String>(1)?))
+        })? {
+            let (id, name) = row?;
+            if found.contains(&id) {
+                continue;
+            }
+            if let Some(rank) = fuzzy_rank(query, &name) {
+                ranked.push((rank, name.len(), id));
+            }
+        }
+        ranked.sort_unstable();
+        ranked.truncate(want);
+        if ranked.is_empty() {
+            return Ok(Vec::new());
+        }
+
+        let placeholders = vec!["?"; ranked.len()].join(",");
+        let mut stmt = conn.prepare(&format!(
+            "SELECT {SYMBOLS_COLUMNS} FROM symbols WHERE id IN ({placeholders})"
+        ))?;
+        let mut by_id: HashMap<SymbolId, Symbol> = stmt
+            .query_map(
+                rusqlite::params_from_iter(ranked.iter().map(|(_, _, id)| id.as_i64())),
+                row_to_symbol,
+            )?
+            .map(|r| r.map(|s| (s.id, s)))
+            .collect::<std::result::Result<_, _>>()?;
+        Ok(ranked
+            .iter()
+            .filter_map(|(_, _, id)| by_id.remove(id))
+            .collect())
+    }
+
+    /// The distinct names of the symbols defined in the files at `paths`
+    /// (normalized workspace-relative paths).
+    pub(crate) fn symbol_names_in_files(&self, paths: &HashSet<String>) -> Result<HashSet<String>> {
+        let conn = self.connection()?;
+        let mut stmt = conn.prepare_cached(
+            "SELECT s.name FROM files f JOIN symbols s ON s.file_id = f.id WHERE f.path = ?1",
+        )?;
+        let mut names = HashSet::new();
+        for path in paths {
+            for name in stmt.query_map([path], |row| row.get::<_, String>(0))? {
+                names.insert(name?);
+            }
+        }
+        Ok(names)
+    }
+
     /// Get a symbol by its database ID.
     pub fn get_symbol_by_id(&self, id: SymbolId) -> Result<Option<Symbol>> {
         trace!(symbol_id = %id, "Looking up symbol by ID");
@@ -129,11 +274,11 @@ impl Index {
         let conn = self.connection()?;
 
         let mut stmt = conn.prepare(&format!(
-            "SELECT {SYMBOLS_COLUMNS} FROM symbols WHERE kind = ?1 LIMIT ?2"
+            "SELECT {SYMBOLS_COLUMNS} FROM symbols WHERE kind_code = ?1 LIMIT ?2"
         ))?;
 
         let symbols = stmt
-            .query_map(params![kind.as_str(), limit_i64], row_to_symbol)?
+            .query_map(params![symbol_kind_code(kind), limit_i64], row_to_symbol)?
             .collect::<std::result::Result<Vec<_>, _>>()?;
 
         Ok(symbols)
@@ -509,6 +654,78 @@ impl Index {
     }
 }
 
+/// Escape `LIKE` metacharacters so `text` matches literally under
+/// `ESCAPE '\'`.
+fn escape_like(text: &str) -> String {
+    let mut out = String::with_capacity(text.len());
+    for c in text.chars() {
+        if matches!(c, '%' | '_' | '\\') {
+            out.push('\\');
+        }
+        out.push(c);
+    }
+    out
+}
+
+/// `query` with its first character uppercased: the form a match takes
+/// when it starts on a camel hump (`map` in `HashMap`).
+fn capitalize(query: &str) -> String {
+    let mut chars = query.chars();
+    chars.next().map_or_else(String::new, |first| {
+        first.to_uppercase().chain(chars).collect()
+    })
+}
+
+/// Rank a subsequence match of `query` in `name`, lower is better, or
+/// `None` if `query` is not a case-insensitive subsequence of `name`.
+///
+/// 0 when every query character lands on a word start (camel-case
+/// initials: `gubi` in `get_user_by_id`, `hm` in `HashMap`); otherwise
+/// 1 plus the number of name characters skipped between the first and
+/// last matched character, so tighter matches rank first.
+fn fuzzy_rank(query: &str, name: &str) -> Option<u32> {
+    let chars: Vec<char> = name.chars().collect();
+    let word_start = |i: usize| {
+        i == 0 || chars[i - 1] == '_' || (chars[i].is_uppercase() && !chars[i - 1].is_uppercase())
+    };
+
+    // Initials: match each query character against word starts only.
+    let starts: String = (0..chars.len())
+        .filter(|&i| word_start(i))
+        .flat_map(|i| chars[i].to_lowercase())
+        .collect();
+    if is_subsequence(&query.to_lowercase(), &starts) {
+        return Some(0);
+    }
+
+    // Greedy leftmost subsequence; the gap count is the spread minus the
+    // matched characters.
+    let mut matched = 0usize;
+    let mut first = None;
+    let mut last = 0usize;
+    let mut wanted = query.chars().flat_map(char::to_lowercase).peekable();
+    for (i, c) in chars.iter().enumerate() {
+        let Some(&q) = wanted.peek() else { break };
+        if c.to_lowercase().eq(std::iter::once(q)) {
+            first.get_or_insert(i);
+            last = i;
+            matched += 1;
+            wanted.next();
+        }
+    }
+    if wanted.peek().is_some() {
+        return None;
+    }
+    let spread = last + 1 - first.unwrap_or(0);
+    Some(1 + u32::try_from(spread - matched).unwrap_or(u32::MAX - 1))
+}
+
+/// Whether `needle` is a subsequence of `haystack`.
+fn is_subsequence(needle: &str, haystack: &str) -> bool {
+    let mut hay = haystack.chars();
+    needle.chars().all(|c| hay.any(|h| h == c))
+}
+
 #[cfg(test)]
 mod search_in_prefix_tests {
     use super::*;
@@ -1180,3 +1397,136 @@ mod search_by_name_ambiguity_tests {
         assert!(seen.contains(&a1.as_i64()) && seen.contains(&a2.as_i64()));
     }
 }
+
+#[cfg(test)]
+mod search_ranking_tests {
+    use super::*;
+    use crate::db::Index;
+    use crate::types::{Language, Visibility};
+
+    fn insert(index: &Index, file_id: FileId, name: &str, qualified_name: &str) -> SymbolId {
+        index
+            .insert_symbol(&InsertSymbolParams {
+                file_id,
+                name,
+                module_path: "crate",
+                qualified_name,
+                kind: SymbolKind::Function,
+                line: 1,
+                column: 1,
+                span: None,
+                signature: None,
+                visibility: Visibility::Public,
+                parent_symbol_id: None,
+                is_test: false,
+            })
+            .expect("symbol")
+    }
+
+    fn names(symbols: &[Symbol]) -> Vec<&str> {
+        symbols.iter().map(|s| s.name.as_str()).collect()
+    }
+
+    #[test]
+    fn ranks_exact_prefix_boundary_substring_then_fuzzy() {
+        let dir = tempfile::tempdir().expect("temp dir");
+        let mut index = Index::open(&dir.path().join("idx.db")).expect("open");
+        let file_id = index
+            .upsert_file(
+                std::path::Path::new("src/lib.rs"),
+                Language::Rust,
+                0,
+                0,
+                None,
+            )
+            .expect("file");
+
+        insert(&index, file_id, "reauthorize", "crate::reauthorize");
+        insert(&index, file_id, "run", "crate::auth::run");
+        insert(&index, file_id, "UserAuth", "crate::UserAuth");
+        insert(&index, file_id, "authorize", "crate::authorize");
+        insert(&index, file_id, "auth", "crate::auth");
+        insert(
+            &index,
+            file_id,
+            "auto_theme_handler",
+            "crate::auto_theme_handler",
+        );
+
+        let results = index.search_symbols("auth", 10).expect("search");
+        assert_eq!(
+            names(&results),
+            [
+                "auth",
+                "authorize",
+                "UserAuth",
+                "reauthorize",
+                "run",
+                "auto_theme_handler",
+            ],
+            "exact, prefix, camel hump, name substring, qualified-name-only, \
+             then subsequence-only"
+        );
+
+        // Not a substring of any name: only the fuzzy tier answers, from the
+        // names sharing a trigram with the query.
+        let results = index.search_symbols("autoth", 10).expect("search");
+        assert_eq!(names(&results), ["auto_theme_handler"]);
+        let results = index.search_symbols("aoth", 10).expect("search");
+        assert!(
+            names(&results).is_empty(),
+            "a subsequence sharing no trigram is not a candidate"
+        );
+        let results = index.search_symbols("auth", 1).expect("search");
+        assert_eq!(names(&results), ["auth"], "limit applies across tiers");
+    }
+
+    #[test]
+    fn trigram_index_follows_deletes() {
+        let dir = tempfile::tempdir().expect("temp dir");
+        let mut index = Index::open(&dir.path().join("idx.db")).expect("open");
+        let file_id = index
+            .upsert_file(
+                std::path::Path::new("src/lib.rs"),
+                Language::Rust,
+                0,
+                0,
+                None,
+            )
+            .expect("file");
+        insert(&index, file_id, "handle_request", "crate::handle_request");
+        assert_eq!(
+            index.search_symbols("request", 10).expect("search").len(),
+            1
+        );
+
+        index
+            .connection()
+            .expect("conn")
+            .execute("DELETE FROM files WHERE id = ?1", [file_id.as_i64()])
+            .expect("delete file");
+        assert!(
+            index
+                .search_symbols("request", 10)
+                .expect("search")
+                .is_empty(),
+            "cascaded symbol deletes must leave no trigram postings behind"
+        );
+    }
+
+    #[test]
+    fn fuzzy_rank_prefers_initials_then_tighter_spans() {
+        assert_eq!(fuzzy_rank("gubi", "get_user_by_id"), Some(0));
+        assert_eq!(fuzzy_rank("hm", "HashMap"), Some(0));
+        assert_eq!(fuzzy_rank("hmap", "HashMap"), Some(4));
+        assert!(fuzzy_rank("hmap", "HashMap") < fuzzy_rank("hmap", "hxxmxxaxxp"));
+        assert_eq!(fuzzy_rank("xyz", "HashMap"), None);
+    }
+
+    #[test]
+    fn like_metacharacters_match_literally() {
+        assert_eq!(escape_like("a_b%c\\"), "a\\_b\\%c\\\\");
+        assert_eq!(capitalize("map"), "Map");
+        assert_eq!(capitalize(""), "");
+    }
+}
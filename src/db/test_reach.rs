@@ -0,0 +1,719 @@
+//! Test reachability, persisted and maintained across indexing runs.
+//!
+//! [`Index::get_untested_code`] needs every symbol some test reaches over
+//! resolved refs, which takes a traversal of the whole reference graph;
+//! after a small edit almost all of the answer is unchanged. So the reached
+//! set is kept in `test_reach`, with two numbers per symbol: its distance in
+//! refs from the nearest test, and its *witnesses*, the reached symbols
+//! referencing it from one step closer. A symbol keeps its distance for as
+//! long as one witness is left, so a run that removes refs only revisits
+//! the symbols whose last witness went, and one that adds refs only what
+//! they bring closer. Witnesses are counted per level rather than per path,
+//! which keeps the counts finite and exact on cycles.
+//!
+//! An update tells the maintenance what it rewrote in two ways:
+//! [`Index::begin_test_reach`] records the targets of the refs in the files
+//! it is about to re-parse (Pass 1 deletes those refs along with the
+//! files' symbols), and a temporary trigger on `refs` logs every resolution
+//! the later passes make, in any file. Every other run (a full index, a
+//! rebuild) recomputes the set. The set is current while its `derived_state`
+//! row holds the current generation; a reader that finds it otherwise (after a
+//! cancelled or failed run, or in an index an older tethys wrote) traverses
+//! the graph itself.
+
+use std::cmp::Reverse;
+use std::collections::{BinaryHeap, HashMap, HashSet, VecDeque};
+
+use rusqlite::{Connection, OptionalExtension, params};
+use tracing::debug;
+
+use super::Index;
+use super::changes::{is_derived_current, mark_derived_current};
+use super::helpers::query_ids;
+use crate::error::Result;
+use crate::types::{SymbolId, TestReach};
+
+/// This table's row in `derived_state`.
+const DERIVED_NAME: &str = "test_reach";
+
+/// Connection-local state of an incremental run, filled by
+/// [`Index::begin_test_reach`] and by the trigger while the run resolves
+/// refs: the rewritten files, the symbols that may have lost a witness
+/// (`suspects`), and the symbols that gained a ref (`sources`).
+const BEGIN_SQL: &str = "
+DROP TRIGGER IF EXISTS temp.test_reach_resolved;
+CREATE TEMP TABLE IF NOT EXISTS test_reach_files (path TEXT PRIMARY KEY);
+CREATE TEMP TABLE IF NOT EXISTS test_reach_suspects (symbol_id INTEGER PRIMARY KEY);
+CREATE TEMP TABLE IF NOT EXISTS test_reach_sources (symbol_id INTEGER PRIMARY KEY);
+DELETE FROM temp.test_reach_files;
+DELETE FROM temp.test_reach_suspects;
+DELETE FROM temp.test_reach_sources;
+CREATE TEMP TRIGGER test_reach_resolved
+AFTER UPDATE OF symbol_id ON main.refs
+WHEN NEW.in_symbol_id IS NOT NULL
+BEGIN
+    INSERT OR IGNORE INTO test_reach_sources (symbol_id)
+    SELECT NEW.in_symbol_id WHERE NEW.symbol_id IS NOT NULL;
+    INSERT OR IGNORE INTO test_reach_suspects (symbol_id)
+    SELECT OLD.symbol_id WHERE OLD.symbol_id IS NOT NULL
+    UNION SELECT NEW.symbol_id WHERE NEW.symbol_id IS NOT NULL;
+END;
+";
+
+/// The targets of the edges leaving the rewritten files' symbols, and of
+/// any other ref stored in those files, while they still exist. Here and
+/// below, `CROSS JOIN` keeps the few rewritten files driving the join.
+const SUSPECTS_SQL: &str = "
+INSERT OR IGNORE INTO temp.test_reach_suspects (symbol_id)
+SELECT r.symbol_id FROM refs r
+WHERE r.in_symbol_id IN (
+    SELECT s.id FROM temp.test_reach_files t
+    CROSS JOIN files f ON f.path = t.path
+    CROSS JOIN symbols s ON s.file_id = f.id
+)
+  AND r.symbol_id IS NOT NULL
+UNION
+SELECT r.symbol_id FROM temp.test_reach_files t
+CROSS JOIN files f ON f.path = t.path
+CROSS JOIN refs r ON r.file_id = f.id
+WHERE r.in_symbol_id IS NOT NULL AND r.symbol_id IS NOT NULL
+";
+
+const END_SQL: &str = "
+DROP TRIGGER IF EXISTS temp.test_reach_resolved;
+DROP TABLE IF EXISTS temp.test_reach_files;
+DROP TABLE IF EXISTS temp.test_reach_suspects;
+DROP TABLE IF EXISTS temp.test_reach_sources;
+";
+
+/// A reached symbol's entry in `test_reach`.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+struct Reach {
+    distance: u32,
+    witnesses: u32,
+}
+
+/// The reference graph as the maintenance walks it: distinct symbols
+/// referenced by, and referencing, a symbol over resolved refs.
+trait RefGraph {
+    fn successors(&self, id: i64) -> Result<Vec<i64>>;
+    fn predecessors(&self, id: i64) -> Result<Vec<i64>>;
+}
+
+struct SqlGraph<'c>(&'c Connection);
+
+impl RefGraph for SqlGraph<'_> {
+    fn successors(&self, id: i64) -> Result<Vec<i64>> {
+        let mut stmt = self.0.prepare_cached(
+            "SELECT DISTINCT symbol_id FROM refs
+             WHERE in_symbol_id = ?1 AND symbol_id IS NOT NULL",
+        )?;
+        let ids = stmt
+            .query_map([id], |row| row.get(0))?
+            .collect::<std::result::Result<_, _>>()?;
+        Ok(ids)
+    }
+
+    fn predecessors(&self, id: i64) -> Result<Vec<i64>> {
+        let mut stmt = self.0.prepare_cached(
+            "SELECT DISTINCT in_symbol_id FROM refs
+             WHERE symbol_id = ?1 AND in_symbol_id IS NOT NULL",
+        )?;
+        let ids = stmt
+            .query_map([id], |row| row.get(0))?
+            .collect::<std::result::Result<_, _>>()?;
+        Ok(ids)
+    }
+}
+
+/// What an incremental run rewrote.
+#[derive(Debug, Default)]
+struct Delta {
+    /// Symbols that may have lost a witness: the targets of deleted or
+    /// re-resolved refs.
+    suspects: Vec<i64>,
+    /// Symbols that may have gained an edge: every symbol of a rewritten
+    /// file, and the sources of refs resolved during the run.
+    sources: Vec<i64>,
+    /// The tests among the rewritten files' symbols.
+    roots: Vec<i64>,
+}
+
+/// Test roots and the distinct edges of the reference graph.
+fn load_graph(conn: &Connection) -> Result<(Vec<i64>, HashMap<i64, Vec<i64>>)> {
+    let roots = query_ids(conn, "SELECT id FROM symbols WHERE is_test = 1")?;
+    let mut stmt = conn.prepare(
+        "SELECT DISTINCT in_symbol_id, symbol_id FROM refs
+         WHERE in_symbol_id IS NOT NULL AND symbol_id IS NOT NULL",
+    )?;
+    let mut edges: HashMap<i64, Vec<i64>> = HashMap::new();
+    for row in stmt.query_map([], |row| Ok((row.get(0)?, row.get(1)?)))? {
+        let (from, to): (i64, i64) = row?;
+        edges.entry(from).or_default().push(to);
+    }
+    Ok((roots, edges))
+}
+
+/// Distances and witnesses of everything `roots` reach over `edges`
+/// (distinct per source), by one breadth-first pass.
+fn levels(roots: &[i64], edges: &HashMap<i64, Vec<i64>>) -> HashMap<i64, Reach> {
+    let mut reach: HashMap<i64, Reach> = HashMap::new();
+    let mut queue = VecDeque::new();
+    for &root in roots {
+        if reach
+            .insert(
+                root,
+                Reach {
+                    distance: 0,
+                    witnesses: 0,
+                },
+            )
+            .is_none()
+        {
+            queue.push_back(root);
+        }
+    }
+    while let Some(current) = queue.pop_front() {
+        let distance = reach[&current].distance + 1;
+        for &next in edges.get(&current).map(Vec::as_slice).unwrap_or_default() {
+            match reach.get_mut(&next) {
+                Some(r) if r.distance == distance => r.witnesses += 1,
+                Some(_) => {}
+                None => {
+                    reach.insert(
+                        next,
+                        Reach {
+                            distance,
+                            witnesses: 1,
+                        },
+                    );
+                    queue.push_back(next);
+                }
+            }
+        }
+    }
+    reach
+}
+
+/// The reached predecessors of `id` one step closer than `distance`.
+fn count_witnesses(
+    reach: &HashMap<i64, Reach>,
+    graph: &impl RefGraph,
+    id: i64,
+    distance: u32,
+) -> Result<u32> {
+    let count = graph
+        .predecessors(id)?
+        .into_iter()
+        .filter(|p| reach.get(p).is_some_and(|r| r.distance + 1 == distance))
+        .count();
+    Ok(u32::try_from(count).unwrap_or(u32::MAX))
+}
+
+/// Bring `reach` from before a run to after it, given what the run
+/// rewrote; `graph` is the graph after the run. Returns the symbols whose
+/// entry changed or went.
+///
+/// Symbols that lost their last witness, and transitively the ones they
+/// alone witnessed, lose their distance; a shortest-path pass seeded from
+/// their surviving neighbours, the new tests and the new edges then settles
+/// every distance the run moved, and the witnesses of everything around a
+/// moved distance or a changed edge are counted again.
+fn apply(
+    reach: &mut HashMap<i64, Reach>,
+    graph: &impl RefGraph,
+    delta: &Delta,
+) -> Result<HashSet<i64>> {
+    let mut dirty: HashSet<i64> = HashSet::new();
+
+    // Removals: recount the suspects, then withdraw the support of every
+    // symbol left without a witness.
+    let mut orphaned = VecDeque::new();
+    for &id in &delta.suspects {
+        let Some(distance) = reach.get(&id).map(|r| r.distance) else {
+            continue;
+        };
+        if distance == 0 {
+            continue;
+        }
+        let witnesses = count_witnesses(reach, graph, id, distance)?;
+        if let Some(r) = reach.get_mut(&id) {
+            r.witnesses = witnesses;
+        }
+        dirty.insert(id);
+        if witnesses == 0 {
+            orphaned.push_back(id);
+        }
+    }
+    let mut affected: HashSet<i64> = HashSet::new();
+    while let Some(id) = orphaned.pop_front() {
+        if !affected.insert(id) {
+            continue;
+        }
+        let distance = reach[&id].distance;
+        for next in graph.successors(id)? {
+            if affected.contains(&next) {
+                continue;
+            }
+            if let Some(r) = reach.get_mut(&next)
+                && r.distance == distance + 1
+            {
+                r.witnesses = r.witnesses.saturating_sub(1);
+                dirty.insert(next);
+                if r.witnesses == 0 {
+                    orphaned.push_back(next);
+                }
+            }
+        }
+    }
+    for id in &affected {
+        reach.remove(id);
+    }
+    dirty.extend(&affected);
+
+    // Settle: every distance is an upper bound now, and each seed is a
+    // place a shorter one can enter.
+    let mut heap = BinaryHeap::new();
+    for &id in &affected {
+        let best = graph
+            .predecessors(id)?
+            .into_iter()
+            .filter_map(|p| reach.get(&p).map(|r| r.distance + 1))
+            .min();
+        if let Some(distance) = best {
+            heap.push(Reverse((distance, id)));
+        }
+    }
+    for &root in &delta.roots {
+        heap.push(Reverse((0, root)));
+    }
+    for &source in &delta.sources {
+        if let Some(r) = reach.get(&source) {
+            let distance = r.distance + 1;
+            for next in graph.successors(source)? {
+                heap.push(Reverse((distance, next)));
+            }
+        }
+    }
+    while let Some(Reverse((distance, id))) = heap.pop() {
+        if reach.get(&id).is_some_and(|r| r.distance <= distance) {
+            continue;
+        }
+        reach.insert(
+            id,
+            Reach {
+                distance,
+                witnesses: 0,
+            },
+        );
+        dirty.insert(id);
+        for next in graph.successors(id)? {
+            if reach.get(&next).is_none_or(|r| r.distance > distance + 1) {
+                heap.push(Reverse((distance + 1, next)));
+            }
+        }
+    }
+
+    // Witnesses change with a symbol's distance, its predecessors'
+    // distances, and its in-edges.
+    let mut recount: HashSet<i64> = dirty.clone();
+    recount.extend(&delta.suspects);
+    for &id in dirty.iter().chain(&delta.sources) {
+        recount.extend(graph.successors(id)?);
+    }
+    for id in recount {
+        let Some(distance) = reach.get(&id).map(|r| r.distance) else {
+            continue;
+        };
+        let witnesses = if distance == 0 {
+            0
+        } else {
+            count_witnesses(reach, graph, id, distance)?
+        };
+        if let Some(r) = reach.get_mut(&id)
+            && r.witnesses != witnesses
+        {
+            r.witnesses = witnesses;
+            dirty.insert(id);
+        }
+    }
+    Ok(dirty)
+}
+
+fn to_sql(value: u32) -> i64 {
+    i64::from(value)
+}
+
+fn from_sql(value: i64) -> u32 {
+    u32::try_from(value).unwrap_or(u32::MAX)
+}
+
+/// The symbols some test reaches, from `test_reach` when it is current.
+pub(super) fn stored_reached(conn: &Connection) -> Result<Option<HashSet<i64>>> {
+    if !is_derived_current(conn, DERIVED_NAME)? {
+        return Ok(None);
+    }
+    let reached = query_ids(conn, "SELECT symbol_id FROM test_reach")?;
+    Ok(Some(reached.into_iter().collect()))
+}
+
+fn load_reach(conn: &Connection) -> Result<HashMap<i64, Reach>> {
+    let mut stmt = conn.prepare("SELECT symbol_id, distance, witnesses FROM test_reach")?;
+    let mut reach = HashMap::new();
+    for row in stmt.query_map([], |row| {
+        Ok((
+            row.get::<_, i64>(0)?,
+            row.get::<_, i64>(1)?,
+            row.get::<_, i64>(2)?,
+        ))
+    })? {
+        let (id, distance, witnesses) = row?;
+        reach.insert(
+            id,
+            Reach {
+                distance: from_sql(distance),
+                witnesses: from_sql(witnesses),
+            },
+        );
+    }
+    Ok(reach)
+}
+
+fn store_reach<'a>(
+    conn: &Connection,
+    reach: &HashMap<i64, Reach>,
+    ids: impl IntoIterator<Item = &'a i64>,
+) -> Result<()> {
+    let mut upsert = conn.prepare_cached(
+        "INSERT INTO test_reach (symbol_id, distance, witnesses) VALUES (?1, ?2, ?3)
+         ON CONFLICT (symbol_id) DO UPDATE
+         SET distance = excluded.distance, witnesses = excluded.witnesses",
+    )?;
+    let mut delete = conn.prepare_cached("DELETE FROM test_reach WHERE symbol_id = ?1")?;
+    for &id in ids {
+        match reach.get(&id) {
+            Some(r) => upsert.execute(params![id, to_sql(r.distance), to_sql(r.witnesses)])?,
+            None => delete.execute([id])?,
+        };
+    }
+    Ok(())
+}
+
+/// Replace `test_reach` with a traversal of the whole graph.
+fn rebuild(conn: &Connection) -> Result<usize> {
+    let (roots, edges) = load_graph(conn)?;
+    let reach = levels(&roots, &edges);
+    conn.execute("DELETE FROM test_reach", [])?;
+    store_reach(conn, &reach, reach.keys())?;
+    Ok(reach.len())
+}
+
+/// Update `test_reach` from the state an incremental run collected.
+fn update(conn: &Connection) -> Result<usize> {
+    let delta = Delta {
+        suspects: query_ids(conn, "SELECT symbol_id FROM temp.test_reach_suspects")?,
+        sources: query_ids(
+            conn,
+            "SELECT symbol_id FROM temp.test_reach_sources
+             UNION
+             SELECT s.id FROM temp.test_reach_files t
+             CROSS JOIN files f ON f.path = t.path
+             CROSS JOIN symbols s ON s.file_id = f.id",
+        )?,
+        roots: query_ids(
+            conn,
+            "SELECT s.id FROM temp.test_reach_files t
+             CROSS JOIN files f ON f.path = t.path
+             CROSS JOIN symbols s ON s.file_id = f.id
+             WHERE +s.is_test = 1",
+        )?,
+    };
+    let mut reach = load_reach(conn)?;
+    let dirty = apply(&mut reach, &SqlGraph(conn), &delta)?;
+    store_reach(conn, &reach, &dirty)?;
+    Ok(dirty.len())
+}
+
+/// Update `test_reach` and stamp it current at `generation`, in one
+/// transaction. Returns the number of entries written.
+fn refresh(conn: &mut Connection, generation: u64, incremental: bool) -> Result<usize> {
+    let tx = conn.transaction()?;
+    let written = if incremental {
+        update(&tx)?
+    } else {
+        rebuild(&tx)?
+    };
+    mark_derived_current(&tx, DERIVED_NAME, generation)?;
+    tx.commit()?;
+    Ok(written)
+}
+
+/// Whether [`Index::begin_test_reach`] prepared an incremental run on
+/// this connection.
+fn is_prepared(conn: &Connection) -> Result<bool> {
+    Ok(conn.query_row(
+        "SELECT EXISTS (SELECT 1 FROM temp.sqlite_master
+                        WHERE type = 'trigger' AND name = 'test_reach_resolved')",
+        [],
+        |row| row.get(0),
+    )?)
+}
+
+/// Record `rewritten` and the targets of their refs, while those exist.
+fn record_rewritten(conn: &Connection, rewritten: &HashSet<String>) -> Result<()> {
+    {
+        let mut insert =
+            conn.prepare_cached("INSERT OR IGNORE INTO temp.test_reach_files (path) VALUES (?1)")?;
+        for path in rewritten {
+            insert.execute([path])?;
+        }
+    }
+    conn.execute(SUSPECTS_SQL, [])?;
+    Ok(())
+}
+
+impl Index {
+    /// Prepare `test_reach` for an update that re-parses or deletes the
+    /// files in `rewritten` (normalized workspace-relative paths). Without
+    /// a current set to start from, nothing is prepared and
+    /// [`Self::finish_test_reach`] recomputes it.
+    pub(crate) fn begin_test_reach(&self, rewritten: &HashSet<String>) -> Result<()> {
+        let conn = self.connection()?;
+        if !is_derived_current(&conn, DERIVED_NAME)? {
+            conn.execute_batch(END_SQL)?;
+            return Ok(());
+        }
+        conn.execute_batch(BEGIN_SQL)?;
+        record_rewritten(&conn, rewritten)
+    }
+
+    /// Add `rewritten` to the files an update prepared by
+    /// [`Self::begin_test_reach`] rewrites, before it re-parses them. Does
+    /// nothing when nothing was prepared.
+    pub(crate) fn extend_test_reach(&self, rewritten: &HashSet<String>) -> Result<()> {
+        let conn = self.connection()?;
+        if !is_prepared(&conn)? {
+            return Ok(());
+        }
+        record_rewritten(&conn, rewritten)
+    }
+
+    /// Bring `test_reach` up to date with a completed run and mark it
+    /// current at `generation`: incrementally after an update prepared by
+    /// [`Self::begin_test_reach`] (`incremental`), by a full traversal
+    /// otherwise.
+    pub(crate) fn finish_test_reach(&self, generation: u64, incremental: bool) -> Result<()> {
+        let mut conn = self.connection()?;
+        let prepared = is_prepared(&conn)?;
+        conn.execute_batch("DROP TRIGGER IF EXISTS temp.test_reach_resolved;")?;
+        let incremental = incremental && prepared;
+        let result = refresh(&mut conn, generation, incremental);
+        conn.execute_batch(END_SQL)?;
+        let written = result?;
+        debug!(
+            generation,
+            incremental, written, "Updated test reachability"
+        );
+        Ok(())
+    }
+
+    /// Drop what [`Self::begin_test_reach`] prepared, for a run that did
+    /// not complete. `test_reach` stays behind the generation until the
+    /// next completed run recomputes it.
+    pub(crate) fn abandon_test_reach(&self) -> Result<()> {
+        self.connection()?.execute_batch(END_SQL)?;
+        Ok(())
+    }
+
+    /// How the tests reach symbol `id`.
+    pub(crate) fn test_reach(&self, id: SymbolId) -> Result<TestReach> {
+        let conn = self.connection()?;
+        let reach = if is_derived_current(&conn, DERIVED_NAME)? {
+            conn.query_row(
+                "SELECT distance, witnesses FROM test_reach WHERE symbol_id = ?1",
+                [id.as_i64()],
+                |row| {
+                    Ok(Reach {
+                        distance: from_sql(row.get(0)?),
+                        witnesses: from_sql(row.get(1)?),
+                    })
+                },
+            )
+            .optional()?
+        } else {
+            let (roots, edges) = load_graph(&conn)?;
+            levels(&roots, &edges).get(&id.as_i64()).copied()
+        };
+        Ok(TestReach {
+            distance: reach.map(|r| r.distance),
+            witnesses: reach.map_or(0, |r| r.witnesses),
+        })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// An in-memory graph with distinct edges.
+    struct MapGraph(Vec<(i64, i64)>);
+
+    impl RefGraph for MapGraph {
+        fn successors(&self, id: i64) -> Result<Vec<i64>> {
+            Ok(self.0.iter().filter(|e| e.0 == id).map(|e| e.1).collect())
+        }
+
+        fn predecessors(&self, id: i64) -> Result<Vec<i64>> {
+            Ok(self.0.iter().filter(|e| e.1 == id).map(|e| e.0).collect())
+        }
+    }
+
+    fn edge_map(edges: &[(i64, i64)]) -> HashMap<i64, Vec<i64>> {
+        let mut map: HashMap<i64, Vec<i64>> = HashMap::new();
+        for &(from, to) in edges {
+            map.entry(from).or_default().push(to);
+        }
+        map
+    }
+
+    fn full(roots: &[i64], edges: &[(i64, i64)]) -> HashMap<i64, Reach> {
+        levels(roots, &edge_map(edges))
+    }
+
+    fn reach(distance: u32, witnesses: u32) -> Reach {
+        Reach {
+            distance,
+            witnesses,
+        }
+    }
+
+    /// Apply the change from (`roots`, `before`) to (`roots_after`,
+    /// `after`) incrementally, with `delta` as the indexer would report
+    /// it, and check it against a traversal of the new graph.
+    fn check(
+        (roots, before): (&[i64], &[(i64, i64)]),
+        (roots_after, after): (&[i64], &[(i64, i64)]),
+        delta: &Delta,
+    ) {
+        let mut maintained = full(roots, before);
+        apply(&mut maintained, &MapGraph(after.to_vec()), delta).expect("apply");
+        assert_eq!(maintained, full(roots_after, after));
+    }
+
+    #[test]
+    fn levels_count_witnesses_one_step_closer() {
+        // 1 → 2 → 4, 1 → 3 → 4, 4 → 2 (back edge), 5 unreached.
+        let got = full(&[1], &[(1, 2), (1, 3), (2, 4), (3, 4), (4, 2), (5, 1)]);
+
+        assert_eq!(got[&1], reach(0, 0));
+        assert_eq!(got[&2], reach(1, 1));
+        assert_eq!(got[&3], reach(1, 1));
+        assert_eq!(got[&4], reach(2, 2));
+        assert!(!got.contains_key(&5));
+    }
+
+    #[test]
+    fn removing_one_witness_keeps_the_distance() {
+        let before = [(1, 2), (1, 3), (2, 4), (3, 4)];
+        let after = [(1, 2), (1, 3), (2, 4)];
+        check(
+            (&[1], &before),
+            (&[1], &after),
+            &Delta {
+                suspects: vec![4],
+                ..Delta::default()
+            },
+        );
+    }
+
+    #[test]
+    fn removing_the_last_witness_drops_a_cycle_it_fed() {
+        // 2 ↔ 3 hang off 1 only through 1 → 2.
+        let before = [(1, 2), (2, 3), (3, 2), (3, 4)];
+        let after = [(2, 3), (3, 2), (3, 4)];
+        check(
+            (&[1], &before),
+            (&[1], &after),
+            &Delta {
+                suspects: vec![2],
+                ..Delta::default()
+            },
+        );
+    }
+
+    #[test]
+    fn a_longer_path_takes_over() {
+        let before = [(1, 2), (2, 3), (1, 4), (4, 5), (5, 3), (3, 6)];
+        let after = [(1, 2), (1, 4), (4, 5), (5, 3), (3, 6)];
+        let mut maintained = full(&[1], &before);
+        apply(
+            &mut maintained,
+            &MapGraph(after.to_vec()),
+            &Delta {
+                suspects: vec![3],
+                ..Delta::default()
+            },
+        )
+        .expect("apply");
+
+        assert_eq!(maintained, full(&[1], &after));
+        assert_eq!(maintained[&6], reach(4, 1));
+    }
+
+    #[test]
+    fn new_tests_and_new_edges_bring_symbols_closer() {
+        let before = [(1, 2), (2, 3), (3, 4)];
+        let after = [(1, 2), (2, 3), (3, 4), (1, 4), (9, 3)];
+        check(
+            (&[1], &before),
+            (&[1, 9], &after),
+            &Delta {
+                sources: vec![1, 9],
+                roots: vec![9],
+                ..Delta::default()
+            },
+        );
+    }
+
+    #[test]
+    fn a_rewritten_file_moves_its_symbols() {
+        // Symbols 2 and 3 are re-indexed as 12 and 13; 13 no longer calls 4,
+        // which stays reached through 5.
+        let before = [(1, 2), (2, 3), (3, 4), (1, 5), (5, 6), (6, 4)];
+        let after = [(1, 12), (12, 13), (1, 5), (5, 6), (6, 4)];
+        let mut maintained = full(&[1], &before);
+        maintained.remove(&2);
+        maintained.remove(&3);
+        apply(
+            &mut maintained,
+            &MapGraph(after.to_vec()),
+            &Delta {
+                suspects: vec![2, 3, 4],
+                sources: vec![1, 12, 13],
+                roots: Vec::new(),
+            },
+        )
+        .expect("apply");
+
+        assert_eq!(maintained, full(&[1], &after));
+    }
+
+    #[test]
+    fn a_deleted_test_unreaches_what_only_it_reached() {
+        let before = [(1, 3), (2, 4), (4, 3)];
+        let after = [(2, 4), (4, 3)];
+        let mut maintained = full(&[1, 2], &before);
+        maintained.remove(&1);
+        apply(
+            &mut maintained,
+            &MapGraph(after.to_vec()),
+            &Delta {
+                suspects: vec![3],
+                ..Delta::default()
+            },
+        )
+        .expect("apply");
+
+        assert_eq!(maintained, full(&[2], &after));
+    }
+}
@@ -0,0 +1,317 @@
+//! Type-hierarchy closure, persisted and maintained across indexing runs.
+//!
+//! [`Index::get_type_hierarchy`] answers "every supertype of S" and "every
+//! subtype of T" from `type_closure`, one row per type and transitive
+//! supertype at the length of the shortest chain, instead of walking
+//! `inherit` refs one level per query. The edges are the resolved inherit
+//! refs anchored to a container symbol; method-level markers are not
+//! hierarchy edges. Inherit refs are few, so maintenance loads them all
+//! (through `idx_refs_inherit`) and works in memory: only the writes are
+//! incremental, and they are what a deep or wide hierarchy makes expensive.
+//!
+//! An update tells the maintenance what it rewrote the same way as for
+//! test reachability (`db/test_reach.rs`): [`Index::begin_type_closure`]
+//! records the subtypes of the types in the files it is about to re-parse,
+//! whose rows Pass 1 deletes with those types, and a temporary trigger on
+//! `refs` logs every type that gains a resolved inherit ref later in the
+//! run. Their ancestors, and those of the rewritten files' types and of
+//! everything below any of them, are then recomputed. Every other run
+//! rebuilds the table. It is current while its `derived_state` row holds
+//! the current generation; otherwise the hierarchy queries walk the refs.
+
+use std::collections::{HashMap, HashSet};
+
+use rusqlite::Connection;
+use tracing::debug;
+
+use super::Index;
+use super::changes::{is_derived_current, mark_derived_current};
+use super::helpers::query_ids;
+use super::hierarchy::CONTAINER_KINDS_SQL;
+use crate::error::Result;
+
+/// This table's row in `derived_state`.
+const DERIVED_NAME: &str = "type_closure";
+
+/// Connection-local state of an incremental run, filled by
+/// [`Index::begin_type_closure`] and by the trigger: the rewritten files,
+/// and the types whose ancestors may have changed (`dirty`).
+const BEGIN_SQL: &str = "
+DROP TRIGGER IF EXISTS temp.type_closure_resolved;
+CREATE TEMP TABLE IF NOT EXISTS type_closure_files (path TEXT PRIMARY KEY);
+CREATE TEMP TABLE IF NOT EXISTS type_closure_dirty (symbol_id INTEGER PRIMARY KEY);
+DELETE FROM temp.type_closure_files;
+DELETE FROM temp.type_closure_dirty;
+CREATE TEMP TRIGGER type_closure_resolved
+AFTER UPDATE OF symbol_id ON main.refs
+WHEN NEW.kind_code = 4 AND NEW.in_symbol_id IS NOT NULL
+BEGIN
+    INSERT OR IGNORE INTO type_closure_dirty (symbol_id) VALUES (NEW.in_symbol_id);
+END;
+";
+
+/// The subtypes of the rewritten files' types, while those still exist.
+/// `CROSS JOIN` keeps the few rewritten files driving the join.
+const DIRTY_SQL: &str = "
+INSERT OR IGNORE INTO temp.type_closure_dirty (symbol_id)
+SELECT c.descendant_id FROM type_closure c
+WHERE c.ancestor_id IN (
+    SELECT s.id FROM temp.type_closure_files t
+    CROSS JOIN files f ON f.path = t.path
+    CROSS JOIN symbols s ON s.file_id = f.id
+)
+";
+
+const END_SQL: &str = "
+DROP TRIGGER IF EXISTS temp.type_closure_resolved;
+DROP TABLE IF EXISTS temp.type_closure_files;
+DROP TABLE IF EXISTS temp.type_closure_dirty;
+";
+
+/// Direct supertypes of every type with a resolved, type-level inherit
+/// ref, deduplicated.
+fn load_supertypes(conn: &Connection) -> Result<HashMap<i64, Vec<i64>>> {
+    let mut stmt = conn.prepare(&format!(
+        "SELECT r.in_symbol_id, r.symbol_id FROM refs r
+         JOIN symbols s ON s.id = r.in_symbol_id
+         WHERE r.kind_code = 4 AND r.symbol_id IS NOT NULL
+           AND s.kind IN {CONTAINER_KINDS_SQL}"
+    ))?;
+    let mut supertypes: HashMap<i64, Vec<i64>> = HashMap::new();
+    for row in stmt.query_map([], |row| Ok((row.get(0)?, row.get(1)?)))? {
+        let (sub, sup): (i64, i64) = row?;
+        supertypes.entry(sub).or_default().push(sup);
+    }
+    for sups in supertypes.values_mut() {
+        sups.sort_unstable();
+        sups.dedup();
+    }
+    Ok(supertypes)
+}
+
+/// Every type `id` inherits from, with the length of the shortest chain.
+/// `id` itself is excluded even when it lies on a cycle.
+fn ancestors(id: i64, supertypes: &HashMap<i64, Vec<i64>>) -> Vec<(i64, u32)> {
+    let mut seen = HashSet::from([id]);
+    let mut found = Vec::new();
+    let mut frontier = vec![id];
+    let mut depth = 1u32;
+    while !frontier.is_empty() {
+        let mut next = Vec::new();
+        for current in frontier {
+            for &sup in supertypes
+                .get(&current)
+                .map(Vec::as_slice)
+                .unwrap_or_default()
+            {
+                if seen.insert(sup) {
+                    found.push((sup, depth));
+                    next.push(sup);
+                }
+            }
+        }
+        frontier = next;
+        depth += 1;
+    }
+    found
+}
+
+/// `ids` and everything below them in the hierarchy.
+fn with_subtypes(ids: &[i64], supertypes: &HashMap<i64, Vec<i64>>) -> HashSet<i64> {
+    let mut subtypes: HashMap<i64, Vec<i64>> = HashMap::new();
+    for (&sub, sups) in supertypes {
+        for &sup in sups {
+            subtypes.entry(sup).or_default().push(sub);
+        }
+    }
+    let mut seen: HashSet<i64> = ids.iter().copied().collect();
+    let mut stack = ids.to_vec();
+    while let Some(current) = stack.pop() {
+        for &sub in subtypes
+            .get(&current)
+            .map(Vec::as_slice)
+            .unwrap_or_default()
+        {
+            if seen.insert(sub) {
+                stack.push(sub);
+            }
+        }
+    }
+    seen
+}
+
+/// Replace the rows of each type in `ids`. Returns the rows written.
+fn write_ancestors<'a>(
+    conn: &Connection,
+    ids: impl IntoIterator<Item = &'a i64>,
+    supertypes: &HashMap<i64, Vec<i64>>,
+) -> Result<usize> {
+    let mut delete = conn.prepare_cached("DELETE FROM type_closure WHERE descendant_id = ?1")?;
+    let mut insert = conn.prepare_cached(
+        "INSERT INTO type_closure (descendant_id, ancestor_id, depth) VALUES (?1, ?2, ?3)",
+    )?;
+    let mut written = 0;
+    for &id in ids {
+        delete.execute([id])?;
+        for (ancestor, depth) in ancestors(id, supertypes) {
+            insert.execute([id, ancestor, i64::from(depth)])?;
+            written += 1;
+        }
+    }
+    Ok(written)
+}
+
+/// Bring `type_closure` up to date and mark it current at `generation`,
+/// in one transaction. Returns the rows written.
+fn refresh(conn: &mut Connection, generation: u64, incremental: bool) -> Result<usize> {
+    let tx = conn.transaction()?;
+    let supertypes = load_supertypes(&tx)?;
+    let written = if incremental {
+        let changed = query_ids(
+            &tx,
+            &format!(
+                "SELECT symbol_id FROM temp.type_closure_dirty
+                 UNION
+                 SELECT s.id FROM temp.type_closure_files t
+                 CROSS JOIN files f ON f.path = t.path
+                 CROSS JOIN symbols s ON s.file_id = f.id
+                 WHERE s.kind IN {CONTAINER_KINDS_SQL}"
+            ),
+        )?;
+        write_ancestors(&tx, &with_subtypes(&changed, &supertypes), &supertypes)?
+    } else {
+        tx.execute("DELETE FROM type_closure", [])?;
+        write_ancestors(&tx, supertypes.keys(), &supertypes)?
+    };
+    mark_derived_current(&tx, DERIVED_NAME, generation)?;
+    tx.commit()?;
+    Ok(written)
+}
+
+/// Whether `type_closure` describes the index at its current generation.
+pub(super) fn is_current(conn: &Connection) -> Result<bool> {
+    is_derived_current(conn, DERIVED_NAME)
+}
+
+/// Whether [`Index::begin_type_closure`] prepared an incremental run on
+/// this connection.
+fn is_prepared(conn: &Connection) -> Result<bool> {
+    Ok(conn.query_row(
+        "SELECT EXISTS (SELECT 1 FROM temp.sqlite_master
+                        WHERE type = 'trigger' AND name = 'type_closure_resolved')",
+        [],
+        |row| row.get(0),
+    )?)
+}
+
+/// Record `rewritten` and the subtypes of their types, while those exist.
+fn record_rewritten(conn: &Connection, rewritten: &HashSet<String>) -> Result<()> {
+    {
+        let mut insert = conn
+            .prepare_cached("INSERT OR IGNORE INTO temp.type_closure_files (path) VALUES (?1)")?;
+        for path in rewritten {
+            insert.execute([path])?;
+        }
+    }
+    conn.execute(DIRTY_SQL, [])?;
+    Ok(())
+}
+
+impl Index {
+    /// Prepare `type_closure` for an update that re-parses or deletes the
+    /// files in `rewritten` (normalized workspace-relative paths). Without
+    /// a current closure to start from, nothing is prepared and
+    /// [`Self::finish_type_closure`] rebuilds it.
+    pub(crate) fn begin_type_closure(&self, rewritten: &HashSet<String>) -> Result<()> {
+        let conn = self.connection()?;
+        if !is_current(&conn)? {
+            conn.execute_batch(END_SQL)?;
+            return Ok(());
+        }
+        conn.execute_batch(BEGIN_SQL)?;
+        record_rewritten(&conn, rewritten)
+    }
+
+    /// Add `rewritten` to the files an update prepared by
+    /// [`Self::begin_type_closure`] rewrites, before it re-parses them.
+    /// Does nothing when nothing was prepared.
+    pub(crate) fn extend_type_closure(&self, rewritten: &HashSet<String>) -> Result<()> {
+        let conn = self.connection()?;
+        if !is_prepared(&conn)? {
+            return Ok(());
+        }
+        record_rewritten(&conn, rewritten)
+    }
+
+    /// Bring `type_closure` up to date with a completed run and mark it
+    /// current at `generation`: incrementally after an update prepared by
+    /// [`Self::begin_type_closure`] (`incremental`), by a rebuild
+    /// otherwise.
+    pub(crate) fn finish_type_closure(&self, generation: u64, incremental: bool) -> Result<()> {
+        let mut conn = self.connection()?;
+        let prepared = is_prepared(&conn)?;
+        conn.execute_batch("DROP TRIGGER IF EXISTS temp.type_closure_resolved;")?;
+        let incremental = incremental && prepared;
+        let result = refresh(&mut conn, generation, incremental);
+        conn.execute_batch(END_SQL)?;
+        let written = result?;
+        debug!(generation, incremental, written, "Updated type closure");
+        Ok(())
+    }
+
+    /// Drop what [`Self::begin_type_closure`] prepared, for a run that did
+    /// not complete. `type_closure` stays behind the generation until the
+    /// next completed run rebuilds it.
+    pub(crate) fn abandon_type_closure(&self) -> Result<()> {
+        self.connection()?.execute_batch(END_SQL)?;
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn supertype_map(edges: &[(i64, i64)]) -> HashMap<i64, Vec<i64>> {
+        let mut map: HashMap<i64, Vec<i64>> = HashMap::new();
+        for &(sub, sup) in edges {
+            map.entry(sub).or_default().push(sup);
+        }
+        map
+    }
+
+    /// Diamond 4 → {2, 3} → 1 plus a shortcut 4 → 1: every ancestor once,
+    /// at its shortest depth.
+    #[test]
+    fn ancestors_take_the_shortest_chain() {
+        let supertypes = supertype_map(&[(4, 2), (4, 3), (2, 1), (3, 1), (2, 5), (5, 6)]);
+        let mut got = ancestors(4, &supertypes);
+        got.sort_unstable();
+        assert_eq!(got, vec![(1, 2), (2, 1), (3, 1), (5, 2), (6, 3)]);
+
+        let shortcut = supertype_map(&[(4, 2), (2, 1), (4, 1)]);
+        let mut got = ancestors(4, &shortcut);
+        got.sort_unstable();
+        assert_eq!(got, vec![(1, 1), (2, 1)]);
+    }
+
+    /// A cycle terminates and never lists a type as its own ancestor.
+    #[test]
+    fn cycles_exclude_the_type_itself() {
+        let supertypes = supertype_map(&[(1, 2), (2, 3), (3, 1)]);
+        let mut got = ancestors(1, &supertypes);
+        got.sort_unstable();
+        assert_eq!(got, vec![(2, 1), (3, 2)]);
+    }
+
+    /// Everything below a changed type needs its rows rewritten; types
+    /// beside or above it do not.
+    #[test]
+    fn subtypes_cover_every_level_below() {
+        // 10 and 11 implement 1; 20 extends 10; 30 extends 20; 2 is apart.
+        let supertypes = supertype_map(&[(10, 1), (11, 1), (20, 10), (30, 20), (31, 2)]);
+        let mut got: Vec<i64> = with_subtypes(&[10], &supertypes).into_iter().collect();
+        got.sort_unstable();
+        assert_eq!(got, vec![10, 20, 30]);
+    }
+}
@@ -39,14 +39,14 @@
 
 use std::collections::{HashMap, HashSet, VecDeque};
 
-use serde::Serialize;
+use serde::{Deserialize, Serialize};
 use tracing::trace;
 
 use super::Index;
 use crate::error::Result;
 
 /// A product function or method no test reaches.
-#[derive(Debug, Clone, Serialize)]
+#[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct UntestedFinding {
     /// Symbol name as declared.
     pub name: String,
@@ -62,7 +62,7 @@ pub struct UntestedFinding {
 
 /// Output of [`Index::get_untested_code`]: findings plus the counts the
 /// caller needs to interpret them.
-#[derive(Debug, Clone, Serialize)]
+#[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct UntestedReport {
     /// Number of `is_test` root symbols the closure started from.
     pub test_roots: usize,
@@ -103,28 +103,41 @@ impl Index {
     /// Compute the untested-code report: product functions/methods outside
     /// the forward closure of `is_test` roots over the reference graph.
     ///
-    /// Single pass: one query for roots, one for edges, one for product
+    /// The closure is read from the persisted test reachability
+    /// (`db/test_reach.rs`) when it is current, which costs O(reached).
+    /// Otherwise: one query for roots, one for edges, one for product
     /// symbols; BFS is O(symbols + refs) in memory.
     pub fn get_untested_code(&self) -> Result<UntestedReport> {
         trace!("Computing untested-code report");
         let conn = self.connection()?;
 
-        let mut roots_stmt = conn.prepare("SELECT id FROM symbols WHERE is_test = 1")?;
-        let roots: Vec<i64> = roots_stmt
-            .query_map([], |row| row.get(0))?
-            .collect::<std::result::Result<_, _>>()?;
-
-        let mut edges_stmt = conn.prepare(
-            "SELECT in_symbol_id, symbol_id FROM refs
-             WHERE in_symbol_id IS NOT NULL AND symbol_id IS NOT NULL",
+        let test_roots: usize = conn.query_row(
+            "SELECT COUNT(*) FROM symbols WHERE is_test = 1",
+            [],
+            |row| row.get(0),
         )?;
-        let mut edges: HashMap<i64, Vec<i64>> = HashMap::new();
-        for row in edges_stmt.query_map([], |row| Ok((row.get(0)?, row.get(1)?)))? {
-            let (from, to): (i64, i64) = row?;
-            edges.entry(from).or_default().push(to);
-        }
-
-        let reached = reachable_closure(&roots, &edges);
+        let reached = match super::test_reach::stored_reached(&conn)? {
+            Some(reached) => reached,
+            None => {
+                trace!("Test reachability is not current; traversing the reference graph");
+                let mut roots_stmt = conn.prepare("SELECT id FROM symbols WHERE is_test = 1")?;
+                let roots: Vec<i64> = roots_stmt
+                    .query_map([], |row| row.get(0))?
+                    .collect::<std::result::Result<_, _>>()?;
+
+                let mut edges_stmt = conn.prepare(
+                    "SELECT in_symbol_id, symbol_id FROM refs
+                     WHERE in_symbol_id IS NOT NULL AND symbol_id IS NOT NULL",
+                )?;
+                let mut edges: HashMap<i64, Vec<i64>> = HashMap::new();
+                for row in edges_stmt.query_map([], |row| Ok((row.get(0)?, row.get(1)?)))? {
+                    let (from, to): (i64, i64) = row?;
+                    edges.entry(from).or_default().push(to);
+                }
+
+                reachable_closure(&roots, &edges)
+            }
+        };
 
         let mut prod_stmt = conn.prepare(
             "SELECT s.id, s.name, s.kind, f.path, s.line, s.module_path
@@ -155,7 +168,7 @@ impl Index {
         }
 
         let mut report = UntestedReport {
-            test_roots: roots.len(),
+            test_roots,
             product_fns,
             findings,
         };
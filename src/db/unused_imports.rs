@@ -0,0 +1,249 @@
+//! Stored file-local facts for unused-import analysis.
+//!
+//! Pass 1 writes, per file, the parsed import statements (with lines and
+//! the glob / re-export flags) and the names its references used *before*
+//! same-file resolution nulled `refs.reference_name` (see
+//! [`Index::index_parsed_file_atomic`]). Together with `identifier_lines`
+//! (textual mentions) and `symbols` (same-name definitions) that is
+//! everything [`crate::Tethys::find_unused_imports`] reads from a parse, so
+//! a fresh file is answered without re-parsing it.
+//!
+//! Coverage is marked by a sentinel row in `referenced_names`, written in
+//! the same transaction as the facts. Files without it (written without
+//! extraction, or indexed before these tables existed) must be re-parsed
+//! by the caller rather than read as "no imports".
+
+use std::collections::{HashMap, HashSet};
+
+use rusqlite::params_from_iter;
+use tracing::trace;
+
+use super::Index;
+use super::identifiers::COVERAGE_SENTINEL;
+use crate::error::Result;
+use crate::languages::common::ImportStatement;
+use crate::types::FileId;
+
+/// Stored import statements, as returned by
+/// [`Index::stored_import_statements`].
+#[derive(Debug, Default)]
+pub(crate) struct StoredImports {
+    /// Files whose import facts are in the index.
+    pub covered: HashSet<FileId>,
+    /// Each covered file's import statements in source order. Files without
+    /// imports have no entry.
+    pub statements: HashMap<FileId, Vec<ImportStatement>>,
+}
+
+/// Split a space-joined segment list back into segments.
+fn split_segments(joined: &str) -> Vec<String> {
+    joined
+        .split(' ')
+        .filter(|s| !s.is_empty())
+        .map(str::to_string)
+        .collect()
+}
+
+impl Index {
+    /// Every stored import statement, grouped by file, plus the set of
+    /// files the facts are complete for.
+    pub(crate) fn stored_import_statements(&self) -> Result<StoredImports> {
+        let conn = self.connection()?;
+
+        let mut stmt =
+            conn.prepare_cached("SELECT file_id FROM referenced_names WHERE name = ?1")?;
+        let covered = stmt
+            .query_map([COVERAGE_SENTINEL], |row| {
+                row.get::<_, i64>(0).map(FileId::from)
+            })?
+            .collect::<std::result::Result<HashSet<_>, _>>()?;
+
+        let mut stmt = conn.prepare(
+            "SELECT file_id, line, path, imported_names, alias, is_glob, is_reexport
+             FROM import_statements
+             ORDER BY file_id, ordinal",
+        )?;
+        let rows = stmt.query_map([], |row| {
+            Ok((
+                FileId::from(row.get::<_, i64>(0)?),
+                ImportStatement {
+                    line: row.get(1)?,
+                    path: split_segments(&row.get::<_, String>(2)?),
+                    imported_names: split_segments(&row.get::<_, String>(3)?),
+                    alias: row.get(4)?,
+                    is_glob: row.get(5)?,
+                    is_reexport: row.get(6)?,
+                },
+            ))
+        })?;
+
+        let mut statements: HashMap<FileId, Vec<ImportStatement>> = HashMap::new();
+        for row in rows {
+            let (file_id, import) = row?;
+            statements.entry(file_id).or_default().push(import);
+        }
+
+        trace!(
+            covered_files = covered.len(),
+            files_with_imports = statements.len(),
+            "Loaded stored import statements"
+        );
+        Ok(StoredImports {
+            covered,
+            statements,
+        })
+    }
+
+    /// `(file, name)` for each of `names` that some reference in the file
+    /// used, by name or as the first segment of its qualified path.
+    pub(crate) fn referenced_name_files(
+        &self,
+        names: &[&str],
+    ) -> Result<HashSet<(FileId, String)>> {
+        let conn = self.connection()?;
+        let mut found = HashSet::new();
+        for chunk in names.chunks(500) {
+            let placeholders = vec!["?"; chunk.len()].join(",");
+            let mut stmt = conn.prepare(&format!(
+                "SELECT file_id, name FROM referenced_names WHERE name IN ({placeholders})"
+            ))?;
+            let rows = stmt.query_map(params_from_iter(chunk), |row| {
+                Ok((
+                    FileId::from(row.get::<_, i64>(0)?),
+                    row.get::<_, String>(1)?,
+                ))
+            })?;
+            for row in rows {
+                found.insert(row?);
+            }
+        }
+        Ok(found)
+    }
+
+    /// Number of symbols named each of `names`, per file. Pairs with no
+    /// such symbol are absent.
+    pub(crate) fn symbol_name_counts(
+        &self,
+        names: &[&str],
+    ) -> Result<HashMap<(FileId, String), usize>> {
+        let conn = self.connection()?;
+        let mut counts = HashMap::new();
+        for chunk in names.chunks(500) {
+            let placeholders = vec!["?"; chunk.len()].join(",");
+            let mut stmt = conn.prepare(&format!(
+                "SELECT file_id, name, COUNT(*) FROM symbols
+                 WHERE name IN ({placeholders})
+                 GROUP BY file_id, name"
+            ))?;
+            let rows = stmt.query_map(params_from_iter(chunk), |row| {
+                Ok((
+                    (
+                        FileId::from(row.get::<_, i64>(0)?),
+                        row.get::<_, String>(1)?,
+                    ),
+                    row.get::<_, usize>(2)?,
+                ))
+            })?;
+            for row in rows {
+                let (key, count) = row?;
+                counts.insert(key, count);
+            }
+        }
+        Ok(counts)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::path::Path;
+
+    use super::*;
+    use crate::identifiers::extract_identifier_lines;
+    use crate::types::Language;
+
+    #[test]
+    fn import_facts_round_trip_and_mark_coverage() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let mut index = Index::open(&dir.path().join("u.db")).expect("open");
+        let imports = [
+            ImportStatement {
+                path: vec!["crate".into(), "util".into()],
+                imported_names: vec!["helper".into(), "Config".into()],
+                is_glob: false,
+                alias: None,
+                line: 2,
+                is_reexport: false,
+            },
+            ImportStatement {
+                path: vec!["std".into(), "fmt".into()],
+                imported_names: vec!["Write".into()],
+                is_glob: false,
+                alias: Some("_".into()),
+                line: 3,
+                is_reexport: true,
+            },
+        ];
+        let identifiers = extract_identifier_lines("use crate::util::helper;\n");
+
+        let (covered, _, _) = index
+            .index_parsed_file_atomic(
+                Path::new("src/a.rs"),
+                Language::Rust,
+                0,
+                0,
+                None,
+                &[],
+                &[],
+                &imports,
+                Some(&identifiers),
+            )
+            .expect("write covered");
+        let (uncovered, _, _) = index
+            .index_parsed_file_atomic(
+                Path::new("src/b.rs"),
+                Language::Rust,
+                0,
+                0,
+                None,
+                &[],
+                &[],
+                &imports,
+                None,
+            )
+            .expect("write uncovered");
+
+        let stored = index.stored_import_statements().expect("load");
+        assert_eq!(stored.covered, HashSet::from([covered]));
+        assert_eq!(
+            stored.statements.get(&covered).map(Vec::as_slice),
+            Some(&imports[..])
+        );
+        assert!(
+            !stored.statements.contains_key(&uncovered),
+            "None writes no statements"
+        );
+
+        // Re-indexing replaces the file's statements rather than appending.
+        index
+            .index_parsed_file_atomic(
+                Path::new("src/a.rs"),
+                Language::Rust,
+                0,
+                0,
+                None,
+                &[],
+                &[],
+                &imports[..1],
+                Some(&identifiers),
+            )
+            .expect("rewrite");
+        let stored = index.stored_import_statements().expect("reload");
+        assert_eq!(stored.statements[&covered].len(), 1);
+        assert!(
+            index
+                .referenced_name_files(&["helper"])
+                .expect("names")
+                .is_empty()
+        );
+    }
+}
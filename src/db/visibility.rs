@@ -31,7 +31,7 @@
 
 use std::collections::HashMap;
 
-use serde::Serialize;
+use serde::{Deserialize, Serialize};
 use tracing::trace;
 
 use super::Index;
@@ -40,7 +40,7 @@ use crate::error::Result;
 
 /// Why a candidate is capped at [`Tier::Maybe`]. An empty demotion list is
 /// exactly [`Tier::Definite`].
-#[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord, Serialize)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord, Serialize, Deserialize)]
 #[serde(rename_all = "kebab-case")]
 pub enum Demotion {
     /// Another indexed symbol shares this name, so use evidence could be
@@ -58,7 +58,7 @@ pub enum Demotion {
 }
 
 /// A pub item whose observed use is consistent with `pub(crate)`.
-#[derive(Debug, Clone, PartialEq, Eq, Serialize)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct VisibilityFinding {
     /// Symbol name as declared.
     pub name: String,
@@ -54,26 +54,32 @@
 //!
 //! # Scan semantics
 //!
-//! Word-boundary matching with the identifier class `[A-Za-z0-9_]` — the
-//! same boundary rule as `unused_imports::count_word_occurrences`,
-//! reimplemented line-wise here because span exclusion needs line
-//! attribution the whole-content counter cannot provide. Unicode
-//! identifiers are out of scope (non-ASCII characters act as separators;
-//! a boundary miss shifts a finding toward Maybe — the safe direction).
-//! Comments and strings COUNT as mentions: textual means textual.
+//! Word-boundary matching with the identifier class `[A-Za-z0-9_]`, with
+//! line attribution for span exclusion. Unicode identifiers are out of
+//! scope (non-ASCII characters act as separators; a boundary miss shifts
+//! a finding toward Maybe — the safe direction). Comments and strings
+//! COUNT as mentions: textual means textual.
+//!
+//! Occurrences come from the index's `identifier_lines` table, tokenized
+//! at Pass 1 with the same rule ([`crate::identifiers`]), so the verdict
+//! reflects the corpus as indexed and costs no file I/O. Files written
+//! without occurrence data (indexes predating the table) are scanned from
+//! disk by [`crate::word_scan`] under the same boundary rule instead —
+//! silence from the index is never read as absence.
 
-use std::collections::HashMap;
-use std::path::Path;
+use std::collections::{HashMap, HashSet};
+use std::path::{Path, PathBuf};
 
-use serde::Serialize;
+use serde::{Deserialize, Serialize};
 use tracing::{debug, warn};
 
-use crate::db::Tier;
 use crate::db::dead_code::ZeroEvidenceCandidate;
-use crate::types::IndexedFile;
+use crate::db::{StoredOccurrences, Tier};
+use crate::types::{FileId, IndexedFile};
+use crate::word_scan::WordScanner;
 
 /// One dead-code candidate, tiered.
-#[derive(Debug, Clone, Serialize)]
+#[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct DeadCodeFinding {
     /// Symbol name as declared.
     pub name: String,
@@ -95,7 +101,7 @@ pub struct DeadCodeFinding {
 /// Counts a consumer needs to interpret the findings. Counts are always
 /// the FULL population — a `limit` truncates [`DeadCodeReport::findings`],
 /// never the summary.
-#[derive(Debug, Clone, Serialize)]
+#[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct DeadCodeSummary {
     /// Zero-evidence candidates evaluated (= definite + maybe).
     pub candidates: usize,
@@ -110,7 +116,7 @@ pub struct DeadCodeSummary {
 /// legitimately clean report (empty findings, zeroed summary) — unlike
 /// untested-code there is no root-set precondition to make emptiness
 /// indeterminate; the candidate population itself is the subject.
-#[derive(Debug, Clone, Serialize)]
+#[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct DeadCodeReport {
     /// Tiered findings, truncated to `limit` when one was given.
     pub findings: Vec<DeadCodeFinding>,
@@ -118,20 +124,21 @@ pub struct DeadCodeReport {
     pub summary: DeadCodeSummary,
 }
 
-/// Assemble the report: run the textual scan over the indexed corpus,
-/// tier each candidate, truncate to `limit`.
+/// Assemble the report: tier each candidate against the stored
+/// identifier occurrences (`stored`), scanning from disk only the files
+/// `stored` does not cover, then truncate to `limit`.
 ///
-/// Cost: one pass over the corpus (`O(total source bytes)` tokenization,
-/// `O(tokens)` hash lookups) — the same cost class as parsing the corpus
-/// at index time; this is a one-shot analysis command, not an always-on
-/// phase. Early-exits once every candidate has a hit.
+/// Cost: `O(stored occurrence lines of the candidate names)` for covered
+/// files; uncovered files cost one parallel multi-pattern pass
+/// (`O(source bytes)`), skipped entirely once every candidate has a hit.
 pub(crate) fn build_report(
     workspace_root: &Path,
     files: &[IndexedFile],
+    stored: &StoredOccurrences,
     candidates: Vec<ZeroEvidenceCandidate>,
     limit: Option<usize>,
 ) -> DeadCodeReport {
-    let mentioned = textually_mentioned(workspace_root, files, &candidates);
+    let mentioned = textually_mentioned(workspace_root, files, stored, &candidates);
 
     let mut definite = 0usize;
     let mut maybe = 0usize;
@@ -185,18 +192,60 @@ pub(crate) fn build_report(
 fn textually_mentioned(
     workspace_root: &Path,
     files: &[IndexedFile],
+    stored: &StoredOccurrences,
     candidates: &[ZeroEvidenceCandidate],
-) -> std::collections::HashSet<usize> {
+) -> HashSet<usize> {
     let mut by_name: HashMap<&str, Vec<usize>> = HashMap::new();
     for (i, c) in candidates.iter().enumerate() {
         by_name.entry(c.name.as_str()).or_default().push(i);
     }
-    let mut mentioned = std::collections::HashSet::new();
+    let paths: HashMap<FileId, std::borrow::Cow<'_, str>> = files
+        .iter()
+        .map(|f| (f.id, f.path.to_string_lossy()))
+        .collect();
+    let mut mentioned = HashSet::new();
+
+    for (file_id, name, lines) in &stored.occurrences {
+        let Some(rel_path) = paths.get(file_id) else {
+            continue;
+        };
+        for &line_no in lines {
+            record_mention(
+                candidates,
+                &by_name,
+                &mut mentioned,
+                rel_path,
+                name,
+                line_no,
+            );
+        }
+    }
 
-    'files: for file in files {
+    // Files the index has no occurrence data for: one parallel pass with
+    // every candidate name compiled into a single automaton.
+    let uncovered: Vec<&IndexedFile> = files
+        .iter()
+        .filter(|f| !stored.covered.contains(&f.id))
+        .collect();
+    if uncovered.is_empty() || mentioned.len() == candidates.len() {
+        return mentioned;
+    }
+    let scanner = match WordScanner::new(by_name.keys().copied()) {
+        Ok(scanner) => scanner,
+        Err(err) => {
+            // Without a scan nothing may accuse: demote every candidate.
+            warn!(%err, "dead-code scan unavailable; tiering every candidate Maybe");
+            return (0..candidates.len()).collect();
+        }
+    };
+    let paths: Vec<PathBuf> = uncovered.iter().map(|f| f.path.clone()).collect();
+    for (file, scanned) in uncovered
+        .iter()
+        .zip(scanner.scan_files(workspace_root, &paths))
+    {
         let rel_path = file.path.to_string_lossy();
-        let content = match std::fs::read_to_string(workspace_root.join(&file.path)) {
-            Ok(content) => content,
+        let hits = match scanned {
+            Ok(hits) => hits,
             Err(err) => {
                 // Diagnostic, not data: an unreadable file only weakens
                 // the scan toward Definite, so surface it on stderr.
@@ -204,33 +253,44 @@ fn textually_mentioned(
                 continue;
             }
         };
-        for (line_idx, line) in content.lines().enumerate() {
-            let line_no = u32::try_from(line_idx + 1).unwrap_or(u32::MAX);
-            for token in line
-                .split(|ch: char| !ch.is_ascii_alphanumeric() && ch != '_')
-                .filter(|t| !t.is_empty())
-            {
-                let Some(hits) = by_name.get(token) else {
-                    continue;
-                };
-                for &ci in hits {
-                    let c = &candidates[ci];
-                    let own_span = c.file == rel_path
-                        && c.line <= line_no
-                        && line_no <= c.end_line.unwrap_or(c.line);
-                    if !own_span {
-                        mentioned.insert(ci);
-                    }
-                }
-            }
-            if mentioned.len() == candidates.len() {
-                break 'files;
-            }
+        for hit in hits {
+            record_mention(
+                candidates,
+                &by_name,
+                &mut mentioned,
+                &rel_path,
+                &scanner.names()[hit.name],
+                hit.line,
+            );
         }
     }
     mentioned
 }
 
+/// Record an occurrence of `token` on `line_no` of `rel_path` as a
+/// mention of every same-named candidate whose own span does not
+/// contain it.
+fn record_mention(
+    candidates: &[ZeroEvidenceCandidate],
+    by_name: &HashMap<&str, Vec<usize>>,
+    mentioned: &mut HashSet<usize>,
+    rel_path: &str,
+    token: &str,
+    line_no: u32,
+) {
+    let Some(hits) = by_name.get(token) else {
+        return;
+    };
+    for &ci in hits {
+        let c = &candidates[ci];
+        let own_span =
+            c.file == rel_path && c.line <= line_no && line_no <= c.end_line.unwrap_or(c.line);
+        if !own_span {
+            mentioned.insert(ci);
+        }
+    }
+}
+
 #[cfg(test)]
 mod tests {
     use std::path::PathBuf;
@@ -296,6 +356,7 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![candidate("hidden", "src/a.rs", 1, Some(1))],
             None,
         );
@@ -316,6 +377,7 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![candidate("rec", "src/a.rs", 1, Some(3))],
             None,
         );
@@ -334,6 +396,7 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![candidate("foo", "src/a.rs", 1, Some(1))],
             None,
         );
@@ -350,6 +413,7 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![candidate("rec", "src/a.rs", 1, None)],
             None,
         );
@@ -368,6 +432,7 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![candidate("helper", "src/a.rs", 1, Some(1))],
             None,
         );
@@ -384,6 +449,7 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![
                 candidate("twin", "src/a.rs", 1, Some(1)),
                 candidate("twin", "src/a.rs", 3, Some(3)),
@@ -403,6 +469,7 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![
                 candidate("a", "src/a.rs", 1, Some(1)),
                 candidate("b", "src/a.rs", 2, Some(2)),
@@ -424,10 +491,64 @@ mod tests {
         let report = build_report(
             dir.path(),
             &files,
+            &StoredOccurrences::default(),
             vec![candidate("lonely", "src/a.rs", 1, Some(1))],
             None,
         );
         assert_eq!(report.findings.len(), 1);
         assert_eq!(report.findings[0].tier, Tier::Definite);
     }
+
+    /// Stored occurrences answer covered files without touching disk: the
+    /// mentioning file does not exist on disk, yet the candidate tiers
+    /// Maybe. Kills: ignoring the index and re-reading the corpus.
+    #[test]
+    fn stored_occurrences_answer_without_file_io() {
+        let dir = workspace(&[]);
+        let mut a = indexed("src/a.rs");
+        a.id = FileId::from(1);
+        let mut b = indexed("src/b.rs");
+        b.id = FileId::from(2);
+        let stored = StoredOccurrences {
+            covered: [a.id, b.id].into_iter().collect(),
+            occurrences: vec![
+                (a.id, "helper".to_string(), vec![1]),
+                (b.id, "helper".to_string(), vec![7]),
+            ],
+        };
+        let report = build_report(
+            dir.path(),
+            &[a, b],
+            &stored,
+            vec![candidate("helper", "src/a.rs", 1, Some(1))],
+            None,
+        );
+        assert_eq!(report.findings[0].tier, Tier::Maybe);
+    }
+
+    /// Span exclusion applies to stored occurrences too, and a covered
+    /// file is never re-scanned: the on-disk copy mentions `rec` outside
+    /// its span, but the index (the corpus as indexed) does not.
+    #[test]
+    fn stored_occurrences_respect_span_and_skip_disk() {
+        let dir = workspace(&[(
+            "src/a.rs",
+            "fn rec() {}
+rec();
+",
+        )]);
+        let a = indexed("src/a.rs");
+        let stored = StoredOccurrences {
+            covered: [a.id].into_iter().collect(),
+            occurrences: vec![(a.id, "rec".to_string(), vec![1])],
+        };
+        let report = build_report(
+            dir.path(),
+            &[a],
+            &stored,
+            vec![candidate("rec", "src/a.rs", 1, Some(1))],
+            None,
+        );
+        assert_eq!(report.findings[0].tier, Tier::Definite);
+    }
 }
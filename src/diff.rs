@@ -0,0 +1,648 @@
+//! Unified-diff parsing for symbol-granular affected tests (`--diff`).
+//!
+//! Extracts only what the affected-tests query needs from a patch: which
+//! files it touches and which NEW-side lines changed in each. The index
+//! describes the working tree the patch produced, so new-side line numbers
+//! are the ones that line up with stored symbol spans.
+//!
+//! Accepted input is `git diff` output (any `--unified` context width) or
+//! plain `diff -u` output. Anything the parser cannot localize to lines —
+//! deleted files, binary files, rename- or mode-only entries — is reported
+//! as `whole_file`, which callers treat as "the whole file changed"
+//! (file-level fallback), never as "nothing changed".
+//!
+//! Changed lines are classified by their text: blank and comment-only
+//! lines are dropped, and attribute or doc-comment lines are reported
+//! apart as `leading`, since they belong to the item below them.
+
+use std::path::PathBuf;
+
+use crate::types::{Symbol, SymbolId, SymbolKind};
+
+/// One file touched by a patch.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub(crate) struct ChangedFile {
+    /// Path as named by the patch, with git's `a/`/`b/` prefixes stripped:
+    /// the new-side path, or the old-side path for a deletion.
+    pub path: PathBuf,
+    /// The change could not be localized and the whole file must be
+    /// treated as changed; `lines` and `leading` are then empty.
+    pub whole_file: bool,
+    /// Changed new-side lines as sorted, merged, inclusive `(start, end)`
+    /// ranges (1-based).
+    pub lines: Vec<(u32, u32)>,
+    /// Changed new-side lines holding only an attribute or a doc comment,
+    /// as for `lines`. They belong to the item below them.
+    pub leading: Vec<(u32, u32)>,
+}
+
+/// What a changed line holds, judged from its text alone.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum LineRole {
+    /// Blank or a plain comment: changing it changes no item.
+    Trivia,
+    /// An attribute (`#[...]`, C# `[...]`) or doc comment (`///`, `/**`)
+    /// on its own line, part of the item below.
+    Leading,
+    /// Anything else.
+    Code,
+}
+
+/// Classify one line of source (without its diff marker).
+///
+/// Deliberately shallow: a line inside a multi-line block comment, or an
+/// inner attribute (`#![...]`), is `Code`, which at worst costs the
+/// file-level fallback.
+fn line_role(text: &str) -> LineRole {
+    let text = text.trim();
+    if text.is_empty() {
+        return LineRole::Trivia;
+    }
+    let doc = (text.starts_with("///") && !text.starts_with("////"))
+        || (text.starts_with("/**") && !text.starts_with("/**/"));
+    if doc || text.starts_with("#[") || (text.starts_with('[') && text.ends_with(']')) {
+        return LineRole::Leading;
+    }
+    if text.starts_with("//") || (text.starts_with("/*") && text.ends_with("*/")) {
+        return LineRole::Trivia;
+    }
+    LineRole::Code
+}
+
+/// Per-file parse state while walking the patch.
+#[derive(Default)]
+struct Entry {
+    old_path: Option<String>,
+    new_path: Option<String>,
+    deleted: bool,
+    whole_file: bool,
+    saw_hunk: bool,
+    lines: Vec<(u32, u32)>,
+    leading: Vec<(u32, u32)>,
+}
+
+impl Entry {
+    fn finish(self, out: &mut Vec<ChangedFile>) {
+        let path = if self.deleted {
+            self.old_path.or(self.new_path)
+        } else {
+            self.new_path.or(self.old_path)
+        };
+        let Some(path) = path else {
+            return;
+        };
+        // No hunk at all: a rename- or mode-only entry.
+        let whole_file = self.deleted || self.whole_file || !self.saw_hunk;
+        let (lines, leading) = if whole_file {
+            (Vec::new(), Vec::new())
+        } else {
+            (merge_ranges(self.lines), merge_ranges(self.leading))
+        };
+        out.push(ChangedFile {
+            path: PathBuf::from(path),
+            whole_file,
+            lines,
+            leading,
+        });
+    }
+}
+
+/// Remaining old/new line budget of the hunk being read, plus the next
+/// new-side line number.
+struct Hunk {
+    old_remaining: u32,
+    new_remaining: u32,
+    next_new_line: u32,
+}
+
+/// Parse unified-diff text into the files it touches.
+///
+/// Files appear in patch order, one entry per file header. Lines outside
+/// any file entry (commit messages from `git format-patch`, `index` lines,
+/// trailing signatures) are ignored.
+pub(crate) fn parse_unified_diff(text: &str) -> Vec<ChangedFile> {
+    let mut out = Vec::new();
+    let mut current: Option<Entry> = None;
+    let mut hunk: Option<Hunk> = None;
+
+    for line in text.lines() {
+        if let Some(h) = hunk.as_mut() {
+            if read_hunk_line(h, line, current.as_mut()) {
+                if h.old_remaining == 0 && h.new_remaining == 0 {
+                    hunk = None;
+                }
+                continue;
+            }
+            // A line that cannot belong to the hunk (truncated patch):
+            // stop counting and fall through to header handling.
+            hunk = None;
+        }
+
+        if let Some(rest) = line.strip_prefix("diff --git ") {
+            if let Some(entry) = current.take() {
+                entry.finish(&mut out);
+            }
+            let mut entry = Entry::default();
+            if let Some((old, new)) = split_git_header(rest) {
+                entry.old_path = Some(old);
+                entry.new_path = Some(new);
+            }
+            current = Some(entry);
+        } else if let Some(rest) = line.strip_prefix("--- ") {
+            // Plain `diff -u` output has no `diff --git` line: a `---`
+            // header after a finished hunk opens the next file.
+            let starts_new_file = current
+                .as_ref()
+                .is_none_or(|entry| entry.saw_hunk || entry.whole_file);
+            if starts_new_file {
+                if let Some(entry) = current.take() {
+                    entry.finish(&mut out);
+                }
+                current = Some(Entry::default());
+            }
+            if let Some(entry) = current.as_mut() {
+                entry.old_path = header_path(rest);
+            }
+        } else if let Some(rest) = line.strip_prefix("+++ ") {
+            if let Some(entry) = current.as_mut() {
+                match header_path(rest) {
+                    Some(path) => entry.new_path = Some(path),
+                    None => entry.deleted = true,
+                }
+            }
+        } else if line.starts_with("deleted file mode") {
+            if let Some(entry) = current.as_mut() {
+                entry.deleted = true;
+            }
+        } else if let Some(rest) = line.strip_prefix("rename to ") {
+            if let Some(entry) = current.as_mut() {
+                entry.new_path = Some(unquote(rest).to_string());
+            }
+        } else if line.starts_with("Binary files ") || line.starts_with("GIT binary patch") {
+            if let Some(entry) = current.as_mut() {
+                entry.whole_file = true;
+            }
+        } else if line.starts_with("@@ ") {
+            if let (Some(entry), Some(parsed)) = (current.as_mut(), parse_hunk_header(line)) {
+                entry.saw_hunk = true;
+                // A pure deletion hunk (`+c,0`) names the line BEFORE the
+                // removed block; the next new-side line is one past it.
+                let next_new_line = if parsed.new_remaining == 0 {
+                    parsed.next_new_line + 1
+                } else {
+                    parsed.next_new_line
+                };
+                if parsed.old_remaining == 0 && parsed.new_remaining == 0 {
+                    entry.whole_file = true;
+                } else {
+                    hunk = Some(Hunk {
+                        next_new_line,
+                        ..parsed
+                    });
+                }
+            }
+        }
+    }
+
+    // An entry left with neither hunks nor a whole-file marker is a rename-
+    // or mode-only change; `finish` reports it file-level rather than drop it.
+    if let Some(entry) = current.take() {
+        entry.finish(&mut out);
+    }
+    out
+}
+
+/// Consume one hunk body line. Returns `false` when `line` is not a hunk
+/// body line at all.
+fn read_hunk_line(hunk: &mut Hunk, line: &str, entry: Option<&mut Entry>) -> bool {
+    let Some(marker) = line.chars().next() else {
+        // Some tools strip the single space from empty context lines.
+        hunk.old_remaining = hunk.old_remaining.saturating_sub(1);
+        hunk.new_remaining = hunk.new_remaining.saturating_sub(1);
+        hunk.next_new_line += 1;
+        return true;
+    };
+    match marker {
+        ' ' => {
+            hunk.old_remaining = hunk.old_remaining.saturating_sub(1);
+            hunk.new_remaining = hunk.new_remaining.saturating_sub(1);
+            hunk.next_new_line += 1;
+        }
+        '+' => {
+            if let Some(entry) = entry {
+                let at = (hunk.next_new_line, hunk.next_new_line);
+                match line_role(&line[1..]) {
+                    LineRole::Trivia => {}
+                    LineRole::Leading => entry.leading.push(at),
+                    LineRole::Code => entry.lines.push(at),
+                }
+            }
+            hunk.new_remaining = hunk.new_remaining.saturating_sub(1);
+            hunk.next_new_line += 1;
+        }
+        '-' => {
+            // A removed line sits between two new-side lines: mark both
+            // neighbours so the symbol that lost the line is selected. A
+            // removed attribute or doc comment belonged to the item now
+            // below the gap.
+            if let Some(entry) = entry {
+                let after = hunk.next_new_line.max(1);
+                match line_role(&line[1..]) {
+                    LineRole::Trivia => {}
+                    LineRole::Leading => entry.leading.push((after, after)),
+                    LineRole::Code => entry.lines.push(((after - 1).max(1), after)),
+                }
+            }
+            hunk.old_remaining = hunk.old_remaining.saturating_sub(1);
+        }
+        // "\ No newline at end of file" annotates the previous line.
+        '\\' => {}
+        _ => return false,
+    }
+    true
+}
+
+/// Parse `@@ -a[,b] +c[,d] @@ ...` into hunk counters.
+fn parse_hunk_header(line: &str) -> Option<Hunk> {
+    let body = line.strip_prefix("@@ ")?;
+    let end = body.find(" @@")?;
+    let mut parts = body[..end].split_whitespace();
+    let old = parts.next()?.strip_prefix('-')?;
+    let new = parts.next()?.strip_prefix('+')?;
+    let (_, old_count) = parse_range(old)?;
+    let (new_start, new_count) = parse_range(new)?;
+    Some(Hunk {
+        old_remaining: old_count,
+        new_remaining: new_count,
+        next_new_line: new_start,
+    })
+}
+
+/// Parse `start[,count]`; a missing count means one line.
+fn parse_range(range: &str) -> Option<(u32, u32)> {
+    match range.split_once(',') {
+        Some((start, count)) => Some((start.parse().ok()?, count.parse().ok()?)),
+        None => Some((range.parse().ok()?, 1)),
+    }
+}
+
+/// Split the `a/<old> b/<new>` tail of a `diff --git` line. Ambiguous for
+/// paths containing " b/", so the `---`/`+++` headers (read later) win
+/// whenever they are present.
+fn split_git_header(rest: &str) -> Option<(String, String)> {
+    let rest = rest.trim();
+    let idx = rest.find(" b/").or_else(|| rest.find(" \"b/"))?;
+    let old = strip_side_prefix(unquote(&rest[..idx]));
+    let new = strip_side_prefix(unquote(&rest[idx + 1..]));
+    Some((old.to_string(), new.to_string()))
+}
+
+/// Path from a `---`/`+++` header, or `None` for `/dev/null`. Drops the
+/// tab-separated timestamp plain `diff -u` appends.
+fn header_path(rest: &str) -> Option<String> {
+    let raw = rest.split('\t').next().unwrap_or(rest).trim_end();
+    let raw = unquote(raw);
+    if raw == "/dev/null" {
+        return None;
+    }
+    Some(strip_side_prefix(raw).to_string())
+}
+
+fn strip_side_prefix(path: &str) -> &str {
+    path.strip_prefix("a/")
+        .or_else(|| path.strip_prefix("b/"))
+        .unwrap_or(path)
+}
+
+/// Strip the double quotes git puts around paths with unusual characters.
+/// Escape sequences inside are left as-is: such paths are rare and an
+/// unmatched spelling degrades to an `unindexed` standing reason.
+fn unquote(path: &str) -> &str {
+    path.strip_prefix('"')
+        .and_then(|p| p.strip_suffix('"'))
+        .unwrap_or(path)
+}
+
+/// Sort and coalesce overlapping or adjacent inclusive ranges.
+fn merge_ranges(mut ranges: Vec<(u32, u32)>) -> Vec<(u32, u32)> {
+    ranges.sort_unstable();
+    let mut merged: Vec<(u32, u32)> = Vec::with_capacity(ranges.len());
+    for (start, end) in ranges {
+        match merged.last_mut() {
+            Some(last) if start <= last.1.saturating_add(1) => last.1 = last.1.max(end),
+            _ => merged.push((start, end)),
+        }
+    }
+    merged
+}
+
+/// Map changed lines onto the innermost spanned symbols of one file.
+///
+/// Each changed line selects the innermost symbol whose stored span
+/// contains it (latest start, then earliest end — the same precedence as
+/// `Index::find_symbol_containing_line`). A changed data member (field,
+/// property, event) also selects its container: the type's shape changed,
+/// so whoever names the type is affected.
+///
+/// A `leading` line (attribute or doc comment, see [`ChangedFile`]) that
+/// no symbol other than a module spans selects the first symbol starting
+/// at or below it within that module: the item it annotates, whose span
+/// may not include it.
+///
+/// Returns `None` — file-level fallback — when any changed line falls
+/// outside every spanned symbol (imports, module-level code, symbols
+/// stored without a span) or lands directly in a module body, since such
+/// a change can affect everything in the file.
+pub(crate) fn symbols_for_lines(
+    symbols: &[Symbol],
+    lines: &[(u32, u32)],
+    leading: &[(u32, u32)],
+) -> Option<Vec<SymbolId>> {
+    if lines.is_empty() && leading.is_empty() {
+        return Some(Vec::new());
+    }
+    let spanned: Vec<(&Symbol, u32, u32)> = symbols
+        .iter()
+        .filter_map(|s| s.span.map(|span| (s, span.start_line(), span.end_line())))
+        .collect();
+    if spanned.is_empty() {
+        return None;
+    }
+
+    let innermost_at = |line: u32| {
+        spanned
+            .iter()
+            .filter(|(_, first, last)| *first <= line && line <= *last)
+            .min_by(|(a, a_first, a_last), (b, b_first, b_last)| {
+                b_first
+                    .cmp(a_first)
+                    .then(a_last.cmp(b_last))
+                    .then(b.column.cmp(&a.column))
+            })
+            .copied()
+    };
+    // The item a leading line annotates: the first symbol starting at or
+    // below it, outermost on ties, without leaving the enclosing module.
+    let annotated_by = |line: u32, module_end: u32| {
+        spanned
+            .iter()
+            .filter(|(_, first, last)| *first >= line && *last <= module_end)
+            .min_by(|(a, a_first, a_last), (b, b_first, b_last)| {
+                a_first
+                    .cmp(b_first)
+                    .then(b_last.cmp(a_last))
+                    .then(a.column.cmp(&b.column))
+            })
+            .map(|(symbol, _, _)| *symbol)
+    };
+
+    let mut selected: Vec<SymbolId> = Vec::new();
+    let changed = lines.iter().map(|range| (range, false));
+    let annotating = leading.iter().map(|range| (range, true));
+    for (&(start, end), is_leading) in changed.chain(annotating) {
+        for line in start..=end {
+            let symbol = match innermost_at(line) {
+                Some((symbol, _, _)) if symbol.kind != SymbolKind::Module => symbol,
+                Some((_, _, module_end)) if is_leading => annotated_by(line, module_end)?,
+                None if is_leading => annotated_by(line, u32::MAX)?,
+                _ => return None,
+            };
+            if symbol.kind == SymbolKind::Module {
+                return None;
+            }
+            selected.push(symbol.id);
+            if symbol.kind.is_data_member()
+                && let Some(parent) = symbol.parent_symbol_id
+            {
+                selected.push(parent);
+            }
+        }
+    }
+
+    selected.sort_unstable_by_key(|id| id.as_i64());
+    selected.dedup();
+    Some(selected)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::types::{FileId, Span, Visibility};
+
+    fn changed(path: &str, lines: &[(u32, u32)]) -> ChangedFile {
+        ChangedFile {
+            path: PathBuf::from(path),
+            whole_file: false,
+            lines: lines.to_vec(),
+            leading: Vec::new(),
+        }
+    }
+
+    fn whole(path: &str) -> ChangedFile {
+        ChangedFile {
+            whole_file: true,
+            ..changed(path, &[])
+        }
+    }
+
+    #[test]
+    fn git_diff_reports_new_side_lines() {
+        let patch = "\
+diff --git a/src/lib.rs b/src/lib.rs
+index 1111111..2222222 100644
+--- a/src/lib.rs
++++ b/src/lib.rs
+@@ -10,6 +10,7 @@ pub fn helper() {
+ context
+ context
+-    old();
++    new_one();
++    new_two();
+ context
+ context
+ context
+";
+        assert_eq!(
+            parse_unified_diff(patch),
+            vec![changed("src/lib.rs", &[(11, 13)])]
+        );
+    }
+
+    #[test]
+    fn zero_context_deletion_marks_neighbouring_lines() {
+        let patch = "\
+diff --git a/src/a.rs b/src/a.rs
+--- a/src/a.rs
++++ b/src/a.rs
+@@ -5,2 +4,0 @@
+-gone();
+-gone_too();
+";
+        assert_eq!(
+            parse_unified_diff(patch),
+            vec![changed("src/a.rs", &[(4, 5)])]
+        );
+    }
+
+    #[test]
+    fn deleted_binary_and_rename_only_entries_are_whole_file() {
+        let patch = "\
+diff --git a/src/old.rs b/src/old.rs
+deleted file mode 100644
+--- a/src/old.rs
++++ /dev/null
+@@ -1,2 +0,0 @@
+-fn a() {}
+-fn b() {}
+diff --git a/img.png b/img.png
+Binary files a/img.png and b/img.png differ
+diff --git a/src/x.rs b/src/y.rs
+similarity index 100%
+rename from src/x.rs
+rename to src/y.rs
+";
+        assert_eq!(
+            parse_unified_diff(patch),
+            vec![whole("src/old.rs"), whole("img.png"), whole("src/y.rs")]
+        );
+    }
+
+    #[test]
+    fn blank_and_comment_lines_are_dropped_and_annotations_lead() {
+        let patch = "\
+diff --git a/src/a.rs b/src/a.rs
+--- a/src/a.rs
++++ b/src/a.rs
+@@ -1,5 +1,7 @@
+ use std::fmt;
++
++// Formatting helpers.
+-/// Old docs.
++/// Renders the value.
++#[inline]
+ pub fn render() {
+-    // old note
++    body();
+ }
+";
+        assert_eq!(
+            parse_unified_diff(patch),
+            vec![ChangedFile {
+                leading: vec![(4, 5)],
+                ..changed("src/a.rs", &[(7, 7)])
+            }]
+        );
+
+        let comment_only = "\
+--- src/a.rs
++++ src/a.rs
+@@ -3 +3,2 @@
+-// old
++  // new
++
+";
+        assert_eq!(
+            parse_unified_diff(comment_only),
+            vec![changed("src/a.rs", &[])]
+        );
+    }
+
+    #[test]
+    fn plain_diff_u_with_timestamps_splits_files() {
+        let patch = "\
+--- src/a.rs\t2026-01-01 00:00:00
++++ src/a.rs\t2026-01-02 00:00:00
+@@ -1 +1 @@
+-a
++b
+--- src/b.rs\t2026-01-01 00:00:00
++++ src/b.rs\t2026-01-02 00:00:00
+@@ -3,0 +4,2 @@
++c
++d
+";
+        assert_eq!(
+            parse_unified_diff(patch),
+            vec![
+                changed("src/a.rs", &[(1, 1)]),
+                changed("src/b.rs", &[(4, 5)])
+            ]
+        );
+    }
+
+    fn symbol(id: i64, kind: SymbolKind, lines: (u32, u32), parent: Option<i64>) -> Symbol {
+        Symbol {
+            id: SymbolId::from(id),
+            file_id: FileId::from(1),
+            name: format!("s{id}"),
+            module_path: String::new(),
+            qualified_name: format!("s{id}"),
+            kind,
+            line: lines.0,
+            column: 1,
+            span: Span::new(lines.0, 1, lines.1, 2),
+            signature: None,
+            signature_details: None,
+            visibility: Visibility::Private,
+            parent_symbol_id: parent.map(SymbolId::from),
+            is_test: false,
+        }
+    }
+
+    #[test]
+    fn innermost_symbol_wins_and_members_pull_in_their_container() {
+        let symbols = vec![
+            symbol(1, SymbolKind::Class, (1, 30), None),
+            symbol(2, SymbolKind::Method, (5, 10), Some(1)),
+            symbol(3, SymbolKind::StructField, (12, 12), Some(1)),
+        ];
+        assert_eq!(
+            symbols_for_lines(&symbols, &[(6, 7)], &[]),
+            Some(vec![SymbolId::from(2)])
+        );
+        assert_eq!(
+            symbols_for_lines(&symbols, &[(12, 12)], &[]),
+            Some(vec![SymbolId::from(1), SymbolId::from(3)])
+        );
+    }
+
+    #[test]
+    fn uncovered_or_module_level_lines_fall_back_to_file_level() {
+        let symbols = vec![
+            symbol(1, SymbolKind::Module, (20, 40), None),
+            symbol(2, SymbolKind::Function, (25, 30), Some(1)),
+        ];
+        assert_eq!(symbols_for_lines(&symbols, &[(1, 1)], &[]), None);
+        assert_eq!(symbols_for_lines(&symbols, &[(22, 22)], &[]), None);
+        assert_eq!(
+            symbols_for_lines(&symbols, &[(26, 26)], &[]),
+            Some(vec![SymbolId::from(2)])
+        );
+        assert_eq!(symbols_for_lines(&[], &[(1, 1)], &[]), None);
+    }
+
+    #[test]
+    fn annotations_select_the_item_below_them() {
+        // `#[test]` or `///` lines on 2-3 and 21-22 sit just above spans
+        // that do not include them.
+        let symbols = vec![
+            symbol(1, SymbolKind::Function, (4, 8), None),
+            symbol(2, SymbolKind::Module, (10, 40), None),
+            symbol(3, SymbolKind::Function, (12, 14), Some(2)),
+            symbol(4, SymbolKind::Function, (23, 30), Some(2)),
+        ];
+        assert_eq!(
+            symbols_for_lines(&symbols, &[], &[(2, 3)]),
+            Some(vec![SymbolId::from(1)])
+        );
+        assert_eq!(
+            symbols_for_lines(&symbols, &[(13, 13)], &[(21, 22)]),
+            Some(vec![SymbolId::from(3), SymbolId::from(4)])
+        );
+        // Annotating the module itself, or nothing, is file-level.
+        assert_eq!(symbols_for_lines(&symbols, &[], &[(9, 9)]), None);
+        assert_eq!(symbols_for_lines(&symbols, &[], &[(35, 35)]), None);
+        // Only dropped lines changed: nothing to select.
+        assert_eq!(symbols_for_lines(&symbols, &[], &[]), Some(vec![]));
+    }
+}
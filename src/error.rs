@@ -32,7 +32,7 @@ pub type Result<T> = std::result::Result<T, Error>;
 pub enum Error {
     /// Database operation failed
     #[error("database error: {0}")]
-    Database(#[from] rusqlite::Error),
+    Database(rusqlite::Error),
 
     /// File system operation failed
     #[error("I/O error: {0}")]
@@ -62,6 +62,27 @@ pub enum Error {
     /// Internal error (mutex poisoning, unexpected state, etc.)
     #[error("internal error: {0}")]
     Internal(String),
+
+    /// The operation's [`crate::CancellationToken`] was cancelled or its
+    /// deadline passed. Any write in flight was rolled back.
+    #[error("operation cancelled")]
+    Cancelled,
+}
+
+/// An interrupt raised by the cancellation progress handler (see
+/// [`crate::CancellationToken`]) is [`Error::Cancelled`], not a database
+/// failure.
+impl From<rusqlite::Error> for Error {
+    fn from(error: rusqlite::Error) -> Self {
+        match error {
+            rusqlite::Error::SqliteFailure(failure, _)
+                if failure.code == rusqlite::ErrorCode::OperationInterrupted =>
+            {
+                Self::Cancelled
+            }
+            error => Self::Database(error),
+        }
+    }
 }
 
 /// Error encountered while indexing a specific file.
@@ -156,7 +177,7 @@ impl From<&Error> for IndexErrorKind {
             Error::Io(_) | Error::Config(_) | Error::NotFound(_) | Error::PackageNotFound(_) => {
                 Self::IoError
             }
-            Error::Database(_) | Error::Internal(_) => Self::DatabaseError,
+            Error::Database(_) | Error::Internal(_) | Error::Cancelled => Self::DatabaseError,
             Error::Parser(_) => Self::ParseFailed,
         }
     }
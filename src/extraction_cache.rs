@@ -0,0 +1,460 @@
+//! Content-addressed cache of Pass 1a extraction results.
+//!
+//! Parsing and extraction depend only on a file's bytes, its language's
+//! grammar, and the extractors, so their output can be reused whenever
+//! those recur: switching back to a branch indexed an hour ago re-parses
+//! every file that differs from the current index, but most of them hold
+//! content the cache has already seen. An entry is keyed by
+//!
+//! - the file's content hash and size (see [`crate::content_hash`]),
+//! - its language and a fingerprint of the tree-sitter grammar (ABI
+//!   version, node kinds and field names), and
+//! - [`EXTRACTOR_VERSION`] and the crate version,
+//!
+//! so a grammar upgrade or extractor change misses rather than replaying
+//! stale output. The value is the [`Extraction`] as zlib-compressed JSON.
+//!
+//! The cache lives in its own `SQLite` file next to the index (it survives
+//! `--rebuild`, which is when it pays off most) and is bounded by size:
+//! after each run, entries not used in the most recent runs are evicted
+//! until the total fits. Recency is per run, not per lookup. A failing
+//! cache only costs parsing: every error is logged and treated as a miss.
+
+use std::collections::HashMap;
+use std::io::{Read, Write};
+use std::path::Path;
+use std::sync::Mutex;
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+use flate2::Compression;
+use flate2::read::ZlibDecoder;
+use flate2::write::ZlibEncoder;
+use rusqlite::{Connection, OptionalExtension, params};
+use serde::{Deserialize, Serialize};
+use tracing::{debug, warn};
+
+use crate::content_hash::ContentHasher;
+use crate::error::{Error, Result};
+use crate::identifiers::IdentifierLines;
+use crate::languages::{
+    self,
+    common::{ExtractedReference, ImportStatement},
+};
+use crate::parallel::OwnedSymbolData;
+use crate::types::{ExtractionCacheStats, Language};
+
+/// Version of the extractors' output. Bump it whenever a change to
+/// symbol, reference, import, attribute or identifier extraction (or to
+/// [`Extraction`]'s fields) would make a cached entry differ from a fresh
+/// parse; the crate version is part of the key as well, but does not move
+/// between releases.
+const EXTRACTOR_VERSION: u32 = 1;
+
+/// File name of the cache, in the directory of the index database.
+pub(crate) const CACHE_FILE_NAME: &str = "extraction-cache.db";
+
+/// Version of the cache database layout. A cache at another version is
+/// dropped and recreated.
+const CACHE_SCHEMA_VERSION: i32 = 1;
+
+/// Misses buffered before they are written in one transaction.
+const FLUSH_EVERY: usize = 256;
+
+const CACHE_SCHEMA: &str = "
+CREATE TABLE IF NOT EXISTS extractions (
+    id INTEGER PRIMARY KEY,
+    content_hash INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    grammar INTEGER NOT NULL,
+    extractor TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    UNIQUE (content_hash, size_bytes, language, grammar, extractor)
+);
+
+CREATE TABLE IF NOT EXISTS cache_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+";
+
+/// Everything Pass 1a extracts from a file's content: the part of
+/// [`crate::parallel::ParsedFileData`] that does not depend on where the
+/// file is or when it was written.
+#[derive(Debug, Clone, Serialize, Deserialize)]
+pub(crate) struct Extraction {
+    pub(crate) symbols: Vec<OwnedSymbolData>,
+    pub(crate) references: Vec<ExtractedReference>,
+    pub(crate) imports: Vec<ImportStatement>,
+    pub(crate) identifiers: Vec<IdentifierLines>,
+}
+
+/// The content-dependent part of a cache key; the cache adds the grammar
+/// fingerprint and extractor version.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub(crate) struct ExtractionKey {
+    pub(crate) content_hash: u64,
+    pub(crate) size_bytes: u64,
+    pub(crate) language: Language,
+}
+
+/// A miss waiting to be written.
+struct PendingEntry {
+    key: ExtractionKey,
+    grammar: i64,
+    payload: Vec<u8>,
+}
+
+/// An open extraction cache, shared by the parallel parse tasks of one
+/// indexing run. Lookups read the database directly; new entries and
+/// recency updates are buffered and written in batches, and
+/// [`Self::finish`] writes the rest and evicts.
+pub(crate) struct ExtractionCache {
+    conn: Mutex<Connection>,
+    max_bytes: u64,
+    /// This run's number, stamped into `last_used` of every entry it uses.
+    run: i64,
+    extractor: String,
+    grammars: Mutex<HashMap<Language, i64>>,
+    pending: Mutex<Vec<PendingEntry>>,
+    touched: Mutex<Vec<i64>>,
+    hits: AtomicUsize,
+    misses: AtomicUsize,
+}
+
+/// `u64` bit-pattern stored as `i64` for `SQLite`.
+#[expect(
+    clippy::cast_possible_wrap,
+    reason = "u64 bit-pattern stored as i64 for SQLite; only compared for equality"
+)]
+fn as_sql(value: u64) -> i64 {
+    value as i64
+}
+
+/// Fingerprint of `language`'s tree-sitter grammar: its ABI version and
+/// every node kind and field name, which change with any grammar upgrade
+/// that could change extraction.
+fn grammar_fingerprint(language: Language) -> i64 {
+    let grammar = languages::get_language_support(language).tree_sitter_language();
+    let mut hasher = ContentHasher::default();
+    hasher.field(&grammar.version().to_le_bytes());
+    for id in 0..grammar.node_kind_count() {
+        let id = u16::try_from(id).unwrap_or(u16::MAX);
+        hasher.field(grammar.node_kind_for_id(id).unwrap_or_default().as_bytes());
+        hasher.update(&[u8::from(grammar.node_kind_is_named(id))]);
+    }
+    for id in 1..=grammar.field_count() {
+        let id = u16::try_from(id).unwrap_or(u16::MAX);
+        hasher.field(grammar.field_name_for_id(id).unwrap_or_default().as_bytes());
+    }
+    as_sql(hasher.finish())
+}
+
+fn encode(extraction: &Extraction) -> Result<Vec<u8>> {
+    let json = serde_json::to_vec(extraction)
+        .map_err(|e| Error::Internal(format!("failed to serialize extraction: {e}")))?;
+    let mut encoder = ZlibEncoder::new(Vec::with_capacity(json.len() / 4), Compression::fast());
+    encoder.write_all(&json)?;
+    Ok(encoder.finish()?)
+}
+
+fn decode(payload: &[u8]) -> Result<Extraction> {
+    let mut json = Vec::new();
+    ZlibDecoder::new(payload).read_to_end(&mut json)?;
+    serde_json::from_slice(&json)
+        .map_err(|e| Error::Internal(format!("corrupt cached extraction: {e}")))
+}
+
+/// Lock `mutex`, recovering the data if a parse task panicked holding it.
+fn lock<T>(mutex: &Mutex<T>) -> std::sync::MutexGuard<'_, T> {
+    mutex
+        .lock()
+        .unwrap_or_else(std::sync::PoisonError::into_inner)
+}
+
+impl ExtractionCache {
+    /// Open (creating if needed) the cache at `path`, bounded to
+    /// `max_bytes` of compressed entries, and start a new run in it.
+    pub(crate) fn open(path: &Path, max_bytes: u64) -> Result<Self> {
+        if let Some(parent) = path.parent() {
+            std::fs::create_dir_all(parent)?;
+        }
+        let conn = Connection::open(path)?;
+        conn.busy_timeout(std::time::Duration::from_secs(5))?;
+        conn.pragma_update(None, "journal_mode", "WAL")?;
+        conn.pragma_update(None, "synchronous", "NORMAL")?;
+
+        let version: i32 = conn.pragma_query_value(None, "user_version", |row| row.get(0))?;
+        if version != CACHE_SCHEMA_VERSION {
+            debug!(
+                path = %path.display(),
+                found = version,
+                expected = CACHE_SCHEMA_VERSION,
+                "Recreating extraction cache"
+            );
+            conn.execute_batch(
+                "DROP TABLE IF EXISTS extractions;
+                 DROP TABLE IF EXISTS cache_meta;",
+            )?;
+        }
+        conn.execute_batch(CACHE_SCHEMA)?;
+        conn.pragma_update(None, "user_version", CACHE_SCHEMA_VERSION)?;
+
+        let run: i64 = conn.query_row(
+            "INSERT INTO cache_meta (key, value) VALUES ('run', 1)
+             ON CONFLICT (key) DO UPDATE SET value = value + 1
+             RETURNING value",
+            [],
+            |row| row.get(0),
+        )?;
+
+        Ok(Self {
+            conn: Mutex::new(conn),
+            max_bytes,
+            run,
+            extractor: format!("{}+{EXTRACTOR_VERSION}", env!("CARGO_PKG_VERSION")),
+            grammars: Mutex::new(HashMap::new()),
+            pending: Mutex::new(Vec::new()),
+            touched: Mutex::new(Vec::new()),
+            hits: AtomicUsize::new(0),
+            misses: AtomicUsize::new(0),
+        })
+    }
+
+    fn grammar(&self, language: Language) -> i64 {
+        *lock(&self.grammars)
+            .entry(language)
+            .or_insert_with(|| grammar_fingerprint(language))
+    }
+
+    /// The cached extraction for `key`, if any.
+    pub(crate) fn get(&self, key: ExtractionKey) -> Option<Extraction> {
+        let grammar = self.grammar(key.language);
+        let found: rusqlite::Result<Option<(i64, Vec<u8>)>> = lock(&self.conn)
+            .prepare_cached(
+                "SELECT id, payload FROM extractions
+                 WHERE content_hash = ?1 AND size_bytes = ?2 AND language = ?3
+                   AND grammar = ?4 AND extractor = ?5",
+            )
+            .and_then(|mut stmt| {
+                stmt.query_row(
+                    params![
+                        as_sql(key.content_hash),
+                        as_sql(key.size_bytes),
+                        key.language.as_str(),
+                        grammar,
+                        self.extractor,
+                    ],
+                    |row| Ok((row.get(0)?, row.get(1)?)),
+                )
+                .optional()
+            });
+        let (id, payload) = match found {
+            Ok(Some(entry)) => entry,
+            Ok(None) => return None,
+            Err(e) => {
+                warn!(error = %e, "Extraction cache lookup failed");
+                return None;
+            }
+        };
+        match decode(&payload) {
+            Ok(extraction) => {
+                lock(&self.touched).push(id);
+                self.hits.fetch_add(1, Ordering::Relaxed);
+                Some(extraction)
+            }
+            Err(e) => {
+                warn!(error = %e, "Discarding unreadable extraction cache entry");
+                None
+            }
+        }
+    }
+
+    /// Add `extraction`, just computed for `key`, to the cache.
+    pub(crate) fn put(&self, key: ExtractionKey, extraction: &Extraction) {
+        self.misses.fetch_add(1, Ordering::Relaxed);
+        let payload = match encode(extraction) {
+            Ok(payload) => payload,
+            Err(e) => {
+                warn!(error = %e, "Failed to encode extraction for the cache");
+                return;
+            }
+        };
+        let entry = PendingEntry {
+            key,
+            grammar: self.grammar(key.language),
+            payload,
+        };
+        let batch = {
+            let mut pending = lock(&self.pending);
+            pending.push(entry);
+            if pending.len() < FLUSH_EVERY {
+                return;
+            }
+            std::mem::take(&mut *pending)
+        };
+        if let Err(e) = self.write(&batch, &[]) {
+            warn!(error = %e, entries = batch.len(), "Failed to write extraction cache entries");
+        }
+    }
+
+    /// Insert `entries` and mark `touched` as used in this run, in one
+    /// transaction.
+    fn write(&self, entries: &[PendingEntry], touched: &[i64]) -> Result<()> {
+        let mut conn = lock(&self.conn);
+        let tx = conn.transaction()?;
+        {
+            let mut insert = tx.prepare_cached(
+                "INSERT INTO extractions
+                     (content_hash, size_bytes, language, grammar, extractor,
+                      payload, bytes, last_used)
+                 VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8)
+                 ON CONFLICT (content_hash, size_bytes, language, grammar, extractor)
+                 DO UPDATE SET payload = excluded.payload, bytes = excluded.bytes,
+                               last_used = excluded.last_used",
+            )?;
+            for entry in entries {
+                insert.execute(params![
+                    as_sql(entry.key.content_hash),
+                    as_sql(entry.key.size_bytes),
+                    entry.key.language.as_str(),
+                    entry.grammar,
+                    self.extractor,
+                    entry.payload,
+                    i64::try_from(entry.payload.len()).unwrap_or(i64::MAX),
+                    self.run,
+                ])?;
+            }
+            let mut touch =
+                tx.prepare_cached("UPDATE extractions SET last_used = ?1 WHERE id = ?2")?;
+            for id in touched {
+                touch.execute(params![self.run, id])?;
+            }
+        }
+        tx.commit()?;
+        Ok(())
+    }
+
+    /// Write what is still buffered, evict the least recently used
+    /// entries beyond the size limit, and report this run's activity.
+    pub(crate) fn finish(self) -> Result<ExtractionCacheStats> {
+        let pending = std::mem::take(&mut *lock(&self.pending));
+        let touched = std::mem::take(&mut *lock(&self.touched));
+        self.write(&pending, &touched)?;
+
+        let conn = lock(&self.conn);
+        // Keep the most recently used entries whose running total fits;
+        // within a run, later insertions first.
+        let evicted = conn.execute(
+            "DELETE FROM extractions WHERE id IN (
+                 SELECT id FROM (
+                     SELECT id, SUM(bytes) OVER (
+                         ORDER BY last_used DESC, id DESC
+                         ROWS UNBOUNDED PRECEDING
+                     ) AS running
+                     FROM extractions
+                 )
+                 WHERE running > ?1
+             )",
+            [as_sql(self.max_bytes)],
+        )?;
+        let bytes: i64 = conn.query_row(
+            "SELECT COALESCE(SUM(bytes), 0) FROM extractions",
+            [],
+            |row| row.get(0),
+        )?;
+
+        let stats = ExtractionCacheStats {
+            hits: self.hits.load(Ordering::Relaxed),
+            misses: self.misses.load(Ordering::Relaxed),
+            evicted,
+            bytes: u64::try_from(bytes).unwrap_or_default(),
+        };
+        debug!(?stats, "Extraction cache updated");
+        Ok(stats)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::languages::common::ExtractedReferenceKind;
+
+    fn extraction(name: &str) -> Extraction {
+        Extraction {
+            symbols: Vec::new(),
+            references: vec![ExtractedReference {
+                name: name.to_string(),
+                kind: ExtractedReferenceKind::Call,
+                line: 1,
+                column: 1,
+                path: None,
+                containing_symbol_span: None,
+            }],
+            imports: Vec::new(),
+            identifiers: vec![IdentifierLines {
+                name: name.to_string(),
+                lines: vec![1],
+            }],
+        }
+    }
+
+    fn key(content_hash: u64) -> ExtractionKey {
+        ExtractionKey {
+            content_hash,
+            size_bytes: 10,
+            language: Language::Rust,
+        }
+    }
+
+    #[test]
+    fn returns_what_an_earlier_run_stored() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let path = dir.path().join("cache.db");
+
+        let cache = ExtractionCache::open(&path, u64::MAX).expect("open");
+        assert!(cache.get(key(1)).is_none());
+        cache.put(key(1), &extraction("first"));
+        let stats = cache.finish().expect("finish");
+        assert_eq!((stats.hits, stats.misses, stats.evicted), (0, 1, 0));
+
+        let cache = ExtractionCache::open(&path, u64::MAX).expect("reopen");
+        let hit = cache.get(key(1)).expect("cached");
+        assert_eq!(hit.references[0].name, "first");
+        assert_eq!(hit.identifiers[0].lines, [1]);
+        assert!(
+            cache
+                .get(ExtractionKey {
+                    language: Language::CSharp,
+                    ..key(1)
+                })
+                .is_none(),
+            "the language is part of the key"
+        );
+        assert_eq!(cache.finish().expect("finish").hits, 1);
+    }
+
+    #[test]
+    fn evicts_least_recently_used_beyond_the_limit() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let path = dir.path().join("cache.db");
+
+        let cache = ExtractionCache::open(&path, u64::MAX).expect("open");
+        cache.put(key(1), &extraction("old"));
+        cache.put(key(2), &extraction("new"));
+        let full = cache.finish().expect("finish");
+
+        // A later run uses entry 1 only; a limit just short of both
+        // entries keeps it and evicts 2.
+        let cache = ExtractionCache::open(&path, full.bytes - 1).expect("reopen");
+        assert!(cache.get(key(1)).is_some());
+        let stats = cache.finish().expect("finish");
+        assert_eq!(stats.evicted, 1);
+
+        let cache = ExtractionCache::open(&path, u64::MAX).expect("reopen");
+        assert!(cache.get(key(1)).is_some());
+        assert!(cache.get(key(2)).is_none());
+    }
+}
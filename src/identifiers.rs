@@ -0,0 +1,83 @@
+//! Identifier-occurrence extraction (Pass 1a).
+//!
+//! Tokenizes a file's text into word-boundary identifiers and the lines
+//! they occur on, while the bytes are already in memory for parsing. The
+//! result is stored per file in the `identifier_lines` table and answers
+//! textual-mention questions (dead-code tiering, the unused-import textual
+//! guard) without re-reading the corpus from disk.
+//!
+//! The boundary rule is the identifier class `[A-Za-z0-9_]`; non-ASCII
+//! characters act as separators. Tokens starting with a digit (numeric
+//! literals, `0x1f`) are not identifiers and are dropped.
+//! Comments and strings are text like any other — textual means textual.
+
+use std::collections::HashMap;
+
+use serde::{Deserialize, Serialize};
+
+/// One identifier and the line (1-based, ascending) of every occurrence
+/// within a single file. A line repeats once per extra occurrence on it, so
+/// `lines.len()` is the file's word-boundary occurrence count.
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct IdentifierLines {
+    /// The identifier token.
+    pub name: String,
+    /// One line per occurrence of the token.
+    pub lines: Vec<u32>,
+}
+
+/// Tokenize `content` into identifier occurrences, sorted by name.
+pub(crate) fn extract_identifier_lines(content: &str) -> Vec<IdentifierLines> {
+    let mut by_name: HashMap<&str, Vec<u32>> = HashMap::new();
+    for (line_idx, line) in content.lines().enumerate() {
+        let line_no = u32::try_from(line_idx + 1).unwrap_or(u32::MAX);
+        for token in line
+            .split(|ch: char| !ch.is_ascii_alphanumeric() && ch != '_')
+            .filter(|t| t.bytes().next().is_some_and(|b| !b.is_ascii_digit()))
+        {
+            by_name.entry(token).or_default().push(line_no);
+        }
+    }
+
+    let mut out: Vec<IdentifierLines> = by_name
+        .into_iter()
+        .map(|(name, lines)| IdentifierLines {
+            name: name.to_string(),
+            lines,
+        })
+        .collect();
+    out.sort_unstable_by(|a, b| a.name.cmp(&b.name));
+    out
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn lines_are_per_occurrence_and_ascending() {
+        let ids = extract_identifier_lines("fn foo() { foo(); }\n// foo_bar 42\nlet x = 0x1f;\n");
+        let get = |name: &str| ids.iter().find(|i| i.name == name).map(|i| i.lines.clone());
+
+        assert_eq!(get("foo"), Some(vec![1, 1]), "one entry per occurrence");
+        assert_eq!(
+            get("foo_bar"),
+            Some(vec![2]),
+            "underscore is an identifier char"
+        );
+        assert_eq!(get("fn"), Some(vec![1]));
+        assert_eq!(get("42"), None, "numeric literals are not identifiers");
+        assert_eq!(get("0x1f"), None);
+        assert!(
+            ids.windows(2).all(|w| w[0].name < w[1].name),
+            "sorted by name"
+        );
+    }
+
+    #[test]
+    fn non_ascii_characters_separate_tokens() {
+        let ids = extract_identifier_lines("café_ok\n");
+        let names: Vec<&str> = ids.iter().map(|i| i.name.as_str()).collect();
+        assert_eq!(names, ["_ok", "caf"]);
+    }
+}
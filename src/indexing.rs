@@ -7,7 +7,7 @@
 //! - File-level dependency computation
 //! - Pending dependency resolution passes
 
-use std::collections::HashMap;
+use std::collections::{HashMap, HashSet};
 use std::path::{Path, PathBuf};
 use std::sync::Mutex;
 use std::sync::atomic::{AtomicUsize, Ordering};
@@ -18,14 +18,18 @@ use tracing::{debug, info, trace, warn};
 
 use crate::Tethys;
 use crate::batch_writer::BatchWriter;
-use crate::db::SymbolData;
+use crate::cancel::{self, CancellationToken};
+use crate::content_hash;
+use crate::db::{SymbolData, normalize_path};
 use crate::error::{Error, IndexError, IndexErrorKind, Result};
+use crate::extraction_cache::{self, Extraction, ExtractionCache, ExtractionKey};
+use crate::identifiers;
 use crate::languages::module_resolver::{ModuleContext, NamespaceMap, get_module_resolver};
 use crate::languages::{self, common};
-use crate::lsp;
 use crate::parallel::{OwnedSymbolData, ParsedFileData};
 use crate::types::{
-    ArchPhaseResult, FileId, Import, IndexOptions, IndexStats, Language, SymbolKind,
+    ArchPhaseResult, ExtractionCacheStats, FileId, Import, IndexOptions, IndexStats, IndexedFile,
+    Language, SymbolKind,
 };
 
 /// Pre-built file→crate assignment index for O(depth) ancestor-walk lookups.
@@ -144,6 +148,12 @@ impl Tethys {
     /// * `options` - Configuration for the indexing process, including whether
     ///   to use LSP for additional resolution.
     ///
+    /// A run under [`IndexOptions::cancellation`] that is cancelled stops at
+    /// the next checkpoint and returns `Ok` with [`IndexStats::cancelled`]
+    /// set: what was written before then is committed and consistent, but
+    /// the index is incomplete until the next full run, and
+    /// [`Self::is_index_complete`] says so.
+    ///
     /// # Example
     ///
     /// ```no_run
@@ -157,22 +167,145 @@ impl Tethys {
     /// println!("Resolved {} references via LSP", stats.total_lsp_resolved());
     /// # Ok::<(), tethys::Error>(())
     /// ```
+    pub fn index_with_options(&mut self, options: IndexOptions) -> Result<IndexStats> {
+        self.index_files(&options, None)
+    }
+
+    /// [`Self::index_with_options`], parsing only the discovered files
+    /// whose normalized workspace-relative path is in `reparse` when given
+    /// (see [`Self::update_with_options`]). Every other phase still covers
+    /// the whole index.
+    pub(crate) fn index_files(
+        &mut self,
+        options: &IndexOptions,
+        reparse: Option<&HashSet<String>>,
+    ) -> Result<IndexStats> {
+        self.ensure_writable()?;
+        let start = Instant::now();
+        let mut stats = IndexStats::default();
+        self.db.begin_generation(reparse)?;
+        let result = {
+            let _scope = cancel::enter(options.cancellation_token());
+            self.run_index_phases(options, reparse, &mut stats)
+        };
+        match result {
+            Ok(()) => {}
+            Err(Error::Cancelled) => {
+                warn!(
+                    files_indexed = stats.files_indexed,
+                    "Indexing cancelled; the index is incomplete"
+                );
+                stats.cancelled = true;
+            }
+            Err(e) => {
+                // The run may have committed some writes before failing;
+                // a new generation keeps cached reports from outliving them.
+                if let Err(commit) = self.db.commit_generation(false) {
+                    warn!(error = %commit, "Failed to commit the index generation");
+                }
+                self.finish_derived_tables(None, false);
+                return Err(e);
+            }
+        }
+        // Outside the cancellation scope: a cancelled run still committed
+        // writes, and its generation must record them.
+        stats.generation = self.db.commit_generation(!stats.cancelled)?;
+        self.finish_derived_tables(
+            (!stats.cancelled).then_some(stats.generation),
+            reparse.is_some(),
+        );
+        stats.duration = start.elapsed();
+        Ok(stats)
+    }
+
+    /// Bring the tables derived from refs (test reachability, the type
+    /// closure) up to date with a run that completed at `generation`,
+    /// incrementally when the run was an update, or drop what the update
+    /// prepared for them when it did not complete (`None`). A derived table
+    /// that cannot be brought up to date stays behind the generation, and
+    /// its readers compute from refs instead.
+    fn finish_derived_tables(&self, generation: Option<u64>, incremental: bool) {
+        let results = match generation {
+            Some(generation) => [
+                (
+                    "test_reach",
+                    self.db.finish_test_reach(generation, incremental),
+                ),
+                (
+                    "type_closure",
+                    self.db.finish_type_closure(generation, incremental),
+                ),
+            ],
+            None => [
+                ("test_reach", self.db.abandon_test_reach()),
+                ("type_closure", self.db.abandon_type_closure()),
+            ],
+        };
+        for (table, result) in results {
+            if let Err(e) = result {
+                warn!(table, error = %e, "Failed to update a derived table");
+            }
+        }
+    }
+
+    /// The extraction cache next to the index, when `options` enable it.
+    /// A cache that cannot be opened is logged and indexing parses
+    /// everything.
+    fn open_extraction_cache(&self, options: &IndexOptions) -> Option<ExtractionCache> {
+        let max_bytes = options.extraction_cache_limit()?;
+        let path = self
+            .db_path
+            .with_file_name(extraction_cache::CACHE_FILE_NAME);
+        match ExtractionCache::open(&path, max_bytes) {
+            Ok(cache) => Some(cache),
+            Err(e) => {
+                warn!(path = %path.display(), error = %e, "Failed to open extraction cache");
+                None
+            }
+        }
+    }
+
+    /// Flush and trim `cache` after Pass 1a, returning its activity.
+    fn finish_extraction_cache(cache: Option<ExtractionCache>) -> Option<ExtractionCacheStats> {
+        match cache?.finish() {
+            Ok(cache_stats) => Some(cache_stats),
+            Err(e) => {
+                warn!(error = %e, "Failed to update extraction cache");
+                None
+            }
+        }
+    }
+
+    /// Fail with [`Error::Config`] on a read-only `Tethys`, before any
+    /// indexing write.
+    pub(crate) fn ensure_writable(&self) -> Result<()> {
+        if self.db.is_read_only() {
+            return Err(Error::Config(
+                "cannot index through a read-only `Tethys` (opened with \
+                 `Tethys::open_read_only`); use `Tethys::new`"
+                    .to_string(),
+            ));
+        }
+        Ok(())
+    }
+
+    /// The phases of [`Self::index_files`], recording into `stats` as they
+    /// go so a cancelled run still reports what it did.
     #[expect(
         clippy::too_many_lines,
         reason = "orchestration method with sequential indexing phases"
     )]
-    pub fn index_with_options(&mut self, options: IndexOptions) -> Result<IndexStats> {
-        let start = Instant::now();
-        let mut files_indexed = 0;
-        let mut symbols_found = 0;
-        let mut references_found = 0;
-        let mut files_skipped = 0;
-        let mut directories_skipped = Vec::new();
-        let mut errors = Vec::new();
+    fn run_index_phases(
+        &mut self,
+        options: &IndexOptions,
+        reparse: Option<&HashSet<String>>,
+        stats: &mut IndexStats,
+    ) -> Result<()> {
         let mut pending: Vec<PendingDependency> = Vec::new();
 
         // Walk the workspace and find source files
-        let all_files = self.discover_files(&mut directories_skipped)?;
+        let all_files = self.discover_files(&mut stats.directories_skipped)?;
+        cancel::check()?;
 
         // Filter to supported languages and count skipped files
         let source_files: Vec<(PathBuf, Language)> = all_files
@@ -182,15 +315,12 @@ impl Tethys {
                 if let Some(language) = Language::from_extension(ext) {
                     Some((file_path, language))
                 } else {
-                    files_skipped += 1;
+                    stats.files_skipped += 1;
                     None
                 }
             })
             .collect();
 
-        let total_files = source_files.len();
-        let workspace_root = self.workspace_root.clone();
-
         // Orphan-cleanup pass (tethys-dhxo): purge rows for files deleted
         // from disk since their last index BEFORE any write/dependency pass.
         // Nothing else ever deletes them — the files-table DELETE logic only
@@ -206,12 +336,25 @@ impl Tethys {
             );
         }
 
+        // An update parses only its changed files; the rest keep the rows
+        // they already have.
+        let mut reparse = reparse.cloned();
+        let (source_files, held_back): (Vec<_>, Vec<_>) = match &reparse {
+            Some(keys) => source_files
+                .into_iter()
+                .partition(|(path, _)| keys.contains(&self.lookup_key(path))),
+            None => (source_files, Vec::new()),
+        };
+
         // Clear file_deps before per-file dependency computation so stale rows
         // from prior runs don't accumulate via the UPSERT in
-        // `insert_file_dependency`. Mirrors `clear_all_call_edges` at the
-        // start of the populate phase below; positioned earlier here because
-        // file_deps is written during per-file processing, not post-hoc like
-        // call_edges.
+        // `insert_file_dependency`. Mirrors `rebuild_call_edges` in the
+        // populate phase below; positioned earlier here because file_deps is
+        // written during per-file processing, not post-hoc like call_edges.
+        // Its repopulation spans the phases below and cannot share the
+        // clear's transaction, so a run cancelled before it ends leaves
+        // file_deps partial; the index stays marked incomplete (see
+        // `Index::is_complete`) until a later run completes.
         self.db.clear_all_file_deps().map_err(|e| {
             warn!(
                 error = %e,
@@ -221,189 +364,53 @@ impl Tethys {
             e
         })?;
 
-        if options.use_streaming() {
-            // =====================================================================
-            // STREAMING MODE: Parse in parallel, write immediately to background thread
-            // Memory usage is O(batch_size) instead of O(n)
-            // =====================================================================
-            info!(
-                total_files,
-                batch_size = options.streaming_batch_size(),
-                "Starting streaming indexing (parse + write in parallel)"
-            );
-
-            let batch_writer =
-                BatchWriter::new(self.db_path.clone(), options.streaming_batch_size());
-
-            let progress_counter = AtomicUsize::new(0);
-            let parse_errors: Mutex<Vec<IndexError>> = Mutex::new(Vec::new());
-
-            // Parse in parallel and send to background writer
-            source_files.par_iter().for_each(|(file_path, language)| {
-                let current = progress_counter.fetch_add(1, Ordering::Relaxed);
-                if current.is_multiple_of(100) {
-                    trace!(progress = current, total = total_files, "Parsing files...");
-                }
-
-                match Self::parse_file_static(&workspace_root, file_path, *language) {
-                    Ok(data) => {
-                        batch_writer.send(data);
-                    }
-                    Err(e) => {
-                        let kind = IndexErrorKind::from(&e);
-                        match parse_errors.lock() {
-                            Ok(mut guard) => {
-                                guard.push(IndexError::new(file_path.clone(), kind, e.to_string()));
-                            }
-                            Err(poisoned) => {
-                                tracing::warn!(
-                                    file = %file_path.display(),
-                                    "Mutex poisoned during error collection, recovering"
-                                );
-                                poisoned.into_inner().push(IndexError::new(
-                                    file_path.clone(),
-                                    kind,
-                                    e.to_string(),
-                                ));
-                            }
-                        }
-                    }
-                }
-            });
-
-            // Wait for batch writer to finish
-            let write_result = batch_writer.finish()?;
-            files_indexed = write_result.stats.files_written;
-            symbols_found = write_result.stats.symbols_written;
-            references_found = write_result.stats.references_written;
-
-            if write_result.stats.files_failed > 0 {
-                warn!(
-                    files_failed = write_result.stats.files_failed,
-                    files_written = write_result.stats.files_written,
-                    "Some files failed to write to database during streaming indexing"
+        let cache = self.open_extraction_cache(options);
+        let defined_before = reparse
+            .as_ref()
+            .map(|keys| self.db.symbol_names_in_files(keys))
+            .transpose()?;
+        self.write_files(&source_files, options, cache.as_ref(), stats, &mut pending)?;
+
+        // Unresolved value and macro_call refs are dropped at the end of
+        // every run, so a file an update does not re-parse no longer has the
+        // refs a symbol the update added would resolve. Re-parse the files
+        // naming such a symbol, as a full index would have resolved them.
+        if let (Some(keys), Some(before)) = (reparse.as_mut(), defined_before) {
+            let extra = self.files_naming_added_symbols(keys, &before)?;
+            if !extra.is_empty() {
+                debug!(
+                    files = extra.len(),
+                    "Re-parsing files that name symbols the update added"
                 );
+                self.db.extend_generation(&extra)?;
+                self.db.extend_test_reach(&extra)?;
+                self.db.extend_type_closure(&extra)?;
+                let extra_files: Vec<(PathBuf, Language)> = held_back
+                    .into_iter()
+                    .filter(|(path, _)| extra.contains(&self.lookup_key(path)))
+                    .collect();
+                self.write_files(&extra_files, options, cache.as_ref(), stats, &mut pending)?;
+                keys.extend(extra);
             }
+        }
+        stats.extraction_cache = Self::finish_extraction_cache(cache);
+        cancel::check()?;
 
-            // Collect parse errors
-            match parse_errors.into_inner() {
-                Ok(parse_errors_vec) => {
-                    errors.extend(parse_errors_vec);
-                }
-                Err(poisoned) => {
-                    tracing::warn!(
-                        "Mutex was poisoned during parallel parsing, recovering collected errors"
-                    );
-                    errors.extend(poisoned.into_inner());
-                }
-            }
-
-            info!(
-                files_indexed,
-                symbols_found,
-                references_found,
-                batches = write_result.stats.batches_committed,
-                "Streaming indexing complete"
-            );
-
+        if options.use_streaming() {
             // Compute file-level dependencies from stored data
             // This is done after all files are written so all file IDs are known
             self.compute_all_dependencies(&mut pending)?;
-        } else {
-            // =====================================================================
-            // BATCH MODE (default): Parse all files in parallel, then write sequentially
-            // Memory usage is O(n) where n = number of files
-            // =====================================================================
-            info!(total_files, "Starting parallel file parsing (Pass 1a)");
-
-            // Phase 1a: Parallel parsing with rayon
-            // Use AtomicUsize for thread-safe progress tracking
-            let progress_counter = AtomicUsize::new(0);
-            let parse_errors: Mutex<Vec<IndexError>> = Mutex::new(Vec::new());
-
-            let parsed_files: Vec<ParsedFileData> = source_files
-                .par_iter()
-                .filter_map(|(file_path, language)| {
-                    let current = progress_counter.fetch_add(1, Ordering::Relaxed);
-                    if current.is_multiple_of(100) {
-                        trace!(progress = current, total = total_files, "Parsing files...");
-                    }
-
-                    match Self::parse_file_static(&workspace_root, file_path, *language) {
-                        Ok(data) => Some(data),
-                        Err(e) => {
-                            let kind = IndexErrorKind::from(&e);
-                            // Handle mutex poisoning - we still want to collect errors even if
-                            // another thread panicked. PoisonError contains the guard.
-                            match parse_errors.lock() {
-                                Ok(mut guard) => {
-                                    guard.push(IndexError::new(
-                                        file_path.clone(),
-                                        kind,
-                                        e.to_string(),
-                                    ));
-                                }
-                                Err(poisoned) => {
-                                    tracing::warn!(
-                                        file = %file_path.display(),
-                                        "Mutex poisoned during error collection, recovering"
-                                    );
-                                    poisoned.into_inner().push(IndexError::new(
-                                        file_path.clone(),
-                                        kind,
-                                        e.to_string(),
-                                    ));
-                                }
-                            }
-                            None
-                        }
-                    }
-                })
+        } else if let Some(keys) = &reparse {
+            // Files an update did not re-parse lost their file_deps rows
+            // with everyone's above; recompute theirs from stored data, as
+            // streaming mode does for all files.
+            let unparsed = self
+                .db
+                .list_all_files()?
+                .into_iter()
+                .filter(|file| !keys.contains(&normalize_path(&file.path)))
                 .collect();
-
-            // Collect parse errors, recovering from mutex poisoning if needed
-            match parse_errors.into_inner() {
-                Ok(parse_errors_vec) => {
-                    errors.extend(parse_errors_vec);
-                }
-                Err(poisoned) => {
-                    tracing::warn!(
-                        "Mutex was poisoned during parallel parsing, recovering collected errors"
-                    );
-                    errors.extend(poisoned.into_inner());
-                }
-            }
-
-            info!(
-                parsed_count = parsed_files.len(),
-                error_count = errors.len(),
-                "Parallel parsing complete (Pass 1a), starting sequential write (Pass 1b)"
-            );
-
-            // Phase 1b: Sequential database writes
-            // This must be sequential because rusqlite Connection is not Sync
-            for data in &parsed_files {
-                match self.write_parsed_file(data, &mut pending) {
-                    Ok((sym_count, ref_count)) => {
-                        files_indexed += 1;
-                        symbols_found += sym_count;
-                        references_found += ref_count;
-                    }
-                    Err(e) => {
-                        let kind = IndexErrorKind::from(&e);
-                        errors.push(IndexError::new(
-                            data.relative_path.clone(),
-                            kind,
-                            e.to_string(),
-                        ));
-                    }
-                }
-            }
-
-            info!(
-                files_indexed,
-                symbols_found, references_found, "Sequential write complete (Pass 1b)"
-            );
+            self.compute_stored_dependencies(unparsed, &mut pending)?;
         }
 
         // Resolution passes: retry pending dependencies until stable
@@ -413,6 +420,7 @@ impl Tethys {
             pass += 1;
             let before = pending.len();
             prev_count = before;
+            cancel::check()?;
             pending = self.resolve_pending(pending)?;
             debug!(
                 pass,
@@ -423,7 +431,7 @@ impl Tethys {
         }
 
         // Convert remaining pending to (from_path, dep_path) for reporting
-        let unresolved_dependencies: Vec<(PathBuf, PathBuf)> = pending
+        stats.unresolved_dependencies = pending
             .into_iter()
             .filter_map(|p| match self.db.get_file_by_id(p.from_file_id) {
                 Ok(Some(f)) => Some((f.path, p.dep_path)),
@@ -446,7 +454,7 @@ impl Tethys {
             .collect();
 
         // Log unresolved dependencies with actual file paths
-        for (from_path, dep_path) in &unresolved_dependencies {
+        for (from_path, dep_path) in &stats.unresolved_dependencies {
             debug!(
                 from_file = %from_path.display(),
                 dep_path = %dep_path.display(),
@@ -455,6 +463,7 @@ impl Tethys {
         }
 
         // Pass 2: Resolve cross-file references using import information
+        cancel::check()?;
         let resolved_refs = self.resolve_cross_file_references()?;
         if resolved_refs > 0 {
             tracing::info!(
@@ -463,39 +472,21 @@ impl Tethys {
             );
         }
 
-        // Pass 3: LSP-based resolution (optional)
-        // Resolve each language separately using its appropriate LSP server
-        let lsp_sessions = if options.use_lsp() {
-            let mut sessions = Vec::new();
-
-            let rust_provider = lsp::AnyProvider::for_language(Language::Rust);
-            let rust_result =
-                self.resolve_via_lsp(&rust_provider, Language::Rust, options.lsp_timeout_secs())?;
-            if rust_result.has_resolutions() {
-                tracing::info!(
-                    language = "rust",
-                    resolved_count = rust_result.resolved_count(),
-                    "Resolved references via LSP"
-                );
-            }
-            sessions.push(rust_result);
-
-            let csharp_provider = lsp::AnyProvider::for_language(Language::CSharp);
-            let csharp_result = self.resolve_via_lsp(
-                &csharp_provider,
-                Language::CSharp,
-                options.lsp_timeout_secs(),
-            )?;
-            if csharp_result.has_resolutions() {
-                tracing::info!(
-                    language = "csharp",
-                    resolved_count = csharp_result.resolved_count(),
-                    "Resolved references via LSP"
-                );
-            }
-            sessions.push(csharp_result);
+        // Pass 3, from a SCIP index (optional): the same answers an LSP
+        // session would give, precomputed, so no server is started for the
+        // references it covers.
+        cancel::check()?;
+        stats.scip_import = options
+            .scip_index_path()
+            .map(|path| self.resolve_via_scip(path))
+            .transpose()?;
 
-            sessions
+        // Pass 3: LSP-based resolution (optional)
+        // Each language gets its own server (or several, when sharded); all
+        // sessions run concurrently and their resolutions land in one batch.
+        cancel::check()?;
+        stats.lsp_sessions = if options.use_lsp() {
+            self.resolve_via_lsp(&[Language::Rust, Language::CSharp], options)?
         } else {
             Vec::new()
         };
@@ -505,6 +496,7 @@ impl Tethys {
         // name locals/externals and would otherwise pad the refs table.
         // Must run after all resolution passes, before call-edge population
         // reads the refs table.
+        cancel::check()?;
         let dropped_unresolved_refs = self.db.drop_unresolved_value_and_macro_call_refs()?;
         if dropped_unresolved_refs > 0 {
             tracing::debug!(
@@ -513,9 +505,12 @@ impl Tethys {
             );
         }
 
-        // Populate pre-computed call graph edges after all resolution passes
-        self.db.clear_all_call_edges()?;
-        let call_edges_count = self.db.populate_call_edges()?;
+        // Populate pre-computed call graph edges after all resolution
+        // passes, replacing the old ones in one transaction. The change
+        // feed first fingerprints the edges of files whose refs resolved
+        // differently in this run.
+        self.db.capture_generation()?;
+        let call_edges_count = self.db.rebuild_call_edges()?;
         if call_edges_count > 0 {
             tracing::debug!(call_edges = call_edges_count, "Populated call graph edges");
         }
@@ -529,6 +524,7 @@ impl Tethys {
         // a type the caller never imported), but the aggregation refuses
         // to record it as a file-level dependency without corroborating
         // import evidence.
+        cancel::check()?;
         let file_crate_map = self.build_file_crate_map()?;
         let file_deps_from_calls = self
             .db
@@ -543,7 +539,8 @@ impl Tethys {
         // Update query planner statistics after bulk writes
         self.db.analyze()?;
 
-        let arch_phase = match self.run_architecture_phase() {
+        cancel::check()?;
+        stats.arch_phase = match self.run_architecture_phase() {
             Ok(arch) => {
                 tracing::debug!(
                     packages = arch.packages_recorded,
@@ -553,6 +550,7 @@ impl Tethys {
                 );
                 Some(ArchPhaseResult::Completed(arch))
             }
+            Err(Error::Cancelled) => return Err(Error::Cancelled),
             Err(e) => {
                 tracing::warn!(
                     error = %e,
@@ -562,18 +560,7 @@ impl Tethys {
             }
         };
 
-        Ok(IndexStats {
-            files_indexed,
-            symbols_found,
-            references_found,
-            duration: start.elapsed(),
-            files_skipped,
-            directories_skipped,
-            errors,
-            unresolved_dependencies,
-            lsp_sessions,
-            arch_phase,
-        })
+        Ok(())
     }
 
     /// Build a map of `FileId` -> crate name for every indexed file.
@@ -621,13 +608,16 @@ impl Tethys {
     ///
     /// This is a static method that can be called from parallel threads.
     /// It reads the file, parses it with tree-sitter, and extracts symbols,
-    /// references, and imports without touching the database.
+    /// references, and imports without touching the database. With a
+    /// `cache`, an extraction cached for the same content is used instead
+    /// of parsing, and a fresh one is added to it.
     ///
     /// # Arguments
     ///
     /// * `workspace_root` - The workspace root for computing relative paths
     /// * `file_path` - Absolute path to the file to parse
     /// * `language` - The detected language of the file
+    /// * `cache` - The extraction cache, when enabled
     ///
     /// # Returns
     ///
@@ -637,7 +627,81 @@ impl Tethys {
         workspace_root: &Path,
         file_path: &Path,
         language: Language,
+        cache: Option<&ExtractionCache>,
     ) -> Result<ParsedFileData> {
+        // Read file content
+        let content = std::fs::read(file_path)?;
+        let content_str = std::str::from_utf8(&content)
+            .map_err(|_| Error::Parser("file is not valid UTF-8".to_string()))?;
+        let content_hash = content_hash::content_hash(&content);
+
+        let key = ExtractionKey {
+            content_hash,
+            size_bytes: content.len() as u64,
+            language,
+        };
+        let extraction = match cache.and_then(|cache| cache.get(key)) {
+            Some(extraction) => extraction,
+            None => {
+                let extraction = Self::extract_file(file_path, content_str, language)?;
+                if let Some(cache) = cache {
+                    cache.put(key, &extraction);
+                }
+                extraction
+            }
+        };
+
+        let metadata = std::fs::metadata(file_path)?;
+        #[expect(
+            clippy::cast_possible_truncation,
+            reason = "nanosecond timestamp fits in i64 until year 2262"
+        )]
+        let mtime_ns = match metadata.modified() {
+            Ok(mtime) => match mtime.duration_since(UNIX_EPOCH) {
+                Ok(duration) => duration.as_nanos() as i64,
+                Err(e) => {
+                    debug!(path = %file_path.display(), error = %e, "File modification time before Unix epoch, using 0");
+                    0
+                }
+            },
+            Err(e) => {
+                debug!(path = %file_path.display(), error = %e, "Cannot read file modification time, using 0");
+                0
+            }
+        };
+        let size_bytes = metadata.len();
+
+        // Compute relative path — reject files outside the workspace boundary
+        let relative_path = file_path
+            .strip_prefix(workspace_root)
+            .map_err(|_| {
+                Error::Config(format!(
+                    "file '{}' is outside workspace root '{}'",
+                    file_path.display(),
+                    workspace_root.display()
+                ))
+            })?
+            .to_path_buf();
+
+        let parsed = ParsedFileData {
+            relative_path,
+            language,
+            mtime_ns,
+            size_bytes,
+            content_hash,
+            symbols: extraction.symbols,
+            references: extraction.references,
+            imports: extraction.imports,
+            identifiers: extraction.identifiers,
+        };
+        parsed.debug_assert_valid();
+        Ok(parsed)
+    }
+
+    /// Parse `content` with tree-sitter and run `language`'s extractors
+    /// over it: the content-only part of [`Self::parse_file_static`], and
+    /// what the extraction cache stores.
+    fn extract_file(file_path: &Path, content_str: &str, language: Language) -> Result<Extraction> {
         use std::cell::RefCell;
 
         // Thread-local parser to avoid re-initialization overhead
@@ -645,11 +709,6 @@ impl Tethys {
             static PARSER: RefCell<tree_sitter::Parser> = RefCell::new(tree_sitter::Parser::new());
         }
 
-        // Read file content
-        let content = std::fs::read(file_path)?;
-        let content_str = std::str::from_utf8(&content)
-            .map_err(|_| Error::Parser("file is not valid UTF-8".to_string()))?;
-
         let lang_support = languages::get_language_support(language);
 
         // try_borrow_mut prevents panics if code structure changes to allow re-entrant calls
@@ -676,26 +735,7 @@ impl Tethys {
         let extracted = lang_support.extract_symbols(&tree, content_str.as_bytes());
         let imports = lang_support.extract_imports(&tree, content_str.as_bytes());
         let references = lang_support.extract_references(&tree, content_str.as_bytes());
-
-        let metadata = std::fs::metadata(file_path)?;
-        #[expect(
-            clippy::cast_possible_truncation,
-            reason = "nanosecond timestamp fits in i64 until year 2262"
-        )]
-        let mtime_ns = match metadata.modified() {
-            Ok(mtime) => match mtime.duration_since(UNIX_EPOCH) {
-                Ok(duration) => duration.as_nanos() as i64,
-                Err(e) => {
-                    debug!(path = %file_path.display(), error = %e, "File modification time before Unix epoch, using 0");
-                    0
-                }
-            },
-            Err(e) => {
-                debug!(path = %file_path.display(), error = %e, "Cannot read file modification time, using 0");
-                0
-            }
-        };
-        let size_bytes = metadata.len();
+        let identifiers = identifiers::extract_identifier_lines(content_str);
 
         // Convert extracted symbols to owned versions.
         //
@@ -735,29 +775,12 @@ impl Tethys {
             })
             .collect();
 
-        // Compute relative path — reject files outside the workspace boundary
-        let relative_path = file_path
-            .strip_prefix(workspace_root)
-            .map_err(|_| {
-                Error::Config(format!(
-                    "file '{}' is outside workspace root '{}'",
-                    file_path.display(),
-                    workspace_root.display()
-                ))
-            })?
-            .to_path_buf();
-
-        let parsed = ParsedFileData {
-            relative_path,
-            language,
-            mtime_ns,
-            size_bytes,
+        Ok(Extraction {
             symbols,
             references,
             imports,
-        };
-        parsed.debug_assert_valid();
-        Ok(parsed)
+            identifiers,
+        })
     }
 
     /// Write a single parsed file to the database and compute its dependencies.
@@ -794,10 +817,11 @@ impl Tethys {
             data.language,
             data.mtime_ns,
             data.size_bytes,
-            None,
+            Some(data.content_hash),
             &symbol_data,
             &data.references,
             &data.imports,
+            Some(&data.identifiers),
         )?;
 
         // Compute and store file dependencies (reusing full_path from above)
@@ -907,6 +931,245 @@ impl Tethys {
         Ok(())
     }
 
+    /// Pass 1 over `source_files`: parse them (in parallel) and write their
+    /// symbols, references and imports, recording into `stats`. Batch mode
+    /// also computes their file dependencies into `pending`; streaming mode
+    /// leaves that to [`Self::compute_all_dependencies`].
+    #[expect(
+        clippy::too_many_lines,
+        reason = "the streaming and batch write modes side by side"
+    )]
+    fn write_files(
+        &mut self,
+        source_files: &[(PathBuf, Language)],
+        options: &IndexOptions,
+        cache: Option<&ExtractionCache>,
+        stats: &mut IndexStats,
+        pending: &mut Vec<PendingDependency>,
+    ) -> Result<()> {
+        let workspace_root = self.workspace_root.clone();
+        let total_files = source_files.len();
+
+        if options.use_streaming() {
+            // =====================================================================
+            // STREAMING MODE: Parse in parallel, write immediately to background thread
+            // Memory usage is O(batch_size) instead of O(n)
+            // =====================================================================
+            info!(
+                total_files,
+                batch_size = options.streaming_batch_size(),
+                "Starting streaming indexing (parse + write in parallel)"
+            );
+
+            let batch_writer =
+                BatchWriter::new(self.db_path.clone(), options.streaming_batch_size());
+
+            let progress_counter = AtomicUsize::new(0);
+            let parse_errors: Mutex<Vec<IndexError>> = Mutex::new(Vec::new());
+            let token = cancel::current();
+
+            // Parse in parallel and send to background writer
+            source_files.par_iter().for_each(|(file_path, language)| {
+                if token.as_ref().is_some_and(CancellationToken::is_cancelled) {
+                    return;
+                }
+                let current = progress_counter.fetch_add(1, Ordering::Relaxed);
+                if current.is_multiple_of(100) {
+                    trace!(progress = current, total = total_files, "Parsing files...");
+                }
+
+                match Self::parse_file_static(&workspace_root, file_path, *language, cache) {
+                    Ok(data) => {
+                        batch_writer.send(data);
+                    }
+                    Err(e) => {
+                        let kind = IndexErrorKind::from(&e);
+                        match parse_errors.lock() {
+                            Ok(mut guard) => {
+                                guard.push(IndexError::new(file_path.clone(), kind, e.to_string()));
+                            }
+                            Err(poisoned) => {
+                                tracing::warn!(
+                                    file = %file_path.display(),
+                                    "Mutex poisoned during error collection, recovering"
+                                );
+                                poisoned.into_inner().push(IndexError::new(
+                                    file_path.clone(),
+                                    kind,
+                                    e.to_string(),
+                                ));
+                            }
+                        }
+                    }
+                }
+            });
+
+            // Wait for batch writer to finish
+            let write_result = batch_writer.finish()?;
+            stats.files_indexed += write_result.stats.files_written;
+            stats.symbols_found += write_result.stats.symbols_written;
+            stats.references_found += write_result.stats.references_written;
+
+            if write_result.stats.files_failed > 0 {
+                warn!(
+                    files_failed = write_result.stats.files_failed,
+                    files_written = write_result.stats.files_written,
+                    "Some files failed to write to database during streaming indexing"
+                );
+            }
+
+            // Collect parse errors
+            match parse_errors.into_inner() {
+                Ok(parse_errors_vec) => {
+                    stats.errors.extend(parse_errors_vec);
+                }
+                Err(poisoned) => {
+                    tracing::warn!(
+                        "Mutex was poisoned during parallel parsing, recovering collected errors"
+                    );
+                    stats.errors.extend(poisoned.into_inner());
+                }
+            }
+
+            info!(
+                files_indexed = stats.files_indexed,
+                symbols_found = stats.symbols_found,
+                references_found = stats.references_found,
+                batches = write_result.stats.batches_committed,
+                "Streaming indexing complete"
+            );
+        } else {
+            // =====================================================================
+            // BATCH MODE (default): Parse all files in parallel, then write sequentially
+            // Memory usage is O(n) where n = number of files
+            // =====================================================================
+            info!(total_files, "Starting parallel file parsing (Pass 1a)");
+
+            // Phase 1a: Parallel parsing with rayon
+            // Use AtomicUsize for thread-safe progress tracking
+            let progress_counter = AtomicUsize::new(0);
+            let parse_errors: Mutex<Vec<IndexError>> = Mutex::new(Vec::new());
+            let token = cancel::current();
+
+            let parsed_files: Vec<ParsedFileData> = source_files
+                .par_iter()
+                .filter_map(|(file_path, language)| {
+                    if token.as_ref().is_some_and(CancellationToken::is_cancelled) {
+                        return None;
+                    }
+                    let current = progress_counter.fetch_add(1, Ordering::Relaxed);
+                    if current.is_multiple_of(100) {
+                        trace!(progress = current, total = total_files, "Parsing files...");
+                    }
+
+                    match Self::parse_file_static(&workspace_root, file_path, *language, cache) {
+                        Ok(data) => Some(data),
+                        Err(e) => {
+                            let kind = IndexErrorKind::from(&e);
+                            // Handle mutex poisoning - we still want to collect errors even if
+                            // another thread panicked. PoisonError contains the guard.
+                            match parse_errors.lock() {
+                                Ok(mut guard) => {
+                                    guard.push(IndexError::new(
+                                        file_path.clone(),
+                                        kind,
+                                        e.to_string(),
+                                    ));
+                                }
+                                Err(poisoned) => {
+                                    tracing::warn!(
+                                        file = %file_path.display(),
+                                        "Mutex poisoned during error collection, recovering"
+                                    );
+                                    poisoned.into_inner().push(IndexError::new(
+                                        file_path.clone(),
+                                        kind,
+                                        e.to_string(),
+                                    ));
+                                }
+                            }
+                            None
+                        }
+                    }
+                })
+                .collect();
+
+            // Collect parse errors, recovering from mutex poisoning if needed
+            match parse_errors.into_inner() {
+                Ok(parse_errors_vec) => {
+                    stats.errors.extend(parse_errors_vec);
+                }
+                Err(poisoned) => {
+                    tracing::warn!(
+                        "Mutex was poisoned during parallel parsing, recovering collected errors"
+                    );
+                    stats.errors.extend(poisoned.into_inner());
+                }
+            }
+
+            info!(
+                parsed_count = parsed_files.len(),
+                error_count = stats.errors.len(),
+                "Parallel parsing complete (Pass 1a), starting sequential write (Pass 1b)"
+            );
+
+            cancel::check()?;
+
+            // Phase 1b: Sequential database writes
+            // This must be sequential because rusqlite Connection is not Sync
+            for data in &parsed_files {
+                cancel::check()?;
+                match self.write_parsed_file(data, pending) {
+                    Ok((sym_count, ref_count)) => {
+                        stats.files_indexed += 1;
+                        stats.symbols_found += sym_count;
+                        stats.references_found += ref_count;
+                    }
+                    Err(Error::Cancelled) => return Err(Error::Cancelled),
+                    Err(e) => {
+                        let kind = IndexErrorKind::from(&e);
+                        stats.errors.push(IndexError::new(
+                            data.relative_path.clone(),
+                            kind,
+                            e.to_string(),
+                        ));
+                    }
+                }
+            }
+
+            info!(
+                files_indexed = stats.files_indexed,
+                symbols_found = stats.symbols_found,
+                references_found = stats.references_found,
+                "Sequential write complete (Pass 1b)"
+            );
+        }
+
+        Ok(())
+    }
+
+    /// The files outside `reparsed` that may name a symbol the update's
+    /// files define now but did not before (`defined_before`).
+    fn files_naming_added_symbols(
+        &self,
+        reparsed: &HashSet<String>,
+        defined_before: &HashSet<String>,
+    ) -> Result<HashSet<String>> {
+        let added: Vec<String> = self
+            .db
+            .symbol_names_in_files(reparsed)?
+            .into_iter()
+            .filter(|name| !defined_before.contains(name))
+            .collect();
+        Ok(self
+            .db
+            .files_naming(&added)?
+            .iter()
+            .map(|path| normalize_path(path))
+            .filter(|key| !reparsed.contains(key))
+            .collect())
+    }
+
     /// Compute file-level dependencies for all indexed files from stored data.
     ///
     /// This is used in streaming mode where dependencies cannot be computed during
@@ -918,6 +1181,15 @@ impl Tethys {
     /// `compute_dependencies`.
     fn compute_all_dependencies(&mut self, pending: &mut Vec<PendingDependency>) -> Result<()> {
         let files = self.db.list_all_files()?;
+        self.compute_stored_dependencies(files, pending)
+    }
+
+    /// [`Self::compute_all_dependencies`] for just `files`.
+    fn compute_stored_dependencies(
+        &mut self,
+        files: Vec<IndexedFile>,
+        pending: &mut Vec<PendingDependency>,
+    ) -> Result<()> {
         let file_count = files.len();
 
         debug!(
@@ -1738,6 +2010,40 @@ mod tests {
         assert_eq!(result.len(), 1);
         assert_eq!(result[0].alias, Some("Map".to_string()));
     }
+
+    #[test]
+    fn call_edge_rebuild_cancelled_midway_keeps_the_previous_edges() {
+        // Enough refs that populating the edges outlasts a progress-handler
+        // poll, which then interrupts it.
+        let mut source = String::from("pub fn helper() {}\n");
+        for i in 0..500 {
+            source.push_str(&format!("pub fn caller_{i}() {{\n    helper();\n}}\n"));
+        }
+        let (_dir, tethys) = indexed_workspace(&[("src/lib.rs", &source)]);
+        let count = |tethys: &Tethys| -> i64 {
+            tethys
+                .db
+                .connection()
+                .expect("conn")
+                .query_row("SELECT COUNT(*) FROM call_edges", [], |row| row.get(0))
+                .expect("count call edges")
+        };
+        assert_eq!(count(&tethys), 500);
+
+        let token = CancellationToken::new();
+        token.cancel();
+        let result = {
+            let _scope = cancel::enter(Some(&token));
+            tethys.db.rebuild_call_edges()
+        };
+
+        assert!(matches!(result, Err(Error::Cancelled)), "got {result:?}");
+        assert_eq!(
+            count(&tethys),
+            500,
+            "the clear rolled back with the rebuild"
+        );
+    }
 }
 
 #[cfg(test)]
@@ -3,6 +3,8 @@
 //! These types represent the intermediate output of tree-sitter extraction,
 //! before conversion to the database domain model in `crate::types`.
 
+use serde::{Deserialize, Serialize};
+
 use crate::types::{FunctionSignature, Span, SymbolKind, Visibility};
 
 /// An extracted symbol from source code.
@@ -50,7 +52,7 @@ pub struct ExtractedSymbol {
 /// `cfg_attr` mention `specta::Type`") match by substring on the args, and
 /// tree-sitter does not surface nested attributes as structured children
 /// inside `cfg_attr(...)` anyway.
-#[derive(Debug, Clone, PartialEq, Eq)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct ExtractedAttribute {
     pub name: String,
     pub args: Option<String>,
@@ -72,7 +74,7 @@ pub(crate) fn strip_outer_parens(raw: &str) -> &str {
 }
 
 /// An extracted reference (usage of a symbol) from source code.
-#[derive(Debug, Clone, PartialEq, Eq)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct ExtractedReference {
     /// Name of the referenced symbol
     pub name: String,
@@ -137,7 +139,7 @@ pub(crate) fn reexport_referenced_names(
 ///
 /// Note: This is distinct from `types::ReferenceKind` which is the domain model
 /// stored in the database. This enum represents what we extract from the AST.
-#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
 pub enum ExtractedReferenceKind {
     /// Function or method call
     Call,
@@ -199,7 +201,7 @@ impl ExtractedReferenceKind {
 ///
 /// Language-specific import types (`UseStatement`, `UsingDirective`) can convert
 /// to this common representation for cross-language analysis.
-#[derive(Debug, Clone, PartialEq, Eq)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct ImportStatement {
     /// Path segments (e.g., `["crate", "auth"]` or `["System", "Collections"]`)
     pub path: Vec<String>,
@@ -214,9 +216,9 @@ pub struct ImportStatement {
     /// Whether this import re-exports its names (`pub use` in Rust).
     ///
     /// Re-exports are API surface, not local usage — analyses like
-    /// unused-import detection must skip them. Not persisted in the
-    /// imports table; only populated on freshly parsed statements
-    /// (always `false` when reconstructed from the database).
+    /// unused-import detection must skip them. Persisted in
+    /// `import_statements` but not in the per-name `imports` table
+    /// (always `false` when reconstructed from the latter).
     pub is_reexport: bool,
 }
 
@@ -34,21 +34,31 @@
 //! ```
 
 mod batch_writer;
+mod cancel;
 pub mod cargo;
+mod content_hash;
 mod db;
 mod dead_code;
+mod diff;
 mod error;
+mod extraction_cache;
 mod graph;
+mod identifiers;
 mod indexing;
 mod languages;
 pub mod lsp;
 mod parallel;
 mod reindex;
+mod report_cache;
 mod resolve;
 mod resolver;
+mod scip;
 mod types;
 mod unused_imports;
+#[doc(hidden)]
+pub mod word_scan;
 
+pub use cancel::CancellationToken;
 pub use cargo::discover_crates;
 pub use db::{
     Demotion, DeprecatedFinding, DeprecatedSymbol, HierarchyDirection, HierarchyNode,
@@ -59,20 +69,26 @@ pub use error::{Error, IndexError, IndexErrorKind, Result};
 pub use graph::{FileImpact, FileImpactDependent, SymbolImpact, SymbolImpactCaller};
 pub use types::{
     AffectedTestsReport, ArchPhaseResult, ArchStats, CallEdgeSelection, Caller, CallerMode,
-    CouplingDetail, CouplingMetrics, CouplingSort, CrateInfo, Cycle, DatabaseStats, FileAnalysis,
-    FileId, FunctionSignature, Import, IndexOptions, IndexStats, IndexUpdate, IndexedFile,
-    Language, LspCompletedSession, LspOutcome, LspSessionResult, Package, PackageDependency,
-    PackageId, PackageSource, PanicKind, PanicPoint, Parameter, ParameterKind, QueryStanding,
+    ChangeKind, ChangedEntity, CouplingDetail, CouplingMetrics, CouplingSort, CrateInfo, Cycle,
+    DatabaseStats, ExtractionCacheStats, FileAnalysis, FileId, FunctionSignature, Import,
+    IndexChange, IndexChanges, IndexOptions, IndexStats, IndexUpdate, IndexedFile, Language,
+    LspCompletedSession, LspOutcome, LspSessionResult, Package, PackageDependency, PackageId,
+    PackageSource, PanicDensity, PanicKind, PanicPoint, Parameter, ParameterKind, QueryStanding,
     ReachabilityDirection, ReachabilityResult, ReachablePath, Reference, ReferenceKind,
-    ResolutionStrategy, Span, StalenessReport, StandingReason, StandingReasonKind, Symbol,
-    SymbolId, SymbolKind, UnresolvedRefForLsp, Visibility,
+    ResolutionStrategy, ScipImportStats, SnapshotStats, Span, StalenessReport, StandingReason,
+    StandingReasonKind, Symbol, SymbolId, SymbolKind, TestReach, UnresolvedRefForLsp, Visibility,
 };
 pub use unused_imports::{UnusedImport, UnusedImportConfidence};
 
 use std::borrow::Cow;
+use std::collections::HashMap;
 use std::path::{Path, PathBuf};
+use std::sync::{Arc, OnceLock};
 
 use db::Index;
+use report_cache::ReportCache;
+use serde::Serialize;
+use serde::de::DeserializeOwned;
 use tracing::{debug, trace, warn};
 
 /// Code intelligence cache and query interface.
@@ -86,11 +102,51 @@ pub struct Tethys {
     db_path: PathBuf,
     db: Index,
     crates: Vec<CrateInfo>,
+    /// Per-language replacements for the bundled language servers, set
+    /// with [`Tethys::set_lsp_provider`].
+    lsp_providers: HashMap<Language, Arc<dyn lsp::LspProvider>>,
+    /// Whether whole-workspace reports go through the report cache; see
+    /// [`Tethys::set_report_cache`].
+    report_cache_enabled: bool,
+    /// The report cache next to the index, opened on first use (`None`
+    /// when it could not be).
+    report_cache: OnceLock<Option<ReportCache>>,
+}
+
+/// `workspace_root`, canonicalized: every stored and compared path hangs
+/// off it.
+fn canonical_workspace_root(workspace_root: &Path) -> Result<PathBuf> {
+    workspace_root.canonicalize().map_err(|e| {
+        Error::Io(std::io::Error::new(
+            e.kind(),
+            format!("workspace root not found: {}", workspace_root.display()),
+        ))
+    })
+}
+
+/// The crates of `workspace_root`: the discovery cached in `db` while none
+/// of its inputs changed, else a fresh [`cargo::discover_crates`], cached
+/// for next time unless `db` is read-only. Cache failures only cost the
+/// rediscovery.
+fn load_crates(db: &Index, workspace_root: &Path) -> Vec<CrateInfo> {
+    match db.cached_crate_discovery(workspace_root) {
+        Ok(Some(crates)) => return crates,
+        Ok(None) => {}
+        Err(e) => warn!(error = %e, "Failed to read cached crate discovery"),
+    }
+    let (crates, inputs) = cargo::discover_crates_with_inputs(workspace_root);
+    if !db.is_read_only()
+        && let Err(e) = db.store_crate_discovery(workspace_root, &crates, &inputs)
+    {
+        warn!(error = %e, "Failed to cache crate discovery");
+    }
+    crates
 }
 
 /// The canonical on-disk location of a workspace's index:
 /// `.rivets/index/tethys.db` under the workspace root. Single source for
-/// [`Tethys::new`] and [`Tethys::remove_index_files`].
+/// [`Tethys::new`], [`Tethys::open_read_only`] and
+/// [`Tethys::remove_index_files`].
 fn index_db_path(workspace_root: &Path) -> PathBuf {
     workspace_root
         .join(".rivets")
@@ -167,17 +223,31 @@ impl Tethys {
     /// - Excludes common build directories (`target/`, `node_modules/`, `bin/`, `obj/`, `build/`, `dist/`, `vendor/`, `__pycache__`)
     /// - Database stored at `.rivets/index/tethys.db`
     pub fn new(workspace_root: &Path) -> Result<Self> {
-        let workspace_root = workspace_root.canonicalize().map_err(|e| {
-            Error::Io(std::io::Error::new(
-                e.kind(),
-                format!("workspace root not found: {}", workspace_root.display()),
-            ))
-        })?;
-
+        let workspace_root = canonical_workspace_root(workspace_root)?;
         let db_path = index_db_path(&workspace_root);
         let db = Index::open(&db_path)?;
+        Ok(Self::from_index(workspace_root, db_path, db))
+    }
+
+    /// Open a workspace's existing index read-only, for query-only use
+    /// such as the CLI's query commands.
+    ///
+    /// Startup is one `user_version` read instead of [`Self::new`]'s
+    /// directory creation, pragma writes and schema DDL. Falls back to
+    /// [`Self::new`] when there is no index yet or its schema is not
+    /// current. Indexing a read-only instance fails with
+    /// [`Error::Config`]; [`Self::rebuild`] reopens it writable.
+    pub fn open_read_only(workspace_root: &Path) -> Result<Self> {
+        let workspace_root = canonical_workspace_root(workspace_root)?;
+        let db_path = index_db_path(&workspace_root);
+        match Index::open_read_only(&db_path)? {
+            Some(db) => Ok(Self::from_index(workspace_root, db_path, db)),
+            None => Self::new(&workspace_root),
+        }
+    }
 
-        let crates = cargo::discover_crates(&workspace_root);
+    fn from_index(workspace_root: PathBuf, db_path: PathBuf, db: Index) -> Self {
+        let crates = load_crates(&db, &workspace_root);
 
         debug_assert!(
             {
@@ -188,12 +258,15 @@ impl Tethys {
             "discover_crates returned duplicate crate names; Cargo's manifest layer should prevent this"
         );
 
-        Ok(Self {
+        Self {
             workspace_root,
             db_path,
             db,
             crates,
-        })
+            lsp_providers: HashMap::new(),
+            report_cache_enabled: true,
+            report_cache: OnceLock::new(),
+        }
     }
 
     /// Delete the on-disk index files (db + WAL/SHM sidecars), if any.
@@ -208,6 +281,20 @@ impl Tethys {
         Index::remove_db_files(&index_db_path(workspace_root))
     }
 
+    /// Replace `workspace_root`'s index with a snapshot written by
+    /// [`Self::export_snapshot`], possibly in another checkout of the
+    /// workspace at another path.
+    ///
+    /// Call it before opening a `Tethys` on the workspace, then
+    /// [`Self::update`] to re-index only the files that differ from the
+    /// snapshot's: files whose content is unchanged are recognized by
+    /// content hash even though a fresh checkout gave them new mtimes. A
+    /// snapshot that fails its checksum, or holds another schema version,
+    /// is refused and the existing index is left alone.
+    pub fn import_snapshot(workspace_root: &Path, snapshot: &Path) -> Result<SnapshotStats> {
+        Index::import_snapshot(snapshot, &index_db_path(workspace_root))
+    }
+
     /// Create a Tethys instance with LSP refinement enabled.
     ///
     /// LSP integration is controlled via [`IndexOptions::with_lsp()`] when calling
@@ -218,6 +305,106 @@ impl Tethys {
         Self::new(workspace_root)
     }
 
+    /// Use `provider` instead of the bundled language server for
+    /// `language`: Pass 3 sessions and [`CallerMode::LspRefined`] queries
+    /// start its command, and a running `tethys lsp-broker` (which only
+    /// knows the bundled servers) is bypassed for that language.
+    ///
+    /// This is how the `tethys-fake-lsp` test server (feature `fake-lsp`)
+    /// is plugged in; it works for any [`lsp::LspProvider`].
+    pub fn set_lsp_provider(
+        &mut self,
+        language: Language,
+        provider: impl lsp::LspProvider + 'static,
+    ) {
+        self.lsp_providers.insert(language, Arc::new(provider));
+    }
+
+    /// Serve the whole-workspace reports ([`Self::find_dead_code`],
+    /// [`Self::get_untested_code`], [`Self::get_visibility_candidates`],
+    /// [`Self::get_deprecated_callers`] and [`Self::get_coupling_metrics`])
+    /// from the report cache while the index is unchanged, or compute
+    /// every one afresh. On by default.
+    ///
+    /// A report is stored in `.rivets/index/report-cache.db` under its
+    /// parameters and the index generation it was computed at, so the
+    /// next indexing run that writes invalidates it. The file is written
+    /// by instances opened with [`Self::open_read_only`] too.
+    pub fn set_report_cache(&mut self, enabled: bool) {
+        self.report_cache_enabled = enabled;
+    }
+
+    /// The report cache, unless disabled or unavailable.
+    fn report_cache(&self) -> Option<&ReportCache> {
+        if !self.report_cache_enabled {
+            return None;
+        }
+        self.report_cache
+            .get_or_init(|| {
+                let path = self.db_path.with_file_name(report_cache::CACHE_FILE_NAME);
+                match ReportCache::open(&path) {
+                    Ok(cache) => Some(cache),
+                    Err(e) => {
+                        warn!(path = %path.display(), error = %e, "Failed to open report cache");
+                        None
+                    }
+                }
+            })
+            .as_ref()
+    }
+
+    /// `report` with `params` as stored at the current index generation,
+    /// else `compute`'s, stored for the next call.
+    fn cached_report<T: Serialize + DeserializeOwned>(
+        &self,
+        report: &str,
+        params: &str,
+        compute: impl FnOnce() -> Result<T>,
+    ) -> Result<T> {
+        let Some(cache) = self.report_cache() else {
+            return compute();
+        };
+        let generation = self.db.generation()?;
+        if let Some(value) = cache.get(report, params, generation) {
+            return Ok(value);
+        }
+        let value = compute()?;
+        cache.put(report, params, generation, &value);
+        Ok(value)
+    }
+
+    /// Run `query` (any calls on the `Tethys` it is handed) under `token`.
+    ///
+    /// The query is abandoned with [`Error::Cancelled`] once `token` is
+    /// cancelled from another thread or its deadline passes: in-flight
+    /// `SQLite` statements are interrupted, and long in-memory work such as
+    /// [`Self::detect_cycles`] checks the token as it goes. A token already
+    /// cancelled on entry fails before `query` runs, and one cancelled by
+    /// the time `query` returns fails too, so an `Ok` is never a result
+    /// some step cut short.
+    ///
+    /// Indexing takes its token through [`IndexOptions::cancellation`].
+    pub fn with_cancellation<T>(
+        &self,
+        token: &CancellationToken,
+        query: impl FnOnce(&Self) -> Result<T>,
+    ) -> Result<T> {
+        let _scope = cancel::enter(Some(token));
+        token.check()?;
+        let result = query(self)?;
+        token.check()?;
+        Ok(result)
+    }
+
+    /// The provider LSP work for `language` starts: the one set with
+    /// [`Self::set_lsp_provider`], else the bundled server.
+    fn lsp_provider(&self, language: Language) -> Arc<dyn lsp::LspProvider> {
+        self.lsp_providers.get(&language).map_or_else(
+            || Arc::new(lsp::AnyProvider::for_language(language)) as Arc<dyn lsp::LspProvider>,
+            Arc::clone,
+        )
+    }
+
     /// Compute the module path for a file in this workspace.
     ///
     /// Returns an empty string if the file is not part of any crate's module tree
@@ -679,11 +866,45 @@ impl Tethys {
         self.db.vacuum()
     }
 
+    /// Write a compacted, compressed and checksummed snapshot of the index
+    /// to `snapshot`, for [`Self::import_snapshot`] in another checkout
+    /// (e.g. a CI cache keyed by commit). The file appears only once it is
+    /// complete.
+    pub fn export_snapshot(&self, snapshot: &Path) -> Result<SnapshotStats> {
+        self.db.export_snapshot(snapshot)
+    }
+
     /// Get statistics about the index database.
     pub fn get_stats(&self) -> Result<types::DatabaseStats> {
         self.db.get_stats()
     }
 
+    /// Whether the last indexing run completed. `false` after a run that
+    /// was cancelled (see [`IndexOptions::cancellation`]) or failed part
+    /// way: its writes are committed, but tables it was rebuilding (file
+    /// dependencies, say) may be partial until a later run completes.
+    pub fn is_index_complete(&self) -> Result<bool> {
+        self.db.is_complete()
+    }
+
+    /// The current index generation. Every indexing run (index, rebuild,
+    /// or an update that re-indexed something) bumps it; see
+    /// [`Self::changes_since`].
+    pub fn generation(&self) -> Result<u64> {
+        self.db.generation()
+    }
+
+    /// The files, symbols, call edges and file dependencies added, removed
+    /// or modified after generation `since`, for invalidating what was
+    /// cached at `since` instead of everything.
+    ///
+    /// When [`IndexChanges::complete`] is `false` the index cannot say
+    /// (`since` is older than the retained log, or from a database this one
+    /// replaced) and everything cached at `since` must be dropped.
+    pub fn changes_since(&self, since: u64) -> Result<IndexChanges> {
+        self.db.changes_since(since)
+    }
+
     // === Test Topology ===
 
     /// Get all test symbols in the index.
@@ -765,6 +986,106 @@ impl Tethys {
             });
         }
 
+        let standing = self.affected_tests_standing(changed_files)?;
+        let tests = self.traverse_affected_tests(changed_files)?;
+
+        Ok(AffectedTestsReport { tests, standing })
+    }
+
+    /// Get affected tests for a unified diff, at symbol granularity.
+    ///
+    /// Each changed new-side line is mapped onto the innermost indexed
+    /// symbol whose stored span contains it; the reference graph is then
+    /// walked backwards from those symbols to the `is_test` symbols that
+    /// reach them. Touching one helper in a large file therefore selects
+    /// only the tests that (transitively) reference that helper, not every
+    /// test depending on any symbol in the file.
+    ///
+    /// Blank and comment-only changed lines are ignored, and a changed
+    /// attribute or doc-comment line counts toward the item below it.
+    ///
+    /// A file falls back to the file-level traversal of
+    /// [`get_affected_tests_with_standing`](Self::get_affected_tests_with_standing)
+    /// when its change cannot be localized: a changed line outside every
+    /// spanned symbol (imports, module-level items, symbols stored without
+    /// a span), deleted or binary files, and rename- or mode-only entries.
+    ///
+    /// Standing is computed exactly as for the file-list query, over the
+    /// files the patch names, so the same exit-code contract applies. The
+    /// diff is read as text (`git diff` or `diff -u` output); paths are
+    /// workspace-relative with git's `a/`/`b/` prefixes stripped.
+    ///
+    /// # Example
+    ///
+    /// ```no_run
+    /// use tethys::Tethys;
+    /// use std::path::Path;
+    ///
+    /// let tethys = Tethys::new(Path::new("/path/to/workspace"))?;
+    /// let patch = std::fs::read_to_string("change.patch")?;
+    /// let report = tethys.get_affected_tests_for_diff(&patch)?;
+    /// for test in &report.tests {
+    ///     println!("Run test: {}", test.qualified_name);
+    /// }
+    /// # Ok::<(), tethys::Error>(())
+    /// ```
+    pub fn get_affected_tests_for_diff(&self, diff: &str) -> Result<AffectedTestsReport> {
+        let changes = diff::parse_unified_diff(diff);
+        let changed_files: Vec<PathBuf> = changes.iter().map(|c| c.path.clone()).collect();
+        if changed_files.is_empty() {
+            return Ok(AffectedTestsReport {
+                tests: Vec::new(),
+                standing: QueryStanding::Confirmed,
+            });
+        }
+
+        let standing = self.affected_tests_standing(&changed_files)?;
+
+        let mut file_level: Vec<PathBuf> = Vec::new();
+        let mut seeds: Vec<SymbolId> = Vec::new();
+        for change in &changes {
+            let Some(file_id) = self.db.get_file_id(&self.relative_path(&change.path))? else {
+                // Unindexed inputs contribute nothing; standing reports them.
+                continue;
+            };
+            if change.whole_file {
+                file_level.push(change.path.clone());
+                continue;
+            }
+            let symbols = self.db.list_symbols_in_file(file_id)?;
+            if let Some(hit) = diff::symbols_for_lines(&symbols, &change.lines, &change.leading) {
+                seeds.extend(hit);
+            } else {
+                debug!(
+                    path = %change.path.display(),
+                    "Changed lines not covered by symbol spans, falling back to file level"
+                );
+                file_level.push(change.path.clone());
+            }
+        }
+
+        let mut tests = self.traverse_affected_tests(&file_level)?;
+        let mut seen: std::collections::HashSet<SymbolId> = tests.iter().map(|t| t.id).collect();
+        for test in self.db.get_tests_reaching_symbols(&seeds)? {
+            if seen.insert(test.id) {
+                tests.push(test);
+            }
+        }
+        tests.sort_by_key(|t| (t.file_id.as_i64(), t.line));
+
+        debug!(
+            seed_symbols = seeds.len(),
+            file_level_fallbacks = file_level.len(),
+            affected_test_count = tests.len(),
+            "Found affected tests for diff"
+        );
+        Ok(AffectedTestsReport { tests, standing })
+    }
+
+    /// Query standing shared by the affected-tests entry points: per-input
+    /// `unindexed`/`stale` reasons, then a trailing whole-index
+    /// `stale-index` reason when the workspace changed since indexing.
+    fn affected_tests_standing(&self, changed_files: &[PathBuf]) -> Result<QueryStanding> {
         let mut reasons = self.classify_changed_files(changed_files)?;
         if self.needs_update()? {
             reasons.push(StandingReason {
@@ -773,14 +1094,11 @@ impl Tethys {
             });
         }
 
-        let tests = self.traverse_affected_tests(changed_files)?;
-        let standing = if reasons.is_empty() {
+        Ok(if reasons.is_empty() {
             QueryStanding::Confirmed
         } else {
             QueryStanding::Indeterminate(reasons)
-        };
-
-        Ok(AffectedTestsReport { tests, standing })
+        })
     }
 
     /// Reverse-traversal core shared by the affected-tests entry points:
@@ -872,8 +1190,10 @@ impl Tethys {
 
     /// Get all panic points in the codebase.
     ///
-    /// Panic points are `.unwrap()` and `.expect()` calls that could panic at runtime.
-    /// Only calls within functions and methods are included.
+    /// Panic points are `.unwrap()` and `.expect()` calls and `panic!()`,
+    /// `unreachable!()`, `todo!()` and `unimplemented!()` invocations that
+    /// could panic at runtime. Only sites within functions and methods are
+    /// included.
     ///
     /// # Arguments
     ///
@@ -951,7 +1271,9 @@ impl Tethys {
     /// # Ok::<(), tethys::Error>(())
     /// ```
     pub fn get_deprecated_callers(&self) -> Result<Vec<DeprecatedFinding>> {
-        self.db.get_deprecated_callers()
+        self.cached_report("deprecated-callers", "", || {
+            self.db.get_deprecated_callers()
+        })
     }
 
     /// Pub Rust items whose observed use is consistent with `pub(crate)`,
@@ -985,7 +1307,11 @@ impl Tethys {
         &self,
         workspace_closed: bool,
     ) -> Result<Vec<VisibilityFinding>> {
-        self.db.get_visibility_candidates(workspace_closed)
+        self.cached_report(
+            "visibility-candidates",
+            &format!("workspace_closed={workspace_closed}"),
+            || self.db.get_visibility_candidates(workspace_closed),
+        )
     }
 
     /// Product functions/methods that no test can reach: multi-root forward
@@ -1013,7 +1339,21 @@ impl Tethys {
     /// # Ok::<(), tethys::Error>(())
     /// ```
     pub fn get_untested_code(&self) -> Result<UntestedReport> {
-        self.db.get_untested_code()
+        self.cached_report("untested-code", "", || self.db.get_untested_code())
+    }
+
+    /// Whether any test reaches a symbol, for one symbol rather than the
+    /// whole [`Self::get_untested_code`] report: its distance in references
+    /// from the nearest test, and how many reached symbols reference it
+    /// from one step closer. `None` when no symbol has that qualified name.
+    ///
+    /// Answered from the reachability every indexing run maintains, or by a
+    /// full traversal when the last run did not complete.
+    pub fn get_test_reach(&self, qualified_name: &str) -> Result<Option<TestReach>> {
+        let Some(symbol) = self.db.get_symbol_by_qualified_name(qualified_name)? else {
+            return Ok(None);
+        };
+        self.db.test_reach(symbol.id).map(Some)
     }
 
     /// Dead-code candidates: non-public, non-test symbols with zero
@@ -1050,14 +1390,24 @@ impl Tethys {
     /// # Ok::<(), tethys::Error>(())
     /// ```
     pub fn find_dead_code(&self, limit: Option<usize>) -> Result<DeadCodeReport> {
-        let candidates = self.db.dead_code_zero_evidence()?;
-        let files = self.db.list_all_files()?;
-        Ok(dead_code::build_report(
-            &self.workspace_root,
-            &files,
-            candidates,
-            limit,
-        ))
+        // Cached whole; `limit` only truncates what is served.
+        let mut report = self.cached_report("dead-code", "", || {
+            let candidates = self.db.dead_code_zero_evidence()?;
+            let files = self.db.list_all_files()?;
+            let names: Vec<&str> = candidates.iter().map(|c| c.name.as_str()).collect();
+            let stored = self.db.identifier_occurrences(&names)?;
+            Ok(dead_code::build_report(
+                &self.workspace_root,
+                &files,
+                &stored,
+                candidates,
+                None,
+            ))
+        })?;
+        if let Some(limit) = limit {
+            report.findings.truncate(limit);
+        }
+        Ok(report)
     }
 
     /// Walk the type hierarchy from the type named `name` over `inherit`
@@ -1107,6 +1457,29 @@ impl Tethys {
         self.db.count_panic_points()
     }
 
+    /// Panic points rolled up per file, counted like
+    /// [`Self::count_panic_points`].
+    ///
+    /// Only files with at least one panic point are listed, the most
+    /// production panic points first. [`PanicDensity::per_kib`] relates
+    /// each count to the file's size.
+    ///
+    /// # Example
+    ///
+    /// ```no_run
+    /// use tethys::Tethys;
+    /// use std::path::Path;
+    ///
+    /// let tethys = Tethys::new(Path::new("/path/to/workspace"))?;
+    /// for file in tethys.get_panic_density()?.iter().take(10) {
+    ///     println!("{}: {:.2}/KiB", file.path.display(), file.per_kib());
+    /// }
+    /// # Ok::<(), tethys::Error>(())
+    /// ```
+    pub fn get_panic_density(&self) -> Result<Vec<PanicDensity>> {
+        self.db.get_panic_density()
+    }
+
     // === Architecture ===
 
     /// List all packages discovered during the last index run.
@@ -1126,7 +1499,9 @@ impl Tethys {
         &self,
         sort: types::CouplingSort,
     ) -> Result<Vec<types::CouplingMetrics>> {
-        self.db.get_coupling_metrics(sort)
+        self.cached_report("coupling", &format!("sort={sort:?}"), || {
+            self.db.get_coupling_metrics(sort)
+        })
     }
 
     /// Detailed coupling for one package by exact name.
@@ -0,0 +1,588 @@
+//! Warm language-server broker for one-shot `--lsp` queries.
+//!
+//! Without it, `tethys callers --lsp` starts a language server, waits out
+//! its workspace load (tens of seconds on a large workspace), asks a single
+//! `textDocument/references` question and shuts the server down again.
+//! [`LspBroker`] is a long-lived local process (`tethys lsp-broker`) that
+//! keeps one ready server per language for a workspace and answers those
+//! questions over a Unix socket; [`BrokerClient`] is the querying side. The
+//! broker is opt-in: when none is listening, queries start their own server
+//! as before.
+//!
+//! The wire format is one JSON request per line, answered by one JSON
+//! response line. Connections are served one at a time. A language's server
+//! is started, and waited on until ready, on the first request for that
+//! language; it is restarted when it has exited or a request to it fails at
+//! the transport level; and every server is shut down once no connection
+//! has arrived for the idle timeout.
+//!
+//! Edits are seen through each server's own file watching. The querying
+//! side sends the queried file's text along with the position, so outgoing
+//! `utf-16` columns are measured against the current contents rather than
+//! whatever the broker saw first.
+
+use std::collections::HashMap;
+use std::collections::hash_map::Entry;
+use std::io::{BufRead, BufReader, Write};
+use std::os::unix::ffi::OsStrExt;
+use std::os::unix::fs::{DirBuilderExt, MetadataExt, PermissionsExt};
+use std::os::unix::net::{UnixListener, UnixStream};
+use std::path::{Path, PathBuf};
+use std::sync::mpsc::{self, RecvTimeoutError};
+use std::time::{Duration, SystemTime, UNIX_EPOCH};
+
+use lsp_types::Location;
+use serde::{Deserialize, Serialize};
+use tracing::{debug, info, warn};
+
+use super::Result;
+use super::error::LspError;
+use super::provider::{AnyProvider, LspProvider};
+use super::transport::{DEFAULT_RESPONSE_TIMEOUT, LspClient};
+use crate::content_hash::content_hash;
+use crate::types::{DEFAULT_LSP_TIMEOUT_SECS, Language};
+
+/// Idle period after which a broker shuts its servers down and exits.
+pub const DEFAULT_BROKER_IDLE_TIMEOUT: Duration = Duration::from_secs(30 * 60);
+
+/// How long a connected client may go quiet between requests before the
+/// broker drops it and serves the next connection.
+const CONNECTION_READ_TIMEOUT: Duration = Duration::from_secs(10);
+
+/// Socket a broker for `workspace_root` listens on.
+///
+/// Lives in `$XDG_RUNTIME_DIR`, or else in a `tethys-<uid>` directory
+/// under the temp directory that only the current user can enter, named by
+/// a hash of the canonical workspace path: deep checkouts would overflow
+/// the ~100 byte limit on socket paths if it sat under `.rivets/`.
+///
+/// # Errors
+///
+/// [`LspError::Broker`] if the private directory exists but is not owned by
+/// the current user or is open to others, or an I/O error creating it.
+pub fn broker_socket_path(workspace_root: &Path) -> Result<PathBuf> {
+    let root = workspace_root
+        .canonicalize()
+        .unwrap_or_else(|_| workspace_root.to_path_buf());
+    let dir = match std::env::var_os("XDG_RUNTIME_DIR") {
+        Some(dir) => PathBuf::from(dir),
+        None => {
+            let uid = current_uid()?;
+            let dir = std::env::temp_dir().join(format!("tethys-{uid}"));
+            ensure_private_dir(&dir, uid)?;
+            dir
+        }
+    };
+    Ok(dir.join(format!(
+        "tethys-lsp-{:016x}.sock",
+        content_hash(root.as_os_str().as_bytes())
+    )))
+}
+
+/// The uid this process creates files as, read back from a probe file
+/// (`unsafe_code` is forbidden, so `geteuid` is out of reach).
+fn current_uid() -> Result<u32> {
+    let nanos = SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .map_or(0, Duration::subsec_nanos);
+    let probe = std::env::temp_dir().join(format!("tethys-uid-{}-{nanos:08x}", std::process::id()));
+    let uid = std::fs::File::create_new(&probe)?.metadata()?.uid();
+    std::fs::remove_file(&probe)?;
+    Ok(uid)
+}
+
+/// Create `dir` accessible to `uid` only, or check that an existing one is:
+/// a real directory (not a symlink) owned by `uid` with no group or other
+/// permissions. Another user could otherwise pre-create it and plant a
+/// socket that queries connect to.
+fn ensure_private_dir(dir: &Path, uid: u32) -> Result<()> {
+    match std::fs::DirBuilder::new().mode(0o700).create(dir) {
+        Err(e) if e.kind() != std::io::ErrorKind::AlreadyExists => return Err(e.into()),
+        _ => {}
+    }
+    let meta = std::fs::symlink_metadata(dir)?;
+    if !meta.is_dir() || meta.uid() != uid || meta.mode() & 0o077 != 0 {
+        return Err(LspError::Broker(format!(
+            "{} is not a directory private to the current user",
+            dir.display()
+        )));
+    }
+    Ok(())
+}
+
+/// A request line sent to the broker.
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+#[serde(tag = "op", rename_all = "snake_case")]
+enum BrokerRequest {
+    /// `textDocument/references` at a 0-indexed line and BYTE column.
+    References {
+        language: Language,
+        file: PathBuf,
+        line: u32,
+        col: u32,
+        /// The file's current text, for outgoing column conversion.
+        source: Option<String>,
+    },
+    /// Shut the servers down and exit.
+    Stop,
+}
+
+/// A response line sent back by the broker.
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
+#[serde(rename_all = "snake_case")]
+enum BrokerResponse {
+    /// The reference locations, declaration excluded.
+    Locations(Vec<Location>),
+    /// The request could not be answered.
+    Error(String),
+    /// Acknowledges [`BrokerRequest::Stop`].
+    Stopping,
+}
+
+/// Write `message` as one JSON line.
+fn write_message<T: Serialize>(writer: &mut UnixStream, message: &T) -> Result<()> {
+    let mut line = serde_json::to_vec(message).map_err(LspError::Serialize)?;
+    line.push(b'\n');
+    writer.write_all(&line)?;
+    Ok(())
+}
+
+/// Failures after which a server is presumed dead or wedged and restarted.
+fn is_transport_failure(error: &LspError) -> bool {
+    matches!(
+        error,
+        LspError::ServerExited | LspError::Io(_) | LspError::InvalidHeader(_)
+    )
+}
+
+/// Long-lived owner of one ready language server per language.
+pub struct LspBroker {
+    workspace_root: PathBuf,
+    socket_path: PathBuf,
+    listener: Option<UnixListener>,
+    idle_timeout: Duration,
+    servers: HashMap<Language, LspClient>,
+}
+
+impl LspBroker {
+    /// Listen on [`broker_socket_path`] for `workspace_root`.
+    ///
+    /// A socket file left behind by a broker that did not exit cleanly is
+    /// replaced; the socket is made accessible to the current user only.
+    ///
+    /// # Errors
+    ///
+    /// [`LspError::Broker`] if another broker is already listening for the
+    /// workspace or the socket directory is not private to the user (see
+    /// [`broker_socket_path`]), or an I/O error if the socket cannot be
+    /// created.
+    pub fn bind(workspace_root: &Path, idle_timeout: Duration) -> Result<Self> {
+        let workspace_root = workspace_root
+            .canonicalize()
+            .unwrap_or_else(|_| workspace_root.to_path_buf());
+        let socket_path = broker_socket_path(&workspace_root)?;
+        Self::bind_at(workspace_root, socket_path, idle_timeout)
+    }
+
+    fn bind_at(
+        workspace_root: PathBuf,
+        socket_path: PathBuf,
+        idle_timeout: Duration,
+    ) -> Result<Self> {
+        if socket_path.exists() {
+            if UnixStream::connect(&socket_path).is_ok() {
+                return Err(LspError::Broker(format!(
+                    "a broker is already listening on {}",
+                    socket_path.display()
+                )));
+            }
+            debug!(socket = %socket_path.display(), "Replacing stale broker socket");
+            std::fs::remove_file(&socket_path)?;
+        }
+        let listener = UnixListener::bind(&socket_path)?;
+        std::fs::set_permissions(&socket_path, std::fs::Permissions::from_mode(0o600))?;
+
+        Ok(Self {
+            workspace_root,
+            socket_path,
+            listener: Some(listener),
+            idle_timeout,
+            servers: HashMap::new(),
+        })
+    }
+
+    /// The socket this broker listens on.
+    #[must_use]
+    pub fn socket_path(&self) -> &Path {
+        &self.socket_path
+    }
+
+    /// Serve connections until a stop request arrives or none has arrived
+    /// for the idle timeout, then shut every server down and remove the
+    /// socket. Failures answering a request are reported to its client.
+    pub fn run(mut self) {
+        let Some(listener) = self.listener.take() else {
+            return;
+        };
+        let (sender, connections) = mpsc::channel();
+        let acceptor = std::thread::spawn(move || {
+            for stream in listener.incoming() {
+                if sender.send(stream).is_err() {
+                    break;
+                }
+            }
+        });
+
+        info!(
+            socket = %self.socket_path.display(),
+            workspace = %self.workspace_root.display(),
+            idle_timeout_secs = self.idle_timeout.as_secs(),
+            "LSP broker listening"
+        );
+        loop {
+            match connections.recv_timeout(self.idle_timeout) {
+                Ok(Ok(stream)) => {
+                    if self.serve_connection(stream) {
+                        info!("LSP broker stop requested");
+                        break;
+                    }
+                }
+                Ok(Err(e)) => warn!(error = %e, "LSP broker failed to accept a connection"),
+                Err(RecvTimeoutError::Timeout) => {
+                    info!(
+                        idle_timeout_secs = self.idle_timeout.as_secs(),
+                        "LSP broker idle; shutting down"
+                    );
+                    break;
+                }
+                Err(RecvTimeoutError::Disconnected) => break,
+            }
+        }
+
+        // Wake the acceptor so it sees the closed channel and exits.
+        drop(connections);
+        let _ = UnixStream::connect(&self.socket_path);
+        let _ = acceptor.join();
+    }
+
+    /// Answer every request on one connection. Returns `true` when the
+    /// client asked the broker to stop.
+    fn serve_connection(&mut self, stream: UnixStream) -> bool {
+        if let Err(e) = stream.set_read_timeout(Some(CONNECTION_READ_TIMEOUT)) {
+            debug!(error = %e, "Cannot set broker connection timeout");
+        }
+        let mut writer = match stream.try_clone() {
+            Ok(writer) => writer,
+            Err(e) => {
+                warn!(error = %e, "Cannot clone broker connection");
+                return false;
+            }
+        };
+
+        for line in BufReader::new(stream).lines() {
+            let line = match line {
+                Ok(line) => line,
+                Err(e) => {
+                    debug!(error = %e, "Broker connection closed");
+                    break;
+                }
+            };
+            if line.trim().is_empty() {
+                continue;
+            }
+
+            let (response, stop) = match serde_json::from_str::<BrokerRequest>(&line) {
+                Ok(BrokerRequest::References {
+                    language,
+                    file,
+                    line,
+                    col,
+                    source,
+                }) => {
+                    let response =
+                        match self.find_references(language, &file, line, col, source.as_deref()) {
+                            Ok(locations) => BrokerResponse::Locations(locations),
+                            Err(e) => BrokerResponse::Error(e.to_string()),
+                        };
+                    (response, false)
+                }
+                Ok(BrokerRequest::Stop) => (BrokerResponse::Stopping, true),
+                Err(e) => (
+                    BrokerResponse::Error(format!("malformed request: {e}")),
+                    false,
+                ),
+            };
+
+            if let Err(e) = write_message(&mut writer, &response) {
+                debug!(error = %e, "Cannot answer broker client");
+                return stop;
+            }
+            if stop {
+                return true;
+            }
+        }
+        false
+    }
+
+    /// `find_references` on `language`'s server, restarting it once if the
+    /// request fails at the transport level.
+    fn find_references(
+        &mut self,
+        language: Language,
+        file: &Path,
+        line: u32,
+        col: u32,
+        source: Option<&str>,
+    ) -> Result<Vec<Location>> {
+        match self.query_references(language, file, line, col, source) {
+            Err(e) if is_transport_failure(&e) => {
+                warn!(error = %e, ?language, "Language server failed; restarting it");
+                self.servers.remove(&language);
+                self.query_references(language, file, line, col, source)
+            }
+            other => other,
+        }
+    }
+
+    fn query_references(
+        &mut self,
+        language: Language,
+        file: &Path,
+        line: u32,
+        col: u32,
+        source: Option<&str>,
+    ) -> Result<Vec<Location>> {
+        let client = self.ready_server(language)?;
+        if let Some(source) = source {
+            client.cache_line_index(file, source);
+        }
+        client.find_references(file, line, col)
+    }
+
+    /// `language`'s running server, started (and waited on until ready) if
+    /// there is none or the previous one has exited.
+    fn ready_server(&mut self, language: Language) -> Result<&mut LspClient> {
+        if let Some(client) = self.servers.get_mut(&language)
+            && client.has_exited()
+        {
+            warn!(?language, "Language server exited; restarting it");
+            self.servers.remove(&language);
+        }
+
+        match self.servers.entry(language) {
+            Entry::Occupied(entry) => Ok(entry.into_mut()),
+            Entry::Vacant(entry) => {
+                let provider = AnyProvider::for_language(language);
+                let mut client = LspClient::start(&provider, &self.workspace_root)?;
+                let timeout = Duration::from_secs(DEFAULT_LSP_TIMEOUT_SECS);
+                if !client.wait_until_ready(provider.readiness_wait(), timeout)? {
+                    return Err(LspError::Broker(format!(
+                        "{} was not ready within {DEFAULT_LSP_TIMEOUT_SECS}s",
+                        provider.command()
+                    )));
+                }
+                info!(
+                    ?language,
+                    command = provider.command(),
+                    "Language server ready"
+                );
+                Ok(entry.insert(client))
+            }
+        }
+    }
+}
+
+impl Drop for LspBroker {
+    fn drop(&mut self) {
+        for (language, mut client) in self.servers.drain() {
+            if let Err(e) = client.shutdown() {
+                warn!(error = %e, ?language, "LSP shutdown failed");
+            }
+        }
+        if let Err(e) = std::fs::remove_file(&self.socket_path)
+            && e.kind() != std::io::ErrorKind::NotFound
+        {
+            warn!(error = %e, socket = %self.socket_path.display(), "Cannot remove broker socket");
+        }
+    }
+}
+
+/// A connection to a running [`LspBroker`].
+pub struct BrokerClient {
+    reader: BufReader<UnixStream>,
+    writer: UnixStream,
+}
+
+impl BrokerClient {
+    /// Connect to the broker for `workspace_root`, or `None` when none is
+    /// listening.
+    #[must_use]
+    pub fn connect(workspace_root: &Path) -> Option<Self> {
+        Self::connect_at(&broker_socket_path(workspace_root).ok()?)
+    }
+
+    fn connect_at(socket_path: &Path) -> Option<Self> {
+        let writer = UnixStream::connect(socket_path).ok()?;
+        // Covers a cold start (readiness wait) plus the request itself.
+        let timeout = Duration::from_secs(DEFAULT_LSP_TIMEOUT_SECS) + DEFAULT_RESPONSE_TIMEOUT;
+        writer.set_read_timeout(Some(timeout)).ok()?;
+        let reader = BufReader::new(writer.try_clone().ok()?);
+        Some(Self { reader, writer })
+    }
+
+    /// [`LspClient::find_references`] on the broker's server for
+    /// `language`. `source` is `file`'s current text, if the caller has it.
+    ///
+    /// # Errors
+    ///
+    /// [`LspError::Broker`] carrying the broker's error, or a transport
+    /// error talking to the broker.
+    pub fn find_references(
+        &mut self,
+        language: Language,
+        file: &Path,
+        line: u32,
+        col: u32,
+        source: Option<&str>,
+    ) -> Result<Vec<Location>> {
+        let request = BrokerRequest::References {
+            language,
+            file: file.to_path_buf(),
+            line,
+            col,
+            source: source.map(str::to_string),
+        };
+        match self.request(&request)? {
+            BrokerResponse::Locations(locations) => Ok(locations),
+            BrokerResponse::Error(message) => Err(LspError::Broker(message)),
+            BrokerResponse::Stopping => Err(LspError::Broker("broker is stopping".to_string())),
+        }
+    }
+
+    /// Ask the broker to shut its servers down and exit.
+    ///
+    /// # Errors
+    ///
+    /// A transport error talking to the broker, or [`LspError::Broker`] on
+    /// an unexpected answer.
+    pub fn stop(&mut self) -> Result<()> {
+        match self.request(&BrokerRequest::Stop)? {
+            BrokerResponse::Stopping => Ok(()),
+            other => Err(LspError::Broker(format!(
+                "unexpected answer to stop: {other:?}"
+            ))),
+        }
+    }
+
+    fn request(&mut self, request: &BrokerRequest) -> Result<BrokerResponse> {
+        write_message(&mut self.writer, request)?;
+        let mut line = String::new();
+        if self.reader.read_line(&mut line)? == 0 {
+            return Err(LspError::Broker("broker closed the connection".to_string()));
+        }
+        serde_json::from_str(&line).map_err(LspError::Deserialize)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn bind(dir: &Path, idle_timeout: Duration) -> LspBroker {
+        LspBroker::bind_at(dir.to_path_buf(), dir.join("b.sock"), idle_timeout).expect("bind")
+    }
+
+    #[test]
+    fn stop_request_ends_the_broker_and_removes_its_socket() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let broker = bind(dir.path(), DEFAULT_BROKER_IDLE_TIMEOUT);
+        let socket = broker.socket_path().to_path_buf();
+        let running = std::thread::spawn(move || broker.run());
+
+        let mut client = BrokerClient::connect_at(&socket).expect("broker is listening");
+        client.stop().expect("stop");
+        running.join().expect("broker thread");
+
+        assert!(!socket.exists(), "socket removed on exit");
+        assert!(BrokerClient::connect_at(&socket).is_none());
+    }
+
+    #[test]
+    fn idle_broker_exits_on_its_own() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let broker = bind(dir.path(), Duration::from_millis(20));
+        let socket = broker.socket_path().to_path_buf();
+        broker.run();
+        assert!(!socket.exists());
+    }
+
+    #[test]
+    fn bind_refuses_a_live_socket_and_replaces_a_stale_one() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let socket = dir.path().join("b.sock");
+        let live = bind(dir.path(), DEFAULT_BROKER_IDLE_TIMEOUT);
+        let err = LspBroker::bind_at(dir.path().to_path_buf(), socket.clone(), Duration::ZERO)
+            .err()
+            .expect("second broker refused");
+        assert!(matches!(err, LspError::Broker(_)), "{err}");
+        drop(live);
+
+        // A listener dropped without cleanup leaves its socket file behind.
+        drop(UnixListener::bind(&socket).expect("stale listener"));
+        assert!(socket.exists());
+        bind(dir.path(), DEFAULT_BROKER_IDLE_TIMEOUT);
+    }
+
+    #[test]
+    fn malformed_requests_are_answered_with_an_error() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let broker = bind(dir.path(), DEFAULT_BROKER_IDLE_TIMEOUT);
+        let socket = broker.socket_path().to_path_buf();
+        let running = std::thread::spawn(move || broker.run());
+
+        let mut client = BrokerClient::connect_at(&socket).expect("broker is listening");
+        client.writer.write_all(b"not json\n").expect("write");
+        let mut line = String::new();
+        client.reader.read_line(&mut line).expect("read");
+        let response: BrokerResponse = serde_json::from_str(&line).expect("response");
+        assert!(
+            matches!(&response, BrokerResponse::Error(m) if m.starts_with("malformed request")),
+            "{response:?}"
+        );
+
+        client.stop().expect("stop");
+        running.join().expect("broker thread");
+    }
+
+    #[test]
+    fn socket_path_is_stable_per_workspace() {
+        let a = tempfile::tempdir().expect("tempdir");
+        let b = tempfile::tempdir().expect("tempdir");
+        let path = |dir: &Path| broker_socket_path(dir).expect("socket path");
+        assert_eq!(path(a.path()), path(a.path()));
+        assert_ne!(path(a.path()), path(b.path()));
+    }
+
+    #[test]
+    fn socket_directory_must_be_private_to_the_user() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let uid = current_uid().expect("uid");
+        let private = dir.path().join("tethys");
+        ensure_private_dir(&private, uid).expect("created");
+        let mode = std::fs::metadata(&private).expect("metadata").mode();
+        assert_eq!(mode & 0o777, 0o700);
+        ensure_private_dir(&private, uid).expect("existing private directory accepted");
+
+        let err = ensure_private_dir(&private, uid.wrapping_add(1))
+            .expect_err("another user's directory");
+        assert!(matches!(err, LspError::Broker(_)), "{err}");
+
+        std::fs::set_permissions(&private, std::fs::Permissions::from_mode(0o755)).expect("chmod");
+        assert!(ensure_private_dir(&private, uid).is_err(), "open to others");
+
+        std::fs::set_permissions(&private, std::fs::Permissions::from_mode(0o700)).expect("chmod");
+        let link = dir.path().join("link");
+        std::os::unix::fs::symlink(&private, &link).expect("symlink");
+        assert!(ensure_private_dir(&link, uid).is_err(), "symlink refused");
+    }
+}
@@ -14,6 +14,8 @@
 use lsp_types::{InitializeResult, PositionEncodingKind};
 use tracing::trace;
 
+use super::line_index::LineIndex;
+
 /// Position encoding negotiated with an LSP server during `initialize`.
 #[derive(Debug, Clone, Copy, PartialEq, Eq)]
 pub(crate) enum PositionEncoding {
@@ -35,30 +37,25 @@ impl PositionEncoding {
         }
     }
 
-    /// Convert a 0-indexed BYTE column on `line_text` into this encoding.
+    /// Convert a 0-indexed BYTE column on 0-indexed `line` of an indexed
+    /// file into this encoding.
     ///
-    /// `Utf8` is an identity no-op. For `Utf16` the byte prefix of the line
-    /// is re-measured as `utf-16` code units. A `byte_col` that is out of
-    /// range or not on a char boundary falls back to the raw byte offset
-    /// rather than dropping the request (correct for ASCII-only prefixes,
-    /// best-effort otherwise).
-    pub(crate) fn col_from_utf8(self, line_text: &str, byte_col: u32) -> u32 {
+    /// `Utf8` is an identity no-op. For `Utf16` the column is re-measured
+    /// as `utf-16` code units through the file's [`LineIndex`]. A column
+    /// that is out of range or not on a char boundary falls back to the raw
+    /// byte offset rather than dropping the request (correct for ASCII-only
+    /// prefixes, best-effort otherwise).
+    pub(crate) fn col_from_utf8(self, index: &LineIndex, line: u32, byte_col: u32) -> u32 {
         if self == Self::Utf8 {
             return byte_col;
         }
-        let prefix = usize::try_from(byte_col)
-            .ok()
-            .and_then(|col| line_text.get(..col));
-        if let Some(prefix) = prefix {
-            u32::try_from(prefix.encode_utf16().count()).unwrap_or(byte_col)
-        } else {
+        index.utf16_col(line, byte_col).unwrap_or_else(|| {
             trace!(
-                byte_col,
-                line_len = line_text.len(),
-                "byte column out of range or mid-character; sending raw offset"
+                line,
+                byte_col, "byte column out of range or mid-character; sending raw offset"
             );
             byte_col
-        }
+        })
     }
 }
 
@@ -117,7 +114,10 @@ mod tests {
     #[test]
     fn utf16_col_is_identity_for_ascii_line() {
         let line = "    let x = compute();";
-        assert_eq!(PositionEncoding::Utf16.col_from_utf8(line, 12), 12);
+        assert_eq!(
+            PositionEncoding::Utf16.col_from_utf8(&LineIndex::new(line), 0, 12),
+            12
+        );
     }
 
     /// Multibyte text BEFORE the column shrinks it: each CJK char is 3
@@ -129,15 +129,24 @@ mod tests {
         let line = "let s = \"\u{65e5}\u{672c}\u{8a9e}\"; foo()";
         let byte_col = u32::try_from(line.find("foo").expect("foo present")).expect("fits");
         assert_eq!(byte_col, 21, "fixture self-check: byte offset of foo");
-        assert_eq!(PositionEncoding::Utf16.col_from_utf8(line, byte_col), 15);
+        assert_eq!(
+            PositionEncoding::Utf16.col_from_utf8(&LineIndex::new(line), 0, byte_col),
+            15
+        );
     }
 
     /// Multibyte text AFTER the column does not affect it (identity).
     #[test]
     fn utf16_col_ignores_multibyte_after_column() {
         let line = "foo(); // \u{65e5}\u{672c}\u{8a9e}";
-        assert_eq!(PositionEncoding::Utf16.col_from_utf8(line, 0), 0);
-        assert_eq!(PositionEncoding::Utf16.col_from_utf8(line, 3), 3);
+        assert_eq!(
+            PositionEncoding::Utf16.col_from_utf8(&LineIndex::new(line), 0, 0),
+            0
+        );
+        assert_eq!(
+            PositionEncoding::Utf16.col_from_utf8(&LineIndex::new(line), 0, 3),
+            3
+        );
     }
 
     /// Emoji are surrogate pairs: 4 `utf-8` bytes = 2 `utf-16` units.
@@ -148,14 +157,20 @@ mod tests {
         let byte_col = u32::try_from(line.find("bar").expect("bar present")).expect("fits");
         assert_eq!(byte_col, 7, "fixture self-check: byte offset of bar");
         // quote(1) + emoji(2) + quote(1) + space(1) = 5 utf-16 units.
-        assert_eq!(PositionEncoding::Utf16.col_from_utf8(line, byte_col), 5);
+        assert_eq!(
+            PositionEncoding::Utf16.col_from_utf8(&LineIndex::new(line), 0, byte_col),
+            5
+        );
     }
 
     /// `utf-8` negotiation is an identity no-op even with multibyte text.
     #[test]
     fn utf8_col_is_identity_even_with_multibyte_prefix() {
         let line = "let s = \"\u{65e5}\u{672c}\u{8a9e}\"; foo()";
-        assert_eq!(PositionEncoding::Utf8.col_from_utf8(line, 20), 20);
+        assert_eq!(
+            PositionEncoding::Utf8.col_from_utf8(&LineIndex::new(line), 0, 20),
+            20
+        );
     }
 
     /// Out-of-range and mid-character byte columns fall back to the raw
@@ -164,8 +179,14 @@ mod tests {
     fn utf16_col_falls_back_to_raw_offset_when_unsliceable() {
         let line = "\u{65e5}\u{672c}";
         // Past end of line.
-        assert_eq!(PositionEncoding::Utf16.col_from_utf8(line, 99), 99);
+        assert_eq!(
+            PositionEncoding::Utf16.col_from_utf8(&LineIndex::new(line), 0, 99),
+            99
+        );
         // Mid-character (byte 1 is inside the 3-byte 日).
-        assert_eq!(PositionEncoding::Utf16.col_from_utf8(line, 1), 1);
+        assert_eq!(
+            PositionEncoding::Utf16.col_from_utf8(&LineIndex::new(line), 0, 1),
+            1
+        );
     }
 }
@@ -71,6 +71,10 @@ pub enum LspError {
     /// Initialize handshake failed.
     #[error("LSP initialize handshake failed: {0}")]
     InitializeFailed(String),
+
+    /// The LSP broker could not answer, or answered unexpectedly.
+    #[error("LSP broker error: {0}")]
+    Broker(String),
 }
 
 impl LspError {
@@ -0,0 +1,117 @@
+//! Per-file line tables for outgoing column conversion.
+//!
+//! A `utf-16` server needs every outgoing BYTE column re-measured against
+//! the text of its line. [`LineIndex`] is built once per file — from the
+//! text sent in `didOpen`, or a single read of the file — and records, per
+//! line, its byte length and the position of each multi-byte character.
+//! Conversion is then a subtraction over the wide characters before the
+//! column: constant time on ASCII lines, and no disk I/O or line scan per
+//! request.
+
+use std::collections::HashMap;
+
+/// A character whose `utf-8` and `utf-16` widths differ.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+struct WideChar {
+    /// Byte column where the character starts.
+    start: u32,
+    /// Width in `utf-8` bytes (2–4).
+    utf8_len: u8,
+    /// Width in `utf-16` code units (1 or 2).
+    utf16_len: u8,
+}
+
+/// Line lengths and wide-character positions of one file's text.
+///
+/// Lines follow [`str::lines`]: split on `\n`, with a trailing `\r`
+/// excluded from the line.
+#[derive(Debug, Clone, Default)]
+pub(crate) struct LineIndex {
+    /// Byte length of each line, terminator excluded.
+    line_lens: Vec<u32>,
+    /// Wide characters of each line that has any, in column order.
+    wide_chars: HashMap<u32, Vec<WideChar>>,
+}
+
+impl LineIndex {
+    /// Index `text`.
+    pub(crate) fn new(text: &str) -> Self {
+        let mut index = Self::default();
+        for (line_no, line) in text.lines().enumerate() {
+            index
+                .line_lens
+                .push(u32::try_from(line.len()).unwrap_or(u32::MAX));
+            if line.is_ascii() {
+                continue;
+            }
+            let wide: Vec<WideChar> = line
+                .char_indices()
+                .filter(|(_, c)| !c.is_ascii())
+                .map(|(start, c)| WideChar {
+                    start: u32::try_from(start).unwrap_or(u32::MAX),
+                    // len_utf8 is 1..=4 and len_utf16 is 1..=2.
+                    utf8_len: u8::try_from(c.len_utf8()).unwrap_or(u8::MAX),
+                    utf16_len: u8::try_from(c.len_utf16()).unwrap_or(u8::MAX),
+                })
+                .collect();
+            index
+                .wide_chars
+                .insert(u32::try_from(line_no).unwrap_or(u32::MAX), wide);
+        }
+        index
+    }
+
+    /// The `utf-16` column of 0-indexed BYTE column `byte_col` on 0-indexed
+    /// `line`, or `None` when the line does not exist, the column is past
+    /// the end of the line, or it falls inside a multi-byte character.
+    pub(crate) fn utf16_col(&self, line: u32, byte_col: u32) -> Option<u32> {
+        let len = *self.line_lens.get(usize::try_from(line).ok()?)?;
+        if byte_col > len {
+            return None;
+        }
+        let Some(wide) = self.wide_chars.get(&line) else {
+            return Some(byte_col);
+        };
+        let mut col = byte_col;
+        for c in wide.iter().take_while(|c| c.start < byte_col) {
+            if byte_col < c.start + u32::from(c.utf8_len) {
+                return None;
+            }
+            col -= u32::from(c.utf8_len - c.utf16_len);
+        }
+        Some(col)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// Each column agrees with re-measuring the line's byte prefix.
+    #[test]
+    fn matches_prefix_measurement_on_every_boundary() {
+        let text = "fn a() {}\r\nlet s = \"\u{65e5}\u{672c}\"; \u{1f600} x\n\n// \u{e9}t\u{e9}\n";
+        let index = LineIndex::new(text);
+        for (line_no, line) in text.lines().enumerate() {
+            let line_no = u32::try_from(line_no).expect("fits");
+            for (byte_col, _) in line.char_indices().chain([(line.len(), ' ')]) {
+                let expected = line[..byte_col].encode_utf16().count();
+                assert_eq!(
+                    index.utf16_col(line_no, u32::try_from(byte_col).expect("fits")),
+                    Some(u32::try_from(expected).expect("fits")),
+                    "line {line_no} byte {byte_col}"
+                );
+            }
+        }
+    }
+
+    #[test]
+    fn rejects_unmappable_columns() {
+        let index = LineIndex::new("\u{65e5}x\r\nab");
+        assert_eq!(index.utf16_col(0, 1), None, "inside a character");
+        assert_eq!(index.utf16_col(0, 5), None, "the \\r is not line text");
+        assert_eq!(index.utf16_col(1, 3), None, "past the end of the line");
+        assert_eq!(index.utf16_col(2, 0), None, "no such line");
+        assert_eq!(index.utf16_col(0, 4), Some(2));
+    }
+}
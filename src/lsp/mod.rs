@@ -31,16 +31,30 @@
 //! - JSON-RPC format: `Content-Length: N\r\n\r\n{json}`
 //! - Request IDs are incrementing integers
 //! - Supports both successful responses and error responses
+//! - A reader thread demultiplexes responses by id, so requests can be
+//!   pipelined (`LspClient::goto_definitions`), across all documents or
+//!   one open document at a time (`DefinitionQueries`)
+//! - Outgoing `utf-16` columns are converted through a per-file line
+//!   table built once per session
+//! - On Unix, `LspBroker` keeps servers warm between CLI invocations and
+//!   `BrokerClient` queries it over a socket
 
+#[cfg(unix)]
+mod broker;
 mod encoding;
 mod error;
+mod line_index;
 mod provider;
+mod rpc;
 mod status;
 mod transport;
 
+#[cfg(unix)]
+pub use broker::{BrokerClient, DEFAULT_BROKER_IDLE_TIMEOUT, LspBroker, broker_socket_path};
 pub use error::LspError;
 pub use provider::{
-    AnyProvider, CSharpLsProvider, LspProvider, ReadinessWait, RustAnalyzerProvider,
+    AnyProvider, CSharpLsProvider, DefinitionQueries, LspProvider, ReadinessWait,
+    RustAnalyzerProvider,
 };
 pub use transport::LspClient;
 
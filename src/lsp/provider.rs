@@ -22,6 +22,27 @@ pub enum ReadinessWait {
     Quiescence,
 }
 
+/// How Pass 3 feeds a session's `textDocument/definition` queries to the
+/// server (see `LspProvider::definition_queries`).
+///
+/// LSP has no request resolving every reference in a document at once
+/// (`documentSymbol` lists what a document defines, semantic tokens only
+/// classify tokens), so both strategies send one definition request per
+/// reference; they differ in when documents are open.
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Default)]
+pub enum DefinitionQueries {
+    /// Open every document with a query up front, before the readiness
+    /// wait, then pipeline all queries across documents. For servers that
+    /// need documents open while they load (csharp-ls). The fallback.
+    #[default]
+    PerReference,
+    /// Take documents one at a time: `didOpen`, pipeline that document's
+    /// queries, `didClose`. The server holds one open document instead of
+    /// all of them, and nothing is read or sent before the readiness wait,
+    /// at the cost of draining the pipeline once per document.
+    PerDocument,
+}
+
 /// Trait for configuring LSP server providers.
 ///
 /// Implementations define how to spawn and configure a specific LSP server.
@@ -67,6 +88,14 @@ pub trait LspProvider: Send + Sync {
     /// there is no signal every server emits, and a wrong declaration
     /// silently degrades resolution to the timeout path.
     fn readiness_wait(&self) -> ReadinessWait;
+
+    /// How Pass 3 should send this server its definition queries.
+    ///
+    /// Defaults to [`DefinitionQueries::PerReference`], which works with
+    /// every server.
+    fn definition_queries(&self) -> DefinitionQueries {
+        DefinitionQueries::PerReference
+    }
 }
 
 /// LSP provider for rust-analyzer.
@@ -98,6 +127,12 @@ impl LspProvider for RustAnalyzerProvider {
     fn readiness_wait(&self) -> ReadinessWait {
         ReadinessWait::Quiescence
     }
+
+    /// rust-analyzer reads the workspace from disk and answers for files
+    /// that are not open, so it never needs them all open at once.
+    fn definition_queries(&self) -> DefinitionQueries {
+        DefinitionQueries::PerDocument
+    }
 }
 
 /// LSP provider for csharp-ls.
@@ -178,6 +213,13 @@ impl LspProvider for AnyProvider {
             Self::CSharp(p) => p.readiness_wait(),
         }
     }
+
+    fn definition_queries(&self) -> DefinitionQueries {
+        match self {
+            Self::Rust(p) => p.definition_queries(),
+            Self::CSharp(p) => p.definition_queries(),
+        }
+    }
 }
 
 impl AnyProvider {
@@ -195,6 +237,20 @@ impl AnyProvider {
 mod tests {
     use super::*;
 
+    #[test]
+    fn only_csharp_ls_needs_every_document_open_up_front() {
+        use crate::types::Language;
+
+        assert_eq!(
+            AnyProvider::for_language(Language::Rust).definition_queries(),
+            DefinitionQueries::PerDocument
+        );
+        assert_eq!(
+            AnyProvider::for_language(Language::CSharp).definition_queries(),
+            DefinitionQueries::PerReference
+        );
+    }
+
     #[test]
     fn rust_analyzer_provider_has_correct_command() {
         let provider = RustAnalyzerProvider;
@@ -0,0 +1,480 @@
+//! Pipelined JSON-RPC connection to a language server.
+//!
+//! A dedicated reader thread owns the server's stdout and demultiplexes
+//! every incoming message as it arrives:
+//!
+//! - Responses (an integer `id`, no `method`) go to the response channel,
+//!   keyed by id, for whichever caller is waiting on that id.
+//! - Server->client requests (`method` AND `id`) are acknowledged with a
+//!   `null` result from the reader thread itself, so the server never
+//!   stalls on us no matter what the client thread is doing.
+//! - Notifications (`method`, no `id`) go to the notification channel,
+//!   where the readiness waits look for their signals. Anything no one
+//!   consumes is discarded before the next request is issued.
+//!
+//! Because reading no longer blocks the writer, any number of requests
+//! can be in flight: [`RpcConnection::pipeline`] keeps a window of them
+//! outstanding and hands each response to its caller in completion order,
+//! turning N round-trips into roughly N / window.
+
+use std::collections::HashMap;
+use std::io::{BufRead, BufReader, Read, Write};
+use std::sync::mpsc::{self, Receiver, RecvTimeoutError, Sender};
+use std::sync::{Arc, Mutex};
+use std::thread::JoinHandle;
+use std::time::Duration;
+
+use serde_json::{Value, json};
+use tracing::{debug, trace, warn};
+
+use super::Result;
+use super::error::LspError;
+
+/// Default number of requests [`RpcConnection::pipeline`] keeps in flight.
+///
+/// Large enough to hide per-request latency behind the server's own
+/// parallelism, small enough that a slow server is not buried under
+/// thousands of queued requests it must answer before it can be shut down.
+pub(crate) const DEFAULT_MAX_IN_FLIGHT: usize = 32;
+
+/// The server's stdin, shared by the client thread (requests) and the
+/// reader thread (acknowledgements).
+type SharedWriter = Arc<Mutex<Box<dyn Write + Send>>>;
+
+/// A response message with its id, or the reader's fatal error.
+type Incoming = Result<(i64, Value)>;
+
+/// JSON-RPC connection with a background reader thread.
+pub(crate) struct RpcConnection {
+    writer: SharedWriter,
+    responses: Receiver<Incoming>,
+    notifications: Receiver<Value>,
+    reader_thread: Option<JoinHandle<()>>,
+    next_id: i64,
+    response_timeout: Duration,
+}
+
+impl RpcConnection {
+    /// Start the reader thread over `reader` and write requests to
+    /// `writer`. Waiting for any single response gives up after
+    /// `response_timeout`.
+    pub(crate) fn spawn<R, W>(reader: R, writer: W, response_timeout: Duration) -> Self
+    where
+        R: Read + Send + 'static,
+        W: Write + Send + 'static,
+    {
+        let writer: SharedWriter = Arc::new(Mutex::new(Box::new(writer)));
+        let (response_tx, responses) = mpsc::channel();
+        let (notification_tx, notifications) = mpsc::channel();
+        let reader_writer = Arc::clone(&writer);
+        let reader_thread = std::thread::spawn(move || {
+            reader_loop(reader, &reader_writer, &response_tx, &notification_tx);
+        });
+
+        Self {
+            writer,
+            responses,
+            notifications,
+            reader_thread: Some(reader_thread),
+            next_id: 0,
+            response_timeout,
+        }
+    }
+
+    /// Send a notification (no response expected).
+    pub(crate) fn notify(&self, method: &str, params: &Value) -> Result<()> {
+        trace!(method, "Sending LSP notification");
+        write_message(
+            &self.writer,
+            &json!({
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params,
+            }),
+        )
+    }
+
+    /// Send a request without waiting for its response; returns its id.
+    pub(crate) fn issue(&mut self, method: &str, params: Value) -> Result<i64> {
+        // Notifications nobody waited for are stale once the client moves
+        // on to its next request; dropping them here bounds the queue.
+        while self.notifications.try_recv().is_ok() {}
+
+        self.next_id += 1;
+        let id = self.next_id;
+        trace!(method, id, "Sending LSP request");
+        write_message(
+            &self.writer,
+            &json!({
+                "jsonrpc": "2.0",
+                "id": id,
+                "method": method,
+                "params": params,
+            }),
+        )?;
+        Ok(id)
+    }
+
+    /// Wait for the response to request `id` and return its `result`.
+    /// Responses to other (abandoned) requests arriving first are dropped.
+    pub(crate) fn wait_for(&mut self, id: i64) -> Result<Value> {
+        loop {
+            let (got, outcome) = self.next_response()?;
+            if got == id {
+                return outcome;
+            }
+            trace!(
+                id = got,
+                waiting_for = id,
+                "Dropping response to an abandoned request"
+            );
+        }
+    }
+
+    /// The next response in arrival order: its id and its `result` (or the
+    /// server's error). The outer error is a transport failure — timeout,
+    /// broken framing, or server exit — after which no more responses come.
+    pub(crate) fn next_response(&mut self) -> Result<(i64, Result<Value>)> {
+        match self.responses.recv_timeout(self.response_timeout) {
+            Ok(Ok((id, message))) => Ok((id, into_result(message))),
+            Ok(Err(e)) => Err(e),
+            Err(RecvTimeoutError::Timeout) => Err(LspError::InvalidHeader(format!(
+                "timeout after {}s waiting for an LSP response",
+                self.response_timeout.as_secs()
+            ))),
+            Err(RecvTimeoutError::Disconnected) => Err(LspError::ServerExited),
+        }
+    }
+
+    /// The next server notification, or `None` if `timeout` elapses first.
+    pub(crate) fn next_notification(&mut self, timeout: Duration) -> Result<Option<Value>> {
+        match self.notifications.recv_timeout(timeout) {
+            Ok(message) => Ok(Some(message)),
+            Err(RecvTimeoutError::Timeout) => Ok(None),
+            Err(RecvTimeoutError::Disconnected) => Err(LspError::ServerExited),
+        }
+    }
+
+    /// Issue `requests` keeping up to `window` in flight, calling
+    /// `on_response(index, result)` as each response arrives (completion
+    /// order, not request order). A request that fails to build is
+    /// reported through `on_response` without being sent.
+    ///
+    /// Returns early with the transport error if the connection fails;
+    /// requests not yet answered at that point get no callback.
+    pub(crate) fn pipeline<'m, I, F>(
+        &mut self,
+        requests: I,
+        window: usize,
+        mut on_response: F,
+    ) -> Result<()>
+    where
+        I: IntoIterator<Item = Result<(&'m str, Value)>>,
+        F: FnMut(usize, Result<Value>),
+    {
+        let window = window.max(1);
+        let mut requests = requests.into_iter().enumerate();
+        let mut in_flight: HashMap<i64, usize> = HashMap::with_capacity(window);
+        let mut exhausted = false;
+
+        loop {
+            while !exhausted && in_flight.len() < window {
+                match requests.next() {
+                    Some((index, Ok((method, params)))) => {
+                        let id = self.issue(method, params)?;
+                        in_flight.insert(id, index);
+                    }
+                    Some((index, Err(e))) => on_response(index, Err(e)),
+                    None => exhausted = true,
+                }
+            }
+            if in_flight.is_empty() {
+                return Ok(());
+            }
+
+            let (id, outcome) = self.next_response()?;
+            match in_flight.remove(&id) {
+                Some(index) => on_response(index, outcome),
+                None => trace!(id, "Dropping response to an abandoned request"),
+            }
+        }
+    }
+
+    /// Wait for the reader thread to finish. Call only once the server's
+    /// stdout is closing (process exited or killed), or this blocks.
+    pub(crate) fn join_reader(&mut self) {
+        if let Some(handle) = self.reader_thread.take() {
+            let _ = handle.join();
+        }
+    }
+}
+
+/// Body of the reader thread: read messages until the stream ends, routing
+/// each one (see the module docs). Exits when the server closes stdout or
+/// the framing breaks; dropping the senders then wakes every waiter.
+fn reader_loop<R: Read>(
+    reader: R,
+    writer: &SharedWriter,
+    responses: &Sender<Incoming>,
+    notifications: &Sender<Value>,
+) {
+    let mut reader = BufReader::new(reader);
+    loop {
+        let message = match read_message(&mut reader) {
+            Ok(message) => message,
+            // The frame was consumed whole, so the stream is still in sync.
+            Err(LspError::Deserialize(e)) => {
+                warn!(error = %e, "Skipping malformed LSP message");
+                continue;
+            }
+            Err(LspError::ServerExited) => {
+                debug!("LSP server closed its output");
+                return;
+            }
+            Err(e) => {
+                let _ = responses.send(Err(e));
+                return;
+            }
+        };
+
+        if let Some(method) = message.get("method").and_then(Value::as_str) {
+            if let Some(request_id) = message.get("id") {
+                trace!(method, "Acknowledging server request");
+                let ack = json!({
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": null,
+                });
+                if let Err(e) = write_message(writer, &ack) {
+                    debug!(method, error = %e, "Failed to acknowledge server request");
+                }
+            } else {
+                trace!(method, "Received LSP notification");
+                // The client may already be gone; nothing to do then.
+                let _ = notifications.send(message);
+            }
+            continue;
+        }
+
+        match message.get("id").and_then(Value::as_i64) {
+            Some(id) => {
+                trace!(id, "Received LSP response");
+                if responses.send(Ok((id, message))).is_err() {
+                    return;
+                }
+            }
+            None => warn!(response = %message, "Dropping LSP response without an integer id"),
+        }
+    }
+}
+
+/// Split a response message into its `result` or the server's error.
+fn into_result(mut message: Value) -> Result<Value> {
+    if let Some(error) = message.get("error") {
+        let code = error.get("code").and_then(Value::as_i64);
+        let msg = error.get("message").and_then(Value::as_str);
+        return Err(match (code, msg) {
+            (Some(code), Some(msg)) => LspError::server_error(code, msg),
+            _ => LspError::InvalidHeader(format!(
+                "malformed LSP error response (missing code or message): {error}"
+            )),
+        });
+    }
+    message
+        .get_mut("result")
+        .map(Value::take)
+        .ok_or_else(|| LspError::InvalidHeader("response missing 'result' field".to_string()))
+}
+
+/// Write one framed JSON-RPC message. Header and body go out in a single
+/// write so concurrent writers (client and reader thread) never interleave
+/// inside a frame, even without the lock's help.
+fn write_message(writer: &SharedWriter, message: &Value) -> Result<()> {
+    let body = serde_json::to_string(message).map_err(LspError::Serialize)?;
+    let mut frame = format!("Content-Length: {}\r\n\r\n", body.len()).into_bytes();
+    frame.extend_from_slice(body.as_bytes());
+
+    trace!(body_len = body.len(), "Writing LSP message");
+
+    let mut writer = writer.lock().map_err(|_| {
+        LspError::Io(std::io::Error::other(
+            "LSP writer lock poisoned (a thread panicked mid-write)",
+        ))
+    })?;
+    writer.write_all(&frame)?;
+    writer.flush()?;
+    Ok(())
+}
+
+/// Read the next complete JSON-RPC message (header + body).
+fn read_message(reader: &mut impl BufRead) -> Result<Value> {
+    let content_length = read_content_length(reader)?;
+    let mut body = vec![0u8; content_length];
+    reader.read_exact(&mut body)?;
+    serde_json::from_slice(&body).map_err(LspError::Deserialize)
+}
+
+/// Read the headers of the next message and return its Content-Length.
+fn read_content_length(reader: &mut impl BufRead) -> Result<usize> {
+    let mut headers = String::new();
+
+    loop {
+        let mut line = String::new();
+        let bytes_read = reader.read_line(&mut line)?;
+
+        if bytes_read == 0 {
+            return Err(LspError::ServerExited);
+        }
+
+        // Empty line signals end of headers
+        if line == "\r\n" || line == "\n" {
+            break;
+        }
+
+        headers.push_str(&line);
+    }
+
+    for line in headers.lines() {
+        if let Some(value) = line.strip_prefix("Content-Length: ") {
+            return value
+                .trim()
+                .parse()
+                .map_err(|_| LspError::InvalidHeader(format!("invalid Content-Length: {value}")));
+        }
+    }
+
+    Err(LspError::InvalidHeader(
+        "missing Content-Length header".to_string(),
+    ))
+}
+
+#[cfg(test)]
+mod tests {
+    use std::io::Cursor;
+
+    use super::*;
+
+    /// In-memory stand-in for the server's stdin.
+    #[derive(Clone, Default)]
+    struct SharedBuf(Arc<Mutex<Vec<u8>>>);
+
+    impl Write for SharedBuf {
+        fn write(&mut self, buf: &[u8]) -> std::io::Result<usize> {
+            self.0.lock().expect("buf lock").extend_from_slice(buf);
+            Ok(buf.len())
+        }
+        fn flush(&mut self) -> std::io::Result<()> {
+            Ok(())
+        }
+    }
+
+    impl SharedBuf {
+        fn text(&self) -> String {
+            String::from_utf8(self.0.lock().expect("buf lock").clone()).expect("utf-8")
+        }
+        fn requests_sent(&self) -> usize {
+            self.text().matches("\"method\":\"test/echo\"").count()
+        }
+    }
+
+    fn frame(message: &Value) -> String {
+        let body = serde_json::to_string(message).expect("serialize");
+        format!("Content-Length: {}\r\n\r\n{body}", body.len())
+    }
+
+    /// A connection whose "server" has already written `messages` and then
+    /// closed its output.
+    fn connection(messages: &[Value]) -> (RpcConnection, SharedBuf) {
+        let input: String = messages.iter().map(frame).collect();
+        let sent = SharedBuf::default();
+        let rpc = RpcConnection::spawn(
+            Cursor::new(input.into_bytes()),
+            sent.clone(),
+            Duration::from_secs(5),
+        );
+        (rpc, sent)
+    }
+
+    fn echo(n: usize) -> impl Iterator<Item = Result<(&'static str, Value)>> {
+        (0..n).map(|i| Ok(("test/echo", json!({ "i": i }))))
+    }
+
+    #[test]
+    fn pipeline_demultiplexes_out_of_order_responses() {
+        let (mut rpc, sent) = connection(&[
+            json!({"jsonrpc": "2.0", "method": "$/progress", "params": {}}),
+            json!({"jsonrpc": "2.0", "id": 2, "result": "two"}),
+            json!({"jsonrpc": "2.0", "id": "srv-1", "method": "window/workDoneProgress/create"}),
+            json!({"jsonrpc": "2.0", "id": 1, "error": {"code": -32801, "message": "modified"}}),
+            json!({"jsonrpc": "2.0", "id": 3, "result": "three"}),
+        ]);
+
+        let mut results: Vec<(usize, std::result::Result<Value, String>)> = Vec::new();
+        rpc.pipeline(echo(3), 2, |i, r| {
+            results.push((i, r.map_err(|e| e.to_string())));
+        })
+        .expect("pipeline");
+
+        assert_eq!(
+            results,
+            [
+                (1, Ok(json!("two"))),
+                (0, Err("LSP error -32801: modified".to_string())),
+                (2, Ok(json!("three"))),
+            ]
+        );
+        let text = sent.text();
+        assert_eq!(sent.requests_sent(), 3);
+        assert!(
+            text.contains("\"srv-1\"") && text.contains("\"result\":null"),
+            "server request acknowledged with null: {text}"
+        );
+        rpc.join_reader();
+    }
+
+    #[test]
+    fn pipeline_never_exceeds_its_window() {
+        let (mut rpc, sent) = connection(&[
+            json!({"jsonrpc": "2.0", "id": 1, "result": 1}),
+            json!({"jsonrpc": "2.0", "id": 2, "result": 2}),
+            json!({"jsonrpc": "2.0", "id": 3, "result": 3}),
+        ]);
+
+        let mut sent_at_callback = Vec::new();
+        rpc.pipeline(echo(3), 1, |_, _| {
+            sent_at_callback.push(sent.requests_sent())
+        })
+        .expect("pipeline");
+        assert_eq!(sent_at_callback, [1, 2, 3]);
+    }
+
+    #[test]
+    fn server_exit_ends_the_pipeline_with_an_error() {
+        let (mut rpc, _sent) = connection(&[json!({"jsonrpc": "2.0", "id": 1, "result": 1})]);
+
+        let mut answered = Vec::new();
+        let err = rpc
+            .pipeline(echo(3), 3, |i, _| answered.push(i))
+            .expect_err("server closed before answering everything");
+        assert!(matches!(err, LspError::ServerExited), "{err}");
+        assert_eq!(answered, [0]);
+    }
+
+    #[test]
+    fn wait_for_skips_abandoned_responses_and_notifications_are_kept() {
+        let (mut rpc, _sent) = connection(&[
+            json!({"jsonrpc": "2.0", "id": 7, "result": "stale"}),
+            json!({"jsonrpc": "2.0", "method": "experimental/serverStatus", "params": {}}),
+            json!({"jsonrpc": "2.0", "id": 1, "result": "fresh"}),
+        ]);
+
+        let note = rpc
+            .next_notification(Duration::from_secs(5))
+            .expect("channel open")
+            .expect("notification forwarded");
+        assert_eq!(note["method"], "experimental/serverStatus");
+
+        let id = rpc.issue("test/echo", json!({})).expect("issue");
+        assert_eq!(rpc.wait_for(id).expect("response"), json!("fresh"));
+    }
+}
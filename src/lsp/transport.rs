@@ -1,18 +1,19 @@
 //! JSON-RPC transport for LSP communication.
 
-use std::io::{BufRead, BufReader, Read, Write};
-use std::path::Path;
-use std::process::{Child, ChildStdin, ChildStdout, Command, Stdio};
+use std::collections::HashMap;
+use std::io::{BufRead, BufReader};
+use std::path::{Path, PathBuf};
+use std::process::{Child, Command, Stdio};
 use std::thread::JoinHandle;
 use std::time::{Duration, Instant};
 
 use lsp_types::{
-    ClientCapabilities, DidOpenTextDocumentParams, GeneralClientCapabilities, GotoDefinitionParams,
-    GotoDefinitionResponse, InitializeParams, InitializeResult, Location, PartialResultParams,
-    Position, PositionEncodingKind, ReferenceContext, ReferenceParams, TextDocumentIdentifier,
-    TextDocumentItem, TextDocumentPositionParams, Uri, WindowClientCapabilities,
-    WorkDoneProgressParams,
-    notification::{DidOpenTextDocument, Notification},
+    ClientCapabilities, DidCloseTextDocumentParams, DidOpenTextDocumentParams,
+    GeneralClientCapabilities, GotoDefinitionParams, GotoDefinitionResponse, InitializeParams,
+    InitializeResult, Location, PartialResultParams, Position, PositionEncodingKind,
+    ReferenceContext, ReferenceParams, TextDocumentIdentifier, TextDocumentItem,
+    TextDocumentPositionParams, Uri, WindowClientCapabilities, WorkDoneProgressParams,
+    notification::{DidCloseTextDocument, DidOpenTextDocument, Notification},
     request::{GotoDefinition, Initialize, References, Shutdown},
 };
 use percent_encoding::{AsciiSet, CONTROLS, utf8_percent_encode};
@@ -23,27 +24,32 @@ use tracing::{debug, trace, warn};
 use super::Result;
 use super::encoding::PositionEncoding;
 use super::error::LspError;
+use super::line_index::LineIndex;
 use super::provider::{LspProvider, ReadinessWait};
+use super::rpc::{DEFAULT_MAX_IN_FLIGHT, RpcConnection};
 use super::status::{ReadyState, SERVER_STATUS_METHOD, classify_server_status};
 
 /// Default timeout for waiting for a response to a single LSP request.
 /// Individual requests (`goto_definition`, `find_references`) should not take
 /// longer than this. Solution loading has its own separate timeout.
-const DEFAULT_RESPONSE_TIMEOUT: Duration = Duration::from_secs(60);
+pub(super) const DEFAULT_RESPONSE_TIMEOUT: Duration = Duration::from_secs(60);
 
 /// LSP client for communicating with language servers.
 ///
-/// Provides a thin JSON-RPC transport layer over stdin/stdout.
+/// Provides a thin JSON-RPC transport layer over stdin/stdout. A background
+/// reader thread demultiplexes the server's output, so requests can be
+/// pipelined (see [`Self::goto_definitions`]).
 pub struct LspClient {
     process: Child,
-    stdin: ChildStdin,
-    stdout: BufReader<ChildStdout>,
-    request_id: i64,
-    response_timeout: Duration,
+    rpc: RpcConnection,
+    /// Requests [`Self::goto_definitions`] keeps in flight at once.
+    max_in_flight: usize,
     /// Position encoding negotiated during `initialize`. Tethys's stored
     /// columns are byte offsets, so `Utf8` means outgoing positions pass
     /// through unchanged; `Utf16` requires per-request conversion.
     position_encoding: PositionEncoding,
+    /// Line tables for `utf-16` conversion, built once per file.
+    line_indexes: HashMap<PathBuf, LineIndex>,
     /// Background thread draining the server's stderr into tracing logs.
     /// Joined on shutdown to avoid leaking threads.
     stderr_thread: Option<JoinHandle<()>>,
@@ -104,7 +110,6 @@ impl LspClient {
                 "failed to capture LSP server stdout",
             ))
         })?;
-        let stdout = BufReader::new(stdout);
 
         // Drain stderr in a background thread so LSP server diagnostics are
         // captured via tracing instead of being permanently lost.
@@ -133,12 +138,11 @@ impl LspClient {
 
         let mut client = Self {
             process,
-            stdin,
-            stdout,
-            request_id: 0,
-            response_timeout: DEFAULT_RESPONSE_TIMEOUT,
+            rpc: RpcConnection::spawn(stdout, stdin, DEFAULT_RESPONSE_TIMEOUT),
+            max_in_flight: DEFAULT_MAX_IN_FLIGHT,
             // LSP spec default until initialize() negotiates otherwise.
             position_encoding: PositionEncoding::Utf16,
+            line_indexes: HashMap::new(),
             stderr_thread,
         };
 
@@ -179,31 +183,50 @@ impl LspClient {
     ///
     /// Identity when the server accepted `utf-8` (tethys's stored columns
     /// ARE byte offsets). When the negotiated encoding is `utf-16`, the
-    /// target line's text is read and its byte prefix re-measured as
-    /// `utf-16` code units. On a line-text read failure the raw byte offset
-    /// is sent rather than dropping the request — correct for ASCII-only
-    /// prefixes, best-effort otherwise.
-    fn encode_outgoing_col(&self, file: &Path, line: u32, byte_col: u32) -> u32 {
-        if self.position_encoding == PositionEncoding::Utf8 {
+    /// column is re-measured through `file`'s cached [`LineIndex`] — seeded
+    /// by [`Self::did_open`], or built from one read of the file on first
+    /// use. If the file cannot be read the raw byte offset is sent rather
+    /// than dropping the request — correct for ASCII-only prefixes,
+    /// best-effort otherwise.
+    fn encode_outgoing_col(
+        encoding: PositionEncoding,
+        line_indexes: &mut HashMap<PathBuf, LineIndex>,
+        file: &Path,
+        line: u32,
+        byte_col: u32,
+    ) -> u32 {
+        if encoding == PositionEncoding::Utf8 {
             return byte_col;
         }
-        let line_text = match std::fs::read_to_string(file) {
-            Ok(content) => usize::try_from(line)
-                .ok()
-                .and_then(|n| content.lines().nth(n).map(str::to_owned)),
-            Err(e) => {
-                debug!(
-                    file = %file.display(),
-                    line,
-                    error = %e,
-                    "Cannot read line text for utf-16 conversion; sending raw byte column"
-                );
-                None
+        if !line_indexes.contains_key(file) {
+            match std::fs::read_to_string(file) {
+                Ok(content) => {
+                    line_indexes.insert(file.to_path_buf(), LineIndex::new(&content));
+                }
+                Err(e) => {
+                    debug!(
+                        file = %file.display(),
+                        line,
+                        error = %e,
+                        "Cannot read line text for utf-16 conversion; sending raw byte column"
+                    );
+                    return byte_col;
+                }
             }
-        };
-        match line_text {
-            Some(text) => self.position_encoding.col_from_utf8(&text, byte_col),
-            None => byte_col,
+        }
+        line_indexes.get(file).map_or(byte_col, |index| {
+            encoding.col_from_utf8(index, line, byte_col)
+        })
+    }
+
+    /// Use `content` as `file`'s text for outgoing column conversion,
+    /// replacing any cached line index. Callers that already hold the
+    /// text of a file they are about to query save a read; a no-op when
+    /// the server accepted `utf-8`.
+    pub(crate) fn cache_line_index(&mut self, file: &Path, content: &str) {
+        if self.position_encoding == PositionEncoding::Utf16 {
+            self.line_indexes
+                .insert(file.to_path_buf(), LineIndex::new(content));
         }
     }
 
@@ -217,181 +240,24 @@ impl LspClient {
     /// Returns an error if:
     /// - The request fails to serialize
     /// - Writing to the LSP server fails
-    /// - Reading the response fails
+    /// - No response arrives within the response timeout, or the server
+    ///   exits first
     /// - The response contains an error
-    /// - The response ID doesn't match the request ID
     pub fn send_request<R>(&mut self, params: R::Params) -> Result<R::Result>
     where
         R: lsp_types::request::Request,
         R::Params: Serialize,
         R::Result: DeserializeOwned,
     {
-        self.request_id += 1;
-        let id = self.request_id;
-
-        let request = json!({
-            "jsonrpc": "2.0",
-            "id": id,
-            "method": R::METHOD,
-            "params": params,
-        });
-
-        trace!(method = R::METHOD, id = id, "Sending LSP request");
-
-        self.write_message(&request)?;
-        self.read_response(id)
+        let params = serde_json::to_value(params).map_err(LspError::Serialize)?;
+        let id = self.rpc.issue(R::METHOD, params)?;
+        let result = self.rpc.wait_for(id)?;
+        serde_json::from_value(result).map_err(LspError::Deserialize)
     }
 
     /// Send an LSP notification (no response expected).
     fn send_notification(&mut self, method: &str, params: &Value) -> Result<()> {
-        let notification = json!({
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params,
-        });
-
-        trace!(method = method, "Sending LSP notification");
-        self.write_message(&notification)
-    }
-
-    /// Write a JSON-RPC message to the server.
-    fn write_message(&mut self, message: &Value) -> Result<()> {
-        let body = serde_json::to_string(message).map_err(LspError::Serialize)?;
-        let header = format!("Content-Length: {}\r\n\r\n", body.len());
-
-        trace!(body_len = body.len(), "Writing LSP message");
-
-        self.stdin.write_all(header.as_bytes())?;
-        self.stdin.write_all(body.as_bytes())?;
-        self.stdin.flush()?;
-
-        Ok(())
-    }
-
-    /// Read a JSON-RPC response from the server.
-    ///
-    /// LSP servers may send various message types interleaved with responses:
-    /// - Notifications (have `method` but no `id`) - skipped
-    /// - Server requests (have both `method` AND `id`) - acknowledged with null result
-    /// - Responses (have `id` but no `method`) - returned to caller
-    ///
-    /// Times out after `self.response_timeout` to prevent infinite hangs if the
-    /// server enters a pathological state (e.g., sending endless notifications).
-    /// Read the next complete JSON-RPC message (header + body) from the server.
-    fn read_message(&mut self) -> Result<Value> {
-        let content_length = self.read_content_length()?;
-        let mut body = vec![0u8; content_length];
-        self.stdout.read_exact(&mut body)?;
-        serde_json::from_slice(&body).map_err(LspError::Deserialize)
-    }
-
-    /// Acknowledge a server->client request with a `null` result so the
-    /// server doesn't stall waiting on a reply we'll never otherwise send.
-    fn ack_server_request(&mut self, request_id: &Value) -> Result<()> {
-        let response = json!({
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "result": null,
-        });
-        self.write_message(&response)
-    }
-
-    fn read_response<T: DeserializeOwned>(&mut self, expected_id: i64) -> Result<T> {
-        let start = Instant::now();
-        let mut skipped_messages: u32 = 0;
-
-        loop {
-            if start.elapsed() > self.response_timeout {
-                return Err(LspError::InvalidHeader(format!(
-                    "timeout after {}s waiting for response to request {expected_id} \
-                     (skipped {skipped_messages} intermediate messages)",
-                    self.response_timeout.as_secs(),
-                )));
-            }
-
-            let message = self.read_message()?;
-
-            // Check if this message has a method field (notification or server request)
-            if let Some(method) = message.get("method").and_then(Value::as_str) {
-                // If it also has an id, it's a server->client request that needs a response
-                if let Some(request_id) = message.get("id") {
-                    trace!(method = method, "Acknowledging server request");
-                    self.ack_server_request(request_id)?;
-                } else {
-                    trace!(method = method, "Skipping LSP notification");
-                }
-                skipped_messages += 1;
-                continue;
-            }
-
-            // No method field means this is a response
-            trace!(response = %message, "Received LSP response");
-
-            // Check for error response
-            if let Some(error) = message.get("error") {
-                let code = error.get("code").and_then(Value::as_i64);
-                let msg = error.get("message").and_then(Value::as_str);
-                return Err(match (code, msg) {
-                    (Some(code), Some(msg)) => LspError::server_error(code, msg),
-                    _ => LspError::InvalidHeader(format!(
-                        "malformed LSP error response (missing code or message): {error}"
-                    )),
-                });
-            }
-
-            // Verify response ID matches
-            let actual_id = message["id"].as_i64().ok_or_else(|| {
-                LspError::InvalidHeader("response missing 'id' field".to_string())
-            })?;
-
-            if actual_id != expected_id {
-                return Err(LspError::IdMismatch {
-                    expected: expected_id,
-                    actual: actual_id,
-                });
-            }
-
-            // Deserialize the result
-            let result = message.get("result").ok_or_else(|| {
-                LspError::InvalidHeader("response missing 'result' field".to_string())
-            })?;
-
-            return serde_json::from_value(result.clone()).map_err(LspError::Deserialize);
-        }
-    }
-
-    /// Read the Content-Length header from the response.
-    fn read_content_length(&mut self) -> Result<usize> {
-        let mut headers = String::new();
-
-        loop {
-            let mut line = String::new();
-            let bytes_read = self.stdout.read_line(&mut line)?;
-
-            if bytes_read == 0 {
-                return Err(LspError::ServerExited);
-            }
-
-            // Empty line signals end of headers
-            if line == "\r\n" || line == "\n" {
-                break;
-            }
-
-            headers.push_str(&line);
-        }
-
-        // Parse Content-Length
-        for line in headers.lines() {
-            if let Some(value) = line.strip_prefix("Content-Length: ") {
-                return value.trim().parse().map_err(|_| {
-                    LspError::InvalidHeader(format!("invalid Content-Length: {value}"))
-                });
-            }
-        }
-
-        Err(LspError::InvalidHeader(
-            "missing Content-Length header".to_string(),
-        ))
+        self.rpc.notify(method, params)
     }
 
     /// Get the definition location for a symbol at the given position.
@@ -417,24 +283,72 @@ impl LspClient {
         line: u32,
         col: u32,
     ) -> Result<Option<Location>> {
-        let uri = path_to_uri(file)?;
-        let col = self.encode_outgoing_col(file, line, col);
-
-        let params = GotoDefinitionParams {
-            text_document_position_params: TextDocumentPositionParams {
-                text_document: TextDocumentIdentifier::new(uri),
-                position: Position::new(line, col),
-            },
-            work_done_progress_params: WorkDoneProgressParams::default(),
-            partial_result_params: PartialResultParams::default(),
-        };
-
+        let col = Self::encode_outgoing_col(
+            self.position_encoding,
+            &mut self.line_indexes,
+            file,
+            line,
+            col,
+        );
+        let params = definition_params(file, line, col)?;
         let response: Option<GotoDefinitionResponse> =
             self.send_request::<GotoDefinition>(params)?;
 
         Ok(response.and_then(Self::extract_first_location))
     }
 
+    /// Pipelined [`Self::goto_definition`] over many positions.
+    ///
+    /// Keeps up to [`Self::max_in_flight`] requests outstanding and calls
+    /// `on_result(index, result)` as each answer arrives — in completion
+    /// order, with `index` the position's place in `positions`. Per-position
+    /// failures (an invalid path, a server error response) arrive through
+    /// `on_result`; the pipeline keeps going.
+    ///
+    /// # Errors
+    ///
+    /// Returns a transport error (write failure, response timeout, server
+    /// exit) that ends the pipeline early. Positions not yet answered at
+    /// that point get no callback.
+    pub fn goto_definitions<'a, I, F>(&mut self, positions: I, mut on_result: F) -> Result<()>
+    where
+        I: IntoIterator<Item = (&'a Path, u32, u32)>,
+        F: FnMut(usize, Result<Option<Location>>),
+    {
+        let encoding = self.position_encoding;
+        let line_indexes = &mut self.line_indexes;
+        let requests = positions.into_iter().map(|(file, line, col)| {
+            let col = Self::encode_outgoing_col(encoding, line_indexes, file, line, col);
+            let params = definition_params(file, line, col)?;
+            let params = serde_json::to_value(params).map_err(LspError::Serialize)?;
+            Ok((GotoDefinition::METHOD, params))
+        });
+
+        self.rpc
+            .pipeline(requests, self.max_in_flight, |index, outcome| {
+                let location = outcome.and_then(|result| {
+                    serde_json::from_value::<Option<GotoDefinitionResponse>>(result)
+                        .map_err(LspError::Deserialize)
+                });
+                on_result(
+                    index,
+                    location.map(|r| r.and_then(Self::extract_first_location)),
+                );
+            })
+    }
+
+    /// Requests [`Self::goto_definitions`] keeps in flight at once.
+    #[must_use]
+    pub fn max_in_flight(&self) -> usize {
+        self.max_in_flight
+    }
+
+    /// Set the pipelining window for [`Self::goto_definitions`]. `1`
+    /// degrades to one round-trip per position; `0` is treated as `1`.
+    pub fn set_max_in_flight(&mut self, window: usize) {
+        self.max_in_flight = window.max(1);
+    }
+
     /// Notify the server that a document has been opened.
     ///
     /// Many LSP servers (like csharp-ls) require documents to be explicitly opened
@@ -465,6 +379,28 @@ impl LspClient {
         let params_value = serde_json::to_value(params).map_err(LspError::Serialize)?;
         self.send_notification(DidOpenTextDocument::METHOD, &params_value)?;
         trace!(file = %file.display(), "Sent didOpen notification");
+        self.cache_line_index(file, content);
+        Ok(())
+    }
+
+    /// Notify the server that a document opened with [`Self::did_open`] is
+    /// closed, so it can drop the document's in-memory state. Also drops
+    /// the document's cached line index.
+    ///
+    /// # Errors
+    ///
+    /// Returns an error if the file path is invalid or communication fails.
+    pub fn did_close(&mut self, file: &Path) -> Result<()> {
+        let params = DidCloseTextDocumentParams {
+            text_document: TextDocumentIdentifier {
+                uri: path_to_uri(file)?,
+            },
+        };
+
+        let params_value = serde_json::to_value(params).map_err(LspError::Serialize)?;
+        self.send_notification(DidCloseTextDocument::METHOD, &params_value)?;
+        trace!(file = %file.display(), "Sent didClose notification");
+        self.line_indexes.remove(file);
         Ok(())
     }
 
@@ -501,29 +437,19 @@ impl LspClient {
         );
 
         loop {
-            // Check timeout
-            if start.elapsed() > timeout {
+            // Server->client requests are acknowledged by the reader
+            // thread; only notifications reach this loop.
+            let remaining = timeout.saturating_sub(start.elapsed());
+            let Some(message) = self.rpc.next_notification(remaining)? else {
                 if loading_token.is_some() {
                     warn!("Timeout waiting for solution load to complete");
                 } else {
                     debug!("Timeout reached without detecting solution loading progress");
                 }
                 return Ok(false);
-            }
-
-            let message = self.read_message()?;
+            };
 
-            // Check if this is a notification or server request
             if let Some(method) = message.get("method").and_then(Value::as_str) {
-                // Handle server->client requests (acknowledge with null)
-                if let Some(request_id) = message.get("id") {
-                    trace!(
-                        method = method,
-                        "Acknowledging server request during solution load"
-                    );
-                    self.ack_server_request(request_id)?;
-                }
-
                 // Check for $/progress notifications
                 if method == "$/progress"
                     && let Some(params) = message.get("params")
@@ -582,14 +508,6 @@ impl LspClient {
                         }
                     }
                 }
-
-                continue;
-            }
-
-            // If we receive a response (has id but no method), something unexpected happened
-            // This shouldn't occur since we haven't sent any requests, but log it
-            if message.get("id").is_some() {
-                trace!("Received unexpected response during solution load wait");
             }
         }
     }
@@ -626,9 +544,9 @@ impl LspClient {
     ///
     /// Safe to call at any point after initialization: if the server is
     /// already quiescent, the initial status notification arrives
-    /// immediately (observed ≤0.1s). The timeout is checked between
-    /// messages, so it bounds the wait only while the server keeps
-    /// talking — the same posture as [`Self::wait_for_solution_load`].
+    /// immediately (observed ≤0.1s). The timeout bounds the whole wait,
+    /// even when the server goes silent — the same posture as
+    /// [`Self::wait_for_solution_load`].
     ///
     /// # Returns
     ///
@@ -649,29 +567,25 @@ impl LspClient {
         );
 
         loop {
-            // `>=`, not `>`: a zero timeout must exit before the first
-            // blocking read even when the clock has not advanced yet.
-            if start.elapsed() >= timeout {
+            // A zero (or exhausted) timeout must exit without waiting even
+            // when a notification is already queued.
+            let remaining = timeout.saturating_sub(start.elapsed());
+            if remaining.is_zero() {
                 warn!("Timeout waiting for rust-analyzer quiescence");
                 return Ok(false);
             }
 
-            let message = self.read_message()?;
+            // Server->client requests are acknowledged by the reader
+            // thread; only notifications reach this loop.
+            let Some(message) = self.rpc.next_notification(remaining)? else {
+                warn!("Timeout waiting for rust-analyzer quiescence");
+                return Ok(false);
+            };
 
             let Some(method) = message.get("method").and_then(Value::as_str) else {
                 continue;
             };
 
-            // Acknowledge server->client requests with null so the server
-            // doesn't stall waiting on us (same as wait_for_solution_load).
-            if let Some(request_id) = message.get("id") {
-                trace!(
-                    method,
-                    "Acknowledging server request during quiescence wait"
-                );
-                self.ack_server_request(request_id)?;
-            }
-
             if method == SERVER_STATUS_METHOD
                 && let Some(params) = message.get("params")
             {
@@ -720,7 +634,13 @@ impl LspClient {
     /// Returns an error if the file path is invalid or communication fails.
     pub fn find_references(&mut self, file: &Path, line: u32, col: u32) -> Result<Vec<Location>> {
         let uri = path_to_uri(file)?;
-        let col = self.encode_outgoing_col(file, line, col);
+        let col = Self::encode_outgoing_col(
+            self.position_encoding,
+            &mut self.line_indexes,
+            file,
+            line,
+            col,
+        );
 
         let params = ReferenceParams {
             text_document_position: TextDocumentPositionParams {
@@ -739,6 +659,11 @@ impl LspClient {
         Ok(response.unwrap_or_default())
     }
 
+    /// Whether the server process has exited (crashed or been killed).
+    pub fn has_exited(&mut self) -> bool {
+        matches!(self.process.try_wait(), Ok(Some(_)))
+    }
+
     /// Gracefully shut down the LSP server.
     ///
     /// Sends a shutdown request followed by an exit notification.
@@ -764,7 +689,7 @@ impl LspClient {
         }
 
         // Wait for process to exit and return exit code
-        match self.process.wait() {
+        let exit_code = match self.process.wait() {
             Ok(status) => {
                 if !status.success() {
                     warn!(
@@ -772,13 +697,17 @@ impl LspClient {
                         "LSP server exited with non-zero status"
                     );
                 }
-                Ok(status.code())
+                status.code()
             }
             Err(e) => {
                 warn!(error = %e, "Failed to wait for LSP server process exit");
-                Ok(None)
+                None
             }
-        }
+        };
+
+        // The exited server closed its stdout, so the reader has finished.
+        self.rpc.join_reader();
+        Ok(exit_code)
     }
 
     /// Extract the first Location from a `GotoDefinitionResponse`.
@@ -816,9 +745,25 @@ impl Drop for LspClient {
         // Reap the child process to prevent zombies. The exit status is
         // irrelevant during cleanup — we already attempted kill() above.
         let _ = self.process.wait();
+
+        self.rpc.join_reader();
     }
 }
 
+/// `textDocument/definition` parameters for a 0-indexed line and a column
+/// already in the negotiated encoding.
+fn definition_params(file: &Path, line: u32, col: u32) -> Result<GotoDefinitionParams> {
+    let uri = path_to_uri(file)?;
+    Ok(GotoDefinitionParams {
+        text_document_position_params: TextDocumentPositionParams {
+            text_document: TextDocumentIdentifier::new(uri),
+            position: Position::new(line, col),
+        },
+        work_done_progress_params: WorkDoneProgressParams::default(),
+        partial_result_params: PartialResultParams::default(),
+    })
+}
+
 /// Client capabilities advertised during the `initialize` handshake.
 ///
 /// - `window.workDoneProgress`: We handle server->client requests with null
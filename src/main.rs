@@ -45,6 +45,43 @@ enum Commands {
         /// Timeout in seconds for LSP solution loading (default: 60, env: `TETHYS_LSP_TIMEOUT`)
         #[arg(long)]
         lsp_timeout: Option<u64>,
+
+        /// Maximum LSP definition queries in flight at once (default: 32)
+        #[arg(long, value_name = "N", requires = "lsp")]
+        lsp_window: Option<usize>,
+
+        /// LSP server instances per language, each resolving a share of the
+        /// workspace's crates (default: 1)
+        #[arg(long, value_name = "N", requires = "lsp")]
+        lsp_shards: Option<usize>,
+
+        /// Stop LSP querying after this many seconds, asking about the most
+        /// valuable references first (non-test calls, ambiguous names,
+        /// busiest files)
+        #[arg(long, value_name = "SECS", requires = "lsp")]
+        lsp_budget: Option<u64>,
+
+        /// Import reference resolutions from a SCIP index (e.g. from
+        /// `rust-analyzer scip`) without starting a language server
+        #[arg(long, value_name = "FILE")]
+        scip: Option<PathBuf>,
+
+        /// Restore the index from a snapshot written by `--export` (e.g.
+        /// the main branch's, from a CI cache), then re-index only the
+        /// files that differ from it
+        #[arg(long, value_name = "FILE", conflicts_with = "rebuild")]
+        import: Option<PathBuf>,
+
+        /// After indexing, write a compressed, checksummed snapshot of the
+        /// index to FILE, restorable with `--import` under any checkout path
+        #[arg(long, value_name = "FILE")]
+        export: Option<PathBuf>,
+
+        /// Reuse parse results for file contents seen in earlier runs (e.g.
+        /// on another branch), keeping up to MIB mebibytes of them in
+        /// `.rivets/index/extraction-cache.db`
+        #[arg(long, value_name = "MIB")]
+        extraction_cache: Option<u64>,
     },
 
     /// Search for symbols by name
@@ -117,6 +154,11 @@ enum Commands {
         /// stdout, an error to stderr, and exits non-zero.
         #[arg(long)]
         json: bool,
+
+        /// Recompute instead of serving the report cached for the current
+        /// index
+        #[arg(long)]
+        no_cache: bool,
     },
 
     /// Detect circular dependencies
@@ -142,14 +184,22 @@ enum Commands {
     /// Find tests affected by changes to specified files
     AffectedTests {
         /// Files that have changed (relative or absolute paths)
+        #[arg(conflicts_with = "diff")]
         files: Vec<String>,
 
         /// Output only test names (one per line, for CI integration)
         #[arg(long)]
         names_only: bool,
+
+        /// Select tests at symbol granularity from a unified diff: a patch
+        /// file, `-` for stdin, or a git revision range (e.g. `main...HEAD`)
+        /// diffed locally without fetching
+        #[arg(long, value_name = "PATCH|RANGE")]
+        diff: Option<String>,
     },
 
-    /// Find potential panic points (`.unwrap()` and `.expect()` calls)
+    /// Find potential panic points (`.unwrap()`/`.expect()` calls and
+    /// `panic!`, `unreachable!`, `todo!`, `unimplemented!` invocations)
     PanicPoints {
         /// Include panic points in test code
         #[arg(long)]
@@ -160,8 +210,12 @@ enum Commands {
         json: bool,
 
         /// Filter to specific file (path relative to workspace root)
-        #[arg(long)]
+        #[arg(long, conflicts_with = "by_file")]
         file: Option<String>,
+
+        /// Show per-file counts and density instead of individual sites
+        #[arg(long)]
+        by_file: bool,
     },
 
     /// List call sites of Rust `#[deprecated]` and C# `[Obsolete]` symbols
@@ -169,6 +223,11 @@ enum Commands {
         /// Output as JSON
         #[arg(long)]
         json: bool,
+
+        /// Recompute instead of serving the report cached for the current
+        /// index
+        #[arg(long)]
+        no_cache: bool,
     },
 
     /// List pub Rust items whose observed use fits `pub(crate)` (tiered)
@@ -184,6 +243,11 @@ enum Commands {
         /// consumed only by those sibling crates may then read Definite
         #[arg(long)]
         workspace_closed: bool,
+
+        /// Recompute instead of serving the report cached for the current
+        /// index
+        #[arg(long)]
+        no_cache: bool,
     },
 
     /// Find imports whose names are never referenced (Rust files)
@@ -205,6 +269,11 @@ enum Commands {
         /// Output as JSON
         #[arg(long)]
         json: bool,
+
+        /// Recompute instead of serving the report cached for the current
+        /// index
+        #[arg(long)]
+        no_cache: bool,
     },
 
     /// List non-public symbols with zero inbound references, tiered
@@ -216,6 +285,22 @@ enum Commands {
         /// Output as JSON
         #[arg(long)]
         json: bool,
+        /// Recompute instead of serving the report cached for the current
+        /// index
+        #[arg(long)]
+        no_cache: bool,
+    },
+
+    /// Keep language servers warm for `callers --lsp` queries (Unix only;
+    /// runs in the foreground until idle or stopped)
+    LspBroker {
+        /// Seconds without a query before the broker exits (default: 1800)
+        #[arg(long, value_name = "SECS", conflicts_with = "stop")]
+        idle_timeout: Option<u64>,
+
+        /// Stop the broker running for this workspace
+        #[arg(long)]
+        stop: bool,
     },
 
     /// Walk the type hierarchy of a type: implemented traits / base types
@@ -273,9 +358,11 @@ fn main() -> ExitCode {
     // affected-tests owns its exit code (0 confirmed / 2 indeterminate /
     // 1 error — tethys-09wx); every other command maps Ok(()) -> SUCCESS.
     let result = match cli.command {
-        Commands::AffectedTests { files, names_only } => {
-            cli::affected_tests::run(&workspace, &files, names_only)
-        }
+        Commands::AffectedTests {
+            files,
+            names_only,
+            diff,
+        } => cli::affected_tests::run(&workspace, &files, diff.as_deref(), names_only),
         command => run_command(&workspace, command).map(|()| ExitCode::SUCCESS),
     };
 
@@ -300,7 +387,26 @@ fn run_command(workspace: &Path, command: Commands) -> Result<(), tethys::Error>
             rebuild,
             lsp,
             lsp_timeout,
-        } => cli::index::run(workspace, rebuild, lsp, lsp_timeout),
+            lsp_window,
+            lsp_shards,
+            lsp_budget,
+            scip,
+            import,
+            export,
+            extraction_cache,
+        } => cli::index::run(
+            workspace,
+            rebuild,
+            lsp,
+            lsp_timeout,
+            lsp_window,
+            lsp_shards,
+            lsp_budget,
+            scip.as_deref(),
+            import.as_deref(),
+            export.as_deref(),
+            extraction_cache,
+        ),
         Commands::Search { query, kind, limit } => {
             cli::search::run(workspace, &query, kind.as_deref(), limit)
         }
@@ -328,7 +434,8 @@ fn run_command(workspace: &Path, command: Commands) -> Result<(), tethys::Error>
             sort,
             package,
             json,
-        } => cli::coupling::run(workspace, sort, package, json),
+            no_cache,
+        } => cli::coupling::run(workspace, sort, package, json, no_cache),
         Commands::Cycles => cli::cycles::run(workspace),
         Commands::Stats => cli::stats::run(workspace),
         Commands::Reachable {
@@ -346,15 +453,28 @@ fn run_command(workspace: &Path, command: Commands) -> Result<(), tethys::Error>
             include_tests,
             json,
             file,
-        } => cli::panic_points::run(workspace, include_tests, json, file.as_deref()),
-        Commands::DeprecatedCallers { json } => cli::deprecated_callers::run(workspace, json),
+            by_file,
+        } => cli::panic_points::run(workspace, include_tests, json, file.as_deref(), by_file),
+        Commands::DeprecatedCallers { json, no_cache } => {
+            cli::deprecated_callers::run(workspace, json, no_cache)
+        }
         Commands::VisibilityTightening {
             json,
             workspace_closed,
-        } => cli::visibility_tightening::run(workspace, json, workspace_closed),
+            no_cache,
+        } => cli::visibility_tightening::run(workspace, json, workspace_closed, no_cache),
         Commands::UnusedImports { json, all } => cli::unused_imports::run(workspace, json, all),
-        Commands::UntestedCode { json } => cli::untested_code::run(workspace, json),
-        Commands::DeadCode { limit, json } => cli::dead_code::run(workspace, limit, json),
+        Commands::UntestedCode { json, no_cache } => {
+            cli::untested_code::run(workspace, json, no_cache)
+        }
+        Commands::DeadCode {
+            limit,
+            json,
+            no_cache,
+        } => cli::dead_code::run(workspace, limit, json, no_cache),
+        Commands::LspBroker { idle_timeout, stop } => {
+            cli::lsp_broker::run(workspace, idle_timeout, stop)
+        }
         Commands::Hierarchy {
             symbol,
             direction,
@@ -24,7 +24,7 @@
 //! let parsed_files: Vec<ParsedFileData> = source_files
 //!     .par_iter()
 //!     .filter_map(|(path, lang)| {
-//!         Tethys::parse_file_static(&workspace_root, path, *lang).ok()
+//!         Tethys::parse_file_static(&workspace_root, path, *lang, None).ok()
 //!     })
 //!     .collect();
 //!
@@ -35,7 +35,10 @@
 
 use std::path::PathBuf;
 
+use serde::{Deserialize, Serialize};
+
 use crate::db::SymbolData;
+use crate::identifiers::IdentifierLines;
 use crate::languages::common::{ExtractedAttribute, ExtractedReference, ImportStatement};
 use crate::types::{Language, Span, SymbolId, SymbolKind, Visibility};
 
@@ -54,12 +57,17 @@ pub struct ParsedFileData {
     pub mtime_ns: i64,
     /// File size in bytes
     pub size_bytes: u64,
+    /// Hash of the file's bytes (see [`crate::content_hash`])
+    pub content_hash: u64,
     /// Extracted symbols
     pub symbols: Vec<OwnedSymbolData>,
     /// Extracted references
     pub references: Vec<ExtractedReference>,
     /// Extracted imports
     pub imports: Vec<ImportStatement>,
+    /// Identifier occurrences (token -> lines), tokenized while the file
+    /// content is in memory
+    pub identifiers: Vec<IdentifierLines>,
 }
 
 /// Owned version of `SymbolData` for thread-safe transfer.
@@ -67,7 +75,7 @@ pub struct ParsedFileData {
 /// `SymbolData` uses borrowed strings for efficiency during single-threaded
 /// indexing. This owned version is used when transferring parsed data across
 /// threads via the parallel parsing infrastructure.
-#[derive(Debug, Clone)]
+#[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct OwnedSymbolData {
     pub name: String,
     pub module_path: String,
@@ -187,9 +195,11 @@ mod tests {
             language: Language::Rust,
             mtime_ns: 1_234_567_890,
             size_bytes: 100,
+            content_hash: 0,
             symbols: vec![],
             references: vec![],
             imports: vec![],
+            identifiers: vec![],
         };
 
         assert_eq!(data.relative_path, PathBuf::from("src/main.rs"));
@@ -5,11 +5,12 @@
 
 use std::collections::{HashMap, HashSet};
 use std::path::{Path, PathBuf};
-use std::time::UNIX_EPOCH;
+use std::time::{Instant, UNIX_EPOCH};
 
 use tracing::{debug, warn};
 
 use crate::Tethys;
+use crate::content_hash::content_hash;
 use crate::db::normalize_path;
 use crate::error::Result;
 use crate::types::{
@@ -33,20 +34,107 @@ enum FileChange {
     reason = "error docs deferred to avoid churn during active development"
 )]
 impl Tethys {
-    /// Incrementally update index for changed files.
+    /// Incrementally update the index: re-index only the files added or
+    /// modified since they were last indexed, and drop deleted ones.
     ///
-    /// **Note:** Currently performs a full re-index. Incremental update is tracked as a future enhancement.
+    /// See [`Self::update_with_options`].
     pub fn update(&mut self) -> Result<IndexUpdate> {
-        // For now, just re-index everything
-        let stats = self.index()?;
+        self.update_with_options(IndexOptions::default())
+    }
+
+    /// Incrementally update the index with custom options (see
+    /// [`Self::index_with_options`]).
+    ///
+    /// A file whose mtime or size differs from its indexed entry is
+    /// re-parsed unless its content hash still matches, as after a fresh
+    /// checkout or [`Self::import_snapshot`]; then only its stored mtime is
+    /// refreshed. Files holding references resolved into a modified or
+    /// deleted file are re-parsed with it, since those references go with
+    /// the file's old symbols. Files naming a symbol the re-parsed files
+    /// newly define are re-parsed too, since a full index would have kept
+    /// references there that resolve to it. The cross-file passes
+    /// (reference resolution, call edges, file dependencies, architecture)
+    /// then run over the whole index exactly as in a full index.
+    pub fn update_with_options(&mut self, options: IndexOptions) -> Result<IndexUpdate> {
+        let start = Instant::now();
+        self.ensure_writable()?;
+
+        let stale = self.get_stale_files()?;
+        let modified = self.drop_content_unchanged(stale.modified)?;
+        if modified.is_empty() && stale.added.is_empty() && stale.deleted.is_empty() {
+            return Ok(IndexUpdate {
+                files_changed: 0,
+                files_unchanged: self.db.list_all_files()?.len(),
+                files_removed: 0,
+                duration: start.elapsed(),
+                errors: Vec::new(),
+                cancelled: false,
+                generation: self.db.generation()?,
+            });
+        }
+
+        let invalidated: Vec<PathBuf> = modified.iter().chain(&stale.deleted).cloned().collect();
+        let deleted: HashSet<String> = stale.deleted.iter().map(|p| normalize_path(p)).collect();
+        let reparse: HashSet<String> = modified
+            .iter()
+            .chain(&stale.added)
+            .chain(&self.db.files_referencing(&invalidated)?)
+            .map(|p| normalize_path(p))
+            .filter(|key| !deleted.contains(key))
+            .collect();
+        debug!(
+            modified = modified.len(),
+            added = stale.added.len(),
+            deleted = deleted.len(),
+            reparse = reparse.len(),
+            "Incremental update"
+        );
+
+        let rewritten: HashSet<String> = reparse.union(&deleted).cloned().collect();
+        self.db.begin_test_reach(&rewritten)?;
+        self.db.begin_type_closure(&rewritten)?;
+        let stats = self.index_files(&options, Some(&reparse))?;
         Ok(IndexUpdate {
             files_changed: stats.files_indexed,
-            files_unchanged: 0, // Always 0 until incremental change detection is implemented
-            duration: stats.duration,
+            files_unchanged: self
+                .db
+                .list_all_files()?
+                .len()
+                .saturating_sub(stats.files_indexed),
+            files_removed: deleted.len(),
+            duration: start.elapsed(),
             errors: stats.errors,
+            cancelled: stats.cancelled,
+            generation: stats.generation,
         })
     }
 
+    /// Of the `modified` files [`Self::get_stale_files`] reported, those
+    /// whose content no longer matches the stored hash. The rest only had
+    /// their mtime change; their stored mtime is refreshed so the next
+    /// staleness check sees them as current.
+    fn drop_content_unchanged(&self, modified: Vec<PathBuf>) -> Result<Vec<PathBuf>> {
+        let mut changed = Vec::with_capacity(modified.len());
+        for path in modified {
+            let abs = self.workspace_root.join(&path);
+            let refreshed = match (self.db.get_file(&path)?, std::fs::metadata(&abs)) {
+                (Some(file), Ok(metadata))
+                    if file.content_hash.is_some() && metadata.len() == file.size_bytes =>
+                {
+                    std::fs::read(&abs)
+                        .is_ok_and(|bytes| Some(content_hash(&bytes)) == file.content_hash)
+                        .then(|| (file.id, mtime_ns(&metadata, &abs)))
+                }
+                _ => None,
+            };
+            match refreshed {
+                Some((id, mtime)) => self.db.set_file_mtime(id, mtime)?,
+                None => changed.push(path),
+            }
+        }
+        Ok(changed)
+    }
+
     /// Check if any indexed files have changed since last update.
     ///
     /// Stops at the first detected change rather than allocating the full
@@ -221,7 +309,7 @@ impl Tethys {
     /// forward-slash string form used by [`load_indexed_map`] (critical on
     /// Windows, where `entry.path()` yields backslash-separated paths but
     /// the DB stores forward slashes).
-    fn lookup_key(&self, file_path: &Path) -> String {
+    pub(crate) fn lookup_key(&self, file_path: &Path) -> String {
         let relative = self.relative_path(file_path);
         normalize_path(relative.as_ref())
     }
@@ -236,7 +324,8 @@ impl Tethys {
     /// [`FileChange::Deleted`] — a file the walk skipped for other reasons
     /// (e.g. an unreadable directory) still exists on disk and is left
     /// alone. FK cascades remove the orphan's dependent rows (see
-    /// [`crate::db::Index::delete_files`]).
+    /// [`crate::db::Index::delete_files`]), after the run's change feed has
+    /// fingerprinted them.
     ///
     /// Runs from `index_with_options` BEFORE the dependency and
     /// reference-resolution passes: without it, streaming mode's
@@ -256,7 +345,7 @@ impl Tethys {
             .map(|(path, _)| self.lookup_key(path))
             .collect();
 
-        let orphan_ids: Vec<FileId> = self
+        let (orphan_ids, orphan_keys): (Vec<FileId>, HashSet<String>) = self
             .db
             .list_all_files()?
             .into_iter()
@@ -265,12 +354,13 @@ impl Tethys {
                 let abs = self.workspace_root.join(&f.path);
                 classify_indexed_file(&abs, f.mtime_ns, f.size_bytes) == FileChange::Deleted
             })
-            .map(|f| f.id)
-            .collect();
+            .map(|f| (f.id, normalize_path(&f.path)))
+            .unzip();
 
         if orphan_ids.is_empty() {
             return Ok(0);
         }
+        self.db.extend_generation(&orphan_keys)?;
         let purged = self.db.delete_files(&orphan_ids)?;
         debug!(
             purged,
@@ -327,6 +417,17 @@ fn classify_indexed_file(file_path: &Path, indexed_mtime: i64, indexed_size: u64
     }
 }
 
+/// Whether a file still matches its indexed mtime/size — the same
+/// [`classify_indexed_file`] check [`Tethys::get_stale_files`] uses, for
+/// analyses that answer fresh files from the index and re-parse the rest.
+pub(crate) fn is_indexed_file_current(
+    file_path: &Path,
+    indexed_mtime: i64,
+    indexed_size: u64,
+) -> bool {
+    classify_indexed_file(file_path, indexed_mtime, indexed_size) == FileChange::Unchanged
+}
+
 /// Convert a file's modification time to nanoseconds since UNIX epoch.
 ///
 /// Returns [`i64::MIN`] with a warning when the OS does not expose a usable
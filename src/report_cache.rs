@@ -0,0 +1,241 @@
+//! Materialized analysis reports, valid for one index generation.
+//!
+//! The whole-workspace reports ([`crate::Tethys::find_dead_code`],
+//! [`crate::Tethys::get_untested_code`] and the like) are recomputed from
+//! the index tables on every call, but their answer can only change when
+//! the index does, and every indexing run that writes bumps the index
+//! generation. So a report is stored under its name, its parameters and
+//! the generation it was computed at, and served again for as long as
+//! that is the current generation. Generations are never reused, even by
+//! a rebuilt or imported index (see the `index_generation` table), so a
+//! stored report can never be mistaken for one of a different index.
+//!
+//! The cache lives in its own `SQLite` file next to the index, so that
+//! instances opened with [`crate::Tethys::open_read_only`] (the CLI's
+//! query commands) can fill it without writing to the index, and never
+//! wait on an indexing run's write lock. It holds one row per report and
+//! parameter set, replaced when a newer generation computes it. A failing
+//! cache only costs the recomputation: every error is logged and treated
+//! as a miss.
+
+use std::io::{Read, Write};
+use std::path::Path;
+use std::sync::Mutex;
+
+use flate2::Compression;
+use flate2::read::ZlibDecoder;
+use flate2::write::ZlibEncoder;
+use rusqlite::{Connection, OptionalExtension, params};
+use serde::Serialize;
+use serde::de::DeserializeOwned;
+use tracing::{debug, warn};
+
+use crate::error::{Error, Result};
+
+/// Version of the reports' output. Bump it whenever a change to one of
+/// the cached analyses (or to a report type's fields) would make a stored
+/// report differ from a fresh one; the crate version is part of the key as
+/// well, but does not move between releases.
+const REPORTS_VERSION: u32 = 1;
+
+/// File name of the cache, in the directory of the index database.
+pub(crate) const CACHE_FILE_NAME: &str = "report-cache.db";
+
+/// Version of the cache database layout. A cache at another version is
+/// dropped and recreated.
+const CACHE_SCHEMA_VERSION: i32 = 1;
+
+/// `tethys` holds the crate and [`REPORTS_VERSION`] that computed the
+/// report: a tethys that changed an analysis must not serve the previous
+/// one's answer.
+const CACHE_SCHEMA: &str = "
+CREATE TABLE IF NOT EXISTS reports (
+    report TEXT NOT NULL,
+    params TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    tethys TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (report, params)
+) WITHOUT ROWID;
+";
+
+fn encode<T: Serialize>(report: &T) -> Result<Vec<u8>> {
+    let json = serde_json::to_vec(report)
+        .map_err(|e| Error::Internal(format!("failed to serialize report: {e}")))?;
+    let mut encoder = ZlibEncoder::new(Vec::with_capacity(json.len() / 4), Compression::fast());
+    encoder.write_all(&json)?;
+    Ok(encoder.finish()?)
+}
+
+fn decode<T: DeserializeOwned>(payload: &[u8]) -> Result<T> {
+    let mut json = Vec::new();
+    ZlibDecoder::new(payload).read_to_end(&mut json)?;
+    serde_json::from_slice(&json)
+        .map_err(|e| Error::Internal(format!("corrupt cached report: {e}")))
+}
+
+/// `generation` as stored.
+fn as_sql(generation: u64) -> i64 {
+    i64::try_from(generation).unwrap_or(i64::MAX)
+}
+
+/// An open report cache.
+pub(crate) struct ReportCache {
+    conn: Mutex<Connection>,
+    tethys: String,
+}
+
+impl ReportCache {
+    /// Open (creating if needed) the cache at `path`.
+    pub(crate) fn open(path: &Path) -> Result<Self> {
+        if let Some(parent) = path.parent() {
+            std::fs::create_dir_all(parent)?;
+        }
+        let conn = Connection::open(path)?;
+        conn.busy_timeout(std::time::Duration::from_secs(5))?;
+        conn.pragma_update(None, "journal_mode", "WAL")?;
+
+        let version: i32 = conn.pragma_query_value(None, "user_version", |row| row.get(0))?;
+        if version != CACHE_SCHEMA_VERSION {
+            debug!(
+                path = %path.display(),
+                found = version,
+                expected = CACHE_SCHEMA_VERSION,
+                "Recreating report cache"
+            );
+            conn.execute_batch("DROP TABLE IF EXISTS reports;")?;
+        }
+        conn.execute_batch(CACHE_SCHEMA)?;
+        conn.pragma_update(None, "user_version", CACHE_SCHEMA_VERSION)?;
+
+        Ok(Self {
+            conn: Mutex::new(conn),
+            tethys: format!("{}+{REPORTS_VERSION}", env!("CARGO_PKG_VERSION")),
+        })
+    }
+
+    fn lookup(&self, report: &str, params: &str, generation: u64) -> Result<Option<Vec<u8>>> {
+        let conn = self
+            .conn
+            .lock()
+            .map_err(|e| Error::Internal(format!("report cache mutex poisoned: {e}")))?;
+        Ok(conn
+            .query_row(
+                "SELECT payload FROM reports
+                 WHERE report = ?1 AND params = ?2 AND generation = ?3 AND tethys = ?4",
+                params![report, params, as_sql(generation), self.tethys],
+                |row| row.get(0),
+            )
+            .optional()?)
+    }
+
+    /// The `report` computed with `params` at `generation`, if stored.
+    pub(crate) fn get<T: DeserializeOwned>(
+        &self,
+        report: &str,
+        params: &str,
+        generation: u64,
+    ) -> Option<T> {
+        let payload = match self.lookup(report, params, generation) {
+            Ok(Some(payload)) => payload,
+            Ok(None) => return None,
+            Err(e) => {
+                warn!(report, error = %e, "Report cache lookup failed");
+                return None;
+            }
+        };
+        match decode(&payload) {
+            Ok(value) => {
+                debug!(report, params, generation, "Serving cached report");
+                Some(value)
+            }
+            Err(e) => {
+                warn!(report, error = %e, "Discarding unreadable cached report");
+                None
+            }
+        }
+    }
+
+    fn store(&self, report: &str, params: &str, generation: u64, payload: &[u8]) -> Result<()> {
+        let conn = self
+            .conn
+            .lock()
+            .map_err(|e| Error::Internal(format!("report cache mutex poisoned: {e}")))?;
+        // A concurrent caller on an older index must not replace a newer
+        // generation's report.
+        conn.execute(
+            "INSERT INTO reports (report, params, generation, tethys, payload)
+             VALUES (?1, ?2, ?3, ?4, ?5)
+             ON CONFLICT (report, params) DO UPDATE
+             SET generation = excluded.generation, tethys = excluded.tethys,
+                 payload = excluded.payload
+             WHERE excluded.generation >= reports.generation",
+            params![report, params, as_sql(generation), self.tethys, payload],
+        )?;
+        Ok(())
+    }
+
+    /// Store `value` as the `report` computed with `params` at
+    /// `generation`, replacing any earlier generation's.
+    pub(crate) fn put<T: Serialize>(&self, report: &str, params: &str, generation: u64, value: &T) {
+        let result =
+            encode(value).and_then(|payload| self.store(report, params, generation, &payload));
+        if let Err(e) = result {
+            warn!(report, error = %e, "Failed to cache report");
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn open() -> (tempfile::TempDir, ReportCache) {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let cache = ReportCache::open(&dir.path().join(CACHE_FILE_NAME)).expect("open");
+        (dir, cache)
+    }
+
+    #[test]
+    fn serves_a_report_only_at_its_generation_and_params() {
+        let (_dir, cache) = open();
+        cache.put("coupling", "sort=name", 7, &vec!["a".to_string()]);
+
+        assert_eq!(
+            cache.get::<Vec<String>>("coupling", "sort=name", 7),
+            Some(vec!["a".to_string()])
+        );
+        assert_eq!(cache.get::<Vec<String>>("coupling", "sort=name", 8), None);
+        assert_eq!(
+            cache.get::<Vec<String>>("coupling", "sort=afferent", 7),
+            None
+        );
+        assert_eq!(cache.get::<Vec<String>>("untested", "sort=name", 7), None);
+    }
+
+    #[test]
+    fn a_newer_generation_replaces_the_report() {
+        let (_dir, cache) = open();
+        cache.put("untested", "", 7, &1u32);
+        cache.put("untested", "", 8, &2u32);
+        cache.put("untested", "", 7, &3u32);
+
+        assert_eq!(cache.get::<u32>("untested", "", 8), Some(2));
+        assert_eq!(cache.get::<u32>("untested", "", 7), None);
+    }
+
+    #[test]
+    fn survives_reopening() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let path = dir.path().join(CACHE_FILE_NAME);
+        ReportCache::open(&path)
+            .expect("open")
+            .put("dead-code", "", 1, &vec![1u32, 2]);
+
+        let reopened = ReportCache::open(&path).expect("reopen");
+        assert_eq!(
+            reopened.get::<Vec<u32>>("dead-code", "", 1),
+            Some(vec![1, 2])
+        );
+    }
+}
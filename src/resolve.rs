@@ -5,12 +5,16 @@
 //! - LSP `goto_definition` resolution
 //! - LSP `find_references` for caller discovery
 
-use std::collections::{HashMap, HashSet};
+use std::collections::{BTreeMap, BTreeSet, HashMap, HashSet};
 use std::path::{Path, PathBuf};
+use std::time::{Duration, Instant};
 
 use tracing::{debug, info, trace, warn};
 
 use crate::Tethys;
+use crate::cancel::CancellationToken;
+use crate::content_hash::ContentHasher;
+use crate::db::{CachedLspAnswer, LspCacheKey, LspRefFacts, normalize_path};
 use crate::error::{Error, Result};
 use crate::languages::get_language_support;
 use crate::languages::module_resolver::{
@@ -18,8 +22,8 @@ use crate::languages::module_resolver::{
 };
 use crate::lsp::{self, LspProvider};
 use crate::types::{
-    CallEdgeSelection, Caller, DEFAULT_LSP_TIMEOUT_SECS, FileId, Import, Language,
-    LspCompletedSession, LspOutcome, LspSessionResult, Reference, ReferenceKind,
+    CallEdgeSelection, Caller, DEFAULT_LSP_TIMEOUT_SECS, FileId, Import, IndexOptions, Language,
+    LspCompletedSession, LspOutcome, LspSessionResult, RefId, Reference, ReferenceKind,
     ResolutionStrategy, Symbol, SymbolId, SymbolKind, UnresolvedRefForLsp,
 };
 
@@ -74,6 +78,118 @@ pub(crate) struct ResolveContext<'a> {
     pub(crate) module_ctx: &'a ModuleContext<'a>,
 }
 
+/// Where one Pass 3 `goto_definition` answer points.
+enum LspAnswer {
+    /// The query failed, or the definition is in a workspace file the index
+    /// does not hold: nothing to apply, and nothing worth caching.
+    Uncacheable,
+    /// No definition inside the workspace.
+    Outside,
+    /// A definition on 1-based `line` of indexed file `file_id`.
+    At {
+        file_id: FileId,
+        /// Workspace-relative path of `file_id`, as the index stores it.
+        path: PathBuf,
+        line: u32,
+    },
+}
+
+/// What one Pass 3 session found, for the caller to apply and cache.
+struct LspSessionOutput {
+    session: LspSessionResult,
+    resolutions: Vec<(i64, SymbolId, ResolutionStrategy)>,
+    /// Cacheable answers, keyed by index into the session's refs.
+    answers: Vec<(usize, CachedLspAnswer)>,
+}
+
+/// What every Pass 3 session of one run shares.
+struct LspPassContext<'a> {
+    options: &'a IndexOptions,
+    /// Id and content hash of every indexed file, by path.
+    file_hashes: &'a HashMap<PathBuf, (FileId, u64)>,
+    /// When the `--lsp-budget` runs out, if there is one.
+    deadline: Option<Instant>,
+}
+
+impl LspPassContext<'_> {
+    /// Whether the budget has run out or the run was cancelled.
+    fn out_of_time(&self) -> bool {
+        self.deadline.is_some_and(|d| Instant::now() >= d)
+            || self
+                .options
+                .cancellation_token()
+                .is_some_and(CancellationToken::is_cancelled)
+    }
+
+    /// `timeout`, cut short to what is left of the budget.
+    fn within_budget(&self, timeout: Duration) -> Duration {
+        self.deadline.map_or(timeout, |d| {
+            timeout.min(d.saturating_duration_since(Instant::now()))
+        })
+    }
+}
+
+/// Order `refs` for a budgeted Pass 3, most valuable query first: calls
+/// outside tests, then other refs outside tests, then test code; within
+/// that, names with several workspace candidates (where Pass 2's name
+/// match was ambiguous) before single-candidate names before names with
+/// none (likely external); then refs in files with more unresolved refs
+/// first. Ties keep path order.
+fn order_by_lsp_priority(refs: &mut [UnresolvedRefForLsp], facts: &HashMap<RefId, LspRefFacts>) {
+    let mut per_file: HashMap<FileId, usize> = HashMap::new();
+    for r in refs.iter() {
+        *per_file.entry(r.file_id).or_insert(0) += 1;
+    }
+    refs.sort_by_cached_key(|r| {
+        let f = facts.get(&r.ref_id).copied().unwrap_or_default();
+        let code = match (f.in_test, f.is_call) {
+            (false, true) => 0u8,
+            (false, false) => 1,
+            (true, _) => 2,
+        };
+        let ambiguity = match f.candidates {
+            0 => 2u8,
+            1 => 1,
+            _ => 0,
+        };
+        (
+            code,
+            ambiguity,
+            std::cmp::Reverse(per_file.get(&r.file_id).copied().unwrap_or(0)),
+            r.file_id.as_i64(),
+        )
+    });
+}
+
+/// Refs of one language answered from the LSP resolution cache.
+#[derive(Debug, Default)]
+struct LspCacheHits {
+    answered: usize,
+    resolved: usize,
+    duration: Duration,
+}
+
+/// Whether `file_name` is a build manifest whose change can alter what the
+/// `language` server answers (see [`Tethys::lsp_deps_fingerprint`]).
+fn is_build_manifest(language: Language, file_name: &str) -> bool {
+    match language {
+        Language::Rust => matches!(
+            file_name,
+            "Cargo.toml" | "Cargo.lock" | "rust-toolchain" | "rust-toolchain.toml"
+        ),
+        Language::CSharp => {
+            let lower = file_name.to_ascii_lowercase();
+            [".csproj", ".sln", ".props", ".targets"]
+                .iter()
+                .any(|ext| lower.ends_with(ext))
+                || matches!(
+                    lower.as_str(),
+                    "global.json" | "nuget.config" | "packages.lock.json"
+                )
+        }
+    }
+}
+
 impl Tethys {
     /// Resolve cross-file references against the symbol database (Pass 2).
     ///
@@ -668,58 +784,381 @@ impl Tethys {
     ///
     /// # Design
     ///
-    /// - LSP is spawned lazily (only if there are unresolved refs for this language)
-    /// - LSP stays alive for batch queries (amortizes startup cost)
-    /// - Shutdown on completion
-    /// - Matches LSP definition locations to symbols by file path + line number
-    ///
-    /// # Arguments
-    ///
-    /// * `provider` - The LSP provider to use (e.g., `RustAnalyzerProvider`)
-    /// * `language` - The language to filter references by (e.g., `Language::Rust`)
+    /// - Refs whose answer is in the persistent cache (same referencing
+    ///   file content, position, and [`Self::lsp_deps_fingerprint`]; for
+    ///   in-workspace targets, an unchanged target file) are answered
+    ///   without a server. A language whose refs all hit starts none.
+    /// - One session per language in `languages` with remaining refs, or
+    ///   [`IndexOptions::lsp_shard_count`] sessions when sharded — refs are
+    ///   grouped by crate and the groups spread across the shards
+    /// - Every session runs on its own thread with its own server process,
+    ///   so languages and shards proceed concurrently
+    /// - Sessions only look up definitions; their resolutions are applied
+    ///   in one [`crate::db::Index::apply_resolutions`] batch once all of
+    ///   them finish, and their answers are added to the cache
+    /// - Under [`IndexOptions::lsp_budget`], each session's refs are
+    ///   queried most valuable first (see `order_by_lsp_priority`) and
+    ///   querying stops when the budget, counted from the start of the
+    ///   pass, runs out
     ///
     /// # Returns
     ///
-    /// The number of references successfully resolved via LSP.
-    #[expect(
-        clippy::too_many_lines,
-        reason = "LSP resolution involves multiple sequential protocol steps"
-    )]
+    /// One [`LspSessionResult`] per session, ordered by `languages` and
+    /// then shard. Cache hits are counted into the language's shard-0
+    /// session. A language with nothing to resolve reports a single
+    /// [`LspOutcome::NothingToResolve`] session.
     pub(crate) fn resolve_via_lsp(
         &self,
-        provider: &dyn lsp::LspProvider,
-        language: Language,
-        lsp_timeout_secs: u64,
-    ) -> Result<LspSessionResult> {
-        // Get unresolved references with file path information, filtered by language
-        let all_unresolved = self.db.get_unresolved_references_for_lsp()?;
-        let unresolved: Vec<_> = all_unresolved
-            .into_iter()
-            .filter(|r| {
-                r.file_path
-                    .extension()
-                    .and_then(|e| e.to_str())
-                    .is_some_and(|ext| Language::from_extension(ext) == Some(language))
-            })
-            .collect();
+        languages: &[Language],
+        options: &IndexOptions,
+    ) -> Result<Vec<LspSessionResult>> {
+        let deadline = options
+            .lsp_time_budget()
+            .map(|budget| Instant::now() + budget);
+        let mut by_language: HashMap<Language, Vec<UnresolvedRefForLsp>> = HashMap::new();
+        for unresolved_ref in self.db.get_unresolved_references_for_lsp()? {
+            let language = unresolved_ref
+                .file_path
+                .extension()
+                .and_then(|e| e.to_str())
+                .and_then(Language::from_extension);
+            if let Some(language) = language.filter(|l| languages.contains(l)) {
+                by_language
+                    .entry(language)
+                    .or_default()
+                    .push(unresolved_ref);
+            }
+        }
 
-        if unresolved.is_empty() {
+        let file_hashes = self.db.file_content_hashes()?;
+        let hash_by_file: HashMap<FileId, u64> = file_hashes.values().copied().collect();
+        let priority_facts = if deadline.is_some() {
+            self.db.lsp_priority_facts()?
+        } else {
+            HashMap::new()
+        };
+
+        let mut sessions = Vec::new();
+        let mut resolutions = Vec::new();
+        let mut fingerprints = Vec::new();
+        let mut cache_hits = Vec::new();
+        let mut jobs = Vec::new();
+        for &language in languages {
+            let unresolved = by_language.remove(&language).unwrap_or_default();
+            if unresolved.is_empty() {
+                debug!(
+                    language = ?language,
+                    "No unresolved references for LSP resolution"
+                );
+                sessions.push(LspSessionResult {
+                    language,
+                    shard: 0,
+                    duration: Duration::ZERO,
+                    outcome: LspOutcome::NothingToResolve,
+                });
+                continue;
+            }
+
+            let started = Instant::now();
+            let provider = self.lsp_provider(language);
+            let fingerprint = self.lsp_deps_fingerprint(language, &*provider, file_hashes.keys());
+            let sources = self.db.lsp_sources_fingerprint(language)?;
+            let cache = self.db.lsp_cache_entries(language, fingerprint, sources)?;
+            let mut misses = Vec::new();
+            let mut hits = LspCacheHits::default();
+            for unresolved_ref in unresolved {
+                let cached = hash_by_file
+                    .get(&unresolved_ref.file_id)
+                    .and_then(|&file_hash| {
+                        cache.get(&LspCacheKey {
+                            file_hash,
+                            line: unresolved_ref.line,
+                            column: unresolved_ref.column,
+                        })
+                    });
+                match cached {
+                    Some(CachedLspAnswer::Outside) => hits.answered += 1,
+                    Some(CachedLspAnswer::At { path, line, hash }) => match file_hashes.get(path) {
+                        Some(&(file_id, current)) if current == *hash => {
+                            hits.answered += 1;
+                            if let Some(symbol) = self.db.find_symbol_at_line(file_id, *line)? {
+                                hits.resolved += 1;
+                                resolutions.push((
+                                    unresolved_ref.ref_id.as_i64(),
+                                    symbol.id,
+                                    ResolutionStrategy::Lsp,
+                                ));
+                            }
+                        }
+                        _ => misses.push(unresolved_ref),
+                    },
+                    None => misses.push(unresolved_ref),
+                }
+            }
+            hits.duration = started.elapsed();
             debug!(
                 language = ?language,
-                "No unresolved references for LSP resolution"
+                cache_hits = hits.answered,
+                cache_resolved = hits.resolved,
+                remaining = misses.len(),
+                "Consulted LSP resolution cache"
             );
-            return Ok(LspSessionResult {
-                language,
-                outcome: LspOutcome::NothingToResolve,
-            });
+            fingerprints.push((language, fingerprint, sources));
+            cache_hits.push((language, hits));
+
+            if !misses.is_empty() {
+                for (shard, mut refs) in self
+                    .shard_lsp_refs(misses, options.lsp_shard_count())
+                    .into_iter()
+                    .enumerate()
+                {
+                    if deadline.is_some() {
+                        order_by_lsp_priority(&mut refs, &priority_facts);
+                    }
+                    jobs.push((language, shard, refs));
+                }
+            }
+        }
+
+        let pass = LspPassContext {
+            options,
+            file_hashes: &file_hashes,
+            deadline,
+        };
+        let outputs = std::thread::scope(|scope| {
+            let handles: Vec<_> = jobs
+                .iter()
+                .map(|(language, shard, refs)| {
+                    let pass = &pass;
+                    scope.spawn(move || {
+                        let provider = self.lsp_provider(*language);
+                        self.run_lsp_session(&*provider, *language, *shard, refs, pass)
+                    })
+                })
+                .collect();
+            handles
+                .into_iter()
+                .map(|handle| {
+                    handle.join().unwrap_or_else(|_| {
+                        Err(Error::Internal("LSP session thread panicked".to_string()))
+                    })
+                })
+                .collect::<Vec<_>>()
+        });
+
+        let mut answers: HashMap<Language, Vec<(LspCacheKey, CachedLspAnswer)>> = HashMap::new();
+        for (output, (language, _, refs)) in outputs.into_iter().zip(&jobs) {
+            let output = output?;
+            resolutions.extend(output.resolutions);
+            sessions.push(output.session);
+            let language_answers = answers.entry(*language).or_default();
+            for (index, answer) in output.answers {
+                let unresolved_ref = &refs[index];
+                if let Some(&file_hash) = hash_by_file.get(&unresolved_ref.file_id) {
+                    let key = LspCacheKey {
+                        file_hash,
+                        line: unresolved_ref.line,
+                        column: unresolved_ref.column,
+                    };
+                    language_answers.push((key, answer));
+                }
+            }
+        }
+        self.db.apply_resolutions(&resolutions)?;
+        for (language, fingerprint, sources) in fingerprints {
+            let language_answers = answers.remove(&language).unwrap_or_default();
+            self.db
+                .store_lsp_cache(language, fingerprint, sources, &language_answers)?;
+        }
+
+        for (language, hits) in cache_hits {
+            if hits.answered > 0 {
+                Self::record_lsp_cache_hits(&mut sessions, language, &hits);
+            }
+        }
+        sessions.sort_by_key(|s| (languages.iter().position(|l| *l == s.language), s.shard));
+        Ok(sessions)
+    }
+
+    /// Fingerprint of what a Pass 3 answer for `language` depends on beyond
+    /// the referencing file: the server command line and every build
+    /// manifest (`Cargo.toml`/`Cargo.lock`, `.csproj`/`.sln`, …) in the
+    /// workspace root or in a directory holding, or above, one of the
+    /// language's indexed `files`. Changing a dependency, toolchain pin, or
+    /// server invalidates the language's cached answers.
+    fn lsp_deps_fingerprint<'a>(
+        &self,
+        language: Language,
+        provider: &dyn LspProvider,
+        files: impl Iterator<Item = &'a PathBuf>,
+    ) -> u64 {
+        let mut dirs: BTreeSet<PathBuf> = BTreeSet::from([PathBuf::new()]);
+        for file in files {
+            let of_language = file
+                .extension()
+                .and_then(|e| e.to_str())
+                .and_then(Language::from_extension)
+                == Some(language);
+            if of_language {
+                dirs.extend(file.ancestors().skip(1).map(Path::to_path_buf));
+            }
         }
 
+        let mut hasher = ContentHasher::default();
+        hasher.field(provider.command().as_bytes());
+        for arg in provider.args() {
+            hasher.field(arg.as_bytes());
+        }
+        for dir in dirs {
+            let Ok(entries) = std::fs::read_dir(self.workspace_root.join(&dir)) else {
+                continue;
+            };
+            // Relative names, so the fingerprint survives moving the checkout.
+            let mut manifests: Vec<String> = entries
+                .filter_map(std::result::Result::ok)
+                .filter_map(|entry| entry.file_name().into_string().ok())
+                .filter(|name| is_build_manifest(language, name))
+                .collect();
+            manifests.sort();
+            for name in manifests {
+                let relative = dir.join(&name);
+                if let Ok(content) = std::fs::read(self.workspace_root.join(&relative)) {
+                    hasher.field(normalize_path(&relative).as_bytes());
+                    hasher.field(&content);
+                }
+            }
+        }
+        hasher.finish()
+    }
+
+    /// Fold a language's cache hits into its shard-0 session, or report them
+    /// as a session of their own when no server session completed for it.
+    fn record_lsp_cache_hits(
+        sessions: &mut Vec<LspSessionResult>,
+        language: Language,
+        hits: &LspCacheHits,
+    ) {
+        let shard_zero = sessions.iter_mut().find_map(|s| match &mut s.outcome {
+            LspOutcome::Completed(completed) if s.language == language && s.shard == 0 => {
+                Some(completed)
+            }
+            _ => None,
+        });
+        if let Some(completed) = shard_zero {
+            completed.resolved_count += hits.resolved;
+            completed.unresolved_attempted += hits.answered;
+            completed.cached = hits.answered;
+            return;
+        }
+        sessions.push(LspSessionResult {
+            language,
+            shard: 0,
+            duration: hits.duration,
+            outcome: LspOutcome::Completed(LspCompletedSession {
+                resolved_count: hits.resolved,
+                unresolved_attempted: hits.answered,
+                error_count: 0,
+                errors: Vec::new(),
+                server_exit_code: None,
+                cached: hits.answered,
+                skipped: 0,
+            }),
+        });
+    }
+
+    /// Split one language's unresolved refs into at most `shards` groups
+    /// of whole crates, balanced by ref count (largest crate first onto
+    /// the least-loaded shard). Refs outside every crate — all of them, for
+    /// C# — are grouped by top-level directory instead.
+    fn shard_lsp_refs(
+        &self,
+        unresolved: Vec<UnresolvedRefForLsp>,
+        shards: usize,
+    ) -> Vec<Vec<UnresolvedRefForLsp>> {
+        if shards <= 1 {
+            return vec![unresolved];
+        }
+
+        let mut groups: BTreeMap<PathBuf, Vec<UnresolvedRefForLsp>> = BTreeMap::new();
+        for unresolved_ref in unresolved {
+            let abs = self.workspace_root.join(&unresolved_ref.file_path);
+            let key = crate::cargo::get_crate_for_file(&abs, &self.crates).map_or_else(
+                || {
+                    unresolved_ref
+                        .file_path
+                        .components()
+                        .next()
+                        .map(|c| PathBuf::from(c.as_os_str()))
+                        .unwrap_or_default()
+                },
+                |c| c.path.clone(),
+            );
+            groups.entry(key).or_default().push(unresolved_ref);
+        }
+
+        let mut groups: Vec<_> = groups.into_values().collect();
+        // Stable sort: equal-sized groups keep their path order.
+        groups.sort_by_key(|g| std::cmp::Reverse(g.len()));
+        let mut buckets: Vec<Vec<UnresolvedRefForLsp>> = Vec::new();
+        buckets.resize_with(shards.min(groups.len()), Vec::new);
+        for group in groups {
+            if let Some(bucket) = buckets.iter_mut().min_by_key(|b| b.len()) {
+                bucket.extend(group);
+            }
+        }
+        buckets
+    }
+
+    /// Run one server session over `unresolved` and look up each ref's
+    /// definition. Returns the session's result, the resolutions it found,
+    /// and its cacheable answers, for the caller to apply and store.
+    #[expect(
+        clippy::too_many_lines,
+        reason = "LSP resolution involves multiple sequential protocol steps"
+    )]
+    fn run_lsp_session(
+        &self,
+        provider: &dyn lsp::LspProvider,
+        language: Language,
+        shard: usize,
+        unresolved: &[UnresolvedRefForLsp],
+        pass: &LspPassContext<'_>,
+    ) -> Result<LspSessionOutput> {
+        let started = Instant::now();
         debug!(
             language = ?language,
+            shard,
             unresolved_count = unresolved.len(),
             "Starting LSP resolution pass (Pass 3)"
         );
 
+        if pass.out_of_time() {
+            info!(
+                language = language.as_str(),
+                shard,
+                skipped = unresolved.len(),
+                "LSP budget spent before the session started"
+            );
+            return Ok(LspSessionOutput {
+                session: LspSessionResult {
+                    language,
+                    shard,
+                    duration: started.elapsed(),
+                    outcome: LspOutcome::Completed(LspCompletedSession {
+                        resolved_count: 0,
+                        unresolved_attempted: 0,
+                        error_count: 0,
+                        errors: Vec::new(),
+                        server_exit_code: None,
+                        cached: 0,
+                        skipped: unresolved.len(),
+                    }),
+                },
+                resolutions: Vec::new(),
+                answers: Vec::new(),
+            });
+        }
+
         // Start LSP lazily - only if there are refs to resolve
         let mut client = match lsp::LspClient::start(provider, &self.workspace_root) {
             Ok(c) => c,
@@ -733,17 +1172,24 @@ impl Tethys {
                      {} Or remove --lsp flag.",
                     provider.install_hint()
                 );
-                return Ok(LspSessionResult {
-                    language,
-                    outcome: LspOutcome::ServerUnavailable {
-                        reason: format!("LSP server for {language:?} failed to start: {e}"),
-                        install_hint: provider.install_hint().to_string(),
+                return Ok(LspSessionOutput {
+                    session: LspSessionResult {
+                        language,
+                        shard,
+                        duration: started.elapsed(),
+                        outcome: LspOutcome::ServerUnavailable {
+                            reason: format!("LSP server for {language:?} failed to start: {e}"),
+                            install_hint: provider.install_hint().to_string(),
+                        },
                     },
+                    resolutions: Vec::new(),
+                    answers: Vec::new(),
                 });
             }
         };
 
-        let mut resolved_count = 0;
+        let mut resolutions = Vec::new();
+        let mut answers = Vec::new();
         let mut lsp_error_count: usize = 0;
         let mut lsp_error_messages: Vec<String> = Vec::new();
         let mut opened_files: HashSet<PathBuf> = HashSet::new();
@@ -751,12 +1197,18 @@ impl Tethys {
 
         // Language::as_str() returns the LSP language identifier ("rust", "csharp")
         let language_id = language.as_str();
+        let per_document = provider.definition_queries() == lsp::DefinitionQueries::PerDocument;
 
-        // Pre-open all unique files for servers like csharp-ls that need time to process
-        let unique_files: HashSet<_> = unresolved
-            .iter()
-            .map(|r| self.workspace_root.join(&r.file_path))
-            .collect();
+        // Pre-open all unique files for servers like csharp-ls that need
+        // time to process; per-document queries open each file in turn.
+        let unique_files: HashSet<_> = if per_document {
+            HashSet::new()
+        } else {
+            unresolved
+                .iter()
+                .map(|r| self.workspace_root.join(&r.file_path))
+                .collect()
+        };
 
         debug!(
             language = ?language,
@@ -813,7 +1265,7 @@ impl Tethys {
         // on a cold workspace (probed for rust-analyzer — see
         // .tethys-2mjj/findings.md). Wait for the readiness signal the
         // provider declares for its server before the query loop.
-        let timeout = std::time::Duration::from_secs(lsp_timeout_secs);
+        let timeout = pass.within_budget(Duration::from_secs(pass.options.lsp_timeout_secs()));
         match client.wait_until_ready(provider.readiness_wait(), timeout) {
             Ok(true) => {
                 debug!(language = ?language, "LSP server ready");
@@ -833,28 +1285,167 @@ impl Tethys {
             }
         }
 
-        for unresolved_ref in &unresolved {
-            match self.resolve_single_ref_via_lsp(
-                &mut client,
-                unresolved_ref,
-                &mut lsp_error_count,
-                &mut lsp_error_messages,
-                &mut opened_files,
-                language_id,
-                &mut did_open_warned,
-            ) {
-                Ok(true) => resolved_count += 1,
-                Ok(false) => {}
-                Err(e) => {
-                    warn!(
-                        ref_id = %unresolved_ref.ref_id,
+        // Files the pre-open pass could not open get one more attempt; refs
+        // in files that cannot even be read are skipped. Per-document
+        // queries open (and check) each file when its turn comes.
+        let mut queries: Vec<(&UnresolvedRefForLsp, PathBuf, usize)> =
+            Vec::with_capacity(unresolved.len());
+        for (ref_index, unresolved_ref) in unresolved.iter().enumerate() {
+            let file_path = self.workspace_root.join(&unresolved_ref.file_path);
+            if per_document
+                || Self::ensure_lsp_open(
+                    &mut client,
+                    &file_path,
+                    &mut opened_files,
+                    language_id,
+                    &mut did_open_warned,
+                )
+            {
+                queries.push((unresolved_ref, file_path, ref_index));
+            }
+        }
+
+        // LSP uses 0-indexed positions, our DB uses 1-indexed. We wait once
+        // after initialization for workspace loading, so no per-query
+        // retries are needed here.
+        // Under a budget, no query is issued once it runs out; those
+        // already in flight are still answered.
+        client.set_max_in_flight(pass.options.lsp_max_in_flight());
+        let mut issued = 0usize;
+        let mut unreadable = 0usize;
+        let mut answered = 0usize;
+        let mut on_definition =
+            |index: usize, definition: lsp::Result<Option<lsp_types::Location>>| {
+                answered += 1;
+                let unresolved_ref = queries[index].0;
+                let answer = self.classify_lsp_definition(
+                    unresolved_ref,
+                    definition,
+                    &mut lsp_error_count,
+                    &mut lsp_error_messages,
+                );
+                let LspAnswer::At {
+                    file_id,
+                    path,
+                    line,
+                } = answer
+                else {
+                    if matches!(answer, LspAnswer::Outside) {
+                        answers.push((queries[index].2, CachedLspAnswer::Outside));
+                    }
+                    return;
+                };
+                match self.db.find_symbol_at_line(file_id, line) {
+                    Ok(Some(symbol)) => {
+                        trace!(
+                            ref_id = %unresolved_ref.ref_id,
+                            symbol_id = %symbol.id,
+                            symbol_name = %symbol.name,
+                            "Matched LSP definition to symbol"
+                        );
+                        resolutions.push((
+                            unresolved_ref.ref_id.as_i64(),
+                            symbol.id,
+                            ResolutionStrategy::Lsp,
+                        ));
+                    }
+                    Ok(None) => {
+                        trace!(
+                            def_path = %path.display(),
+                            def_line = line,
+                            "No symbol found at definition line"
+                        );
+                    }
+                    Err(e) => {
+                        warn!(
+                            ref_id = %unresolved_ref.ref_id,
+                            error = %e,
+                            "Database error during LSP resolution"
+                        );
+                        return;
+                    }
+                }
+                if let Some(&(_, hash)) = pass.file_hashes.get(&path) {
+                    answers.push((queries[index].2, CachedLspAnswer::At { path, line, hash }));
+                }
+            };
+        let pipeline = if per_document {
+            // Queries arrive grouped by file (path order, or by file within
+            // each priority tier under a budget), so each run of one file's
+            // queries is one open document.
+            let mut outcome = Ok(());
+            let mut offset = 0usize;
+            for run in queries.chunk_by(|a, b| a.1 == b.1) {
+                let start = offset;
+                offset += run.len();
+                if pass.out_of_time() {
+                    break;
+                }
+                let file_path = &run[0].1;
+                if !Self::ensure_lsp_open(
+                    &mut client,
+                    file_path,
+                    &mut opened_files,
+                    language_id,
+                    &mut did_open_warned,
+                ) {
+                    unreadable += run.len();
+                    continue;
+                }
+                let positions = run
+                    .iter()
+                    .take_while(|_| !pass.out_of_time())
+                    .inspect(|_| issued += 1)
+                    .map(Self::lsp_position);
+                outcome = client.goto_definitions(positions, |index, definition| {
+                    on_definition(start + index, definition);
+                });
+                opened_files.remove(file_path);
+                if let Err(e) = client.did_close(file_path) {
+                    trace!(
+                        file = %file_path.display(),
                         error = %e,
-                        "Database error during LSP resolution"
+                        "Failed to send didClose notification"
                     );
                 }
+                if outcome.is_err() {
+                    break;
+                }
+            }
+            outcome
+        } else {
+            let positions = queries
+                .iter()
+                .take_while(|_| !pass.out_of_time())
+                .inspect(|_| issued += 1)
+                .map(Self::lsp_position);
+            client.goto_definitions(positions, &mut on_definition)
+        };
+        if let Err(e) = pipeline {
+            // The connection died mid-pass: every query still outstanding
+            // failed with it.
+            let unanswered = issued - answered;
+            warn!(
+                error = %e,
+                unanswered,
+                "LSP connection failed during resolution"
+            );
+            lsp_error_count += unanswered;
+            if lsp_error_messages.len() < LspCompletedSession::MAX_ERROR_MESSAGES {
+                lsp_error_messages.push(format!(
+                    "LSP connection failed with {unanswered} queries unanswered: {e}"
+                ));
             }
         }
 
+        let skipped = queries.len() - issued - unreadable;
+        if skipped > 0 {
+            info!(
+                language = language.as_str(),
+                shard, issued, skipped, "LSP budget spent; remaining references left unresolved"
+            );
+        }
+
         if lsp_error_count > LspCompletedSession::MAX_ERROR_MESSAGES {
             info!(
                 total_errors = lsp_error_count,
@@ -864,7 +1455,8 @@ impl Tethys {
 
         debug!(
             language = ?language,
-            resolved_count = resolved_count,
+            shard,
+            resolved_count = resolutions.len(),
             total_unresolved = unresolved.len(),
             lsp_errors = lsp_error_count,
             "LSP resolution pass complete"
@@ -879,95 +1471,117 @@ impl Tethys {
             }
         };
 
-        Ok(LspSessionResult {
+        let session = LspSessionResult {
             language,
+            shard,
+            duration: started.elapsed(),
             outcome: LspOutcome::Completed(LspCompletedSession {
-                resolved_count,
-                unresolved_attempted: unresolved.len(),
+                resolved_count: resolutions.len(),
+                unresolved_attempted: unresolved.len() - skipped,
                 error_count: lsp_error_count,
                 errors: lsp_error_messages,
                 server_exit_code: exit_code,
+                cached: 0,
+                skipped,
             }),
+        };
+        if session.has_resolutions() {
+            info!(
+                language = language.as_str(),
+                shard,
+                resolved_count = session.resolved_count(),
+                duration_ms = session.duration.as_millis(),
+                "Resolved references via LSP"
+            );
+        }
+        Ok(LspSessionOutput {
+            session,
+            resolutions,
+            answers,
         })
     }
 
-    /// Attempt to resolve a single reference via LSP.
+    /// The 0-indexed LSP position of one Pass 3 query; the index stores
+    /// 1-indexed lines and columns.
+    fn lsp_position<'q>(
+        (unresolved_ref, path, _): &'q (&UnresolvedRefForLsp, PathBuf, usize),
+    ) -> (&'q Path, u32, u32) {
+        (
+            path.as_path(),
+            unresolved_ref.line.saturating_sub(1),
+            unresolved_ref.column.saturating_sub(1),
+        )
+    }
+
+    /// Make sure `file_path` is open in the server (required by some servers
+    /// like csharp-ls), sending `didOpen` if it is not yet.
     ///
-    /// Returns `Ok(true)` if resolved, `Ok(false)` if not resolved (but no error),
-    /// or `Err` for database errors.
-    #[expect(
-        clippy::too_many_lines,
-        reason = "didOpen warn/trace branching adds lines but keeps logic cohesive"
-    )]
-    #[expect(
-        clippy::too_many_arguments,
-        reason = "mutable resolution state is threaded through; bundling into a struct is a future cleanup"
-    )]
-    fn resolve_single_ref_via_lsp(
-        &self,
+    /// Returns `false` only when the file cannot be read — its refs cannot
+    /// be queried. A failed `didOpen` send still returns `true`: some
+    /// servers answer without it.
+    fn ensure_lsp_open(
         client: &mut lsp::LspClient,
-        unresolved_ref: &UnresolvedRefForLsp,
-        lsp_error_count: &mut usize,
-        lsp_error_messages: &mut Vec<String>,
+        file_path: &Path,
         opened_files: &mut HashSet<PathBuf>,
         language_id: &str,
         did_open_warned: &mut bool,
-    ) -> Result<bool> {
-        // Construct absolute file path for LSP
-        let file_path = self.workspace_root.join(&unresolved_ref.file_path);
-
-        // Ensure the file is opened in the LSP server (required by some servers like csharp-ls)
-        if !opened_files.contains(&file_path) {
-            // Read file content
-            let content = match std::fs::read_to_string(&file_path) {
-                Ok(c) => c,
-                Err(e) => {
-                    if *did_open_warned {
-                        trace!(
-                            file = %file_path.display(),
-                            error = %e,
-                            "Failed to read file for LSP didOpen"
-                        );
-                    } else {
-                        warn!(
-                            file = %file_path.display(),
-                            error = %e,
-                            "Failed to read file for LSP didOpen"
-                        );
-                        *did_open_warned = true;
-                    }
-                    return Ok(false);
-                }
-            };
+    ) -> bool {
+        if opened_files.contains(file_path) {
+            return true;
+        }
 
-            // Send didOpen notification
-            if let Err(e) = client.did_open(&file_path, &content, language_id) {
+        let content = match std::fs::read_to_string(file_path) {
+            Ok(c) => c,
+            Err(e) => {
                 if *did_open_warned {
                     trace!(
                         file = %file_path.display(),
                         error = %e,
-                        "Failed to send didOpen notification"
+                        "Failed to read file for LSP didOpen"
                     );
                 } else {
                     warn!(
                         file = %file_path.display(),
                         error = %e,
-                        "Failed to send didOpen notification"
+                        "Failed to read file for LSP didOpen"
                     );
                     *did_open_warned = true;
                 }
-                // Continue anyway - some servers might work without it
+                return false;
             }
-            opened_files.insert(file_path.clone());
-        }
+        };
 
-        // LSP uses 0-indexed positions, our DB uses 1-indexed
-        let lsp_line = unresolved_ref.line.saturating_sub(1);
-        let lsp_col = unresolved_ref.column.saturating_sub(1);
+        if let Err(e) = client.did_open(file_path, &content, language_id) {
+            if *did_open_warned {
+                trace!(
+                    file = %file_path.display(),
+                    error = %e,
+                    "Failed to send didOpen notification"
+                );
+            } else {
+                warn!(
+                    file = %file_path.display(),
+                    error = %e,
+                    "Failed to send didOpen notification"
+                );
+                *did_open_warned = true;
+            }
+            // Continue anyway - some servers might work without it
+        }
+        opened_files.insert(file_path.to_path_buf());
+        true
+    }
 
-        // Call goto_definition - we wait once after initialization for solution loading,
-        // so no per-query retries needed here
-        let definition = match client.goto_definition(&file_path, lsp_line, lsp_col) {
+    /// Classify where one `goto_definition` answer points, counting and
+    /// logging query failures.
+    fn classify_lsp_definition(
+        &self,
+        unresolved_ref: &UnresolvedRefForLsp,
+        definition: lsp::Result<Option<lsp_types::Location>>,
+        lsp_error_count: &mut usize,
+        lsp_error_messages: &mut Vec<String>,
+    ) -> LspAnswer {
+        let definition = match definition {
             Ok(Some(loc)) => loc,
             Ok(None) => {
                 trace!(
@@ -975,7 +1589,7 @@ impl Tethys {
                     ref_name = %unresolved_ref.reference_name,
                     "LSP returned no definition"
                 );
-                return Ok(false);
+                return LspAnswer::Outside;
             }
             Err(e) => {
                 *lsp_error_count += 1;
@@ -1000,7 +1614,7 @@ impl Tethys {
                         "LSP goto_definition failed"
                     );
                 }
-                return Ok(false);
+                return LspAnswer::Uncacheable;
             }
         };
 
@@ -1010,7 +1624,7 @@ impl Tethys {
                 uri = definition.uri.as_str(),
                 "Cannot parse LSP definition URI"
             );
-            return Ok(false);
+            return LspAnswer::Uncacheable;
         };
 
         // Make the path relative to workspace root
@@ -1019,16 +1633,27 @@ impl Tethys {
                 def_path = %def_path.display(),
                 "Definition outside workspace, skipping"
             );
-            return Ok(false);
+            return LspAnswer::Outside;
         };
 
         // Look up the file in our DB
-        let Some(def_file_id) = self.db.get_file_id(relative_def_path)? else {
-            trace!(
-                def_path = %relative_def_path.display(),
-                "Definition file not in index"
-            );
-            return Ok(false);
+        let def_file_id = match self.db.get_file_id(relative_def_path) {
+            Ok(Some(id)) => id,
+            Ok(None) => {
+                trace!(
+                    def_path = %relative_def_path.display(),
+                    "Definition file not in index"
+                );
+                return LspAnswer::Uncacheable;
+            }
+            Err(e) => {
+                warn!(
+                    ref_id = %unresolved_ref.ref_id,
+                    error = %e,
+                    "Database error during LSP resolution"
+                );
+                return LspAnswer::Uncacheable;
+            }
         };
 
         // LSP returns 0-indexed, convert to 1-indexed for DB lookup.
@@ -1040,31 +1665,11 @@ impl Tethys {
         // src/lsp/encoding.rs) and need the inverse conversion to bytes.
         let def_line = definition.range.start.line + 1;
 
-        // Find the symbol at that line
-        let Some(symbol) = self.db.find_symbol_at_line(def_file_id, def_line)? else {
-            trace!(
-                def_path = %relative_def_path.display(),
-                def_line = def_line,
-                "No symbol found at definition line"
-            );
-            return Ok(false);
-        };
-
-        // Resolve the reference
-        self.db.resolve_reference(
-            unresolved_ref.ref_id.as_i64(),
-            symbol.id,
-            ResolutionStrategy::Lsp,
-        )?;
-
-        trace!(
-            ref_id = %unresolved_ref.ref_id,
-            symbol_id = %symbol.id,
-            symbol_name = %symbol.name,
-            "Resolved reference via LSP"
-        );
-
-        Ok(true)
+        LspAnswer::At {
+            file_id: def_file_id,
+            path: PathBuf::from(normalize_path(relative_def_path)),
+            line: def_line,
+        }
     }
 
     /// Convert a file URI to a filesystem path.
@@ -1100,19 +1705,20 @@ impl Tethys {
     /// Indexed symbol coordinates point at the declaration node, while
     /// `textDocument/references` must target its `name` field. Falls back to
     /// the indexed coordinates when no syntax span or source is available.
-    fn lsp_symbol_name_position(file: &Path, symbol: &Symbol, language: Language) -> (u32, u32) {
+    fn lsp_symbol_name_position(
+        source: Option<&str>,
+        symbol: &Symbol,
+        language: Language,
+    ) -> (u32, u32) {
         let fallback = (
             symbol.line.saturating_sub(1),
             symbol.column.saturating_sub(1),
         );
-        let Some(span) = symbol.span else {
-            return fallback;
-        };
-        let Ok(source) = std::fs::read(file) else {
+        let (Some(span), Some(source)) = (symbol.span, source) else {
             return fallback;
         };
         get_language_support(language)
-            .definition_name_position(&source, span)
+            .definition_name_position(source.as_bytes(), span)
             .map_or(fallback, |(line, column)| {
                 (line.saturating_sub(1), column.saturating_sub(1))
             })
@@ -1121,11 +1727,11 @@ impl Tethys {
     /// Start an LSP client and wait for its provider-specific readiness signal.
     fn start_ready_caller_lsp(
         &self,
-        provider: lsp::AnyProvider,
+        provider: &dyn lsp::LspProvider,
         symbol_name: &str,
         language: Language,
     ) -> Option<lsp::LspClient> {
-        let mut client = match lsp::LspClient::start(&provider, &self.workspace_root) {
+        let mut client = match lsp::LspClient::start(provider, &self.workspace_root) {
             Ok(client) => client,
             Err(error) => {
                 warn!(
@@ -1141,7 +1747,7 @@ impl Tethys {
             }
         };
 
-        let timeout = std::time::Duration::from_secs(DEFAULT_LSP_TIMEOUT_SECS);
+        let timeout = Duration::from_secs(DEFAULT_LSP_TIMEOUT_SECS);
         let ready = match client.wait_until_ready(provider.readiness_wait(), timeout) {
             Ok(ready) => ready,
             Err(error) => {
@@ -1168,6 +1774,76 @@ impl Tethys {
         None
     }
 
+    /// `find_references` through a running `tethys lsp-broker` for this
+    /// workspace. `None` when no broker is listening, it could not answer,
+    /// or `language` has a provider set with `Tethys::set_lsp_provider`
+    /// (the broker only runs bundled servers); the caller then starts a
+    /// server itself.
+    #[cfg(unix)]
+    fn brokered_references(
+        &self,
+        language: Language,
+        file: &Path,
+        (line, col): (u32, u32),
+        source: Option<&str>,
+    ) -> Option<Vec<lsp_types::Location>> {
+        if self.lsp_providers.contains_key(&language) {
+            return None;
+        }
+        let mut broker = lsp::BrokerClient::connect(&self.workspace_root)?;
+        match broker.find_references(language, file, line, col, source) {
+            Ok(refs) => {
+                debug!(refs = refs.len(), "LSP broker answered find_references");
+                Some(refs)
+            }
+            Err(error) => {
+                warn!(
+                    error = %error,
+                    "LSP broker could not answer — starting a server for this query"
+                );
+                None
+            }
+        }
+    }
+
+    /// `find_references` on a server started, and shut down again, for
+    /// this one query. `None` (after logging why) when the server could
+    /// not start, was not ready, or the request failed.
+    fn cold_lsp_references(
+        &self,
+        qualified_name: &str,
+        language: Language,
+        file: &Path,
+        (line, col): (u32, u32),
+        source: Option<&str>,
+    ) -> Option<Vec<lsp_types::Location>> {
+        let provider = self.lsp_provider(language);
+        let mut lsp_client = self.start_ready_caller_lsp(&*provider, qualified_name, language)?;
+
+        // The source read by the caller seeds the client's column conversion.
+        if let Some(source) = source {
+            lsp_client.cache_line_index(file, source);
+        }
+        let lsp_refs = match lsp_client.find_references(file, line, col) {
+            Ok(refs) => Some(refs),
+            Err(e) => {
+                // User explicitly requested --lsp, so log at error level
+                tracing::error!(
+                    error = %e,
+                    symbol = %qualified_name,
+                    "LSP find_references failed - returning indexed callers only"
+                );
+                None
+            }
+        };
+
+        // Graceful shutdown
+        if let Err(e) = lsp_client.shutdown() {
+            warn!(error = %e, "LSP shutdown failed");
+        }
+        lsp_refs
+    }
+
     /// Get symbols that call/use the given symbol, with LSP refinement.
     ///
     /// Combines results from the tree-sitter index with references found by the
@@ -1178,7 +1854,8 @@ impl Tethys {
     ///
     /// 1. Get callers from the index
     /// 2. Find the symbol's definition location
-    /// 3. Call LSP `find_references` at that location
+    /// 3. Call LSP `find_references` at that location — through a running
+    ///    `tethys lsp-broker` if there is one, else on a fresh server
     /// 4. For each LSP reference, find its containing symbol
     /// 5. Merge with indexed callers, deduplicating by symbol ID
     ///
@@ -1201,40 +1878,34 @@ impl Tethys {
             .ok_or_else(|| Error::NotFound(format!("file id: {}", symbol.file_id)))?;
         let symbol_file_path = self.workspace_root.join(&symbol_file.path);
 
-        // Step 3: Spawn LSP and call find_references
-        // Select the appropriate LSP provider based on the symbol's file language
-        let provider = lsp::AnyProvider::for_language(symbol_file.language);
-        let Some(mut lsp_client) =
-            self.start_ready_caller_lsp(provider, qualified_name, symbol_file.language)
-        else {
-            return Ok(indexed_callers);
-        };
-
-        // LSP uses 0-indexed positions, our DB uses 1-indexed
+        // LSP uses 0-indexed positions, our DB uses 1-indexed.
+        let source = std::fs::read_to_string(&symbol_file_path).ok();
         let (lsp_line, lsp_col) =
-            Self::lsp_symbol_name_position(&symbol_file_path, symbol, symbol_file.language);
-
-        let lsp_refs = match lsp_client.find_references(&symbol_file_path, lsp_line, lsp_col) {
-            Ok(refs) => refs,
-            Err(e) => {
-                // User explicitly requested --lsp, so log at error level
-                tracing::error!(
-                    error = %e,
-                    symbol = %qualified_name,
-                    "LSP find_references failed - returning indexed callers only"
-                );
-                if let Err(shutdown_err) = lsp_client.shutdown() {
-                    warn!(error = %shutdown_err, "LSP shutdown failed");
-                }
-                return Ok(indexed_callers);
-            }
+            Self::lsp_symbol_name_position(source.as_deref(), symbol, symbol_file.language);
+
+        // Step 3: Ask a running `tethys lsp-broker`, else spawn a server
+        // for this one query.
+        #[cfg(unix)]
+        let brokered = self.brokered_references(
+            symbol_file.language,
+            &symbol_file_path,
+            (lsp_line, lsp_col),
+            source.as_deref(),
+        );
+        #[cfg(not(unix))]
+        let brokered = None;
+        let Some(lsp_refs) = brokered.or_else(|| {
+            self.cold_lsp_references(
+                qualified_name,
+                symbol_file.language,
+                &symbol_file_path,
+                (lsp_line, lsp_col),
+                source.as_deref(),
+            )
+        }) else {
+            return Ok(indexed_callers);
         };
 
-        // Graceful shutdown
-        if let Err(e) = lsp_client.shutdown() {
-            warn!(error = %e, "LSP shutdown failed");
-        }
-
         let indexed_len = indexed_callers.len();
         debug!(
             symbol = %qualified_name,
@@ -1300,7 +1971,7 @@ impl Tethys {
 
             // LSP returns 0-indexed, convert to 1-indexed for DB lookup.
             // ENCODING FENCE: line-granular match-back — see the fence note
-            // in resolve_single_ref_via_lsp before adding column use here.
+            // in classify_lsp_definition before adding column use here.
             let ref_line = loc.range.start.line + 1;
 
             // Find the symbol that contains this reference location
@@ -1338,7 +2009,7 @@ impl Tethys {
 #[cfg(test)]
 mod tests {
     use super::*;
-    use crate::types::{FileId, Import};
+    use crate::types::{FileId, Import, RefId};
 
     // ========================================================================
     // ref_binds_to_symbol_kind Tests
@@ -1476,6 +2147,116 @@ mod tests {
         let (_, source_module) = explicit["Error"];
         assert_eq!(source_module, "crate::error");
     }
+
+    // ========================================================================
+    // shard_lsp_refs Tests
+    // ========================================================================
+
+    /// Shards take whole crates, largest first onto the least-loaded shard;
+    /// files outside every crate group by top-level directory.
+    #[test]
+    fn shard_lsp_refs_keeps_crates_whole_and_balances() {
+        let dir = tempfile::tempdir().expect("tempdir");
+        let root = dir.path();
+        std::fs::write(
+            root.join("Cargo.toml"),
+            "[workspace]\nmembers = [\"crates/*\"]\n",
+        )
+        .expect("workspace toml");
+        for name in ["a", "b", "c"] {
+            let crate_dir = root.join("crates").join(name);
+            std::fs::create_dir_all(crate_dir.join("src")).expect("mkdir");
+            std::fs::write(
+                crate_dir.join("Cargo.toml"),
+                format!("[package]\nname = \"{name}\"\nversion = \"0.1.0\"\n"),
+            )
+            .expect("crate toml");
+        }
+        let tethys = Tethys::new(root).expect("Tethys::new");
+
+        let refs: Vec<UnresolvedRefForLsp> = [
+            "crates/a/src/lib.rs",
+            "crates/a/src/lib.rs",
+            "crates/a/src/x.rs",
+            "crates/b/src/lib.rs",
+            "crates/b/src/lib.rs",
+            "crates/c/src/lib.rs",
+            "scripts/gen.rs",
+        ]
+        .into_iter()
+        .zip(1..)
+        .map(|(path, id)| UnresolvedRefForLsp {
+            ref_id: RefId::from(id),
+            file_id: FileId::from(id),
+            file_path: PathBuf::from(path),
+            line: 1,
+            column: 1,
+            reference_name: "x".to_string(),
+        })
+        .collect();
+
+        assert_eq!(tethys.shard_lsp_refs(refs.clone(), 1).len(), 1);
+        assert_eq!(
+            tethys.shard_lsp_refs(refs.clone(), 10).len(),
+            4,
+            "never more shards than groups"
+        );
+
+        let shards = tethys.shard_lsp_refs(refs, 2);
+        let ids = |shard: &[UnresolvedRefForLsp]| {
+            let mut ids: Vec<i64> = shard.iter().map(|r| r.ref_id.as_i64()).collect();
+            ids.sort_unstable();
+            ids
+        };
+        // a (3 refs) and b (2) seed the shards; c joins b, then the
+        // unowned script ties and goes to the first shard.
+        assert_eq!(ids(&shards[0]), [1, 2, 3, 7]);
+        assert_eq!(ids(&shards[1]), [4, 5, 6]);
+    }
+
+    /// Budgeted Pass 3 order: non-test calls, then other non-test refs,
+    /// then test code; ambiguous names first within each; then busier
+    /// files first.
+    #[test]
+    fn lsp_priority_puts_valuable_queries_first() {
+        // (ref id, file id, is_call, in_test, candidates)
+        let cases = [
+            (1, 1, true, true, 3),
+            (2, 1, false, false, 3),
+            (3, 2, true, false, 0),
+            (4, 2, true, false, 1),
+            (5, 2, true, false, 2),
+            (6, 3, true, false, 2),
+            (7, 4, true, false, 1),
+            (8, 4, true, false, 1),
+        ];
+        let mut refs = Vec::new();
+        let mut facts = HashMap::new();
+        for (id, file, is_call, in_test, candidates) in cases {
+            refs.push(UnresolvedRefForLsp {
+                ref_id: RefId::from(id),
+                file_id: FileId::from(file),
+                file_path: PathBuf::from(format!("src/f{file}.rs")),
+                line: 1,
+                column: 1,
+                reference_name: "x".to_string(),
+            });
+            facts.insert(
+                RefId::from(id),
+                LspRefFacts {
+                    is_call,
+                    in_test,
+                    candidates,
+                },
+            );
+        }
+
+        order_by_lsp_priority(&mut refs, &facts);
+        let order: Vec<i64> = refs.iter().map(|r| r.ref_id.as_i64()).collect();
+        // 5 and 6 are both ambiguous calls, and 5's file has more
+        // unresolved refs; likewise 4 (file 2) before 7 and 8 (file 4).
+        assert_eq!(order, [5, 6, 4, 7, 8, 3, 2, 1]);
+    }
 }
 
 #[cfg(test)]
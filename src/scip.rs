@@ -0,0 +1,595 @@
+//! Pass 3 resolutions imported from a SCIP index.
+//!
+//! A SCIP index (`index.scip`, as written by `rust-analyzer scip` or
+//! `scip-dotnet`) records every identifier occurrence in a workspace along
+//! with the symbol it names and where that symbol is defined — the answer a
+//! language server would give to `goto_definition`, computed ahead of time.
+//! [`Tethys::resolve_via_scip`] reads one and binds unresolved refs to the
+//! symbols it names without starting a server: each ref is matched to the
+//! occurrence covering its position, the occurrence's symbol to its
+//! definition, and the definition line to the indexed symbol on it, exactly
+//! as Pass 3 matches a `goto_definition` answer back. The resolutions are
+//! stamped [`ResolutionStrategy::Lsp`] and applied in one batch.
+//!
+//! The index is protobuf; only the handful of fields used here are decoded
+//! (by the minimal wire reader below), and everything else is skipped, so
+//! no protobuf dependency or generated schema is needed.
+
+use std::borrow::Cow;
+use std::collections::HashMap;
+use std::path::{Path, PathBuf};
+use std::time::Instant;
+
+use tracing::{debug, trace};
+
+use crate::Tethys;
+use crate::db::normalize_path;
+use crate::error::{Error, Result};
+use crate::types::{FileId, ResolutionStrategy, ScipImportStats, UnresolvedRefForLsp};
+
+/// Protobuf wire type of a varint field.
+const WIRE_VARINT: u8 = 0;
+/// Protobuf wire type of a fixed 64-bit field.
+const WIRE_FIXED64: u8 = 1;
+/// Protobuf wire type of a length-delimited field.
+const WIRE_LEN: u8 = 2;
+/// Protobuf wire type of a fixed 32-bit field.
+const WIRE_FIXED32: u8 = 5;
+
+/// `SymbolRole.Definition` bit of `Occurrence.symbol_roles`.
+const ROLE_DEFINITION: u64 = 0x1;
+
+/// The error for an index that does not decode.
+fn malformed(what: &str) -> Error {
+    Error::Parser(format!("malformed SCIP index: {what}"))
+}
+
+/// Cursor over one protobuf message.
+struct Reader<'a> {
+    buf: &'a [u8],
+    pos: usize,
+}
+
+impl<'a> Reader<'a> {
+    fn new(buf: &'a [u8]) -> Self {
+        Self { buf, pos: 0 }
+    }
+
+    fn is_empty(&self) -> bool {
+        self.pos >= self.buf.len()
+    }
+
+    fn varint(&mut self) -> Result<u64> {
+        let mut value = 0u64;
+        for shift in (0..64).step_by(7) {
+            let byte = *self
+                .buf
+                .get(self.pos)
+                .ok_or_else(|| malformed("truncated varint"))?;
+            self.pos += 1;
+            value |= u64::from(byte & 0x7f) << shift;
+            if byte & 0x80 == 0 {
+                return Ok(value);
+            }
+        }
+        Err(malformed("varint longer than 10 bytes"))
+    }
+
+    /// The next field's number and wire type.
+    fn field(&mut self) -> Result<(u64, u8)> {
+        let key = self.varint()?;
+        // The low three bits are the wire type.
+        Ok((key >> 3, u8::try_from(key & 0x7).unwrap_or(u8::MAX)))
+    }
+
+    fn bytes(&mut self) -> Result<&'a [u8]> {
+        let len = usize::try_from(self.varint()?).map_err(|_| malformed("oversized field"))?;
+        let end = self
+            .pos
+            .checked_add(len)
+            .filter(|&end| end <= self.buf.len())
+            .ok_or_else(|| malformed("truncated field"))?;
+        let bytes = &self.buf[self.pos..end];
+        self.pos = end;
+        Ok(bytes)
+    }
+
+    fn string(&mut self) -> Result<&'a str> {
+        std::str::from_utf8(self.bytes()?).map_err(|_| malformed("string is not utf-8"))
+    }
+
+    fn skip(&mut self, wire: u8) -> Result<()> {
+        let width = match wire {
+            WIRE_VARINT => return self.varint().map(drop),
+            WIRE_LEN => return self.bytes().map(drop),
+            WIRE_FIXED64 => 8,
+            WIRE_FIXED32 => 4,
+            _ => return Err(malformed("unsupported wire type")),
+        };
+        if self.buf.len() - self.pos < width {
+            return Err(malformed("truncated field"));
+        }
+        self.pos += width;
+        Ok(())
+    }
+}
+
+/// Unit of `Occurrence.range` character offsets (`Document.position_encoding`).
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum PositionEncoding {
+    /// `utf-8` bytes; also assumed when the document leaves it unspecified.
+    Utf8,
+    /// `utf-16` code units.
+    Utf16,
+    /// Unicode scalar values.
+    Utf32,
+}
+
+/// One `Occurrence`, with its range normalized to four 0-based numbers.
+#[derive(Debug, Clone, PartialEq, Eq)]
+struct Occurrence<'a> {
+    start_line: u32,
+    start_char: u32,
+    end_line: u32,
+    end_char: u32,
+    symbol: &'a str,
+    definition: bool,
+}
+
+/// One `Document`: a source file and its occurrences.
+#[derive(Debug)]
+struct ScipDocument<'a> {
+    /// Path relative to the index's project root.
+    relative_path: &'a str,
+    encoding: PositionEncoding,
+    /// The file's text, when the indexer embedded it.
+    text: Option<&'a str>,
+    occurrences: Vec<Occurrence<'a>>,
+}
+
+/// The parts of a SCIP `Index` the import uses, borrowing the raw bytes.
+#[derive(Debug)]
+struct ScipIndex<'a> {
+    /// `Metadata.project_root`, a `file://` URI.
+    project_root: Option<&'a str>,
+    documents: Vec<ScipDocument<'a>>,
+}
+
+/// Decode a serialized SCIP `Index`.
+fn parse_index(buf: &[u8]) -> Result<ScipIndex<'_>> {
+    let mut index = ScipIndex {
+        project_root: None,
+        documents: Vec::new(),
+    };
+    let mut reader = Reader::new(buf);
+    while !reader.is_empty() {
+        match reader.field()? {
+            (1, WIRE_LEN) => {
+                let mut metadata = Reader::new(reader.bytes()?);
+                while !metadata.is_empty() {
+                    match metadata.field()? {
+                        (3, WIRE_LEN) => index.project_root = Some(metadata.string()?),
+                        (_, wire) => metadata.skip(wire)?,
+                    }
+                }
+            }
+            (2, WIRE_LEN) => index.documents.push(parse_document(reader.bytes()?)?),
+            (_, wire) => reader.skip(wire)?,
+        }
+    }
+    Ok(index)
+}
+
+fn parse_document(buf: &[u8]) -> Result<ScipDocument<'_>> {
+    let mut document = ScipDocument {
+        relative_path: "",
+        encoding: PositionEncoding::Utf8,
+        text: None,
+        occurrences: Vec::new(),
+    };
+    let mut reader = Reader::new(buf);
+    while !reader.is_empty() {
+        match reader.field()? {
+            (1, WIRE_LEN) => document.relative_path = reader.string()?,
+            (2, WIRE_LEN) => document
+                .occurrences
+                .push(parse_occurrence(reader.bytes()?)?),
+            (5, WIRE_LEN) => document.text = Some(reader.string()?),
+            (6, WIRE_VARINT) => {
+                document.encoding = match reader.varint()? {
+                    2 => PositionEncoding::Utf16,
+                    3 => PositionEncoding::Utf32,
+                    _ => PositionEncoding::Utf8,
+                };
+            }
+            (_, wire) => reader.skip(wire)?,
+        }
+    }
+    Ok(document)
+}
+
+fn parse_occurrence(buf: &[u8]) -> Result<Occurrence<'_>> {
+    let mut range = Vec::with_capacity(4);
+    let mut symbol = "";
+    let mut roles = 0;
+    let mut reader = Reader::new(buf);
+    let to_u32 = |v: u64| u32::try_from(v).map_err(|_| malformed("range out of bounds"));
+    while !reader.is_empty() {
+        match reader.field()? {
+            // `repeated int32 range`, normally packed.
+            (1, WIRE_LEN) => {
+                let mut packed = Reader::new(reader.bytes()?);
+                while !packed.is_empty() {
+                    range.push(to_u32(packed.varint()?)?);
+                }
+            }
+            (1, WIRE_VARINT) => range.push(to_u32(reader.varint()?)?),
+            (2, WIRE_LEN) => symbol = reader.string()?,
+            (3, WIRE_VARINT) => roles = reader.varint()?,
+            (_, wire) => reader.skip(wire)?,
+        }
+    }
+    let (start_line, start_char, end_line, end_char) = match range[..] {
+        [line, start, end] => (line, start, line, end),
+        [start_line, start, end_line, end] => (start_line, start, end_line, end),
+        _ => return Err(malformed("occurrence range needs 3 or 4 elements")),
+    };
+    Ok(Occurrence {
+        start_line,
+        start_char,
+        end_line,
+        end_char,
+        symbol,
+        definition: roles & ROLE_DEFINITION != 0,
+    })
+}
+
+/// Whether `symbol` is document-local (`local <id>`), and so never a
+/// workspace symbol.
+fn is_local(symbol: &str) -> bool {
+    symbol.is_empty() || symbol.starts_with("local ")
+}
+
+/// 0-based BYTE column `byte_col` of `line` in `encoding`'s units, or `None`
+/// when it is past the end of the line or inside a character.
+fn encode_column(line: &str, byte_col: usize, encoding: PositionEncoding) -> Option<u32> {
+    let prefix = line.get(..byte_col)?;
+    let units = match encoding {
+        PositionEncoding::Utf8 => prefix.len(),
+        PositionEncoding::Utf16 => prefix.encode_utf16().count(),
+        PositionEncoding::Utf32 => prefix.chars().count(),
+    };
+    u32::try_from(units).ok()
+}
+
+/// A document's single-line, non-definition occurrences of workspace
+/// symbols, grouped by 0-based line so each ref scans only its own line.
+fn occurrences_by_line<'o, 'a>(
+    occurrences: &'o [Occurrence<'a>],
+) -> HashMap<u32, Vec<&'o Occurrence<'a>>> {
+    let mut by_line: HashMap<u32, Vec<&Occurrence<'a>>> = HashMap::new();
+    for o in occurrences {
+        if !o.definition && !is_local(o.symbol) && o.start_line == o.end_line {
+            by_line.entry(o.start_line).or_default().push(o);
+        }
+    }
+    by_line
+}
+
+/// The narrowest occurrence in `by_line` on 0-based `line` covering
+/// column `col`.
+fn occurrence_at<'o, 'a>(
+    by_line: &HashMap<u32, Vec<&'o Occurrence<'a>>>,
+    line: u32,
+    col: u32,
+) -> Option<&'o Occurrence<'a>> {
+    by_line
+        .get(&line)?
+        .iter()
+        .copied()
+        .filter(|o| o.start_char <= col && col < o.end_char)
+        .min_by_key(|o| o.end_char - o.start_char)
+}
+
+impl Tethys {
+    /// Resolve still-unresolved refs from the SCIP index at `scip_path`.
+    ///
+    /// Document paths are taken relative to the index's project root and
+    /// re-based onto the workspace; documents outside it, or naming files
+    /// that are not indexed, are ignored. A ref resolves when the
+    /// occurrence covering its position names a symbol whose definition
+    /// occurrence lies in an indexed file, on a line holding an indexed
+    /// symbol. Locals and symbols defined outside the workspace (no
+    /// definition occurrence in the index) leave the ref unresolved.
+    ///
+    /// # Errors
+    ///
+    /// [`Error::Io`] if the file cannot be read, [`Error::Parser`] if it is
+    /// not a SCIP index, or a database error.
+    pub(crate) fn resolve_via_scip(&self, scip_path: &Path) -> Result<ScipImportStats> {
+        let started = Instant::now();
+        let bytes = std::fs::read(scip_path)?;
+        let index = parse_index(&bytes)?;
+        let project_root = index.project_root.and_then(Self::uri_to_path);
+
+        // Workspace-relative path of every document, and where each
+        // workspace symbol is defined (path, 1-based line).
+        let mut documents: HashMap<String, (PathBuf, &ScipDocument<'_>)> = HashMap::new();
+        let mut definitions: HashMap<&str, (PathBuf, u32)> = HashMap::new();
+        for document in &index.documents {
+            let Some(path) = self.scip_document_path(project_root.as_deref(), document) else {
+                continue;
+            };
+            for occurrence in &document.occurrences {
+                if occurrence.definition && !is_local(occurrence.symbol) {
+                    definitions
+                        .entry(occurrence.symbol)
+                        .or_insert_with(|| (path.clone(), occurrence.start_line + 1));
+                }
+            }
+            documents.insert(normalize_path(&path), (path, document));
+        }
+
+        let mut refs_by_file: HashMap<String, Vec<UnresolvedRefForLsp>> = HashMap::new();
+        for unresolved_ref in self.db.get_unresolved_references_for_lsp()? {
+            let key = normalize_path(&unresolved_ref.file_path);
+            if documents.contains_key(&key) {
+                refs_by_file.entry(key).or_default().push(unresolved_ref);
+            }
+        }
+
+        let mut stats = ScipImportStats {
+            documents: documents.len(),
+            ..ScipImportStats::default()
+        };
+        let mut file_ids: HashMap<&Path, Option<FileId>> = HashMap::new();
+        let mut resolutions = Vec::new();
+        for (key, refs) in &refs_by_file {
+            let (path, document) = &documents[key];
+            let text = match (document.encoding, document.text) {
+                (PositionEncoding::Utf8, _) => None,
+                (_, Some(text)) => Some(Cow::Borrowed(text)),
+                (_, None) => match std::fs::read_to_string(self.workspace_root.join(path)) {
+                    Ok(text) => Some(Cow::Owned(text)),
+                    Err(e) => {
+                        debug!(
+                            path = %path.display(),
+                            error = %e,
+                            "Cannot read file to convert SCIP columns, skipping document"
+                        );
+                        continue;
+                    }
+                },
+            };
+            let lines: Vec<&str> = text
+                .as_deref()
+                .map(|t| t.lines().collect())
+                .unwrap_or_default();
+            let occurrences = occurrences_by_line(&document.occurrences);
+
+            for unresolved_ref in refs {
+                let line = unresolved_ref.line.saturating_sub(1);
+                let byte_col = unresolved_ref.column.saturating_sub(1);
+                let col = if document.encoding == PositionEncoding::Utf8 {
+                    Some(byte_col)
+                } else {
+                    usize::try_from(line)
+                        .ok()
+                        .and_then(|l| lines.get(l))
+                        .and_then(|text| {
+                            encode_column(text, usize::try_from(byte_col).ok()?, document.encoding)
+                        })
+                };
+                let Some(occurrence) = col.and_then(|col| occurrence_at(&occurrences, line, col))
+                else {
+                    continue;
+                };
+                stats.matched += 1;
+                let Some((def_path, def_line)) = definitions.get(occurrence.symbol) else {
+                    trace!(
+                        ref_name = %unresolved_ref.reference_name,
+                        symbol = occurrence.symbol,
+                        "SCIP symbol defined outside the workspace"
+                    );
+                    continue;
+                };
+                let def_file_id = match file_ids.get(def_path.as_path()) {
+                    Some(&id) => id,
+                    None => {
+                        let id = self.db.get_file_id(def_path)?;
+                        file_ids.insert(def_path.as_path(), id);
+                        id
+                    }
+                };
+                let Some(def_file_id) = def_file_id else {
+                    continue;
+                };
+                if let Some(symbol) = self.db.find_symbol_at_line(def_file_id, *def_line)? {
+                    resolutions.push((
+                        unresolved_ref.ref_id.as_i64(),
+                        symbol.id,
+                        ResolutionStrategy::Lsp,
+                    ));
+                }
+            }
+        }
+        self.db.apply_resolutions(&resolutions)?;
+
+        stats.resolved = resolutions.len();
+        stats.duration = started.elapsed();
+        debug!(
+            scip = %scip_path.display(),
+            documents = stats.documents,
+            matched = stats.matched,
+            resolved = stats.resolved,
+            "Imported resolutions from SCIP index"
+        );
+        Ok(stats)
+    }
+
+    /// Workspace-relative path of `document`, or `None` when it lies
+    /// outside the workspace.
+    ///
+    /// Without a parsable project root the document path is taken to be
+    /// workspace-relative already.
+    fn scip_document_path(
+        &self,
+        project_root: Option<&Path>,
+        document: &ScipDocument<'_>,
+    ) -> Option<PathBuf> {
+        let relative = Path::new(document.relative_path);
+        if relative.as_os_str().is_empty() || relative.is_absolute() {
+            return None;
+        }
+        let Some(root) = project_root else {
+            return Some(relative.to_path_buf());
+        };
+        match root.join(relative).strip_prefix(&self.workspace_root) {
+            Ok(path) => Some(path.to_path_buf()),
+            Err(_) => {
+                trace!(
+                    path = document.relative_path,
+                    "SCIP document outside the workspace, skipping"
+                );
+                None
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn varint(mut value: u64, out: &mut Vec<u8>) {
+        while value >= 0x80 {
+            out.push(u8::try_from(value & 0x7f).expect("seven bits") | 0x80);
+            value >>= 7;
+        }
+        out.push(u8::try_from(value).expect("below 0x80"));
+    }
+
+    fn len_field(field: u64, bytes: &[u8], out: &mut Vec<u8>) {
+        varint((field << 3) | u64::from(WIRE_LEN), out);
+        varint(u64::try_from(bytes.len()).expect("fits"), out);
+        out.extend_from_slice(bytes);
+    }
+
+    fn occurrence(range: &[u64], symbol: &str, roles: u64) -> Vec<u8> {
+        let mut packed = Vec::new();
+        for &v in range {
+            varint(v, &mut packed);
+        }
+        let mut out = Vec::new();
+        len_field(1, &packed, &mut out);
+        len_field(2, symbol.as_bytes(), &mut out);
+        if roles != 0 {
+            varint(3 << 3, &mut out);
+            varint(roles, &mut out);
+        }
+        // An unknown fixed32 field, to be skipped.
+        varint((9 << 3) | u64::from(WIRE_FIXED32), &mut out);
+        out.extend_from_slice(&[0; 4]);
+        out
+    }
+
+    #[test]
+    fn decodes_documents_occurrences_and_encoding() {
+        let mut metadata = Vec::new();
+        len_field(3, b"file:///ws", &mut metadata);
+        let mut document = Vec::new();
+        len_field(1, b"src/lib.rs", &mut document);
+        len_field(2, &occurrence(&[3, 6, 10], "s a#f().", 0), &mut document);
+        len_field(2, &occurrence(&[0, 1, 2, 3], "local 0", 1), &mut document);
+        varint(6 << 3, &mut document);
+        varint(2, &mut document);
+        let mut index = Vec::new();
+        len_field(1, &metadata, &mut index);
+        len_field(2, &document, &mut index);
+
+        let parsed = parse_index(&index).expect("decodes");
+        assert_eq!(parsed.project_root, Some("file:///ws"));
+        let [document] = &parsed.documents[..] else {
+            panic!("one document expected");
+        };
+        assert_eq!(document.relative_path, "src/lib.rs");
+        assert_eq!(document.encoding, PositionEncoding::Utf16);
+        assert_eq!(
+            document.occurrences,
+            [
+                Occurrence {
+                    start_line: 3,
+                    start_char: 6,
+                    end_line: 3,
+                    end_char: 10,
+                    symbol: "s a#f().",
+                    definition: false,
+                },
+                Occurrence {
+                    start_line: 0,
+                    start_char: 1,
+                    end_line: 2,
+                    end_char: 3,
+                    symbol: "local 0",
+                    definition: true,
+                },
+            ]
+        );
+    }
+
+    #[test]
+    fn rejects_malformed_input() {
+        for bad in [
+            &[0x12, 0x05, 0x0a][..],
+            &[0x80],
+            &[0x0f],
+            &[0x12, 0x04, 0x12, 0x02, 0x08, 0x01],
+        ] {
+            assert!(
+                matches!(parse_index(bad), Err(Error::Parser(_))),
+                "{bad:?} must not decode"
+            );
+        }
+        assert!(parse_index(&[]).expect("empty index").documents.is_empty());
+    }
+
+    #[test]
+    fn matches_the_narrowest_covering_occurrence_in_the_document_encoding() {
+        let occ = |start_char, end_char, symbol| Occurrence {
+            start_line: 0,
+            start_char,
+            end_line: 0,
+            end_char,
+            symbol,
+            definition: false,
+        };
+        let document = [occ(0, 12, "outer"), occ(4, 8, "inner")];
+        let occurrences = occurrences_by_line(&document);
+        assert_eq!(
+            occurrence_at(&occurrences, 0, 5).map(|o| o.symbol),
+            Some("inner")
+        );
+        assert_eq!(
+            occurrence_at(&occurrences, 0, 9).map(|o| o.symbol),
+            Some("outer")
+        );
+        assert_eq!(occurrence_at(&occurrences, 0, 12), None, "end is exclusive");
+        assert_eq!(occurrence_at(&occurrences, 1, 5), None);
+
+        let line = "let s = \"\u{65e5}\u{1f600}\"; go()";
+        let byte_col = line.find("go").expect("present");
+        assert_eq!(
+            encode_column(line, byte_col, PositionEncoding::Utf8),
+            Some(19)
+        );
+        assert_eq!(
+            encode_column(line, byte_col, PositionEncoding::Utf16),
+            Some(15)
+        );
+        assert_eq!(
+            encode_column(line, byte_col, PositionEncoding::Utf32),
+            Some(14)
+        );
+        assert_eq!(encode_column(line, 10, PositionEncoding::Utf16), None);
+    }
+}
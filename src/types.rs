@@ -20,6 +20,7 @@ use std::time::Duration;
 
 use serde::{Deserialize, Serialize};
 
+use crate::cancel::CancellationToken;
 use crate::error::IndexError;
 
 /// A strongly-typed symbol ID to prevent mixing with file IDs.
@@ -169,7 +170,7 @@ impl Language {
 /// `lib_path` / `bin_paths.first()` fallback chain. That open-coding is
 /// the design-tax pattern fixed by `rivets-i8qn` — duplicated chains
 /// drift independently when one site is updated and the others aren't.
-#[derive(Debug, Clone, PartialEq, Eq)]
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
 pub struct CrateInfo {
     /// Crate name from `[package].name`
     pub name: String,
@@ -393,7 +394,8 @@ pub enum ResolutionStrategy {
     UniqueWorkspace,
     /// Pass 2: prefix-split module enumeration (rivets-044i).
     QualifiedModuleFallback,
-    /// Pass 3: LSP `goto_definition` refinement.
+    /// Pass 3: LSP `goto_definition` refinement, or the same answer read
+    /// from a SCIP index.
     Lsp,
 }
 
@@ -746,7 +748,8 @@ pub struct IndexedFile {
     pub mtime_ns: i64,
     /// File size in bytes
     pub size_bytes: u64,
-    /// Content hash for change detection (algorithm TBD, not yet implemented)
+    /// FNV-1a 64 hash of the file's bytes at index time (see
+    /// `content_hash`); `None` for rows written before hashing existed.
     pub content_hash: Option<u64>,
     /// When this file was last indexed (unix timestamp)
     pub indexed_at: i64,
@@ -904,8 +907,11 @@ pub struct FileAnalysis {
 /// Default timeout for LSP solution loading (in seconds).
 pub const DEFAULT_LSP_TIMEOUT_SECS: u64 = 60;
 
+/// Default number of `goto_definition` requests Pass 3 keeps in flight.
+pub const DEFAULT_LSP_MAX_IN_FLIGHT: usize = 32;
+
 /// Options for configuring the indexing process.
-#[derive(Debug, Clone, Copy)]
+#[derive(Debug, Clone)]
 pub struct IndexOptions {
     /// Enable LSP-based resolution for references that tree-sitter cannot resolve.
     ///
@@ -925,6 +931,43 @@ pub struct IndexOptions {
     /// Default: 60 seconds
     lsp_timeout_secs: u64,
 
+    /// Number of `goto_definition` requests Pass 3 keeps in flight.
+    ///
+    /// The LSP client pipelines queries: a larger window hides more
+    /// round-trip latency; `1` restores one-at-a-time querying.
+    ///
+    /// Default: 32
+    lsp_max_in_flight: usize,
+
+    /// Server instances Pass 3 splits each language's references across.
+    ///
+    /// References are grouped by crate and the groups spread over this
+    /// many concurrent sessions, each its own server process. Sessions for
+    /// different languages always run concurrently.
+    ///
+    /// Default: 1
+    lsp_shards: usize,
+
+    /// Wall-clock budget for Pass 3, from its start.
+    ///
+    /// When set, each session queries its references most valuable first
+    /// (calls outside tests, then names with several workspace candidates,
+    /// then files with the most unresolved references) and stops issuing
+    /// queries once the budget is spent; what it never asked about is
+    /// counted in [`LspCompletedSession::skipped`].
+    ///
+    /// Default: `None` (no budget; references in path order)
+    lsp_budget: Option<Duration>,
+
+    /// SCIP index to import Pass 3 resolutions from.
+    ///
+    /// Read after Pass 2 and before any LSP session: references it answers
+    /// are resolved without a server, and only the rest are left for
+    /// [`Self::use_lsp`]. See [`ScipImportStats`].
+    ///
+    /// Default: `None`
+    scip_index: Option<PathBuf>,
+
     /// Enable streaming writes during indexing.
     ///
     /// When enabled, parsed files are written to `SQLite` immediately via a background
@@ -941,6 +984,26 @@ pub struct IndexOptions {
     ///
     /// Default: 100
     streaming_batch_size: usize,
+
+    /// Token that aborts the run when cancelled or past its deadline.
+    ///
+    /// Checked between phases, between per-file writes, by every parse
+    /// task, and inside `SQLite` statements; a cancelled run returns with
+    /// [`IndexStats::cancelled`] set.
+    ///
+    /// Default: `None`
+    cancellation: Option<CancellationToken>,
+
+    /// Size limit, in bytes, of the extraction cache; `None` disables it.
+    ///
+    /// When set, Pass 1a looks each file's content up in a cache of
+    /// earlier extraction results (stored next to the index, surviving
+    /// rebuilds) before parsing it, and adds what it parses. Re-indexing
+    /// after switching branches then mostly reads the cache. See
+    /// [`ExtractionCacheStats`].
+    ///
+    /// Default: `None`
+    extraction_cache_bytes: Option<u64>,
 }
 
 impl IndexOptions {
@@ -970,8 +1033,14 @@ impl IndexOptions {
         Self {
             use_lsp: true,
             lsp_timeout_secs: timeout,
+            lsp_max_in_flight: DEFAULT_LSP_MAX_IN_FLIGHT,
+            lsp_shards: 1,
+            lsp_budget: None,
+            scip_index: None,
             use_streaming: false,
             streaming_batch_size: 100,
+            cancellation: None,
+            extraction_cache_bytes: None,
         }
     }
 
@@ -981,8 +1050,14 @@ impl IndexOptions {
         Self {
             use_lsp: false,
             lsp_timeout_secs: DEFAULT_LSP_TIMEOUT_SECS,
+            lsp_max_in_flight: DEFAULT_LSP_MAX_IN_FLIGHT,
+            lsp_shards: 1,
+            lsp_budget: None,
+            scip_index: None,
             use_streaming: true,
             streaming_batch_size: 100,
+            cancellation: None,
+            extraction_cache_bytes: None,
         }
     }
 
@@ -992,8 +1067,14 @@ impl IndexOptions {
         Self {
             use_lsp: false,
             lsp_timeout_secs: DEFAULT_LSP_TIMEOUT_SECS,
+            lsp_max_in_flight: DEFAULT_LSP_MAX_IN_FLIGHT,
+            lsp_shards: 1,
+            lsp_budget: None,
+            scip_index: None,
             use_streaming: true,
             streaming_batch_size: batch_size,
+            cancellation: None,
+            extraction_cache_bytes: None,
         }
     }
 
@@ -1011,6 +1092,52 @@ impl IndexOptions {
         self
     }
 
+    /// Set how many `goto_definition` requests Pass 3 keeps in flight
+    /// (`0` is treated as `1`).
+    #[must_use]
+    pub fn lsp_window(mut self, window: usize) -> Self {
+        self.lsp_max_in_flight = window.max(1);
+        self
+    }
+
+    /// Set how many server instances Pass 3 runs per language
+    /// (`0` is treated as `1`).
+    #[must_use]
+    pub fn lsp_shards(mut self, shards: usize) -> Self {
+        self.lsp_shards = shards.max(1);
+        self
+    }
+
+    /// Give Pass 3 a wall-clock budget (see the `lsp_budget` field).
+    #[must_use]
+    pub fn lsp_budget(mut self, budget: Duration) -> Self {
+        self.lsp_budget = Some(budget);
+        self
+    }
+
+    /// Import Pass 3 resolutions from the SCIP index at `path` (see the
+    /// `scip_index` field).
+    #[must_use]
+    pub fn scip_index(mut self, path: impl Into<PathBuf>) -> Self {
+        self.scip_index = Some(path.into());
+        self
+    }
+
+    /// Run under `token` (see the `cancellation` field).
+    #[must_use]
+    pub fn cancellation(mut self, token: CancellationToken) -> Self {
+        self.cancellation = Some(token);
+        self
+    }
+
+    /// Cache extraction results, up to `max_bytes` (see the
+    /// `extraction_cache_bytes` field).
+    #[must_use]
+    pub fn extraction_cache(mut self, max_bytes: u64) -> Self {
+        self.extraction_cache_bytes = Some(max_bytes);
+        self
+    }
+
     /// Check if LSP-based resolution is enabled.
     #[must_use]
     pub fn use_lsp(&self) -> bool {
@@ -1023,6 +1150,30 @@ impl IndexOptions {
         self.lsp_timeout_secs
     }
 
+    /// Get the Pass 3 pipelining window.
+    #[must_use]
+    pub fn lsp_max_in_flight(&self) -> usize {
+        self.lsp_max_in_flight
+    }
+
+    /// Get the number of Pass 3 server instances per language.
+    #[must_use]
+    pub fn lsp_shard_count(&self) -> usize {
+        self.lsp_shards
+    }
+
+    /// Get the Pass 3 time budget, if any.
+    #[must_use]
+    pub fn lsp_time_budget(&self) -> Option<Duration> {
+        self.lsp_budget
+    }
+
+    /// Get the SCIP index to import, if any.
+    #[must_use]
+    pub fn scip_index_path(&self) -> Option<&Path> {
+        self.scip_index.as_deref()
+    }
+
     /// Check if streaming writes are enabled.
     #[must_use]
     pub fn use_streaming(&self) -> bool {
@@ -1034,6 +1185,18 @@ impl IndexOptions {
     pub fn streaming_batch_size(&self) -> usize {
         self.streaming_batch_size
     }
+
+    /// Get the cancellation token, if any.
+    #[must_use]
+    pub fn cancellation_token(&self) -> Option<&CancellationToken> {
+        self.cancellation.as_ref()
+    }
+
+    /// Get the extraction cache size limit, if the cache is enabled.
+    #[must_use]
+    pub fn extraction_cache_limit(&self) -> Option<u64> {
+        self.extraction_cache_bytes
+    }
 }
 
 impl Default for IndexOptions {
@@ -1041,8 +1204,14 @@ impl Default for IndexOptions {
         Self {
             use_lsp: false,
             lsp_timeout_secs: DEFAULT_LSP_TIMEOUT_SECS,
+            lsp_max_in_flight: DEFAULT_LSP_MAX_IN_FLIGHT,
+            lsp_shards: 1,
+            lsp_budget: None,
+            scip_index: None,
             use_streaming: false,
             streaming_batch_size: 100,
+            cancellation: None,
+            extraction_cache_bytes: None,
         }
     }
 }
@@ -1087,6 +1256,11 @@ pub struct IndexStats {
     /// Results from LSP resolution sessions (one per language attempted).
     /// Empty when `IndexOptions::use_lsp` was not set.
     pub lsp_sessions: Vec<LspSessionResult>,
+    /// Result of the SCIP import. `None` when no SCIP index was given.
+    pub scip_import: Option<ScipImportStats>,
+    /// Extraction cache activity. `None` when the cache was not enabled
+    /// (or could not be opened).
+    pub extraction_cache: Option<ExtractionCacheStats>,
     /// Outcome of the architecture-analysis phase.
     ///
     /// `None` means the phase did not run (the default state, before indexing).
@@ -1095,6 +1269,16 @@ pub struct IndexStats {
     /// `Some(ArchPhaseResult::Failed(err))` means the phase errored — index
     /// data is otherwise valid.
     pub arch_phase: Option<ArchPhaseResult>,
+    /// Whether the run was cancelled (see [`IndexOptions::cancellation`]).
+    ///
+    /// What was written before the cancellation is committed, but later
+    /// phases did not run: counts are partial and references may be left
+    /// unresolved until the next full index.
+    pub cancelled: bool,
+    /// The index generation this run produced: every run bumps it, and
+    /// [`Tethys::changes_since`](crate::Tethys::changes_since) lists what
+    /// each generation changed.
+    pub generation: u64,
 }
 
 impl IndexStats {
@@ -1114,11 +1298,46 @@ impl IndexStats {
     }
 }
 
-/// Result of a single LSP resolution session for one language.
+/// Extraction cache activity during one indexing run (see
+/// [`IndexOptions::extraction_cache`]).
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct ExtractionCacheStats {
+    /// Files whose extraction was read from the cache instead of parsed.
+    pub hits: usize,
+    /// Files parsed and added to the cache.
+    pub misses: usize,
+    /// Entries evicted to bring the cache back within its size limit.
+    pub evicted: usize,
+    /// Size of the cached extractions after eviction.
+    pub bytes: u64,
+}
+
+/// Result of importing Pass 3 resolutions from a SCIP index.
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct ScipImportStats {
+    /// Documents in the index that map into the workspace.
+    pub documents: usize,
+    /// Unresolved references that fell on a non-local SCIP occurrence.
+    pub matched: usize,
+    /// References resolved, as [`ResolutionStrategy::Lsp`]. The rest of
+    /// `matched` named symbols defined outside the workspace, or on a line
+    /// with no indexed symbol.
+    pub resolved: usize,
+    /// Time spent reading, decoding, and applying the index.
+    pub duration: Duration,
+}
+
+/// Result of a single LSP resolution session: one server instance working
+/// through one language's references, or its shard of them.
 #[derive(Debug, Clone)]
 pub struct LspSessionResult {
     /// The language this session targeted.
     pub language: Language,
+    /// Which of the language's shards this session handled (0-based; always
+    /// 0 when the references were not sharded).
+    pub shard: usize,
+    /// Wall-clock time from server start to shutdown.
+    pub duration: Duration,
     /// The outcome of the session.
     pub outcome: LspOutcome,
 }
@@ -1182,6 +1401,14 @@ pub struct LspCompletedSession {
     pub errors: Vec<String>,
     /// The exit code of the LSP server process, if available.
     pub server_exit_code: Option<i32>,
+    /// References answered from the persistent resolution cache rather
+    /// than the server. Included in `unresolved_attempted`, and in
+    /// `resolved_count` for those that resolved.
+    pub cached: usize,
+    /// References never queried because the `--lsp-budget` ran out. Not
+    /// included in `unresolved_attempted`; they stay unresolved (and
+    /// uncached) for the next run.
+    pub skipped: usize,
 }
 
 impl LspCompletedSession {
@@ -1204,10 +1431,111 @@ pub struct IndexUpdate {
     pub files_changed: usize,
     /// Number of files unchanged since last index
     pub files_unchanged: usize,
+    /// Number of files dropped from the index because they were deleted
+    pub files_removed: usize,
     /// How long the update took
     pub duration: Duration,
     /// Errors encountered
     pub errors: Vec<IndexError>,
+    /// Whether the update was cancelled (see [`IndexStats::cancelled`]).
+    pub cancelled: bool,
+    /// The index generation after the update: unchanged when nothing was
+    /// re-indexed (see [`IndexStats::generation`]).
+    pub generation: u64,
+}
+
+/// Result of writing or restoring an index snapshot.
+///
+/// Returned by [`Tethys::export_snapshot`](crate::Tethys::export_snapshot)
+/// and [`Tethys::import_snapshot`](crate::Tethys::import_snapshot).
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct SnapshotStats {
+    /// Indexed files the snapshot holds.
+    pub files: usize,
+    /// Size of the database inside the snapshot, uncompressed.
+    pub database_bytes: u64,
+    /// Size of the snapshot file.
+    pub snapshot_bytes: u64,
+}
+
+/// What kind of index entry an [`IndexChange`] is about.
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
+#[serde(rename_all = "snake_case")]
+pub enum ChangedEntity {
+    /// An indexed file.
+    File,
+    /// A symbol definition.
+    Symbol,
+    /// A caller -> callee edge of the call graph.
+    CallEdge,
+    /// A file-level dependency.
+    FileDependency,
+}
+
+/// How an [`IndexChange`]'s entry changed.
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
+#[serde(rename_all = "snake_case")]
+pub enum ChangeKind {
+    /// The entry is new in this generation.
+    Added,
+    /// The entry is gone in this generation.
+    Removed,
+    /// The entry exists before and after, but differs: a file's content,
+    /// a symbol's kind, location, signature or visibility, an edge's
+    /// weight.
+    Modified,
+}
+
+/// One entry of the index change feed.
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct IndexChange {
+    /// The generation that made the change.
+    pub generation: u64,
+    /// What kind of entry changed.
+    pub entity: ChangedEntity,
+    /// How it changed.
+    pub kind: ChangeKind,
+    /// The file the entry belongs to: the file itself, the symbol's file,
+    /// the caller's file, or the dependent file.
+    pub path: PathBuf,
+    /// The symbol's or the caller's qualified name; `None` for files and
+    /// file dependencies.
+    pub name: Option<String>,
+    /// The callee's qualified name, or the path the dependent file depends
+    /// on; `None` for files and symbols.
+    pub target: Option<String>,
+}
+
+/// What changed in the index after a given generation.
+///
+/// Returned by [`Tethys::changes_since`](crate::Tethys::changes_since).
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct IndexChanges {
+    /// The generation the changes are relative to.
+    pub since: u64,
+    /// The current generation.
+    pub generation: u64,
+    /// Whether `changes` is everything that changed after `since`. `false`
+    /// when the log no longer reaches back that far, or `since` is from a
+    /// database this one replaced: anything cached at `since` must then be
+    /// dropped.
+    pub complete: bool,
+    /// The changes, oldest generation first.
+    pub changes: Vec<IndexChange>,
+}
+
+/// How the tests reach a symbol.
+///
+/// Returned by [`Tethys::get_test_reach`](crate::Tethys::get_test_reach).
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+pub struct TestReach {
+    /// References on the shortest path from a test: `0` for a test itself,
+    /// `None` when no test reaches the symbol.
+    pub distance: Option<u32>,
+    /// Reached symbols that reference this one from one step closer to a
+    /// test, i.e. how many would have to stop doing so before its distance
+    /// grows. `0` for tests and unreached symbols.
+    pub witnesses: u32,
 }
 
 /// Result of comparing the index against the filesystem.
@@ -1438,13 +1766,25 @@ impl ReachabilityResult {
 // === Panic Point Analysis Types ===
 
 /// The type of panic-inducing call.
+///
+/// Marked `#[non_exhaustive]` so further panicking calls and macros can be
+/// classified without breaking external pattern matches.
 #[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord, Hash, Serialize, Deserialize)]
 #[serde(rename_all = "snake_case")]
+#[non_exhaustive]
 pub enum PanicKind {
     /// `.unwrap()` call
     Unwrap,
     /// `.expect()` call
     Expect,
+    /// `panic!()` invocation
+    Panic,
+    /// `unreachable!()` invocation
+    Unreachable,
+    /// `todo!()` invocation
+    Todo,
+    /// `unimplemented!()` invocation
+    Unimplemented,
 }
 
 impl PanicKind {
@@ -1454,6 +1794,10 @@ impl PanicKind {
         match self {
             Self::Unwrap => "unwrap",
             Self::Expect => "expect",
+            Self::Panic => "panic",
+            Self::Unreachable => "unreachable",
+            Self::Todo => "todo",
+            Self::Unimplemented => "unimplemented",
         }
     }
 
@@ -1463,20 +1807,35 @@ impl PanicKind {
         match s {
             "unwrap" => Some(Self::Unwrap),
             "expect" => Some(Self::Expect),
+            "panic" => Some(Self::Panic),
+            "unreachable" => Some(Self::Unreachable),
+            "todo" => Some(Self::Todo),
+            "unimplemented" => Some(Self::Unimplemented),
             _ => None,
         }
     }
+
+    /// Whether this kind is a macro invocation rather than a method call.
+    #[must_use]
+    pub fn is_macro(&self) -> bool {
+        !matches!(self, Self::Unwrap | Self::Expect)
+    }
 }
 
 impl std::fmt::Display for PanicKind {
     fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
-        write!(f, ".{}()", self.as_str())
+        if self.is_macro() {
+            write!(f, "{}!()", self.as_str())
+        } else {
+            write!(f, ".{}()", self.as_str())
+        }
     }
 }
 
 /// A potential panic point in the codebase.
 ///
-/// Represents a call to `.unwrap()` or `.expect()` that could panic at runtime.
+/// Represents a call to `.unwrap()` or `.expect()`, or a `panic!()`-family
+/// macro invocation, that could panic at runtime.
 #[derive(Debug, Clone, Serialize, Deserialize)]
 #[must_use]
 pub struct PanicPoint {
@@ -1484,7 +1843,7 @@ pub struct PanicPoint {
     pub path: PathBuf,
     /// Line number where the panic point occurs (1-indexed)
     pub line: u32,
-    /// The type of panic call (unwrap or expect)
+    /// The type of panic call (unwrap, expect, or a panicking macro)
     pub kind: PanicKind,
     /// Name of the containing function/method
     pub containing_symbol: String,
@@ -1530,6 +1889,40 @@ impl PanicPoint {
     }
 }
 
+/// Panic points rolled up for one file.
+///
+/// Returned by `Tethys::get_panic_density()`, most production panic points
+/// first.
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct PanicDensity {
+    /// Path to the file (relative to workspace root)
+    pub path: PathBuf,
+    /// Panic points in production code
+    pub production_count: u32,
+    /// Panic points in test code
+    pub test_count: u32,
+    /// Size of the file when it was indexed
+    pub size_bytes: u64,
+}
+
+impl PanicDensity {
+    /// Production panic points per KiB of source. Returns 0.0 for an empty
+    /// file.
+    #[must_use]
+    #[expect(
+        clippy::cast_precision_loss,
+        reason = "source files are far below 2^53 bytes, the largest integer \
+                  f64 represents exactly"
+    )]
+    pub fn per_kib(&self) -> f64 {
+        if self.size_bytes == 0 {
+            0.0
+        } else {
+            f64::from(self.production_count) * 1024.0 / self.size_bytes as f64
+        }
+    }
+}
+
 /// Statistics about the index database.
 ///
 /// Returned by `Tethys::get_stats()`.
@@ -1559,6 +1952,9 @@ pub struct DatabaseStats {
     pub skipped_unknown_languages: usize,
     /// Number of symbols with unrecognized kind (possible version mismatch)
     pub skipped_unknown_kinds: usize,
+    /// Whether the last indexing run was cancelled or failed part way, so
+    /// the counts may be partial (see `Tethys::is_index_complete`)
+    pub incomplete: bool,
 }
 
 #[cfg(test)]
@@ -2153,13 +2549,21 @@ mod tests {
 
     #[test]
     fn panic_kind_parse_unknown_returns_none() {
-        assert_eq!(PanicKind::parse("panic"), None);
+        assert_eq!(PanicKind::parse("unwrap_or"), None);
+        assert_eq!(PanicKind::parse("assert"), None);
         assert_eq!(PanicKind::parse(""), None);
     }
 
     #[test]
     fn panic_kind_roundtrip() {
-        let variants = [PanicKind::Unwrap, PanicKind::Expect];
+        let variants = [
+            PanicKind::Unwrap,
+            PanicKind::Expect,
+            PanicKind::Panic,
+            PanicKind::Unreachable,
+            PanicKind::Todo,
+            PanicKind::Unimplemented,
+        ];
         for kind in variants {
             let str_repr = kind.as_str();
             let parsed = PanicKind::parse(str_repr);
@@ -2171,6 +2575,25 @@ mod tests {
     fn panic_kind_display() {
         assert_eq!(format!("{}", PanicKind::Unwrap), ".unwrap()");
         assert_eq!(format!("{}", PanicKind::Expect), ".expect()");
+        assert_eq!(format!("{}", PanicKind::Panic), "panic!()");
+        assert_eq!(format!("{}", PanicKind::Unreachable), "unreachable!()");
+    }
+
+    #[test]
+    fn panic_density_per_kib() {
+        let density = PanicDensity {
+            path: PathBuf::from("src/lib.rs"),
+            production_count: 3,
+            test_count: 7,
+            size_bytes: 2048,
+        };
+        assert!((density.per_kib() - 1.5).abs() < f64::EPSILON);
+
+        let empty = PanicDensity {
+            size_bytes: 0,
+            ..density
+        };
+        assert!(empty.per_kib().abs() < f64::EPSILON);
     }
 
     // === CrateInfo tests ===
@@ -2229,7 +2652,14 @@ mod tests {
         }
 
         fn arb_panic_kind() -> impl Strategy<Value = PanicKind> {
-            prop_oneof![Just(PanicKind::Unwrap), Just(PanicKind::Expect),]
+            prop_oneof![
+                Just(PanicKind::Unwrap),
+                Just(PanicKind::Expect),
+                Just(PanicKind::Panic),
+                Just(PanicKind::Unreachable),
+                Just(PanicKind::Todo),
+                Just(PanicKind::Unimplemented),
+            ]
         }
 
         fn arb_known_reference_kind() -> impl Strategy<Value = ReferenceKind> {
@@ -2345,6 +2775,8 @@ mod tests {
             error_count: errors,
             errors: vec![],
             server_exit_code: exit_code,
+            cached: 0,
+            skipped: 0,
         }
     }
 
@@ -2370,6 +2802,8 @@ mod tests {
     fn lsp_session_result_has_resolutions_completed() {
         let result = LspSessionResult {
             language: Language::Rust,
+            shard: 0,
+            duration: Duration::ZERO,
             outcome: LspOutcome::Completed(make_completed_session(3, 1, 0, Some(0))),
         };
         assert!(result.has_resolutions());
@@ -2380,6 +2814,8 @@ mod tests {
     fn lsp_session_result_has_errors_server_unavailable() {
         let result = LspSessionResult {
             language: Language::CSharp,
+            shard: 0,
+            duration: Duration::ZERO,
             outcome: LspOutcome::ServerUnavailable {
                 reason: "not installed".to_string(),
                 install_hint: "dotnet tool install csharp-ls".to_string(),
@@ -2394,6 +2830,8 @@ mod tests {
     fn lsp_session_result_nothing_to_resolve() {
         let result = LspSessionResult {
             language: Language::Rust,
+            shard: 0,
+            duration: Duration::ZERO,
             outcome: LspOutcome::NothingToResolve,
         };
         assert!(!result.has_errors());
@@ -2418,13 +2856,21 @@ mod tests {
             lsp_sessions: vec![
                 LspSessionResult {
                     language: Language::Rust,
+                    shard: 0,
+                    duration: Duration::ZERO,
                     outcome: LspOutcome::Completed(make_completed_session(7, 2, 0, Some(0))),
                 },
                 LspSessionResult {
                     language: Language::CSharp,
+                    shard: 0,
+                    duration: Duration::ZERO,
                     outcome: LspOutcome::Completed(make_completed_session(3, 1, 0, Some(0))),
                 },
             ],
+            scip_import: None,
+            extraction_cache: None,
+            cancelled: false,
+            generation: 0,
         };
         assert_eq!(stats.total_lsp_resolved(), 10);
     }
@@ -2441,7 +2887,11 @@ mod tests {
             errors: vec![],
             unresolved_dependencies: vec![],
             lsp_sessions: vec![],
+            scip_import: None,
+            extraction_cache: None,
             arch_phase: None,
+            cancelled: false,
+            generation: 0,
         };
         assert_eq!(stats.total_lsp_resolved(), 0);
         assert!(!stats.has_lsp_errors());
@@ -2581,7 +3031,8 @@ mod tests {
 ///
 /// `PackageId` is part of the public API for symmetry with `FileId` /
 /// `SymbolId`, but no public method takes one as input. Treat it as opaque.
-#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, PartialOrd, Ord)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, PartialOrd, Ord, Serialize, Deserialize)]
+#[serde(transparent)]
 pub struct PackageId(i64);
 
 impl PackageId {
@@ -2614,7 +3065,8 @@ impl std::fmt::Display for PackageId {
 }
 
 /// How a package was discovered. v1 only emits `Manifest`.
-#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+#[serde(rename_all = "lowercase")]
 #[non_exhaustive]
 pub enum PackageSource {
     /// Discovered via Cargo.toml.
@@ -2646,7 +3098,7 @@ impl PackageSource {
 }
 
 /// A discovered package. Identified by `name` (UNIQUE per workspace).
-#[derive(Debug, Clone, PartialEq)]
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
 pub struct Package {
     /// Database row ID.
     pub id: PackageId,
@@ -2659,7 +3111,7 @@ pub struct Package {
 }
 
 /// Coupling metrics for a single package.
-#[derive(Debug, Clone, PartialEq)]
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
 pub struct CouplingMetrics {
     /// The package these metrics describe.
     pub package: Package,
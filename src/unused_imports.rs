@@ -2,12 +2,12 @@
 //!
 //! Reports explicit imports whose bound name is never referenced in the
 //! importing file. Unlike reachability-based analyses, unused-import
-//! detection is purely file-local, so this module re-parses source files
-//! directly (in parallel) rather than querying post-resolution index state —
-//! re-parsing keeps line numbers, sees references *before* same-file
-//! resolution discards their names, and can never be stale relative to disk.
-//! The index is consulted only to corroborate confidence (is the imported
-//! symbol a workspace trait?).
+//! detection is purely file-local: it needs each file's import statements
+//! with lines, the names its references used *before* same-file resolution
+//! discards them, and its textual mentions. Indexing persists exactly those
+//! facts (see `db::unused_imports`), so files whose mtime/size still match
+//! the index are answered from it; stale and unindexed files are re-parsed
+//! (in parallel), so results always reflect the current state on disk.
 //!
 //! ## False-positive posture
 //!
@@ -23,18 +23,21 @@
 //! - Imports that may be traits used invisibly through method-call syntax
 //!   are downgraded to [`UnusedImportConfidence::MaybeTrait`].
 
-use std::path::PathBuf;
+use std::collections::{HashMap, HashSet};
+use std::path::{Path, PathBuf};
 
 use rayon::prelude::*;
 use serde::Serialize;
 use tracing::{debug, warn};
 
 use crate::Tethys;
+use crate::db::normalize_path;
 use crate::error::Result;
-use crate::languages::common::ImportStatement;
+use crate::languages::common::{ImportStatement, referenced_names};
 use crate::languages::module_resolver::{ModuleContext, get_module_resolver};
 use crate::parallel::ParsedFileData;
-use crate::types::{Language, SymbolKind};
+use crate::reindex::is_indexed_file_current;
+use crate::types::{FileId, Language, SymbolKind};
 
 /// How certain the analysis is that an import is genuinely unused.
 #[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize)]
@@ -65,11 +68,52 @@ pub struct UnusedImport {
     pub confidence: UnusedImportConfidence,
 }
 
-/// Per-file parse output retained for analysis.
-struct ParsedForAnalysis {
+/// The file-local facts the analysis runs on, read from the index for
+/// fresh files or taken from a parse for the rest. The per-name maps only
+/// need to answer for the file's bound names.
+#[derive(Debug, Default)]
+struct FileFacts {
     relative_path: PathBuf,
-    data: ParsedFileData,
-    content: String,
+    imports: Vec<ImportStatement>,
+    /// Names referenced before same-file resolution: direct names plus the
+    /// first path segment of qualified references.
+    referenced: HashSet<String>,
+    /// Same-name symbol definitions in the file, per bound name.
+    definitions: HashMap<String, usize>,
+    /// Word-boundary occurrences in the file's text, per bound name.
+    mentions: HashMap<String, usize>,
+}
+
+impl FileFacts {
+    /// Facts from a fresh parse of the file.
+    fn from_parse(data: ParsedFileData) -> Self {
+        let bound: HashSet<&str> = data.imports.iter().flat_map(bound_names).collect();
+        let referenced = referenced_names(&data.references)
+            .into_iter()
+            .map(str::to_string)
+            .collect();
+        let mut definitions = HashMap::new();
+        for sym in data
+            .symbols
+            .iter()
+            .filter(|s| bound.contains(s.name.as_str()))
+        {
+            *definitions.entry(sym.name.clone()).or_insert(0) += 1;
+        }
+        let mentions = data
+            .identifiers
+            .iter()
+            .filter(|i| bound.contains(i.name.as_str()))
+            .map(|i| (i.name.clone(), i.lines.len()))
+            .collect();
+        Self {
+            relative_path: data.relative_path,
+            imports: data.imports,
+            referenced,
+            definitions,
+            mentions,
+        }
+    }
 }
 
 #[expect(
@@ -80,11 +124,12 @@ impl Tethys {
     /// Find explicit imports whose bound name is never referenced in the
     /// importing file.
     ///
-    /// Re-parses workspace source files in parallel; results always reflect
-    /// the current state on disk. The index database is used only to
-    /// upgrade confidence (a name that resolves to a workspace non-trait
-    /// symbol is reported as [`UnusedImportConfidence::Definite`]), so
-    /// running `tethys index` first improves precision but is not required.
+    /// Files unchanged since they were indexed are answered from facts
+    /// stored at index time; modified and unindexed files are re-parsed in
+    /// parallel, so results always reflect the current state on disk and
+    /// running `tethys index` first is not required — only faster. The
+    /// index also upgrades confidence (a name that resolves to a workspace
+    /// non-trait symbol is reported as [`UnusedImportConfidence::Definite`]).
     ///
     /// Currently Rust-only: C# `using` directives are namespace globs,
     /// which this analysis skips by design.
@@ -102,77 +147,146 @@ impl Tethys {
             })
             .collect();
 
+        let (mut facts, stale) = self.stored_import_facts(&rust_files)?;
         debug!(
             file_count = rust_files.len(),
+            from_index = facts.len(),
+            reparsed = stale.len(),
             "Scanning Rust files for unused imports"
         );
+        facts.extend(Self::parse_import_facts(&self.workspace_root, &stale));
 
-        let workspace_root = self.workspace_root.clone();
+        let mut findings = Vec::new();
+        for file in &facts {
+            self.analyze_file(file, &mut findings)?;
+        }
 
-        // Parse in parallel. Files that fail to parse are skipped with a
-        // warning — an unparseable file can't be analyzed, and failing the
-        // whole report over one bad file helps nobody.
-        let parsed: Vec<ParsedForAnalysis> = rust_files
+        // Deterministic output regardless of parallel parse order.
+        findings.sort_by(|a, b| (&a.file, a.line, &a.name).cmp(&(&b.file, b.line, &b.name)));
+
+        Ok(findings)
+    }
+
+    /// Split `rust_files` into facts answered from the index and the files
+    /// that must be re-parsed: unindexed, modified since indexing (the
+    /// mtime/size check `get_stale_files` uses), or indexed without stored
+    /// facts.
+    fn stored_import_facts(
+        &self,
+        rust_files: &[PathBuf],
+    ) -> Result<(Vec<FileFacts>, Vec<PathBuf>)> {
+        let indexed: HashMap<String, (FileId, i64, u64)> = self
+            .db
+            .list_all_files()?
+            .into_iter()
+            .map(|f| (normalize_path(&f.path), (f.id, f.mtime_ns, f.size_bytes)))
+            .collect();
+        let stored = self.db.stored_import_statements()?;
+
+        let candidates: Vec<Option<(FileId, i64, u64)>> = rust_files
+            .iter()
+            .map(|path| {
+                indexed
+                    .get(&normalize_path(self.relative_path(path).as_ref()))
+                    .copied()
+                    .filter(|(id, _, _)| stored.covered.contains(id))
+            })
+            .collect();
+        let fresh: Vec<Option<FileId>> = rust_files
+            .par_iter()
+            .zip(&candidates)
+            .map(|(path, candidate)| {
+                candidate.and_then(|(id, mtime, size)| {
+                    is_indexed_file_current(path, mtime, size).then_some(id)
+                })
+            })
+            .collect();
+
+        let mut statements = stored.statements;
+        let mut by_id: HashMap<FileId, FileFacts> = HashMap::new();
+        let mut stale = Vec::new();
+        for (path, id) in rust_files.iter().zip(fresh) {
+            match id {
+                Some(id) => {
+                    by_id.insert(
+                        id,
+                        FileFacts {
+                            relative_path: self.relative_path(path).into_owned(),
+                            imports: statements.remove(&id).unwrap_or_default(),
+                            ..FileFacts::default()
+                        },
+                    );
+                }
+                None => stale.push(path.clone()),
+            }
+        }
+
+        // Per-name facts, fetched only for names some fresh file could
+        // report.
+        let mut names: Vec<&str> = by_id
+            .values()
+            .flat_map(|f| f.imports.iter().flat_map(bound_names))
+            .collect();
+        names.sort_unstable();
+        names.dedup();
+
+        let referenced = self.db.referenced_name_files(&names)?;
+        let definitions = self.db.symbol_name_counts(&names)?;
+        let occurrences = self.db.identifier_occurrences(&names)?;
+
+        for (id, name) in referenced {
+            if let Some(f) = by_id.get_mut(&id) {
+                f.referenced.insert(name);
+            }
+        }
+        for ((id, name), count) in definitions {
+            if let Some(f) = by_id.get_mut(&id) {
+                f.definitions.insert(name, count);
+            }
+        }
+        for (id, name, lines) in occurrences.occurrences {
+            if let Some(f) = by_id.get_mut(&id) {
+                f.mentions.insert(name, lines.len());
+            }
+        }
+
+        let mut facts = Vec::with_capacity(by_id.len());
+        for (id, f) in by_id {
+            // Written in the same transaction as the import facts, so this
+            // only trips on an index from before either existed.
+            if occurrences.covered.contains(&id) {
+                facts.push(f);
+            } else {
+                stale.push(self.workspace_root.join(&f.relative_path));
+            }
+        }
+        Ok((facts, stale))
+    }
+
+    /// Re-parse `files` in parallel. Files that fail to parse are skipped
+    /// with a warning — an unparseable file can't be analyzed, and failing
+    /// the whole report over one bad file helps nobody.
+    fn parse_import_facts(workspace_root: &Path, files: &[PathBuf]) -> Vec<FileFacts> {
+        files
             .par_iter()
             .filter_map(|file_path| {
-                let data = match Self::parse_file_static(&workspace_root, file_path, Language::Rust)
-                {
-                    Ok(d) => d,
+                match Self::parse_file_static(workspace_root, file_path, Language::Rust, None) {
+                    Ok(data) => Some(FileFacts::from_parse(data)),
                     Err(e) => {
                         warn!(
                             file = %file_path.display(),
                             error = %e,
                             "Skipping file in unused-import analysis (parse failed)"
                         );
-                        return None;
-                    }
-                };
-                // Re-read for the textual guard. parse_file_static reads
-                // internally but doesn't return the content; a second read
-                // of an OS-cached file is cheap and keeps its signature
-                // untouched.
-                let content = match std::fs::read_to_string(file_path) {
-                    Ok(c) => c,
-                    Err(e) => {
-                        warn!(
-                            file = %file_path.display(),
-                            error = %e,
-                            "Skipping file in unused-import analysis (read failed)"
-                        );
-                        return None;
+                        None
                     }
-                };
-                Some(ParsedForAnalysis {
-                    relative_path: data.relative_path.clone(),
-                    data,
-                    content,
-                })
+                }
             })
-            .collect();
-
-        let mut findings = Vec::new();
-        for file in &parsed {
-            self.analyze_file(file, &mut findings)?;
-        }
-
-        // Deterministic output regardless of parallel parse order.
-        findings.sort_by(|a, b| (&a.file, a.line, &a.name).cmp(&(&b.file, b.line, &b.name)));
-
-        Ok(findings)
+            .collect()
     }
 
-    /// Analyze one parsed file, appending findings.
-    fn analyze_file(
-        &self,
-        file: &ParsedForAnalysis,
-        findings: &mut Vec<UnusedImport>,
-    ) -> Result<()> {
-        // Names actually referenced in the file: direct names plus the first
-        // path segment of qualified references (`db::open()` marks `db` used).
-        // Shared with compute_dependencies via `common::referenced_names` so
-        // both agree on which imports count as used.
-        let referenced = crate::languages::common::referenced_names(&file.data.references);
-
+    /// Analyze one file's facts, appending findings.
+    fn analyze_file(&self, file: &FileFacts, findings: &mut Vec<UnusedImport>) -> Result<()> {
         let resolver = get_module_resolver(Language::Rust);
         let full_path = self.workspace_root.join(&file.relative_path);
         let module_ctx = ModuleContext {
@@ -182,35 +296,12 @@ impl Tethys {
             namespaces: None,
         };
 
-        for import in &file.data.imports {
-            // Glob imports: usage indeterminable, skip by design.
-            if import.is_glob {
-                continue;
-            }
-            // Re-exports (`pub use`) are API surface, not local usage —
-            // whether anything *external* consumes them is a different
-            // analysis (dead re-export detection over the whole index).
-            if import.is_reexport {
-                continue;
-            }
-            // `use foo::Bar as _;` imports a trait for method syntax only —
-            // explicitly intentional, never report.
-            if import.alias.as_deref() == Some("_") {
-                continue;
-            }
-
-            for name in &import.imported_names {
-                let bound_name: &str = if name == "self" {
-                    // `use foo::bar::{self, X}` binds the module name `bar`.
-                    match import.path.last() {
-                        Some(last) => last,
-                        None => continue,
-                    }
-                } else {
-                    import.alias.as_deref().unwrap_or(name)
-                };
-
-                if referenced.contains(bound_name) {
+        for import in &file.imports {
+            for (name, bound_name) in reportable_bindings(import) {
+                // Referenced names are shared with compute_dependencies via
+                // `common::referenced_names` (`db::open()` marks `db` used),
+                // so both agree on which imports count as used.
+                if file.referenced.contains(bound_name) {
                     continue;
                 }
 
@@ -225,14 +316,9 @@ impl Tethys {
                 // puts the module name in the file twice (the decl + the use
                 // path) with zero real uses. The declaration is not a use, so
                 // it must not mask the redundant import.
-                let non_usage_occurrences = count_in_use_statements(&file.data.imports, bound_name)
-                    + file
-                        .data
-                        .symbols
-                        .iter()
-                        .filter(|s| s.name == bound_name)
-                        .count();
-                if count_word_occurrences(&file.content, bound_name) > non_usage_occurrences {
+                let non_usage_occurrences = count_in_use_statements(&file.imports, bound_name)
+                    + file.definitions.get(bound_name).copied().unwrap_or(0);
+                if file.mentions.get(bound_name).copied().unwrap_or(0) > non_usage_occurrences {
                     continue;
                 }
 
@@ -317,41 +403,56 @@ fn count_in_use_statements(imports: &[ImportStatement], name: &str) -> usize {
         .sum()
 }
 
-/// Count word-boundary occurrences of `name` in `content`.
+/// The `(imported_name, bound_name)` pairs of `import` the analysis may
+/// report. Whole statements are skipped when usage is indeterminable or
+/// deliberately invisible:
 ///
-/// A match counts only when not surrounded by identifier characters
-/// (`[A-Za-z0-9_]`), so `Bar` does not match inside `FooBar` or `Bar2`.
-fn count_word_occurrences(content: &str, name: &str) -> usize {
-    if name.is_empty() {
-        return 0;
-    }
-    let bytes = content.as_bytes();
-    let mut count = 0;
-    let mut start = 0;
-    while let Some(pos) = content[start..].find(name) {
-        let abs = start + pos;
-        let end = abs + name.len();
-        let before_ok = abs == 0 || !is_ident_byte(bytes[abs - 1]);
-        let after_ok = end >= bytes.len() || !is_ident_byte(bytes[end]);
-        if before_ok && after_ok {
-            count += 1;
-        }
-        // Advance past this match position (byte-safe: `find` returns
-        // char-boundary offsets and `name` is well-formed UTF-8).
-        start = abs + name.len().max(1);
+/// - Glob imports: usage indeterminable, skipped by design.
+/// - Re-exports (`pub use`) are API surface, not local usage — whether
+///   anything *external* consumes them is a different analysis (dead
+///   re-export detection over the whole index).
+/// - `use foo::Bar as _;` imports a trait for method syntax only —
+///   explicitly intentional, never reported.
+///
+/// `use foo::bar::{self, X}` binds the module name `bar` for `self`.
+fn reportable_bindings(import: &ImportStatement) -> Vec<(&str, &str)> {
+    if import.is_glob || import.is_reexport || import.alias.as_deref() == Some("_") {
+        return Vec::new();
     }
-    count
+    import
+        .imported_names
+        .iter()
+        .filter_map(|name| {
+            let bound: &str = if name == "self" {
+                import.path.last()?
+            } else {
+                import.alias.as_deref().unwrap_or(name)
+            };
+            Some((name.as_str(), bound))
+        })
+        .collect()
 }
 
-/// Whether a byte is an identifier character for word-boundary purposes.
-fn is_ident_byte(b: u8) -> bool {
-    b.is_ascii_alphanumeric() || b == b'_'
+/// Bound names of `import` the textual guard needs counts for.
+fn bound_names(import: &ImportStatement) -> impl Iterator<Item = &str> {
+    reportable_bindings(import)
+        .into_iter()
+        .map(|(_, bound)| bound)
 }
 
 #[cfg(test)]
 mod tests {
     use super::*;
 
+    /// Single-name view of the identifier tokenizer, as the textual guard
+    /// sees it (for parsed and stored files alike).
+    fn count_word_occurrences(content: &str, name: &str) -> usize {
+        crate::identifiers::extract_identifier_lines(content)
+            .into_iter()
+            .find(|i| i.name == name)
+            .map_or(0, |i| i.lines.len())
+    }
+
     #[test]
     fn word_occurrences_respects_boundaries() {
         assert_eq!(count_word_occurrences("Bar FooBar Bar2 _Bar Bar", "Bar"), 2);
@@ -722,4 +823,88 @@ mod tests {
         assert_eq!(findings[0].name, "db");
         assert_eq!(findings[0].confidence, UnusedImportConfidence::Definite);
     }
+
+    /// Indexed (answered from stored facts) and unindexed (re-parsed)
+    /// workspaces with identical sources must report identically.
+    #[test]
+    fn stored_facts_agree_with_reparse() {
+        let files = [
+            ("Cargo.toml", CARGO_TOML),
+            (
+                "src/lib.rs",
+                "pub mod db;\npub mod util;\nuse crate::db::{self};\n\
+                 use crate::util::{helper, parse, Config as Cfg, Greet};\n\
+                 use std::collections::*;\n\
+                 use std::fmt::Write as _;\n\
+                 pub use util::other;\n\n\
+                 /// Uses [`Greet`].\n\
+                 pub fn entry(v: Vec<i32>) -> Vec<i32> { v.into_iter().map(parse).collect() }\n",
+            ),
+            ("src/db.rs", "pub fn thing() {}\n"),
+            (
+                "src/util.rs",
+                "pub fn helper() {}\npub fn other() {}\n\
+                 pub fn parse(x: i32) -> i32 { x }\n\
+                 pub struct Config;\npub trait Greet {}\n",
+            ),
+        ];
+        let (_indexed_dir, indexed) = workspace(&files);
+
+        let dir = tempfile::tempdir().expect("tempdir");
+        for (rel, content) in &files {
+            let full = dir.path().join(rel);
+            std::fs::create_dir_all(full.parent().expect("parent")).expect("mkdir");
+            std::fs::write(&full, content).expect("write fixture");
+        }
+        let unindexed = Tethys::new(dir.path()).expect("Tethys::new");
+
+        let summarize = |findings: Vec<UnusedImport>| {
+            findings
+                .into_iter()
+                .map(|f| (f.file, f.line, f.name, f.source_module))
+                .collect::<Vec<_>>()
+        };
+        let stored = summarize(indexed.find_unused_imports().expect("stored scan"));
+        let names: Vec<&str> = stored.iter().map(|f| f.2.as_str()).collect();
+        assert_eq!(names, ["db", "Cfg", "helper"], "{stored:?}");
+        assert_eq!(
+            stored,
+            summarize(unindexed.find_unused_imports().expect("parsed scan"))
+        );
+    }
+
+    /// A file edited after indexing fails the mtime/size check and is
+    /// re-parsed, so findings track the disk rather than the stale index.
+    #[test]
+    fn file_modified_after_indexing_is_reparsed() {
+        let (dir, tethys) = workspace(&[
+            ("Cargo.toml", CARGO_TOML),
+            (
+                "src/lib.rs",
+                "pub mod util;
+use crate::util::helper;
+
+pub fn entry() {}
+",
+            ),
+            (
+                "src/util.rs",
+                "pub fn helper() {}
+",
+            ),
+        ]);
+        assert_eq!(tethys.find_unused_imports().expect("scan").len(), 1);
+
+        std::fs::write(
+            dir.path().join("src/lib.rs"),
+            "pub mod util;
+use crate::util::helper;
+
+pub fn entry() { helper(); }
+",
+        )
+        .expect("edit");
+        let findings = tethys.find_unused_imports().expect("rescan");
+        assert!(findings.is_empty(), "edit must be seen: {findings:?}");
+    }
 }
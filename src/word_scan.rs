@@ -0,0 +1,186 @@
+//! Multi-pattern word-boundary scanner for the textual analyses.
+//!
+//! Dead-code tiering asks "where does this identifier occur as a whole
+//! word?" for many names at once, over files the index holds no stored
+//! occurrences for. [`WordScanner`] compiles every name into one
+//! Aho-Corasick automaton and answers for all of them in a single pass over
+//! each source, instead of one `find` loop per name (`O(names × bytes)`).
+//!
+//! # Boundary rule
+//!
+//! A hit counts only when the bytes on either side are not identifier
+//! characters (`[A-Za-z0-9_]`), so `Bar` does not match inside `FooBar`,
+//! `Bar2`, or `_Bar`. Non-ASCII characters act as separators — the rule
+//! [`crate::identifiers`] tokenizes by, so scanned and indexed answers
+//! agree.
+//!
+//! Leftmost-longest, non-overlapping matching is exact under this rule for
+//! identifier-only names: a word-boundary hit can never start inside, or
+//! share a start with, a longer identifier match, because either would
+//! require an identifier character where the hit needs a boundary. Names
+//! containing other characters are still matched, but a hit overlapping
+//! an earlier non-boundary match of a different name can be missed.
+//!
+//! Public (but hidden) only so the benches can drive it directly.
+
+use std::path::{Path, PathBuf};
+
+use aho_corasick::{AhoCorasick, MatchKind};
+use rayon::prelude::*;
+
+use crate::error::{Error, Result};
+
+/// One word-boundary occurrence found by [`WordScanner`].
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub struct WordHit {
+    /// Index into [`WordScanner::names`].
+    pub name: usize,
+    /// 1-based line of the occurrence.
+    pub line: u32,
+}
+
+/// A compiled set of names, scanned for together.
+#[derive(Debug)]
+pub struct WordScanner {
+    automaton: AhoCorasick,
+    names: Vec<String>,
+}
+
+impl WordScanner {
+    /// Compile `names` (deduplicated; empty names dropped) into one
+    /// automaton.
+    ///
+    /// # Errors
+    ///
+    /// [`Error::Internal`] if the automaton exceeds the builder's size
+    /// limits.
+    pub fn new<I, S>(names: I) -> Result<Self>
+    where
+        I: IntoIterator<Item = S>,
+        S: Into<String>,
+    {
+        let mut names: Vec<String> = names
+            .into_iter()
+            .map(Into::into)
+            .filter(|n| !n.is_empty())
+            .collect();
+        names.sort_unstable();
+        names.dedup();
+
+        let automaton = AhoCorasick::builder()
+            .match_kind(MatchKind::LeftmostLongest)
+            .build(&names)
+            .map_err(|e| Error::Internal(format!("cannot build word scanner: {e}")))?;
+        Ok(Self { automaton, names })
+    }
+
+    /// The compiled names, sorted; [`WordHit::name`] indexes this slice.
+    #[must_use]
+    pub fn names(&self) -> &[String] {
+        &self.names
+    }
+
+    /// Every word-boundary occurrence in `content`, in text order.
+    #[must_use]
+    pub fn occurrences(&self, content: &str) -> Vec<WordHit> {
+        let bytes = content.as_bytes();
+        let mut hits = Vec::new();
+        let mut line = 1u32;
+        let mut counted_to = 0usize;
+        for m in self.automaton.find_iter(content) {
+            let before_ok = m.start() == 0 || !is_ident_byte(bytes[m.start() - 1]);
+            let after_ok = m.end() >= bytes.len() || !is_ident_byte(bytes[m.end()]);
+            if !(before_ok && after_ok) {
+                continue;
+            }
+            let newlines = bytes[counted_to..m.start()]
+                .iter()
+                .filter(|&&b| b == b'\n')
+                .count();
+            line = line.saturating_add(u32::try_from(newlines).unwrap_or(u32::MAX));
+            counted_to = m.start();
+            hits.push(WordHit {
+                name: m.pattern().as_usize(),
+                line,
+            });
+        }
+        hits
+    }
+
+    /// Scan many in-memory sources in parallel, one result per source in
+    /// input order.
+    #[must_use]
+    pub fn scan_all<T: AsRef<str> + Sync>(&self, sources: &[T]) -> Vec<Vec<WordHit>> {
+        sources
+            .par_iter()
+            .map(|s| self.occurrences(s.as_ref()))
+            .collect()
+    }
+
+    /// Read and scan `paths` (relative to `root`) in parallel, one result
+    /// per path in input order. Unreadable files yield their I/O error
+    /// rather than failing the whole scan.
+    #[must_use]
+    pub fn scan_files(&self, root: &Path, paths: &[PathBuf]) -> Vec<std::io::Result<Vec<WordHit>>> {
+        paths
+            .par_iter()
+            .map(|p| std::fs::read_to_string(root.join(p)).map(|c| self.occurrences(&c)))
+            .collect()
+    }
+}
+
+/// Whether a byte is an identifier character for word-boundary purposes.
+fn is_ident_byte(b: u8) -> bool {
+    b.is_ascii_alphanumeric() || b == b'_'
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn count(content: &str, name: &str) -> usize {
+        WordScanner::new([name])
+            .expect("scanner")
+            .occurrences(content)
+            .len()
+    }
+
+    #[test]
+    fn respects_identifier_boundaries() {
+        assert_eq!(count("Bar FooBar Bar2 _Bar Bar", "Bar"), 2);
+        assert_eq!(count("", "Bar"), 0);
+        assert_eq!(count("Bar", ""), 0);
+        assert_eq!(count("Bar::baz()", "Bar"), 1);
+        assert_eq!(count("x.bar()", "bar"), 1);
+    }
+
+    #[test]
+    fn many_names_in_one_pass_with_lines() {
+        let scanner = WordScanner::new(["foo", "foo_bar", "bar", "foo"]).expect("scanner");
+        assert_eq!(
+            scanner.names(),
+            ["bar", "foo", "foo_bar"],
+            "sorted, deduplicated"
+        );
+        let hits = scanner.occurrences("foo_bar(foo)\n\nbar; foobar\n// foo\n");
+        let named: Vec<(&str, u32)> = hits
+            .iter()
+            .map(|h| (scanner.names()[h.name].as_str(), h.line))
+            .collect();
+        assert_eq!(named, [("foo_bar", 1), ("foo", 1), ("bar", 3), ("foo", 4)]);
+    }
+
+    #[test]
+    fn parallel_scans_preserve_input_order() {
+        let scanner = WordScanner::new(["x"]).expect("scanner");
+        let results = scanner.scan_all(&["x", "y", "\nx x"]);
+        assert_eq!(results.iter().map(Vec::len).collect::<Vec<_>>(), [1, 0, 2]);
+        assert_eq!(results[2][1].line, 2);
+
+        let dir = tempfile::tempdir().expect("tempdir");
+        std::fs::write(dir.path().join("a.rs"), "x\n").expect("write");
+        let files = scanner.scan_files(dir.path(), &[PathBuf::from("a.rs"), PathBuf::from("b.rs")]);
+        assert_eq!(files[0].as_ref().expect("readable").len(), 1);
+        assert!(files[1].is_err(), "missing file reports its error");
+    }
+}
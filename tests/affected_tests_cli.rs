@@ -453,3 +453,120 @@ fn human_mode_shares_exit_and_reason_contract() {
         "human report must still list found tests:\n{stdout}"
     );
 }
+
+/// Two helpers, each with its own test, so a patch touching one helper's
+/// body distinguishes symbol-granular selection from file-level selection.
+const TWO_HELPERS_RS: &str = "pub fn double(x: i32) -> i32 {
+    x * 2
+}
+
+pub fn triple(x: i32) -> i32 {
+    x * 3
+}
+
+#[test]
+fn test_double() {
+    assert_eq!(double(2), 4);
+}
+
+#[test]
+fn test_triple() {
+    assert_eq!(triple(2), 6);
+}
+";
+
+/// A zero-context patch changing only the body of `triple` (line 6).
+const TRIPLE_PATCH: &str = "diff --git a/src/lib.rs b/src/lib.rs
+--- a/src/lib.rs
++++ b/src/lib.rs
+@@ -6 +6 @@ pub fn triple(x: i32) -> i32 {
+-    x * 3
++    x + x + x
+";
+
+/// `--diff <patch>` selects only the test reaching the changed symbol,
+/// where the file-level query would select both tests in the file.
+#[test]
+fn diff_selects_tests_at_symbol_granularity() {
+    let ws = fixture_workspace();
+    std::fs::write(ws.path().join("src/lib.rs"), TWO_HELPERS_RS).expect("write lib.rs");
+    index(ws.path());
+    let patch = ws.path().join("triple.patch");
+    std::fs::write(&patch, TRIPLE_PATCH).expect("write patch");
+
+    let out = run_tethys(
+        ws.path(),
+        &[
+            "affected-tests",
+            "--names-only",
+            "--diff",
+            patch.to_str().expect("utf-8 tempdir"),
+        ],
+        None,
+    );
+    assert_eq!(
+        exit_code(&out),
+        0,
+        "stderr: {}",
+        String::from_utf8_lossy(&out.stderr)
+    );
+    let lines = stdout_lines(&out);
+    assert!(
+        lines.len() == 1 && lines[0].ends_with("test_triple"),
+        "expected only test_triple, got: {lines:?}"
+    );
+
+    let file_level = run_tethys(
+        ws.path(),
+        &["affected-tests", "--names-only", "src/lib.rs"],
+        None,
+    );
+    assert_eq!(stdout_lines(&file_level).len(), 2);
+}
+
+/// A patch blanking a comment between the helpers (line 4) and rewriting
+/// the attribute above `test_triple` (line 14): neither line lies in a
+/// symbol span, but only the attribute counts, toward the test below it.
+const ANNOTATION_PATCH: &str = "diff --git a/src/lib.rs b/src/lib.rs
+--- a/src/lib.rs
++++ b/src/lib.rs
+@@ -4 +4 @@
+-// spacer
++
+@@ -14 +14 @@
+-#[cfg_attr(miri, ignore)]
++#[test]
+";
+
+/// Blank, comment and attribute lines outside every span keep `--diff`
+/// symbol-granular instead of falling back to the whole file.
+#[test]
+fn diff_ignores_trivia_and_attaches_attributes_to_the_item_below() {
+    let ws = fixture_workspace();
+    std::fs::write(ws.path().join("src/lib.rs"), TWO_HELPERS_RS).expect("write lib.rs");
+    index(ws.path());
+    let patch = ws.path().join("annotation.patch");
+    std::fs::write(&patch, ANNOTATION_PATCH).expect("write patch");
+
+    let out = run_tethys(
+        ws.path(),
+        &[
+            "affected-tests",
+            "--names-only",
+            "--diff",
+            patch.to_str().expect("utf-8 tempdir"),
+        ],
+        None,
+    );
+    assert_eq!(
+        exit_code(&out),
+        0,
+        "stderr: {}",
+        String::from_utf8_lossy(&out.stderr)
+    );
+    let lines = stdout_lines(&out);
+    assert!(
+        lines.len() == 1 && lines[0].ends_with("test_triple"),
+        "expected only test_triple, got: {lines:?}"
+    );
+}
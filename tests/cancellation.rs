@@ -0,0 +1,110 @@
+//! Integration tests for `CancellationToken`: queries under
+//! `Tethys::with_cancellation` and index runs under
+//! `IndexOptions::cancellation`.
+//!
+//! A cancelled query fails with `Error::Cancelled`; a cancelled index run
+//! returns `Ok` with `IndexStats::cancelled` set and leaves an index the
+//! next run completes normally.
+
+mod common;
+
+use std::time::{Duration, Instant};
+
+use common::workspace_with_files;
+use tethys::{CancellationToken, Error, IndexOptions};
+
+/// Two files importing each other: one dependency cycle.
+const CYCLE_FILES: &[(&str, &str)] = &[
+    (
+        "src/lib.rs",
+        "mod a;\nmod b;\n\npub fn root() {\n    a::from_a();\n}\n",
+    ),
+    (
+        "src/a.rs",
+        "use crate::b::from_b;\n\npub fn from_a() {\n    from_b();\n}\n",
+    ),
+    (
+        "src/b.rs",
+        "use crate::a::from_a;\n\npub fn from_b() {\n    from_a();\n}\n",
+    ),
+];
+
+#[test]
+fn cancelled_token_fails_query_before_it_runs() {
+    let (_dir, mut tethys) = workspace_with_files(CYCLE_FILES);
+    tethys.index().expect("index failed");
+    let token = CancellationToken::new();
+    token.cancel();
+
+    let mut ran = false;
+    let result = tethys.with_cancellation(&token, |t| {
+        ran = true;
+        t.detect_cycles()
+    });
+
+    assert!(matches!(result, Err(Error::Cancelled)), "got {result:?}");
+    assert!(!ran, "a query under a cancelled token must not start");
+}
+
+#[test]
+fn token_cancelled_mid_query_fails_it() {
+    let (_dir, mut tethys) = workspace_with_files(CYCLE_FILES);
+    tethys.index().expect("index failed");
+    let token = CancellationToken::new();
+
+    let result = tethys.with_cancellation(&token, |t| {
+        let stats = t.get_stats()?;
+        token.cancel();
+        t.detect_cycles().map(|cycles| (stats, cycles))
+    });
+
+    assert!(matches!(result, Err(Error::Cancelled)), "got {result:?}");
+}
+
+#[test]
+fn live_token_returns_the_query_result() {
+    let (_dir, mut tethys) = workspace_with_files(CYCLE_FILES);
+    tethys.index().expect("index failed");
+    let token = CancellationToken::with_timeout(Duration::from_secs(3600));
+
+    let cycles = tethys
+        .with_cancellation(&token, tethys::Tethys::detect_cycles)
+        .expect("query under a live token");
+
+    assert_eq!(cycles.len(), tethys.detect_cycles().expect("cycles").len());
+    assert!(!cycles.is_empty(), "a.rs and b.rs import each other");
+}
+
+#[test]
+fn expired_deadline_stops_indexing_with_partial_stats() {
+    let (_dir, mut tethys) = workspace_with_files(CYCLE_FILES);
+    let token = CancellationToken::with_deadline(Instant::now());
+
+    let stats = tethys
+        .index_with_options(IndexOptions::default().cancellation(token))
+        .expect("a cancelled run still returns stats");
+
+    assert!(stats.cancelled);
+    assert_eq!(stats.files_indexed, 0);
+    assert!(stats.arch_phase.is_none(), "later phases must not run");
+}
+
+#[test]
+fn index_after_a_cancelled_run_is_complete() {
+    let (_dir, mut tethys) = workspace_with_files(CYCLE_FILES);
+    let token = CancellationToken::new();
+    token.cancel();
+    tethys
+        .index_with_options(IndexOptions::with_streaming().cancellation(token))
+        .expect("cancelled run");
+    assert!(!tethys.is_index_complete().expect("completeness"));
+    assert!(tethys.get_stats().expect("stats").incomplete);
+
+    let stats = tethys.index().expect("index failed");
+
+    assert!(!stats.cancelled);
+    assert!(tethys.is_index_complete().expect("completeness"));
+    assert!(!tethys.get_stats().expect("stats").incomplete);
+    assert_eq!(stats.files_indexed, 3);
+    assert!(!tethys.detect_cycles().expect("cycles").is_empty());
+}
@@ -53,3 +53,68 @@ pub fn workspace_with_files(files: &[(&str, &str)]) -> (TempDir, Tethys) {
 pub fn open_db(tethys: &Tethys) -> Connection {
     Connection::open(tethys.db_path()).expect("opening tethys.db should succeed")
 }
+
+/// A workspace with two `area` methods and, on `src/lib.rs` line 6,
+/// `call_line`: calls on receivers Pass 2 cannot type (`c: Circle`,
+/// `s: Square`), which stay unresolved without Pass 3 (ambiguous name).
+///
+/// In `src/shapes.rs`, `Circle::area` is on line 13 and `Square::area` on
+/// line 19.
+pub fn shapes_workspace(call_line: &str) -> (TempDir, Tethys) {
+    let lib = format!(
+        "pub mod shapes;\n\
+         \n\
+         pub fn total() -> u32 {{\n\
+         \x20   let c = shapes::circle();\n\
+         \x20   let s = shapes::square();\n\
+         {call_line}\n\
+         }}\n"
+    );
+    workspace_with_files(&[
+        ("src/lib.rs", &lib),
+        (
+            "src/shapes.rs",
+            "pub struct Circle;\n\
+             pub struct Square;\n\
+             \n\
+             pub fn circle() -> Circle {\n\
+             \x20   Circle\n\
+             }\n\
+             \n\
+             pub fn square() -> Square {\n\
+             \x20   Square\n\
+             }\n\
+             \n\
+             impl Circle {\n\
+             \x20   pub fn area(&self) -> u32 {\n\
+             \x20       3\n\
+             \x20   }\n\
+             }\n\
+             \n\
+             impl Square {\n\
+             \x20   pub fn area(&self) -> u32 {\n\
+             \x20       4\n\
+             \x20   }\n\
+             }\n",
+        ),
+    ])
+}
+
+/// (column, strategy, target `qualified_name`) of each call on `src/lib.rs`
+/// line 6 of a [`shapes_workspace`], in column order.
+pub fn area_calls(tethys: &Tethys) -> Vec<(u32, Option<String>, Option<String>)> {
+    let conn = open_db(tethys);
+    let mut stmt = conn
+        .prepare(
+            "SELECT r.column, r.strategy, ts.qualified_name
+             FROM refs r JOIN files f ON f.id = r.file_id
+             LEFT JOIN symbols ts ON ts.id = r.symbol_id
+             WHERE f.path = 'src/lib.rs' AND r.line = 6 AND r.kind = 'call'
+             ORDER BY r.column",
+        )
+        .expect("prepare");
+    stmt.query_map([], |row| Ok((row.get(0)?, row.get(1)?, row.get(2)?)))
+        .expect("query")
+        .collect::<Result<_, _>>()
+        .expect("collect")
+}
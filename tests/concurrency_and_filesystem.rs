@@ -174,22 +174,35 @@ fn rebuild_clears_and_reindexes_cleanly() {
 }
 
 #[test]
-fn update_maps_index_stats_to_index_update_fields() {
-    let (_dir, mut tethys) =
-        workspace_with_files(&[("src/lib.rs", "pub fn hello() {}\npub struct Config {}\n")]);
+fn update_reindexes_only_changed_files() {
+    let (dir, mut tethys) = workspace_with_files(&[
+        ("src/lib.rs", "pub mod other;\npub fn hello() {}\n"),
+        ("src/other.rs", "pub struct Config {}\n"),
+    ]);
 
     tethys.index().expect("initial index should succeed");
     let update = tethys.update().expect("update should succeed");
+    assert_eq!(update.files_changed, 0, "nothing changed since the index");
+    assert_eq!(update.files_unchanged, 2);
+
+    std::fs::write(
+        dir.path().join("src/other.rs"),
+        "pub struct Config {}\npub struct Extra {}\n",
+    )
+    .expect("rewrite other.rs");
+    let update = tethys.update().expect("update should succeed");
 
-    assert!(
-        update.files_changed > 0,
-        "update should report changed files"
-    );
     assert_eq!(
-        update.files_unchanged, 0,
-        "update currently re-indexes everything so nothing is unchanged"
+        update.files_changed, 1,
+        "only other.rs should be re-indexed"
     );
+    assert_eq!(update.files_unchanged, 1);
+    assert_eq!(update.files_removed, 0);
     assert!(update.duration > std::time::Duration::ZERO);
+    assert!(
+        tethys.get_symbol("Extra").expect("lookup").is_some(),
+        "the new symbol should be indexed"
+    );
 }
 
 #[test]
@@ -0,0 +1,117 @@
+//! The extraction cache (`IndexOptions::extraction_cache`): content seen
+//! in an earlier run is read back instead of re-parsed, and the index it
+//! produces is the one a full parse builds.
+
+mod common;
+
+use std::fs;
+
+use common::{open_db, workspace_with_files};
+use tethys::{IndexOptions, Tethys};
+
+const FILES: &[(&str, &str)] = &[
+    ("src/lib.rs", "pub mod core;\npub mod app;\n"),
+    (
+        "src/core.rs",
+        "/// Doubles.\n#[inline]\npub fn compute(x: i64) -> i64 {\n    x * 2\n}\n",
+    ),
+    (
+        "src/app.rs",
+        "use crate::core::compute;\n\npub fn run() -> i64 {\n    compute(1)\n}\n",
+    ),
+];
+
+const APP_ON_BRANCH: &str =
+    "use crate::core::compute;\n\npub fn run() -> i64 {\n    compute(1) + compute(2)\n}\n";
+
+const CACHE: u64 = 64 * 1024 * 1024;
+
+/// Row counts that differ if a cached extraction diverged from a parse.
+fn shape(tethys: &Tethys) -> [i64; 6] {
+    let conn = open_db(tethys);
+    [
+        "SELECT COUNT(*) FROM symbols",
+        "SELECT COUNT(*) FROM refs",
+        "SELECT COUNT(*) FROM refs WHERE symbol_id IS NOT NULL",
+        "SELECT COUNT(*) FROM imports",
+        "SELECT COUNT(*) FROM attributes",
+        "SELECT COUNT(*) FROM call_edges",
+    ]
+    .map(|sql| conn.query_row(sql, [], |row| row.get(0)).expect(sql))
+}
+
+#[test]
+fn rebuild_reads_every_file_from_the_cache() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+
+    let first = tethys
+        .index_with_options(IndexOptions::default().extraction_cache(CACHE))
+        .expect("first index");
+    let first_cache = first.extraction_cache.expect("cache enabled");
+    assert_eq!((first_cache.hits, first_cache.misses), (0, 3));
+    let parsed = shape(&tethys);
+
+    let rebuilt = tethys
+        .rebuild_with_options(IndexOptions::default().extraction_cache(CACHE))
+        .expect("rebuild");
+    let cache = rebuilt.extraction_cache.expect("cache enabled");
+
+    assert_eq!((cache.hits, cache.misses), (3, 0));
+    assert_eq!(rebuilt.symbols_found, first.symbols_found);
+    assert_eq!(shape(&tethys), parsed);
+}
+
+#[test]
+fn switching_back_to_a_branch_hits_its_content() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    let app = dir.path().join("src/app.rs");
+    let options = || IndexOptions::default().extraction_cache(CACHE);
+
+    tethys.index_with_options(options()).expect("index main");
+    let on_main = shape(&tethys);
+
+    fs::write(&app, APP_ON_BRANCH).expect("switch to branch");
+    let branch = tethys
+        .update_with_options(options())
+        .expect("update branch");
+    assert_eq!(branch.files_changed, 1);
+
+    fs::write(&app, FILES[2].1).expect("switch back to main");
+    let stats = tethys
+        .rebuild_with_options(options())
+        .expect("rebuild on main");
+    let cache = stats.extraction_cache.expect("cache enabled");
+
+    assert_eq!(cache.misses, 0, "main's app.rs was cached on the first run");
+    assert_eq!(shape(&tethys), on_main);
+}
+
+#[test]
+fn streaming_mode_uses_the_cache_too() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+    tethys
+        .index_with_options(IndexOptions::default().extraction_cache(CACHE))
+        .expect("seed the cache");
+    let parsed = shape(&tethys);
+
+    let stats = tethys
+        .rebuild_with_options(IndexOptions::with_streaming().extraction_cache(CACHE))
+        .expect("streaming rebuild");
+
+    assert_eq!(stats.extraction_cache.expect("cache enabled").hits, 3);
+    assert_eq!(shape(&tethys), parsed);
+}
+
+#[test]
+fn cache_is_off_by_default() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+
+    let stats = tethys.index().expect("index");
+
+    assert!(stats.extraction_cache.is_none());
+    assert!(
+        !dir.path()
+            .join(".rivets/index/extraction-cache.db")
+            .exists()
+    );
+}
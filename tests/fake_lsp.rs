@@ -0,0 +1,224 @@
+//! Integration tests for Pass 3 and `CallerMode::LspRefined` against the
+//! scripted `tethys-fake-lsp` server, so LSP behaviour is covered without
+//! rust-analyzer installed.
+//!
+//! Run with: `cargo test --features fake-lsp --test fake_lsp`
+//!
+//! `fixtures/fake_lsp/shapes.json` answers the two `area` calls of
+//! [`common::shapes_workspace`] with their `impl` methods.
+
+#![cfg(feature = "fake-lsp")]
+
+mod common;
+
+use std::path::Path;
+
+use common::{area_calls, shapes_workspace, workspace_with_files};
+use serde_json::{Value, json};
+use tethys::lsp::{DefinitionQueries, LspProvider, ReadinessWait};
+use tethys::{CallerMode, IndexOptions, Language};
+
+const SHAPES_FIXTURE: &str = include_str!("fixtures/fake_lsp/shapes.json");
+
+/// Runs `tethys-fake-lsp` with a fixture file.
+struct FakeLsp {
+    fixture: String,
+    readiness: ReadinessWait,
+    queries: DefinitionQueries,
+}
+
+impl LspProvider for FakeLsp {
+    fn command(&self) -> &'static str {
+        env!("CARGO_BIN_EXE_tethys-fake-lsp")
+    }
+
+    fn args(&self) -> Vec<&str> {
+        vec![self.fixture.as_str()]
+    }
+
+    fn readiness_wait(&self) -> ReadinessWait {
+        self.readiness
+    }
+
+    fn definition_queries(&self) -> DefinitionQueries {
+        self.queries
+    }
+}
+
+/// Write `fixture` with `overrides`' top-level keys replaced into `dir`,
+/// and return a provider serving it.
+fn fake_lsp(dir: &Path, fixture: &str, overrides: Value) -> FakeLsp {
+    let mut fixture: Value = serde_json::from_str(fixture).expect("fixture is JSON");
+    if let (Some(fixture), Value::Object(overrides)) = (fixture.as_object_mut(), overrides) {
+        fixture.extend(overrides);
+    }
+    let readiness = match fixture["readiness"].as_str() {
+        Some("solution_load") => ReadinessWait::SolutionLoad,
+        _ => ReadinessWait::Quiescence,
+    };
+    let path = dir.join("fake-lsp.json");
+    std::fs::write(&path, fixture.to_string()).expect("write fixture");
+    FakeLsp {
+        fixture: path.to_string_lossy().into_owned(),
+        readiness,
+        queries: DefinitionQueries::PerReference,
+    }
+}
+
+fn resolved_by_lsp(columns: [u32; 2]) -> Vec<(u32, Option<String>, Option<String>)> {
+    vec![
+        (
+            columns[0],
+            Some("lsp".to_string()),
+            Some("Circle::area".to_string()),
+        ),
+        (
+            columns[1],
+            Some("lsp".to_string()),
+            Some("Square::area".to_string()),
+        ),
+    ]
+}
+
+#[test]
+fn pass3_resolves_calls_from_replayed_definitions() {
+    let (dir, mut tethys) = shapes_workspace("    c.area() + s.area()");
+    tethys.set_lsp_provider(
+        Language::Rust,
+        fake_lsp(dir.path(), SHAPES_FIXTURE, json!({})),
+    );
+
+    let stats = tethys
+        .index_with_options(IndexOptions::with_lsp())
+        .expect("index failed");
+
+    assert_eq!(
+        stats.total_lsp_resolved(),
+        2,
+        "got {:?}",
+        stats.lsp_sessions
+    );
+    assert_eq!(area_calls(&tethys), resolved_by_lsp([7, 18]));
+}
+
+/// Against a server that answers only for open documents, both query
+/// strategies have each document open while its queries are in flight.
+#[test]
+fn pass3_queries_documents_while_they_are_open() {
+    for queries in [
+        DefinitionQueries::PerReference,
+        DefinitionQueries::PerDocument,
+    ] {
+        let (dir, mut tethys) = shapes_workspace("    c.area() + s.area()");
+        let mut provider = fake_lsp(dir.path(), SHAPES_FIXTURE, json!({"require_open": true}));
+        provider.queries = queries;
+        tethys.set_lsp_provider(Language::Rust, provider);
+
+        let stats = tethys
+            .index_with_options(IndexOptions::with_lsp())
+            .expect("index failed");
+
+        assert_eq!(
+            area_calls(&tethys),
+            resolved_by_lsp([7, 18]),
+            "{queries:?}: {:?}",
+            stats.lsp_sessions
+        );
+    }
+}
+
+#[test]
+fn pass3_waits_for_solution_load_readiness() {
+    let (dir, mut tethys) = shapes_workspace("    c.area() + s.area()");
+    tethys.set_lsp_provider(
+        Language::Rust,
+        fake_lsp(
+            dir.path(),
+            SHAPES_FIXTURE,
+            json!({"readiness": "solution_load", "ready_after_ms": 50}),
+        ),
+    );
+
+    let stats = tethys
+        .index_with_options(IndexOptions::with_lsp())
+        .expect("index failed");
+
+    assert_eq!(
+        stats.total_lsp_resolved(),
+        2,
+        "got {:?}",
+        stats.lsp_sessions
+    );
+}
+
+/// With `utf-16` negotiated, the client must convert the byte columns
+/// after the non-ASCII comment: `é` is two bytes but one UTF-16 unit.
+#[test]
+fn pass3_converts_columns_for_a_utf16_server() {
+    let (dir, mut tethys) = shapes_workspace("    /* é */ c.area() + s.area()");
+    let fixture = json!({
+        "position_encoding": "utf-16",
+        "definitions": [
+            {
+                "path": "src/lib.rs", "line": 5, "character": 14,
+                "target": {"path": "src/shapes.rs", "line": 12},
+            },
+            {
+                "path": "src/lib.rs", "line": 5, "character": 25,
+                "target": {"path": "src/shapes.rs", "line": 18},
+            },
+        ],
+    });
+    tethys.set_lsp_provider(
+        Language::Rust,
+        fake_lsp(dir.path(), &fixture.to_string(), json!({})),
+    );
+
+    tethys
+        .index_with_options(IndexOptions::with_lsp())
+        .expect("index failed");
+
+    assert_eq!(area_calls(&tethys), resolved_by_lsp([16, 27]));
+}
+
+#[test]
+fn lsp_refined_callers_merge_replayed_references() {
+    let (dir, mut tethys) = workspace_with_files(&[(
+        "src/lib.rs",
+        "pub fn target() -> bool {\n\
+         \x20   true\n\
+         }\n\
+         \n\
+         pub fn indexed_caller() -> bool {\n\
+         \x20   target()\n\
+         }\n\
+         \n\
+         pub fn lsp_only_caller() -> bool {\n\
+         \x20   true\n\
+         }\n",
+    )]);
+    let fixture = json!({
+        "references": [{
+            "path": "src/lib.rs", "line": 0, "character": 7,
+            "locations": [
+                {"path": "src/lib.rs", "line": 5, "character": 4},
+                {"path": "src/lib.rs", "line": 9, "character": 4},
+            ],
+        }],
+    });
+    tethys.set_lsp_provider(
+        Language::Rust,
+        fake_lsp(dir.path(), &fixture.to_string(), json!({})),
+    );
+    tethys.index().expect("index failed");
+
+    let mut callers: Vec<String> = tethys
+        .get_callers("target", CallerMode::LspRefined)
+        .expect("callers")
+        .into_iter()
+        .map(|caller| caller.symbol.qualified_name)
+        .collect();
+    callers.sort();
+
+    assert_eq!(callers, ["indexed_caller", "lsp_only_caller"]);
+}
@@ -2294,12 +2294,12 @@ fn canonical_reachability_preserves_source_and_dangling_posture() {
     connection
         .execute(
             "INSERT INTO symbols (
-                file_id, name, module_path, qualified_name, kind, line, column,
-                end_line, end_column, signature, visibility, parent_symbol_id, is_test
+                file_id, name, module_path, qualified_name, kind_code, line, column,
+                end_line, end_column, signature, visibility_code, parent_symbol_id, is_test
              )
              SELECT
-                file_id, name, module_path, qualified_name, kind, line, column,
-                end_line, end_column, signature, visibility, parent_symbol_id, is_test
+                file_id, name, module_path, qualified_name, kind_code, line, column,
+                end_line, end_column, signature, visibility_code, parent_symbol_id, is_test
              FROM symbols WHERE id = ?1",
             [source_id],
         )
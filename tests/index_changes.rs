@@ -0,0 +1,156 @@
+//! The index generation and change feed (`Tethys::changes_since`): each
+//! run bumps the generation and logs exactly the entries it changed, so a
+//! consumer can invalidate what it cached per file and symbol.
+
+mod common;
+
+use std::fs;
+use std::path::Path;
+
+use common::workspace_with_files;
+use tethys::{ChangeKind, ChangedEntity, IndexChange, Tethys};
+
+const FILES: &[(&str, &str)] = &[
+    ("src/lib.rs", "pub mod core;\npub mod app;\n"),
+    (
+        "src/core.rs",
+        "pub fn compute(x: i64) -> i64 {\n    x * 2\n}\n",
+    ),
+    (
+        "src/app.rs",
+        "use crate::core::compute;\n\npub fn run() -> i64 {\n    compute(1)\n}\n",
+    ),
+];
+
+fn entries(changes: &[IndexChange], entity: ChangedEntity) -> Vec<(ChangeKind, String)> {
+    changes
+        .iter()
+        .filter(|c| c.entity == entity)
+        .map(|c| {
+            let what = match (&c.name, &c.target) {
+                (Some(name), Some(target)) => format!("{name} -> {target}"),
+                (Some(name), None) => name.clone(),
+                (None, Some(target)) => format!("{} -> {target}", c.path.display()),
+                (None, None) => c.path.display().to_string(),
+            };
+            (c.kind, what)
+        })
+        .collect()
+}
+
+#[test]
+fn reindexing_unchanged_files_logs_nothing() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+    let first = tethys.index().expect("index").generation;
+
+    let second = tethys.index().expect("re-index").generation;
+    let changes = tethys.changes_since(first).expect("changes");
+
+    assert_eq!(second, first + 1);
+    assert_eq!(tethys.generation().expect("generation"), second);
+    assert!(changes.complete);
+    assert!(changes.changes.is_empty(), "got {:?}", changes.changes);
+}
+
+#[test]
+fn update_logs_the_symbols_and_edges_it_changed() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    let indexed = tethys.index().expect("index").generation;
+
+    fs::write(
+        dir.path().join("src/app.rs"),
+        "use crate::core::compute;\n\npub fn run() -> i64 {\n    compute(1)\n}\n\n\
+         pub fn again() -> i64 {\n    compute(2)\n}\n",
+    )
+    .expect("edit app.rs");
+    let update = tethys.update().expect("update");
+    let changes = tethys.changes_since(indexed).expect("changes").changes;
+
+    assert_eq!(update.generation, indexed + 1);
+    assert!(changes.iter().all(|c| c.generation == update.generation));
+    assert_eq!(
+        entries(&changes, ChangedEntity::File),
+        [(ChangeKind::Modified, "src/app.rs".to_string())]
+    );
+    assert_eq!(
+        entries(&changes, ChangedEntity::Symbol),
+        [(ChangeKind::Added, "again".to_string())]
+    );
+    assert_eq!(
+        entries(&changes, ChangedEntity::CallEdge),
+        [(ChangeKind::Added, "again -> compute".to_string())]
+    );
+    assert!(
+        entries(&changes, ChangedEntity::FileDependency)
+            .iter()
+            .all(|(kind, _)| *kind == ChangeKind::Modified),
+        "app.rs still depends on core.rs and on nothing new"
+    );
+}
+
+#[test]
+fn shifting_a_symbol_does_not_log_it_as_modified() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    let indexed = tethys.index().expect("index").generation;
+
+    // `compute` moves down two lines; nothing about it changes.
+    fs::write(
+        dir.path().join("src/core.rs"),
+        "// Arithmetic helpers.\n\npub fn compute(x: i64) -> i64 {\n    x * 2\n}\n",
+    )
+    .expect("edit core.rs");
+    tethys.update().expect("update");
+    let changes = tethys.changes_since(indexed).expect("changes").changes;
+
+    assert_eq!(
+        entries(&changes, ChangedEntity::File),
+        [(ChangeKind::Modified, "src/core.rs".to_string())]
+    );
+    assert!(
+        entries(&changes, ChangedEntity::Symbol).is_empty(),
+        "got {changes:?}"
+    );
+    assert!(entries(&changes, ChangedEntity::CallEdge).is_empty());
+}
+
+#[test]
+fn removed_files_log_their_symbols_as_removed() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    let indexed = tethys.index().expect("index").generation;
+
+    fs::remove_file(dir.path().join("src/app.rs")).expect("delete app.rs");
+    tethys.update().expect("update");
+    let changes = tethys.changes_since(indexed).expect("changes").changes;
+
+    assert!(changes.iter().all(|c| c.kind == ChangeKind::Removed));
+    assert!(
+        entries(&changes, ChangedEntity::Symbol).contains(&(ChangeKind::Removed, "run".into()))
+    );
+    assert!(
+        changes
+            .iter()
+            .any(|c| c.entity == ChangedEntity::File && c.path == Path::new("src/app.rs"))
+    );
+}
+
+#[test]
+fn a_rebuilt_index_cannot_answer_for_older_generations() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    let indexed = tethys.index().expect("index").generation;
+
+    tethys.rebuild().expect("rebuild");
+    let after_rebuild = tethys.changes_since(indexed).expect("changes");
+    assert!(after_rebuild.generation > indexed);
+    assert!(!after_rebuild.complete);
+    assert!(after_rebuild.changes.is_empty());
+
+    // Deleting the index files and indexing again
+    // also starts above every generation the old database handed out.
+    let current = after_rebuild.generation;
+    drop(tethys);
+    Tethys::remove_index_files(dir.path()).expect("remove");
+    let mut fresh = Tethys::new(dir.path()).expect("reopen");
+    let reindexed = fresh.index().expect("index").generation;
+    assert!(reindexed > current);
+    assert!(!fresh.changes_since(current).expect("changes").complete);
+}
@@ -0,0 +1,125 @@
+//! Panic points classified at extraction (`Tethys::get_panic_points`,
+//! `count_panic_points`, `get_panic_density`): method calls and the
+//! panicking std macros are recognised as Pass 1 stores them, resolved refs
+//! are not panic points, and an update reclassifies the files it re-parses.
+
+mod common;
+
+use std::fs;
+use std::path::PathBuf;
+
+use common::{open_db, workspace_with_files};
+use tethys::{PanicKind, Tethys};
+
+const FILES: &[(&str, &str)] = &[
+    ("src/lib.rs", "pub mod config;\npub mod flow;\n"),
+    (
+        "src/config.rs",
+        "pub fn load(raw: Option<&str>) -> &str {\n\
+         \x20   raw.expect(\"config present\")\n\
+         }\n\n\
+         #[cfg(test)]\n\
+         mod tests {\n\
+         \x20   #[test]\n\
+         \x20   fn loads() {\n\
+         \x20       super::load(Some(\"x\")).parse::<u8>().unwrap();\n\
+         \x20   }\n\
+         }\n",
+    ),
+    (
+        "src/flow.rs",
+        "macro_rules! todo {\n    () => {};\n}\n\n\
+         pub fn step(n: u8) -> u8 {\n\
+         \x20   match n {\n\
+         \x20       0 => panic!(\"zero\"),\n\
+         \x20       1 => std::unreachable!(),\n\
+         \x20       _ => {}\n\
+         \x20   }\n\
+         \x20   todo!();\n\
+         \x20   n\n\
+         }\n",
+    ),
+];
+
+fn sites(tethys: &Tethys, include_tests: bool) -> Vec<(String, u32, PanicKind)> {
+    tethys
+        .get_panic_points(include_tests, None)
+        .expect("panic points")
+        .into_iter()
+        .map(|p| (p.path.display().to_string(), p.line, p.kind))
+        .collect()
+}
+
+#[test]
+fn calls_and_std_macros_are_panic_points() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+
+    // The workspace's own `todo!` binds its macro_rules! and is no panic
+    // point.
+    assert_eq!(
+        sites(&tethys, true),
+        vec![
+            ("src/config.rs".to_string(), 2, PanicKind::Expect),
+            ("src/config.rs".to_string(), 9, PanicKind::Unwrap),
+            ("src/flow.rs".to_string(), 7, PanicKind::Panic),
+            ("src/flow.rs".to_string(), 8, PanicKind::Unreachable),
+        ]
+    );
+    assert_eq!(tethys.count_panic_points().expect("count"), (3, 1));
+
+    let conn = open_db(&tethys);
+    let resolved: i64 = conn
+        .query_row(
+            "SELECT COUNT(*) FROM refs WHERE panic_code IS NOT NULL AND symbol_id IS NOT NULL",
+            [],
+            |row| row.get(0),
+        )
+        .expect("count resolved");
+    assert_eq!(resolved, 0, "resolved refs never carry a panic kind");
+}
+
+#[test]
+fn density_rolls_up_per_file() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+
+    let density = tethys.get_panic_density().expect("density");
+    let rows: Vec<(PathBuf, u32, u32)> = density
+        .iter()
+        .map(|d| (d.path.clone(), d.production_count, d.test_count))
+        .collect();
+    assert_eq!(
+        rows,
+        vec![
+            (PathBuf::from("src/flow.rs"), 2, 0),
+            (PathBuf::from("src/config.rs"), 1, 1),
+        ]
+    );
+    assert!(
+        density
+            .iter()
+            .all(|d| d.size_bytes > 0 && d.per_kib() > 0.0)
+    );
+}
+
+#[test]
+fn update_reclassifies_the_edited_file() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+
+    fs::write(
+        dir.path().join("src/flow.rs"),
+        "pub fn step(n: u8) -> u8 {\n    if n == 0 {\n        unimplemented!()\n    }\n    n\n}\n",
+    )
+    .expect("edit flow.rs");
+    tethys.update().expect("update");
+
+    assert_eq!(
+        sites(&tethys, false),
+        vec![
+            ("src/config.rs".to_string(), 2, PanicKind::Expect),
+            ("src/flow.rs".to_string(), 3, PanicKind::Unimplemented),
+        ]
+    );
+}
@@ -0,0 +1,282 @@
+//! Plan fences for the hot query shapes: each must stay on the index
+//! designed for it (see the refs, `call_edges`, `file_deps` and `imports`
+//! index comments in `src/db/schema.rs`). The SQL mirrors the statements
+//! in `src/db/graph.rs` and `src/db/references.rs`; change them together.
+//! Latency for the same shapes is benched in `benches/queries.rs`
+//! (`query_shapes`).
+
+mod common;
+
+use common::{open_db, workspace_with_files};
+use rusqlite::{Connection, ToSql};
+
+const FILES: &[(&str, &str)] = &[
+    ("src/lib.rs", "pub mod core;\npub mod app;\n"),
+    (
+        "src/core.rs",
+        "pub fn compute(x: i64) -> i64 {\n    x * 2\n}\n\npub fn twice(x: i64) -> i64 {\n    compute(compute(x))\n}\n",
+    ),
+    (
+        "src/app.rs",
+        "use crate::core::{compute, twice};\n\npub fn run() -> i64 {\n    twice(1) + compute(2) + external::call()\n}\n",
+    ),
+];
+
+const SYMBOL_COLUMNS: &str = "s.id, s.file_id, s.name, s.module_path, s.qualified_name,
+    s.kind, s.line, s.column, s.end_line, s.end_column,
+    s.signature, s.visibility, s.parent_symbol_id, s.is_test";
+
+const REFS_COLUMNS: &str = "id, symbol_id, file_id, kind, line, column, end_line, end_column, in_symbol_id, reference_name";
+
+const EXCLUDE_SPECULATIVE: &str = " AND EXISTS (SELECT 1 FROM refs_banded rb
+    WHERE rb.in_symbol_id = ce.caller_symbol_id
+      AND rb.symbol_id = ce.callee_symbol_id
+      AND rb.band != 'speculative')";
+
+fn indexed() -> (tempfile::TempDir, Connection) {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index failed");
+    let conn = open_db(&tethys);
+    (dir, conn)
+}
+
+fn plan(conn: &Connection, sql: &str, params: &[&dyn ToSql]) -> Vec<String> {
+    conn.prepare(&format!("EXPLAIN QUERY PLAN {sql}"))
+        .expect("explain should prepare")
+        .query_map(params, |row| row.get::<_, String>(3))
+        .expect("explain should run")
+        .collect::<Result<_, _>>()
+        .expect("explain rows")
+}
+
+fn assert_uses(plan: &[String], step: &str) {
+    assert!(
+        plan.iter().any(|detail| detail.contains(step)),
+        "plan must contain `{step}`; plan: {plan:?}"
+    );
+}
+
+fn assert_avoids(plan: &[String], step: &str) {
+    assert!(
+        !plan
+            .iter()
+            .any(|detail| detail == step || detail.starts_with(&format!("{step} "))),
+        "plan must not contain `{step}`; plan: {plan:?}"
+    );
+}
+
+fn callers_sql(exclusion: &str) -> String {
+    format!(
+        "SELECT {SYMBOL_COLUMNS}, f.path
+         FROM call_edges ce
+         JOIN symbols s ON s.id = ce.caller_symbol_id
+         JOIN files f ON f.id = s.file_id
+         WHERE ce.callee_symbol_id = ?1{exclusion}
+         ORDER BY s.qualified_name"
+    )
+}
+
+fn transitive_callers_sql(exclusion: &str) -> String {
+    format!(
+        "WITH RECURSIVE caller_tree(symbol_id, depth) AS (
+             SELECT caller_symbol_id, 1
+             FROM call_edges ce
+             WHERE callee_symbol_id = ?1 AND ?2 >= 1{exclusion}
+             UNION
+             SELECT ce.caller_symbol_id, ct.depth + 1
+             FROM call_edges ce
+             JOIN caller_tree ct ON ce.callee_symbol_id = ct.symbol_id
+             WHERE ct.depth < ?2{exclusion}
+         ),
+         nearest(symbol_id, min_depth) AS (
+             SELECT symbol_id, MIN(depth) FROM caller_tree GROUP BY symbol_id
+         )
+         SELECT {SYMBOL_COLUMNS}, f.path, n.min_depth
+         FROM nearest n
+         JOIN symbols s ON s.id = n.symbol_id
+         JOIN files f ON f.id = s.file_id
+         ORDER BY n.min_depth, s.qualified_name"
+    )
+}
+
+#[test]
+fn callers_read_only_the_callee_index() {
+    let (_dir, conn) = indexed();
+
+    for exclusion in ["", EXCLUDE_SPECULATIVE] {
+        let plan = plan(&conn, &callers_sql(exclusion), &[&1]);
+        assert_uses(&plan, "COVERING INDEX idx_call_edges_callee");
+        if !exclusion.is_empty() {
+            assert_uses(&plan, "COVERING INDEX idx_refs_in_symbol");
+        }
+    }
+}
+
+#[test]
+fn callees_walk_the_call_edges_primary_key() {
+    let (_dir, conn) = indexed();
+
+    let plan = plan(
+        &conn,
+        &format!(
+            "SELECT {SYMBOL_COLUMNS}, ce.call_count
+             FROM call_edges ce
+             JOIN symbols s ON s.id = ce.callee_symbol_id
+             WHERE ce.caller_symbol_id = ?1
+             ORDER BY s.qualified_name"
+        ),
+        &[&1],
+    );
+
+    assert_uses(&plan, "PRIMARY KEY (caller_symbol_id=?)");
+}
+
+#[test]
+fn transitive_callers_look_symbols_up_by_id() {
+    let (_dir, conn) = indexed();
+
+    for exclusion in ["", EXCLUDE_SPECULATIVE] {
+        let plan = plan(&conn, &transitive_callers_sql(exclusion), &[&1, &50]);
+        assert_uses(&plan, "COVERING INDEX idx_call_edges_callee");
+        assert_avoids(&plan, "SCAN s");
+    }
+}
+
+#[test]
+fn transitive_dependents_look_files_up_by_id() {
+    let (_dir, conn) = indexed();
+
+    let plan = plan(
+        &conn,
+        "WITH RECURSIVE dependent_tree(file_id, depth) AS (
+             SELECT DISTINCT fd.from_file_id, 1
+             FROM file_deps fd
+             WHERE fd.to_file_id = ?1 AND ?2 >= 1
+             UNION
+             SELECT DISTINCT fd.from_file_id, dt.depth + 1
+             FROM file_deps fd
+             JOIN dependent_tree dt ON fd.to_file_id = dt.file_id
+             WHERE dt.depth < ?2
+         ),
+         nearest(file_id, min_depth) AS (
+             SELECT file_id, MIN(depth) FROM dependent_tree GROUP BY file_id
+         )
+         SELECT f.path, n.min_depth
+         FROM nearest n
+         JOIN files f ON f.id = n.file_id
+         ORDER BY n.min_depth, f.path",
+        &[&1, &50],
+    );
+
+    assert_uses(&plan, "COVERING INDEX idx_file_deps_to");
+    assert_avoids(&plan, "SCAN f");
+}
+
+#[test]
+fn reference_lists_come_presorted_from_their_index() {
+    let (_dir, conn) = indexed();
+
+    for (sql, index) in [
+        (
+            format!("SELECT {REFS_COLUMNS} FROM refs WHERE symbol_id = ?1 ORDER BY file_id, line"),
+            "idx_refs_symbol",
+        ),
+        (
+            format!("SELECT {REFS_COLUMNS} FROM refs WHERE file_id = ?1 ORDER BY line, column"),
+            "idx_refs_file",
+        ),
+    ] {
+        let plan = plan(&conn, &sql, &[&1]);
+        assert_uses(&plan, index);
+        assert_avoids(&plan, "USE TEMP B-TREE FOR ORDER BY");
+    }
+
+    let plan = plan(
+        &conn,
+        &format!("SELECT {REFS_COLUMNS} FROM refs WHERE symbol_id IS NULL ORDER BY file_id, line"),
+        &[],
+    );
+    assert_uses(&plan, "idx_refs_unresolved");
+    assert_avoids(&plan, "USE TEMP B-TREE FOR ORDER BY");
+}
+
+#[test]
+fn imports_of_a_file_use_the_primary_key() {
+    let (_dir, conn) = indexed();
+
+    let plan = plan(
+        &conn,
+        "SELECT file_id, symbol_name, source_module, alias
+         FROM imports WHERE file_id = ?1 ORDER BY source_module, symbol_name",
+        &[&1],
+    );
+
+    assert_uses(&plan, "PRIMARY KEY (file_id=?)");
+}
+
+/// The type closure is built from the inherit refs alone and read by
+/// either end of a pair (`src/db/type_closure.rs`, `src/db/hierarchy.rs`).
+#[test]
+fn type_closure_reads_stay_on_their_indexes() {
+    let (_dir, conn) = indexed();
+
+    let plan_edges = plan(
+        &conn,
+        "SELECT r.in_symbol_id, r.symbol_id FROM refs r
+         JOIN symbols s ON s.id = r.in_symbol_id
+         WHERE r.kind_code = 4 AND r.symbol_id IS NOT NULL
+           AND s.kind IN ('struct','class','enum','trait','interface','type_alias')",
+        &[],
+    );
+    assert_uses(&plan_edges, "idx_refs_inherit");
+    assert_avoids(&plan_edges, "SCAN r");
+
+    let plan_up = plan(
+        &conn,
+        "SELECT ancestor_id, depth FROM type_closure WHERE descendant_id = ?1",
+        &[&1],
+    );
+    assert_uses(&plan_up, "PRIMARY KEY (descendant_id=?)");
+
+    let plan_down = plan(
+        &conn,
+        "SELECT descendant_id, depth FROM type_closure WHERE ancestor_id = ?1",
+        &[&1],
+    );
+    assert_uses(&plan_down, "idx_type_closure_ancestor");
+}
+
+/// Panic points are classified at Pass 1, so the panic-points queries walk
+/// the partial `idx_refs_panic` rather than every ref
+/// (`src/db/panic_points.rs`).
+#[test]
+fn panic_point_reads_stay_on_their_partial_index() {
+    let (_dir, conn) = indexed();
+
+    let plan_count = plan(
+        &conn,
+        "SELECT s.is_test, COUNT(*)
+         FROM refs r
+         JOIN symbols s ON r.in_symbol_id = s.id
+         WHERE r.panic_code IS NOT NULL
+           AND s.kind IN ('function', 'method')
+         GROUP BY s.is_test",
+        &[],
+    );
+    assert_uses(&plan_count, "idx_refs_panic");
+    assert_avoids(&plan_count, "SCAN s");
+
+    let plan_file = plan(
+        &conn,
+        "SELECT f.path, r.line, r.panic, s.name, s.is_test
+         FROM refs r
+         JOIN files f ON r.file_id = f.id
+         JOIN symbols s ON r.in_symbol_id = s.id
+         WHERE r.panic_code IS NOT NULL
+           AND s.kind IN ('function', 'method')
+           AND f.path = ?1
+         ORDER BY f.path, r.line",
+        &[&"src/app.rs"],
+    );
+    assert_uses(&plan_file, "idx_refs_panic (file_id=?)");
+}
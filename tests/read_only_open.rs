@@ -0,0 +1,71 @@
+//! Integration tests for `Tethys::open_read_only`, the query commands'
+//! startup path: it opens a current index without DDL or pragma writes and
+//! falls back to `Tethys::new` when the index is missing.
+
+mod common;
+
+use common::{open_db, workspace_with_files};
+use tethys::{Error, IndexOptions, Tethys};
+
+const FILES: &[(&str, &str)] = &[("src/lib.rs", "pub fn alpha() {}\n\npub fn beta() {}\n")];
+
+#[test]
+fn read_only_open_answers_queries() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index failed");
+
+    let reader = Tethys::open_read_only(dir.path()).expect("read-only open");
+
+    let names: Vec<String> = reader
+        .search_symbols("alpha")
+        .expect("search")
+        .into_iter()
+        .map(|s| s.name)
+        .collect();
+    assert_eq!(names, ["alpha"]);
+    assert_eq!(
+        reader.crates().len(),
+        1,
+        "crate discovery is reused from the index"
+    );
+}
+
+#[test]
+fn read_only_instance_refuses_to_index() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index failed");
+    let mut reader = Tethys::open_read_only(dir.path()).expect("read-only open");
+
+    let result = reader.index_with_options(IndexOptions::default());
+
+    assert!(matches!(result, Err(Error::Config(_))), "got {result:?}");
+}
+
+#[test]
+fn read_only_open_without_an_index_falls_back_to_new() {
+    let (dir, _tethys) = workspace_with_files(FILES);
+    let db_path = dir.path().join(".rivets/index/tethys.db");
+    std::fs::remove_file(&db_path).expect("remove db");
+
+    let mut reader = Tethys::open_read_only(dir.path()).expect("fallback open");
+
+    assert!(db_path.exists(), "the fallback creates the index");
+    reader.index().expect("a fallback instance is writable");
+}
+
+#[test]
+fn index_from_another_schema_version_asks_for_a_rebuild() {
+    let (dir, tethys) = workspace_with_files(FILES);
+    open_db(&tethys)
+        .pragma_update(None, "user_version", 999)
+        .expect("set user_version");
+    drop(tethys);
+
+    for result in [Tethys::open_read_only(dir.path()), Tethys::new(dir.path())] {
+        match result {
+            Err(Error::Config(message)) => assert!(message.contains("--rebuild"), "{message}"),
+            Err(other) => panic!("expected a rebuild error, got {other:?}"),
+            Ok(_) => panic!("expected a rebuild error, got an open index"),
+        }
+    }
+}
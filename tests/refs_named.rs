@@ -95,9 +95,10 @@ pub fn use_it() {
 
 /// Slice 5 — claim C4: the view cannot introduce panic-points false positives.
 ///
-/// `panic_points` filters `WHERE reference_name IN ('unwrap','expect')` with NO
-/// `symbol_id` guard, so a resolved ref becomes a panic site iff it gains such
-/// a `reference_name`. The view never writes `reference_name`, so this stays 0.
+/// `panic_points` classifies refs by `reference_name` at Pass 1 and trusts the
+/// stored class with NO `symbol_id` guard, so a resolved ref becomes a panic
+/// site iff it keeps such a `reference_name`. The view never writes
+/// `reference_name`, so this stays 0.
 ///
 /// DEVIATION from the plan: the planned fence asserted panic-points CLI output
 /// directly, but that output is entangled with name-only method misresolution
@@ -0,0 +1,109 @@
+//! The report cache (`Tethys::set_report_cache`): a whole-workspace report
+//! is computed once per index generation and served from
+//! `report-cache.db` until the next indexing run.
+//!
+//! The tests rename a symbol behind the index's back (no indexing run, so
+//! no new generation): a served report still shows the old name, a
+//! computed one the new name.
+
+mod common;
+
+use common::{open_db, workspace_with_files};
+use tethys::{DeadCodeReport, Tethys};
+
+const FILES: &[(&str, &str)] = &[
+    (
+        "src/lib.rs",
+        "mod helpers;\npub fn api() {}\n\n\
+         #[cfg(test)]\nmod tests {\n    #[test]\n    fn calls_api() {\n\
+         \x20       super::api();\n    }\n}\n",
+    ),
+    (
+        "src/helpers.rs",
+        "fn lonely_qr() -> i32 {\n    1\n}\n\nfn idle_qr() -> i32 {\n    2\n}\n",
+    ),
+];
+
+fn names(report: &DeadCodeReport) -> Vec<&str> {
+    report.findings.iter().map(|f| f.name.as_str()).collect()
+}
+
+fn rename_behind_the_index(tethys: &Tethys) {
+    open_db(tethys)
+        .execute(
+            "UPDATE symbols SET name = 'renamed_qr' WHERE name = 'lonely_qr'",
+            [],
+        )
+        .expect("rename");
+}
+
+#[test]
+fn reports_are_served_until_the_next_index_run() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+
+    let computed = tethys.find_dead_code(None).expect("computed");
+    assert_eq!(names(&computed), ["lonely_qr", "idle_qr"]);
+    assert!(dir.path().join(".rivets/index/report-cache.db").is_file());
+
+    rename_behind_the_index(&tethys);
+    let served = tethys.find_dead_code(None).expect("served");
+    assert_eq!(names(&served), names(&computed));
+
+    tethys.index().expect("re-index");
+    let recomputed = tethys.find_dead_code(None).expect("recomputed");
+    assert_eq!(names(&recomputed), ["lonely_qr", "idle_qr"]);
+    rename_behind_the_index(&tethys);
+    tethys.update().expect("no-op update");
+    assert_eq!(
+        names(&tethys.find_dead_code(None).expect("served again")),
+        ["lonely_qr", "idle_qr"],
+        "an update that changed nothing keeps the generation"
+    );
+}
+
+#[test]
+fn a_served_report_still_honors_the_limit() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+    tethys.find_dead_code(None).expect("fill the cache");
+
+    let limited = tethys.find_dead_code(Some(1)).expect("limited");
+
+    assert_eq!(names(&limited), ["lonely_qr"]);
+    assert_eq!(limited.summary.candidates, 2);
+}
+
+#[test]
+fn disabling_the_cache_recomputes() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+    tethys.find_dead_code(None).expect("fill the cache");
+    rename_behind_the_index(&tethys);
+
+    tethys.set_report_cache(false);
+    let fresh = tethys.find_dead_code(None).expect("fresh");
+
+    assert_eq!(names(&fresh), ["renamed_qr", "idle_qr"]);
+}
+
+#[test]
+fn read_only_instances_share_the_cache() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+    tethys.get_untested_code().expect("fill the cache");
+    rename_behind_the_index(&tethys);
+    drop(tethys);
+
+    let reader = Tethys::open_read_only(dir.path()).expect("open read-only");
+    let computed = reader.find_dead_code(None).expect("dead code");
+    let served = reader.get_untested_code().expect("untested");
+
+    assert_eq!(
+        names(&computed),
+        ["renamed_qr", "idle_qr"],
+        "not cached yet"
+    );
+    let untested: Vec<&str> = served.findings.iter().map(|f| f.name.as_str()).collect();
+    assert_eq!(untested, ["lonely_qr", "idle_qr"]);
+}
@@ -0,0 +1,78 @@
+//! Integration tests for importing Pass 3 resolutions from a SCIP index
+//! (`tethys index --scip`).
+//!
+//! `fixtures/scip/shapes.scip` is a hand-built index of the workspace in
+//! [`shapes_workspace`], shaped like `rust-analyzer scip` output: no project
+//! root (paths are workspace-relative), `utf-8` positions, locals for the
+//! `let` bindings, and an external `u32` with no definition occurrence.
+
+mod common;
+
+use common::area_calls;
+use tethys::IndexOptions;
+
+const SCIP_FIXTURE: &[u8] = include_bytes!("fixtures/scip/shapes.scip");
+
+/// The calls on line 6 stay unresolved without SCIP.
+fn shapes_workspace() -> (tempfile::TempDir, tethys::Tethys) {
+    common::shapes_workspace("    c.area() + s.area()")
+}
+
+#[test]
+fn ambiguous_method_calls_stay_unresolved_without_scip() {
+    let (_dir, mut tethys) = shapes_workspace();
+    let stats = tethys.index().expect("index failed");
+
+    assert!(stats.scip_import.is_none());
+    assert_eq!(
+        area_calls(&tethys),
+        [(7, None, None), (18, None, None)],
+        "the fixture must leave both calls to Pass 3"
+    );
+}
+
+#[test]
+fn scip_occurrences_resolve_calls_to_their_definitions() {
+    let (dir, mut tethys) = shapes_workspace();
+    let scip_path = dir.path().join("index.scip");
+    std::fs::write(&scip_path, SCIP_FIXTURE).expect("write fixture");
+
+    let stats = tethys
+        .index_with_options(IndexOptions::default().scip_index(&scip_path))
+        .expect("index failed");
+
+    let scip = stats.scip_import.expect("SCIP import ran");
+    assert_eq!(scip.documents, 2);
+    assert!(
+        scip.resolved >= 2 && scip.resolved <= scip.matched,
+        "got {scip:?}"
+    );
+    assert!(stats.lsp_sessions.is_empty(), "no server was involved");
+    assert_eq!(
+        area_calls(&tethys),
+        [
+            (7, Some("lsp".to_string()), Some("Circle::area".to_string())),
+            (
+                18,
+                Some("lsp".to_string()),
+                Some("Square::area".to_string())
+            ),
+        ]
+    );
+}
+
+#[test]
+fn malformed_scip_index_fails_the_run() {
+    let (dir, mut tethys) = shapes_workspace();
+    let scip_path = dir.path().join("index.scip");
+    std::fs::write(&scip_path, &SCIP_FIXTURE[..SCIP_FIXTURE.len() - 3]).expect("write");
+
+    let err = tethys
+        .index_with_options(IndexOptions::default().scip_index(&scip_path))
+        .expect_err("a truncated index must not import");
+    assert!(matches!(err, tethys::Error::Parser(_)), "got {err:?}");
+
+    let missing = tethys
+        .index_with_options(IndexOptions::default().scip_index(dir.path().join("missing.scip")));
+    assert!(matches!(missing, Err(tethys::Error::Io(_))));
+}
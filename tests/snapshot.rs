@@ -0,0 +1,197 @@
+//! Index snapshots (`Tethys::export_snapshot` / `import_snapshot`) and the
+//! incremental `update()` that follows an import: a snapshot restores under
+//! another checkout path, and the update re-parses only the delta yet ends
+//! with the same index a full run would build.
+
+mod common;
+
+use std::fs;
+use std::path::Path;
+
+use common::{open_db, workspace_with_files};
+use tethys::{CallEdgeSelection, CallerMode, Tethys};
+
+const MAIN: &[(&str, &str)] = &[
+    ("src/lib.rs", "pub mod core;\npub mod app;\n"),
+    (
+        "src/core.rs",
+        "pub fn compute(x: i64) -> i64 {\n    x * 2\n}\n",
+    ),
+    (
+        "src/app.rs",
+        "use crate::core::compute;\n\npub fn run() -> i64 {\n    compute(1)\n}\n",
+    ),
+];
+
+const APP_ON_BRANCH: &str = "use crate::core::compute;\n\npub fn run() -> i64 {\n    compute(1)\n}\n\npub fn again() -> i64 {\n    compute(2)\n}\n";
+
+/// Row counts that differ if an update left the index unlike a full run.
+fn shape(tethys: &Tethys) -> [i64; 5] {
+    let conn = open_db(tethys);
+    [
+        "SELECT COUNT(*) FROM files",
+        "SELECT COUNT(*) FROM symbols",
+        "SELECT COUNT(*) FROM refs WHERE symbol_id IS NOT NULL",
+        "SELECT COUNT(*) FROM call_edges",
+        "SELECT COUNT(*) FROM file_deps",
+    ]
+    .map(|sql| conn.query_row(sql, [], |row| row.get(0)).expect(sql))
+}
+
+fn caller_names(tethys: &Tethys, callee: &str) -> Vec<String> {
+    let mut names: Vec<String> = tethys
+        .get_callers(
+            callee,
+            CallerMode::Indexed {
+                call_edges: CallEdgeSelection::All,
+            },
+        )
+        .expect("get_callers")
+        .into_iter()
+        .map(|caller| caller.symbol.name)
+        .collect();
+    names.sort();
+    names
+}
+
+fn refs_to(tethys: &Tethys, name: &str) -> i64 {
+    open_db(tethys)
+        .query_row(
+            "SELECT COUNT(*) FROM refs r JOIN symbols s ON s.id = r.symbol_id WHERE s.name = ?1",
+            [name],
+            |row| row.get(0),
+        )
+        .expect("count refs")
+}
+
+fn export_main(snapshot: &Path) -> tempfile::TempDir {
+    let (dir, mut tethys) = workspace_with_files(MAIN);
+    tethys.index().expect("index main");
+    tethys.export_snapshot(snapshot).expect("export");
+    dir
+}
+
+#[test]
+fn imported_snapshot_updates_only_the_delta_in_another_checkout() {
+    let cache = tempfile::tempdir().expect("cache dir");
+    let snapshot = cache.path().join("main.snapshot");
+    let _main = export_main(&snapshot);
+
+    // The PR checkout: another path, fresh mtimes, one file changed.
+    let (branch_dir, _) = workspace_with_files(MAIN);
+    fs::write(branch_dir.path().join("src/app.rs"), APP_ON_BRANCH).expect("edit app.rs");
+
+    let restored = Tethys::import_snapshot(branch_dir.path(), &snapshot).expect("import");
+    assert_eq!(restored.files, 3);
+    let mut branch = Tethys::new(branch_dir.path()).expect("open branch");
+    let update = branch.update().expect("update");
+
+    assert_eq!(update.files_changed, 1, "only app.rs differs from main");
+    assert_eq!(update.files_unchanged, 2);
+    assert_eq!(caller_names(&branch, "compute"), ["again", "run"]);
+
+    let (fresh_dir, mut fresh) = workspace_with_files(MAIN);
+    fs::write(fresh_dir.path().join("src/app.rs"), APP_ON_BRANCH).expect("edit app.rs");
+    fresh.index().expect("full index");
+    assert_eq!(shape(&branch), shape(&fresh));
+
+    let again = branch.update().expect("second update");
+    assert_eq!(again.files_changed, 0, "mtimes were refreshed by the first");
+}
+
+#[test]
+fn update_reparses_files_that_referenced_a_changed_file() {
+    let (dir, mut tethys) = workspace_with_files(MAIN);
+    tethys.index().expect("index");
+    let before = shape(&tethys);
+
+    // A different size, so the change shows even within one mtime tick.
+    // Rewriting core.rs replaces `compute`'s symbol row, and with it the
+    // resolved reference in app.rs, which must be re-parsed to get it back.
+    fs::write(
+        dir.path().join("src/core.rs"),
+        "pub fn compute(x: i64) -> i64 {\n    x * 30\n}\n",
+    )
+    .expect("edit core.rs");
+    let update = tethys.update().expect("update");
+
+    assert_eq!(update.files_changed, 2, "core.rs and its referrer app.rs");
+    assert_eq!(caller_names(&tethys, "compute"), ["run"]);
+    assert_eq!(shape(&tethys), before);
+}
+
+#[test]
+fn update_reparses_files_naming_a_symbol_it_adds() {
+    // `helper` inside a macro has no definition yet, so the index drops the
+    // unresolved macro_call ref from app.rs.
+    const BEFORE: &[(&str, &str)] = &[
+        ("src/lib.rs", "pub mod app;\n"),
+        (
+            "src/app.rs",
+            "pub fn run() {\n    assert_eq!(helper(), 1);\n}\n",
+        ),
+    ];
+    const LIB_AFTER: &str = "pub mod app;\npub mod util;\n";
+    const UTIL: &str = "pub fn helper() -> i64 {\n    1\n}\n";
+
+    let (dir, mut tethys) = workspace_with_files(BEFORE);
+    tethys.index().expect("index");
+    assert_eq!(refs_to(&tethys, "helper"), 0);
+
+    fs::write(dir.path().join("src/lib.rs"), LIB_AFTER).expect("edit lib.rs");
+    fs::write(dir.path().join("src/util.rs"), UTIL).expect("add util.rs");
+    tethys.update().expect("update");
+
+    let (fresh_dir, mut fresh) = workspace_with_files(BEFORE);
+    fs::write(fresh_dir.path().join("src/lib.rs"), LIB_AFTER).expect("edit lib.rs");
+    fs::write(fresh_dir.path().join("src/util.rs"), UTIL).expect("add util.rs");
+    fresh.index().expect("full index");
+
+    assert_eq!(refs_to(&fresh, "helper"), 1);
+    assert_eq!(refs_to(&tethys, "helper"), 1, "app.rs was re-parsed");
+    assert_eq!(shape(&tethys), shape(&fresh));
+}
+
+#[test]
+fn update_drops_deleted_files() {
+    let (dir, mut tethys) = workspace_with_files(MAIN);
+    tethys.index().expect("index");
+
+    fs::remove_file(dir.path().join("src/app.rs")).expect("delete app.rs");
+    let update = tethys.update().expect("update");
+
+    assert_eq!(update.files_removed, 1);
+    assert!(caller_names(&tethys, "compute").is_empty());
+    assert!(
+        tethys
+            .get_file(Path::new("src/app.rs"))
+            .expect("lookup")
+            .is_none()
+    );
+}
+
+#[test]
+fn snapshot_from_another_schema_is_refused() {
+    let cache = tempfile::tempdir().expect("cache dir");
+    let snapshot = cache.path().join("main.snapshot");
+    let _main = export_main(&snapshot);
+
+    // Rewrite the header's schema version (bytes 12..16 of the payload).
+    let compressed = fs::read(&snapshot).expect("read snapshot");
+    let mut payload = Vec::new();
+    std::io::Read::read_to_end(
+        &mut flate2::read::GzDecoder::new(compressed.as_slice()),
+        &mut payload,
+    )
+    .expect("decompress");
+    payload[12..16].copy_from_slice(&999_i32.to_le_bytes());
+    let mut encoder = flate2::write::GzEncoder::new(Vec::new(), flate2::Compression::default());
+    std::io::Write::write_all(&mut encoder, &payload).expect("compress");
+    fs::write(&snapshot, encoder.finish().expect("finish")).expect("write snapshot");
+
+    let (branch_dir, _) = workspace_with_files(MAIN);
+    let err = Tethys::import_snapshot(branch_dir.path(), &snapshot).expect_err("refused");
+
+    assert!(matches!(err, tethys::Error::Config(_)), "got {err:?}");
+    assert!(err.to_string().contains("schema version 999"), "got {err}");
+}
@@ -0,0 +1,139 @@
+//! Test reachability (`Tethys::get_test_reach`, and the closure behind
+//! `get_untested_code`): every indexing run leaves it current, an update
+//! maintains it from what it rewrote, and the result matches a traversal
+//! of the whole graph.
+
+mod common;
+
+use std::fs;
+
+use common::{open_db, workspace_with_files};
+use tethys::{TestReach, Tethys};
+
+const FILES: &[(&str, &str)] = &[
+    (
+        "src/lib.rs",
+        "pub mod core;\nmod checks;\n\nuse crate::core::helper;\n\n\
+         pub fn api() {\n    helper();\n}\n\n\
+         #[cfg(test)]\nmod tests {\n    #[test]\n    fn calls_api() {\n\
+         \x20       super::api();\n    }\n}\n",
+    ),
+    (
+        "src/core.rs",
+        "pub fn helper() {\n    deep();\n}\n\npub fn deep() {}\n\npub fn spare() {}\n",
+    ),
+    (
+        "src/checks.rs",
+        "#[cfg(test)]\nmod tests {\n    use crate::core::spare;\n\n\
+         \x20   #[test]\n    fn covers_spare() {\n        spare();\n    }\n}\n",
+    ),
+];
+
+const NAMES: &[&str] = &["api", "helper", "deep", "spare"];
+
+fn reach_of(tethys: &Tethys) -> Vec<TestReach> {
+    NAMES
+        .iter()
+        .map(|name| {
+            tethys
+                .get_test_reach(name)
+                .expect("test reach")
+                .unwrap_or_else(|| panic!("{name} is indexed"))
+        })
+        .collect()
+}
+
+fn reached(tethys: &Tethys, name: &str) -> bool {
+    tethys
+        .get_test_reach(name)
+        .expect("test reach")
+        .is_some_and(|reach| reach.distance.is_some())
+}
+
+fn stored_generation(tethys: &Tethys) -> Option<u64> {
+    open_db(tethys)
+        .query_row(
+            "SELECT generation FROM derived_state WHERE name = 'test_reach'",
+            [],
+            |row| row.get::<_, i64>(0),
+        )
+        .ok()
+        .and_then(|generation| u64::try_from(generation).ok())
+}
+
+/// Compare the maintained reachability with a full traversal, by making
+/// the stored set stale so that lookups traverse.
+fn assert_matches_a_full_traversal(tethys: &Tethys) {
+    let maintained = reach_of(tethys);
+    open_db(tethys)
+        .execute("DELETE FROM derived_state WHERE name = 'test_reach'", [])
+        .expect("invalidate");
+    assert_eq!(maintained, reach_of(tethys));
+}
+
+#[test]
+fn indexing_leaves_reachability_current() {
+    let (_dir, mut tethys) = workspace_with_files(FILES);
+    let stats = tethys.index().expect("index");
+
+    assert_eq!(stored_generation(&tethys), Some(stats.generation));
+    assert!(NAMES.iter().all(|name| reached(&tethys, name)));
+    assert_eq!(
+        tethys.get_test_reach("no_such_symbol").expect("lookup"),
+        None
+    );
+    assert_matches_a_full_traversal(&tethys);
+}
+
+#[test]
+fn update_maintains_reachability_from_the_edit() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.set_report_cache(false);
+    tethys.index().expect("index");
+
+    fs::write(
+        dir.path().join("src/core.rs"),
+        "pub fn helper() {}\n\npub fn deep() {}\n\npub fn spare() {}\n",
+    )
+    .expect("edit core.rs");
+    let update = tethys.update().expect("update");
+
+    assert_eq!(stored_generation(&tethys), Some(update.generation));
+    assert!(!reached(&tethys, "deep"));
+    assert!(reached(&tethys, "helper"));
+    let untested = tethys.get_untested_code().expect("untested");
+    assert!(untested.findings.iter().any(|f| f.name == "deep"));
+    assert_matches_a_full_traversal(&tethys);
+}
+
+#[test]
+fn deleting_a_test_file_unreaches_what_only_it_tested() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+
+    fs::remove_file(dir.path().join("src/checks.rs")).expect("delete checks.rs");
+    tethys.update().expect("update");
+
+    assert!(!reached(&tethys, "spare"));
+    assert!(reached(&tethys, "deep"));
+    assert_matches_a_full_traversal(&tethys);
+}
+
+#[test]
+fn a_stale_set_is_recomputed_by_the_next_run() {
+    let (dir, mut tethys) = workspace_with_files(FILES);
+    tethys.index().expect("index");
+    open_db(&tethys)
+        .execute("DELETE FROM derived_state WHERE name = 'test_reach'", [])
+        .expect("invalidate");
+
+    fs::write(
+        dir.path().join("src/core.rs"),
+        "pub fn helper() {\n    deep();\n    spare();\n}\n\npub fn deep() {}\n\npub fn spare() {}\n",
+    )
+    .expect("edit core.rs");
+    let update = tethys.update().expect("update");
+
+    assert_eq!(stored_generation(&tethys), Some(update.generation));
+    assert_matches_a_full_traversal(&tethys);
+}
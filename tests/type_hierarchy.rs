@@ -259,3 +259,106 @@ fn cli_json_envelope_through_binary_seam() {
         .expect("run binary");
     assert!(!out.status.success(), "unknown type exits non-zero");
 }
+
+fn names_at_depth(nodes: &[tethys::HierarchyNode]) -> Vec<(String, u32)> {
+    nodes.iter().map(|n| (n.name.clone(), n.depth)).collect()
+}
+
+/// Both directions as the precomputed closure serves them, then as the
+/// edge walk answers once the closure is marked stale: they must agree.
+fn closure_and_walk(
+    tethys: &tethys::Tethys,
+    name: &str,
+) -> (Vec<(String, u32)>, Vec<(String, u32)>) {
+    let served = tethys
+        .get_type_hierarchy(name, HierarchyDirection::Both)
+        .expect("closure");
+    open_db(tethys)
+        .execute("DELETE FROM derived_state WHERE name = 'type_closure'", [])
+        .expect("mark stale");
+    let walked = tethys
+        .get_type_hierarchy(name, HierarchyDirection::Both)
+        .expect("walk");
+    assert_eq!(names_at_depth(&served.up), names_at_depth(&walked.up));
+    assert_eq!(names_at_depth(&served.down), names_at_depth(&walked.down));
+    (names_at_depth(&served.up), names_at_depth(&served.down))
+}
+
+const CLOSURE_FILES: &[(&str, &str)] = &[
+    ("src/lib.rs", "pub mod traits;\npub mod types;\n"),
+    (
+        "src/traits.rs",
+        "pub trait A {}\npub trait B: A {}\npub trait C: B + std::fmt::Debug {}\n",
+    ),
+    (
+        "src/types.rs",
+        "use crate::traits::{A, B, C};\n\n\
+         pub struct S {}\nimpl C for S {}\n\n\
+         pub struct T {}\nimpl A for T {}\n",
+    ),
+];
+
+/// The closure is current after indexing and answers like the walk,
+/// external supertypes included.
+#[test]
+fn closure_serves_both_directions_like_the_walk() {
+    let (_dir, mut tethys) = workspace_with_files(CLOSURE_FILES);
+    tethys.index().expect("index");
+    assert!(
+        scalar(
+            &open_db(&tethys),
+            "SELECT COUNT(*) FROM type_closure c JOIN symbols s ON s.id = c.descendant_id
+             WHERE s.name = 'S'",
+        ) >= 1,
+        "closure rows exist for S"
+    );
+
+    let (up, _) = closure_and_walk(&tethys, "S");
+    assert_eq!(
+        up,
+        [
+            ("C".to_string(), 1),
+            ("B".to_string(), 2),
+            ("Debug".to_string(), 2),
+            ("A".to_string(), 3)
+        ]
+    );
+}
+
+/// An update that cuts a supertrait edge, and one that adds an
+/// implementor, leave the closure matching the walk.
+#[test]
+fn update_maintains_the_closure() {
+    let (dir, mut tethys) = workspace_with_files(CLOSURE_FILES);
+    tethys.index().expect("index");
+
+    std::fs::write(
+        dir.path().join("src/traits.rs"),
+        "pub trait A {}\npub trait B {}\npub trait C: B + std::fmt::Debug {}\n",
+    )
+    .expect("edit traits.rs");
+    tethys.update().expect("update");
+    let served = tethys
+        .get_type_hierarchy("A", HierarchyDirection::Down)
+        .expect("down");
+    assert_eq!(names_at_depth(&served.down), [("T".to_string(), 1)]);
+
+    std::fs::write(
+        dir.path().join("src/types.rs"),
+        format!(
+            "{}\npub struct U {{}}\nimpl B for U {{}}\n",
+            CLOSURE_FILES[2].1
+        ),
+    )
+    .expect("edit types.rs");
+    tethys.update().expect("update");
+    let (_, down) = closure_and_walk(&tethys, "B");
+    assert_eq!(
+        down,
+        [
+            ("C".to_string(), 1),
+            ("U".to_string(), 1),
+            ("S".to_string(), 2)
+        ]
+    );
+}